@@ -0,0 +1,305 @@
+# V4.0_STRATEGIC_LOCKED_BY_SMITH_LIN
+# -*- coding: utf-8 -*-
+"""
+Adaptive concurrency limiter for TrinityBridge.run_safe (replaces the fixed bridge semaphore).
+Algorithms:
+- "gradient": grows by sqrt(limit) per round trip while latency stays flat; when recent RTT rises
+  against the long-term or no-load RTT (queueing delay), the limit is scaled by that ratio (>= 0.5).
+- "aimd": +1/limit per success while queueing delay is within tolerance, x backoff (once per RTT)
+  on overload or error.
+- "fixed": constant limit (same behaviour as the former semaphore, plus metrics and fast rejection).
+Per-caller fairness: while another caller is waiting, a caller may hold at most caller_quota * limit
+permits; waiters are served FIFO among callers still under quota. The quota is work-conserving: a
+caller alone in the queue (e.g. all traffic on the default caller) can use the whole limit. A request
+whose estimated queue wait exceeds its timeout is rejected immediately with a retry_after hint instead
+of occupying the queue.
+Run as script for a simulated-latency load test.
+"""
+import math
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+ALGORITHMS = ("gradient", "aimd", "fixed")
+
+
+class LimiterRejected(Exception):
+    """Raised when a permit cannot be granted in time; retry_after is a hint in seconds."""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(f"concurrency limiter rejected ({reason}); retry after {retry_after:.2f}s")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class Permit:
+    """Held while a call runs; release() (or context exit) feeds the latency sample back to the limiter."""
+
+    def __init__(self, limiter: "AdaptiveConcurrencyLimiter", caller: str, wait: float):
+        self._limiter = limiter
+        self.caller = caller
+        self.wait = wait
+        self._start = time.monotonic()
+        self._released = False
+
+    def release(self, error: bool = False) -> None:
+        if not self._released:
+            self._released = True
+            self._limiter._release(self, time.monotonic() - self._start, error)
+
+    def __enter__(self) -> "Permit":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.release(error=exc_type is not None)
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    s = sorted(values)
+    return s[min(len(s) - 1, int(q * (len(s) - 1) + 0.5))]
+
+
+class AdaptiveConcurrencyLimiter:
+    def __init__(
+        self,
+        initial_limit: int = 8,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        algorithm: str = "gradient",
+        caller_quota: float = 1.0,
+        rtt_tolerance: float = 1.5,
+        backoff: float = 0.9,
+        metrics_window: int = 1024,
+    ):
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"algorithm must be one of {ALGORITHMS}, got {algorithm!r}")
+        self.algorithm = algorithm
+        self._min = max(1, int(min_limit))
+        self._max = max(self._min, int(max_limit))
+        self._limit = float(min(self._max, max(self._min, int(initial_limit))))
+        self._caller_quota = float(caller_quota)
+        self._tolerance = float(rtt_tolerance)
+        self._backoff = float(backoff)
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._caller_in_flight: Dict[str, int] = {}
+        self._waiters: Deque[Tuple[object, str]] = deque()
+        self._short_rtt: Optional[float] = None
+        self._long_rtt: Optional[float] = None
+        self._min_rtt: Optional[float] = None
+        self._last_cut = 0.0
+        self._waits: Deque[float] = deque(maxlen=metrics_window)
+        self._rtts: Deque[float] = deque(maxlen=metrics_window)
+        self._granted = 0
+        self._errors = 0
+        self._rejected: Dict[str, int] = {"deadline": 0, "timeout": 0}
+        self._max_queue_depth = 0
+
+    # -- admission ------------------------------------------------------------
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def _quota(self) -> int:
+        return max(1, int(math.ceil(self._limit * self._caller_quota)))
+
+    def _eligible(self, caller: str, waiting: frozenset = frozenset()) -> bool:
+        """A slot is free and caller is under quota, or no other caller is waiting for one."""
+        if self._in_flight >= int(self._limit):
+            return False
+        return self._caller_in_flight.get(caller, 0) < self._quota() or not (waiting - {caller})
+
+    def _is_next(self, ticket: object) -> bool:
+        """ticket is the first queued waiter whose caller is eligible, and a slot is free."""
+        if self._in_flight >= int(self._limit):
+            return False
+        waiting = frozenset(c for _, c in self._waiters)
+        for t, c in self._waiters:
+            if self._eligible(c, waiting):
+                return t is ticket
+        return False
+
+    def _estimated_wait(self, ahead: int) -> float:
+        rtt = self._short_rtt or 0.0
+        free = int(self._limit) - self._in_flight
+        if ahead < free:
+            return 0.0
+        return (ahead - free + 1) / max(1, int(self._limit)) * rtt
+
+    def acquire(self, caller: str = "default", timeout: Optional[float] = None) -> Permit:
+        """Block until a permit is granted; raise LimiterRejected on predicted or actual deadline miss."""
+        t0 = time.monotonic()
+        with self._cond:
+            if not self._waiters and self._eligible(caller):
+                return self._grant(caller, t0)
+            est = self._estimated_wait(len(self._waiters))
+            if timeout is not None and self._short_rtt is not None and est > timeout:
+                self._rejected["deadline"] += 1
+                raise LimiterRejected("deadline", est)
+            ticket = object()
+            self._waiters.append((ticket, caller))
+            self._max_queue_depth = max(self._max_queue_depth, len(self._waiters))
+            deadline = None if timeout is None else t0 + timeout
+            try:
+                while not self._is_next(ticket):
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        self._rejected["timeout"] += 1
+                        raise LimiterRejected("timeout", max(est, self._short_rtt or 0.0))
+                    self._cond.wait(remaining)
+            finally:
+                self._waiters.remove((ticket, caller))
+                self._cond.notify_all()
+            return self._grant(caller, t0)
+
+    def try_acquire(self, caller: str = "default") -> Optional[Permit]:
+        """Non-blocking acquire (for event-loop schedulers): a permit if one is free right now, else None."""
+        with self._cond:
+            if not self._waiters and self._eligible(caller):
+                return self._grant(caller, time.monotonic())
+            return None
+
+    def _grant(self, caller: str, t0: float) -> Permit:
+        wait = time.monotonic() - t0
+        self._in_flight += 1
+        self._caller_in_flight[caller] = self._caller_in_flight.get(caller, 0) + 1
+        self._granted += 1
+        self._waits.append(wait)
+        return Permit(self, caller, wait)
+
+    # -- feedback -------------------------------------------------------------
+    def _release(self, permit: Permit, rtt: float, error: bool) -> None:
+        with self._cond:
+            self._in_flight -= 1
+            n = self._caller_in_flight.get(permit.caller, 1) - 1
+            if n:
+                self._caller_in_flight[permit.caller] = n
+            else:
+                self._caller_in_flight.pop(permit.caller, None)
+            self._rtts.append(rtt)
+            if error:
+                self._errors += 1
+            self._update(rtt, permit.wait, error)
+            self._cond.notify_all()
+
+    def _update(self, rtt: float, wait: float, error: bool) -> None:
+        now = time.monotonic()
+        self._short_rtt = rtt if self._short_rtt is None else self._short_rtt + 0.5 * (rtt - self._short_rtt)
+        self._long_rtt = rtt if self._long_rtt is None else self._long_rtt + 0.02 * (rtt - self._long_rtt)
+        # No-load baseline; creeps up slowly so a permanently slower backend is re-learned.
+        self._min_rtt = rtt if self._min_rtt is None else min(self._min_rtt * 1.001, rtt)
+        if self.algorithm == "fixed":
+            return
+        # Backend queueing delay = latency above the no-load baseline.
+        overloaded = error or self._short_rtt > self._min_rtt * self._tolerance
+        if self.algorithm == "aimd":
+            if overloaded:
+                # At most one multiplicative cut per round trip, otherwise one burst collapses the limit.
+                if now - self._last_cut < self._short_rtt:
+                    return
+                self._last_cut = now
+                new = self._limit * self._backoff
+            else:
+                new = self._limit + 1.0 / self._limit
+        else:
+            # Drift the long-term baseline back down when recent latency has settled below it.
+            if self._long_rtt > self._short_rtt * 2:
+                self._long_rtt *= 0.95
+            gradient = max(0.5, min(1.0, self._tolerance * self._long_rtt / max(self._short_rtt, 1e-9)))
+            if overloaded:
+                gradient = max(0.5, min(gradient, self._tolerance * self._min_rtt / max(self._short_rtt, 1e-9)))
+            if gradient < 1.0:
+                if now - self._last_cut < self._short_rtt:
+                    return
+                self._last_cut = now
+                new = self._limit * gradient
+            else:
+                # ~limit samples arrive per round trip, so this grows the limit by sqrt(limit) per RTT.
+                new = self._limit + math.sqrt(self._limit) / self._limit
+        self._limit = float(min(self._max, max(self._min, new)))
+
+    # -- metrics --------------------------------------------------------------
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            waits = list(self._waits)
+            rtts = list(self._rtts)
+            return {
+                "algorithm": self.algorithm,
+                "limit": int(self._limit),
+                "in_flight": self._in_flight,
+                "queue_depth": len(self._waiters),
+                "max_queue_depth": self._max_queue_depth,
+                "granted": self._granted,
+                "errors": self._errors,
+                "rejected": dict(self._rejected),
+                "wait_p50_s": round(_percentile(waits, 0.5), 4),
+                "wait_p95_s": round(_percentile(waits, 0.95), 4),
+                "rtt_p50_s": round(_percentile(rtts, 0.5), 4),
+                "rtt_p95_s": round(_percentile(rtts, 0.95), 4),
+                "caller_in_flight": dict(self._caller_in_flight),
+            }
+
+
+if __name__ == "__main__":
+    import argparse
+    import random
+
+    parser = argparse.ArgumentParser(description="Simulated-latency load test for AdaptiveConcurrencyLimiter")
+    parser.add_argument("--clients", type=int, default=48)
+    parser.add_argument("--seconds", type=float, default=4.0)
+    parser.add_argument("--capacity", type=int, default=12, help="backend concurrency before latency degrades")
+    parser.add_argument("--base-ms", type=float, default=20.0)
+    args = parser.parse_args()
+
+    def run(limiter: AdaptiveConcurrencyLimiter) -> Dict[str, Any]:
+        active = [0]
+        lock = threading.Lock()
+        done: List[float] = []
+        rejected = [0]
+        stop = time.monotonic() + args.seconds
+
+        def backend() -> None:
+            with lock:
+                active[0] += 1
+                load = active[0]
+            # Latency is flat up to capacity, then grows with overload (contention on Chroma/SQLite).
+            time.sleep(args.base_ms / 1000.0 * max(1.0, load / args.capacity) ** 2 * random.uniform(0.9, 1.1))
+            with lock:
+                active[0] -= 1
+
+        def client(i: int) -> None:
+            while time.monotonic() < stop:
+                t0 = time.monotonic()
+                try:
+                    with limiter.acquire(caller=f"c{i % 4}", timeout=0.5):
+                        backend()
+                    done.append(time.monotonic() - t0)
+                except LimiterRejected as e:
+                    rejected[0] += 1
+                    time.sleep(min(e.retry_after, 0.05))
+
+        threads = [threading.Thread(target=client, args=(i,)) for i in range(args.clients)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        st = limiter.stats()
+        return {
+            "throughput_rps": round(len(done) / args.seconds, 1),
+            "e2e_p95_ms": round(_percentile(done, 0.95) * 1000, 1),
+            "rejected": rejected[0],
+            "final_limit": st["limit"],
+            "wait_p95_ms": round(st["wait_p95_s"] * 1000, 1),
+        }
+
+    for label, lim in (
+        ("fixed 4", AdaptiveConcurrencyLimiter(4, 1, 4, algorithm="fixed")),
+        ("fixed 8", AdaptiveConcurrencyLimiter(8, 1, 8, algorithm="fixed")),
+        ("fixed 48", AdaptiveConcurrencyLimiter(48, 1, 48, algorithm="fixed")),
+        ("aimd", AdaptiveConcurrencyLimiter(4, 1, 64, algorithm="aimd")),
+        ("gradient", AdaptiveConcurrencyLimiter(4, 1, 64, algorithm="gradient")),
+    ):
+        print(f"{label:>9}: {run(lim)}")
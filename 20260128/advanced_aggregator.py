@@ -6,6 +6,10 @@ import requests
 import time
 import hashlib
 import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "asset_library_l2"))
+from asset_store import AssetStore
 
 # 闭环：精度阈值来自 amah_config.json
 def _load_precision_threshold():
@@ -43,22 +47,17 @@ def fetch_v20k_final_sprint():
         "Cochlear Regeneration OR Advanced Otolaryngology"
     ]
 
-    all_assets = []
-    seen_ids = set()
-
-    try:
-        with open("merged_data.json", "r", encoding="utf-8") as f:
-            all_assets = json.load(f)
-            seen_ids = {item.get("id") or item.get("agid") for item in all_assets if item.get("id") or item.get("agid")}
-            print(f"📊 当前底座: {len(all_assets)} | 开启最后 1,600 项定向清扫...")
-    except Exception:
-        pass
+    # L2 资产库（SQLite）：唯一索引去重 + 每页一批事务写入，代替整表读写 merged_data.json
+    store = AssetStore(".")
+    total = store.count("trial")
+    if total:
+        print(f"📊 当前底座: {total} | 开启最后 1,600 项定向清扫...")
 
     target_total = 20000
     session = requests.Session()
 
     for word in sprint_keywords:
-        if len(all_assets) >= target_total:
+        if total >= target_total:
             break
         print(f"📡 正在捕捉稀缺资产: [{word}]")
 
@@ -82,10 +81,11 @@ def fetch_v20k_final_sprint():
                 if not studies:
                     break
 
-                new_in_batch = 0
-                for s in studies:
-                    nct_id = s.get("protocolSection", {}).get("identificationModule", {}).get("nctId")
-                    if nct_id not in seen_ids:
+                page_ids = [s.get("protocolSection", {}).get("identificationModule", {}).get("nctId") for s in studies]
+                seen_ids = store.contains("trial", [i for i in page_ids if i])
+                batch = []
+                for s, nct_id in zip(studies, page_ids):
+                    if nct_id and nct_id not in seen_ids:
                         seen_ids.add(nct_id)
                         proto = s.get("protocolSection", {})
                         category = "High-End-Tech"
@@ -100,7 +100,7 @@ def fetch_v20k_final_sprint():
 
                         # V4.0 AGID 映射：每条资产带 agid，并挂载 precision_lock_threshold
                         agid = to_agid("AGG", "ASSET", nct_id)
-                        all_assets.append({
+                        batch.append({
                             "id": nct_id,
                             "agid": agid,
                             "source": f"Final_Sprint_{word[:10]}",
@@ -110,12 +110,11 @@ def fetch_v20k_final_sprint():
                             "criteria": proto.get("eligibilityModule", {}).get("eligibilityCriteria", ""),
                             "precision_target": PRECISION_LOCK_THRESHOLD,
                         })
-                        new_in_batch += 1
-
-                if len(all_assets) % 100 == 0:
-                    with open("merged_data.json", "w", encoding="utf-8") as f:
-                        json.dump(all_assets, f, ensure_ascii=False, indent=2)
-                    print(f"📈 目标逼近中: {len(all_assets)} / 20000")
+                added, _ = store.upsert("trial", batch)
+                new_in_batch = len(added)
+                total += new_in_batch
+                if new_in_batch:
+                    print(f"📈 目标逼近中: {total} / 20000")
 
                 next_token = data.get("nextPageToken")
                 if not next_token or new_in_batch == 0:
@@ -124,8 +123,9 @@ def fetch_v20k_final_sprint():
             except Exception:
                 break
 
-    with open("merged_data.json", "w", encoding="utf-8") as f:
-        json.dump(all_assets, f, ensure_ascii=False, indent=2)
+    # 导出 merged_data.json 视图（仅在有新增时重写），供 batch_build_db 等现有读取方使用
+    store.export_views(["trial"])
+    store.close()
     print(f"🎉 20,000 项全球全量资产调度库建设完成 (V4.0 AGID，阈值 {PRECISION_LOCK_THRESHOLD})！")
 
 
@@ -10,8 +10,15 @@ import os
 import threading
 import hashlib
 import logging
+import re
+import sqlite3
+import sys
+from collections.abc import Mapping
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from itertools import islice
+from operator import attrgetter
+from types import MappingProxyType
+from typing import Callable, Dict, List, Any, Optional
 
 logger = logging.getLogger(__name__)
 
@@ -33,6 +40,147 @@ def _get_d_threshold() -> float:
 D_PRECISION_HARD_LOCK = 0.79
 
 
+# ------------------------------------------------------------------------------
+# Shared source cache and lean records for Components 1–3
+# Each (component class, source file) is parsed once per process: a repeated ingest with unchanged
+# (mtime, size) reuses the normalized records; a changed stat re-reads the bytes and re-parses only
+# if their hash changed too. Records are __slots__ objects with a dict-like (Mapping) read interface.
+# ------------------------------------------------------------------------------
+class _LeanRecord(Mapping):
+    """Dict-like read view over __slots__ fields (no per-record __dict__); dict(record) gives a plain copy.
+    Records are shared through the source cache, so treat them as immutable."""
+
+    __slots__ = ()
+    _fields: tuple = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._values = attrgetter(*cls._fields)
+
+    def _asdict(self) -> Dict[str, Any]:
+        return dict(zip(self._fields, self._values(self)))
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self._fields:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self):
+        return iter(self._fields)
+
+    def __len__(self) -> int:
+        return len(self._fields)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({dict(self)!r})"
+
+    def __reduce__(self):
+        return (type(self), self._values(self))
+
+
+class PatientRecord(_LeanRecord):
+    _fields = ("id", "agid", "region", "category", "title", "status", "updated_ts")
+    __slots__ = _fields
+
+    def __init__(self, id, agid, region, category, title, status, updated_ts):
+        self.id, self.agid, self.region, self.category = id, agid, region, category
+        self.title, self.status, self.updated_ts = title, status, updated_ts
+
+
+class TherapeuticAssetRecord(_LeanRecord):
+    _fields = ("id", "agid", "source", "category", "title", "status", "updated_ts")
+    __slots__ = _fields
+
+    def __init__(self, id, agid, source, category, title, status, updated_ts):
+        self.id, self.agid, self.source, self.category = id, agid, source, category
+        self.title, self.status, self.updated_ts = title, status, updated_ts
+
+
+class PIRecord(_LeanRecord):
+    _fields = ("id", "agid", "name", "affiliation", "linked_projects", "updated_ts")
+    __slots__ = _fields
+
+    def __init__(self, id, agid, name, affiliation, linked_projects, updated_ts):
+        self.id, self.agid, self.name, self.affiliation = id, agid, name, affiliation
+        self.linked_projects, self.updated_ts = linked_projects, updated_ts
+
+
+class _SourceCache:
+    """Process-wide cache: (owner, path) -> (stat key, content hash, parsed value)."""
+
+    RACY_MTIME_WINDOW_NS = 2_000_000_000
+
+    def __init__(self):
+        self._entries: Dict[tuple, tuple] = {}
+        self._lock = threading.Lock()
+        self.parses = 0
+
+    def load(self, owner: str, path: str, parse: Callable[[Any], Any], empty: Any) -> Any:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return empty
+        key = (owner, path)
+        stat_key = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            entry = self._entries.get(key)
+        # a stat within the racy window may hide a same-size rewrite in the same mtime tick: re-hash
+        if entry is not None and entry[0] == stat_key and st.st_mtime_ns < time.time_ns() - self.RACY_MTIME_WINDOW_NS:
+            return entry[2]
+        try:
+            with open(path, "rb") as f:
+                raw = f.read()
+        except OSError:
+            return empty
+        digest = hashlib.blake2b(raw, digest_size=16).hexdigest()
+        if entry is not None and entry[1] == digest:  # touched, same bytes
+            value = entry[2]
+        else:
+            try:
+                data = json.loads(raw)
+            except Exception:
+                return empty
+            del raw
+            value = parse(data)
+            self.parses += 1
+        with self._lock:
+            self._entries[key] = (stat_key, digest, value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_SOURCE_CACHE = _SourceCache()
+
+
+def _keyword_pattern(keywords) -> "re.Pattern":
+    """One precompiled alternation for substring keyword checks (same semantics as `any(k in s ...)`)."""
+    return re.compile("|".join(re.escape(k) for k in sorted(keywords, key=len, reverse=True)))
+
+
+def _intern(value: Any) -> Any:
+    """Interns short repeated strings (category, status) so 1M records share one object per value."""
+    return sys.intern(value) if type(value) is str else value
+
+
+def _utc_ts() -> str:
+    return datetime.utcnow().isoformat() + "Z"
+
+
+_EMPTY_MAP = MappingProxyType({})
+
+
+def _to_plain(value: Any) -> Any:
+    """Deep-copies read-only views (MappingProxyType, lean records, tuples) into JSON-serializable dicts/lists."""
+    if isinstance(value, Mapping):
+        return {k: _to_plain(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_plain(v) for v in value]
+    return value
+
+
 # ==============================================================================
 # Component_1: Global_Patient_Resources
 # Ingest 100k+ patient-centric data (NA, Commonwealth, EU, Asia-Pacific).
@@ -47,11 +195,21 @@ class Global_Patient_Resources:
 
     REGIONS = ("NA", "Commonwealth", "EU", "Asia-Pacific")
     DEFAULT_SOURCE = "merged_data.json"  # can be extended with region-keyed files
+    # first matching rule wins; no match -> "NA"
+    REGION_KEYWORDS = (
+        ("Asia-Pacific", ("japan", "china", "korea", "singapore", "australia", "asia")),
+        ("EU", ("uk", "london", "oxford", "europe", "eu ", "germany", "france")),
+        ("Commonwealth", ("canada", "australia", "india", "commonwealth")),
+    )
+    _REGION_RULES = tuple((region, _keyword_pattern(kws)) for region, kws in REGION_KEYWORDS)
+    _ANY_REGION_RE = _keyword_pattern({k for _, kws in REGION_KEYWORDS for k in kws})  # one scan for the NA case
 
     def __init__(self, data_dir: Optional[str] = None):
         self._data_dir = os.path.abspath(data_dir or os.path.dirname(__file__))
-        self._index: Dict[str, Dict[str, Any]] = {}
-        self._lock = threading.Lock()
+        self._index: Dict[str, PatientRecord] = {}
+        self._region_count_cache: Dict[str, int] = {}
+        self._snapshot = self._freeze()
+        self._lock = threading.RLock()  # get_snapshot holds it while _region_counts re-acquires it
 
     def _assign_agid(self, raw_id: str, region: str) -> str:
         return _to_agid("GPR", "PATIENT", f"{region}:{raw_id}")
@@ -59,61 +217,56 @@ class Global_Patient_Resources:
     def ingest(self) -> int:
         """Load patient-centric records from configured sources; normalize by region for intent mapping."""
         path = os.path.join(self._data_dir, self.DEFAULT_SOURCE)
-        if not os.path.isfile(path):
-            with self._lock:
-                self._index = {}
-            return 0
-        try:
-            with open(path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-        except Exception:
-            with self._lock:
-                self._index = {}
-            return 0
+        index, counts = _SOURCE_CACHE.load(type(self).__qualname__, path, self._build_index, ({}, {}))
+        with self._lock:
+            if index is not self._index:  # unchanged source: keep the published snapshot object
+                self._index = index
+                self._region_count_cache = counts
+                self._snapshot = self._freeze()
+        return len(index)
+
+    def _freeze(self) -> MappingProxyType:
+        return MappingProxyType({"region_counts": MappingProxyType(self._region_count_cache),
+                                 "index": MappingProxyType(self._index), "total": len(self._index)})
+
+    def _build_index(self, data: Any) -> tuple:
         items = data if isinstance(data, list) else [data]
-        index = {}
+        index: Dict[str, PatientRecord] = {}
+        counts: Dict[str, int] = {}
+        ts = _utc_ts()
         for item in items:
             raw_id = item.get("id") or item.get("nct_id") or str(len(index))
             region = self._infer_region(item)
             agid = item.get("agid") or self._assign_agid(raw_id, region)
-            index[raw_id] = {
-                "id": raw_id,
-                "agid": agid,
-                "region": region,
-                "category": item.get("category", ""),
-                "title": (item.get("title") or item.get("brief_title") or "")[:200],
-                "status": str(item.get("status", "")).upper(),
-                "updated_ts": datetime.utcnow().isoformat() + "Z",
-            }
-        with self._lock:
-            self._index = index
-        return len(self._index)
+            if raw_id in index:
+                counts[index[raw_id].region] -= 1
+            index[raw_id] = PatientRecord(
+                raw_id, agid, region, _intern(item.get("category", "")),
+                (item.get("title") or item.get("brief_title") or "")[:200],
+                _intern(str(item.get("status", "")).upper()), ts,
+            )
+            counts[region] = counts.get(region, 0) + 1
+        return index, {r: c for r, c in counts.items() if c}
 
     def _infer_region(self, item: Dict) -> str:
         """Infer region for multi-region alignment (NA, Commonwealth, EU, Asia-Pacific)."""
         title = (item.get("title") or item.get("brief_title") or "").lower()
         cat = (item.get("category") or "").lower()
         s = f"{title} {cat}"
-        if any(x in s for x in ["japan", "china", "korea", "singapore", "australia", "asia"]):
-            return "Asia-Pacific"
-        if any(x in s for x in ["uk", "london", "oxford", "europe", "eu ", "germany", "france"]):
-            return "EU"
-        if any(x in s for x in ["canada", "australia", "india", "commonwealth"]):
-            return "Commonwealth"
+        if self._ANY_REGION_RE.search(s) is None:
+            return "NA"
+        for region, pattern in self._REGION_RULES:
+            if pattern.search(s):
+                return region
         return "NA"
 
-    def get_snapshot(self) -> Dict[str, Any]:
-        """Return current index snapshot (call only when D ≤ 0.79)."""
-        with self._lock:
-            return {"region_counts": self._region_counts(), "index": dict(self._index), "total": len(self._index)}
+    def get_snapshot(self) -> MappingProxyType:
+        """Return current index snapshot (call only when D ≤ 0.79): a read-only view, replaced on each changed ingest."""
+        return self._snapshot
 
     def _region_counts(self) -> Dict[str, int]:
         with self._lock:
-            c = {}
-            for v in self._index.values():
-                r = v.get("region", "NA")
-                c[r] = c.get(r, 0) + 1
-            return c
+            return dict(self._region_count_cache)
 
 
 # ==============================================================================
@@ -129,10 +282,12 @@ class Advanced_Therapeutic_Assets:
 
     SOURCE_FILES = ("merged_data.json", "all_trials.json")
     ASSET_TAGS = ("fda", "clinical trial", "cell therapy", "gene therapy", "stem cell", "bci", "brain-computer", "neuro")
+    _ASSET_TAG_RE = _keyword_pattern(ASSET_TAGS)
 
     def __init__(self, data_dir: Optional[str] = None):
         self._data_dir = os.path.abspath(data_dir or os.path.dirname(__file__))
-        self._index: Dict[str, Dict[str, Any]] = {}
+        self._index: Dict[str, TherapeuticAssetRecord] = {}
+        self._snapshot = self._freeze()
         self._lock = threading.Lock()
 
     def _assign_agid(self, raw_id: str, source: str) -> str:
@@ -141,44 +296,51 @@ class Advanced_Therapeutic_Assets:
     def _is_therapeutic_asset(self, item: Dict) -> bool:
         title = (item.get("title") or item.get("brief_title") or "").lower()
         cat = (item.get("category") or "").lower()
-        s = f"{title} {cat}"
-        return any(tag in s for tag in self.ASSET_TAGS)
+        return self._ASSET_TAG_RE.search(f"{title} {cat}") is not None
 
     def ingest(self) -> int:
         """Load and index FDA trials, cell/gene therapy, stem cell, BCI from configured sources."""
-        index = {}
+        parts = []
         for source in self.SOURCE_FILES:
             path = os.path.join(self._data_dir, source)
-            if not os.path.isfile(path):
-                continue
-            try:
-                with open(path, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-            except Exception:
-                continue
-            items = data if isinstance(data, list) else [data]
-            for item in items:
-                if not self._is_therapeutic_asset(item):
-                    continue
-                raw_id = item.get("id") or item.get("nct_id") or str(hash(json.dumps(item, sort_keys=True)))
-                agid = item.get("agid") or self._assign_agid(raw_id, source)
-                index[raw_id] = {
-                    "id": raw_id,
-                    "agid": agid,
-                    "source": source,
-                    "category": item.get("category", ""),
-                    "title": (item.get("title") or item.get("brief_title") or "")[:200],
-                    "status": str(item.get("status") or item.get("overall_status", "")).upper(),
-                    "updated_ts": datetime.utcnow().isoformat() + "Z",
-                }
+            parts.append(_SOURCE_CACHE.load(type(self).__qualname__, path,
+                                            lambda data, source=source: self._build_index(data, source), {}))
+        merged = len(parts) > 1 and any(parts[1:])
+        if not merged:
+            index = parts[0]
+        else:
+            index = {}
+            for part in parts:
+                index.update(part)
         with self._lock:
-            self._index = index
+            # a merged index is a new dict every time: compare by content (records are shared, so this is cheap)
+            if index is not self._index and (not merged or index != self._index):
+                self._index = index
+                self._snapshot = self._freeze()
         return len(self._index)
 
-    def get_snapshot(self) -> Dict[str, Any]:
-        """Return current asset index snapshot (call only when D ≤ 0.79)."""
-        with self._lock:
-            return {"index": dict(self._index), "total": len(self._index)}
+    def _freeze(self) -> MappingProxyType:
+        return MappingProxyType({"index": MappingProxyType(self._index), "total": len(self._index)})
+
+    def _build_index(self, data: Any, source: str) -> Dict[str, TherapeuticAssetRecord]:
+        items = data if isinstance(data, list) else [data]
+        index: Dict[str, TherapeuticAssetRecord] = {}
+        ts = _utc_ts()
+        for item in items:
+            if not self._is_therapeutic_asset(item):
+                continue
+            raw_id = item.get("id") or item.get("nct_id") or str(hash(json.dumps(item, sort_keys=True)))
+            agid = item.get("agid") or self._assign_agid(raw_id, source)
+            index[raw_id] = TherapeuticAssetRecord(
+                raw_id, agid, source, _intern(item.get("category", "")),
+                (item.get("title") or item.get("brief_title") or "")[:200],
+                _intern(str(item.get("status") or item.get("overall_status", "")).upper()), ts,
+            )
+        return index
+
+    def get_snapshot(self) -> MappingProxyType:
+        """Return current asset index snapshot (call only when D ≤ 0.79): a read-only view."""
+        return self._snapshot
 
 
 # ==============================================================================
@@ -195,8 +357,9 @@ class Principal_Investigator_Registry:
 
     def __init__(self, data_dir: Optional[str] = None):
         self._data_dir = os.path.abspath(data_dir or os.path.dirname(__file__))
-        self._index: Dict[str, Dict[str, Any]] = {}
-        self._project_to_pi: Dict[str, List[str]] = {}
+        self._index: Dict[str, PIRecord] = {}
+        self._project_to_pi: Dict[str, tuple] = {}
+        self._snapshot = self._freeze()
         self._lock = threading.Lock()
 
     def _assign_agid(self, raw_id: str) -> str:
@@ -205,58 +368,127 @@ class Principal_Investigator_Registry:
     def ingest(self, therapeutic_asset_ids: Optional[List[str]] = None) -> int:
         """Load PI registry and optionally link to given therapeutic asset IDs (Component_2)."""
         path = os.path.join(self._data_dir, self.DEFAULT_SOURCE)
-        index = {}
-        project_to_pi = {}
-        if os.path.isfile(path):
-            try:
-                with open(path, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-            except Exception:
-                data = []
-            items = data if isinstance(data, list) else ([data] if isinstance(data, dict) else [])
-            for item in items:
-                raw_id = item.get("id") or item.get("name") or str(len(index))
-                agid = item.get("agid") or self._assign_agid(raw_id)
-                index[raw_id] = {
-                    "id": raw_id,
-                    "agid": agid,
-                    "name": item.get("name", ""),
-                    "affiliation": item.get("affiliation", ""),
-                    "linked_projects": item.get("linked_projects", []),
-                    "updated_ts": datetime.utcnow().isoformat() + "Z",
-                }
-                for proj in item.get("linked_projects", []):
-                    project_to_pi.setdefault(proj, []).append(raw_id)
+        index, project_to_pi = _SOURCE_CACHE.load(type(self).__qualname__, path, self._build_index, ({}, {}))
         if therapeutic_asset_ids:
+            # the cached mapping is shared; add the unlinked asset ids on a copy
+            project_to_pi = dict(project_to_pi)
             for aid in therapeutic_asset_ids:
                 if aid not in project_to_pi:
-                    project_to_pi[aid] = []
+                    project_to_pi[aid] = ()
         with self._lock:
-            self._index = index
-            self._project_to_pi = project_to_pi
+            if index is not self._index or (project_to_pi is not self._project_to_pi
+                                            and project_to_pi != self._project_to_pi):
+                self._index = index
+                self._project_to_pi = project_to_pi
+                self._snapshot = self._freeze()
         return len(self._index)
 
-    def get_snapshot(self) -> Dict[str, Any]:
-        """Return current PI registry snapshot (call only when D ≤ 0.79)."""
-        with self._lock:
-            return {"index": dict(self._index), "project_to_pi": dict(self._project_to_pi), "total": len(self._index)}
+    def _freeze(self) -> MappingProxyType:
+        return MappingProxyType({"index": MappingProxyType(self._index),
+                                 "project_to_pi": MappingProxyType(self._project_to_pi), "total": len(self._index)})
+
+    def _build_index(self, data: Any) -> tuple:
+        items = data if isinstance(data, list) else ([data] if isinstance(data, dict) else [])
+        index: Dict[str, PIRecord] = {}
+        project_to_pi: Dict[str, List[str]] = {}
+        ts = _utc_ts()
+        for item in items:
+            raw_id = item.get("id") or item.get("name") or str(len(index))
+            agid = item.get("agid") or self._assign_agid(raw_id)
+            linked = tuple(item.get("linked_projects", []))
+            index[raw_id] = PIRecord(raw_id, agid, item.get("name", ""), item.get("affiliation", ""), linked, ts)
+            for proj in linked:
+                project_to_pi.setdefault(proj, []).append(raw_id)
+        return index, {proj: tuple(pis) for proj, pis in project_to_pi.items()}
+
+    def get_snapshot(self) -> MappingProxyType:
+        """Return current PI registry snapshot (call only when D ≤ 0.79): a read-only view."""
+        return self._snapshot
 
 
 # ==============================================================================
 # Component_4: Lifecycle_Pulse_Monitor
 # 12-hour background scanner: additions, deletions, status changes across Components 1–3.
 # ==============================================================================
+_FINGERPRINT_ENCODER = json.JSONEncoder(ensure_ascii=False, sort_keys=True, default=str)
+
+
+def _record_fingerprint(key: str, record: Dict[str, Any]) -> str:
+    """Content fingerprint of one index record (key included, volatile updated_ts / component excluded)."""
+    payload = _FINGERPRINT_ENCODER.encode({k: v for k, v in record.items() if k != "updated_ts" and k != "component"})
+    return hashlib.blake2b(f"{key}\x1f{payload}".encode("utf-8"), digest_size=8).hexdigest()
+
+
+def _index_digest(fingerprints: Any) -> str:
+    """Order-independent digest of a whole index: XOR of the 64-bit record fingerprints plus the count."""
+    acc, n = 0, 0
+    for fp in fingerprints:
+        acc ^= int(fp, 16)
+        n += 1
+    return f"{n}:{acc:016x}"
+
+
+class _PulseIndexStore:
+    """
+    Compact keyed store for the pulse index (SQLite, WAL): key -> fingerprint, status, category, record.
+    A cycle only writes the rows that were added, changed or deleted; the whole-index digest and the
+    source-file signature live in a meta table.
+    """
+
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(path, timeout=30.0, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=wal")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS pulse_index (key TEXT PRIMARY KEY, fp TEXT NOT NULL, status TEXT, "
+            "category TEXT, record TEXT NOT NULL) WITHOUT ROWID;"
+            "CREATE TABLE IF NOT EXISTS pulse_meta (k TEXT PRIMARY KEY, v TEXT);"
+        )
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def meta(self, k: str) -> Optional[str]:
+        row = self._conn.execute("SELECT v FROM pulse_meta WHERE k = ?", (k,)).fetchone()
+        return row[0] if row else None
+
+    def is_empty(self) -> bool:
+        return self._conn.execute("SELECT 1 FROM pulse_index LIMIT 1").fetchone() is None
+
+    def fingerprints(self) -> Dict[str, tuple]:
+        return {k: (fp, st, cat) for k, fp, st, cat in self._conn.execute(
+            "SELECT key, fp, status, category FROM pulse_index")}
+
+    def apply(self, upserts: List[tuple], deletes: List[str], meta: Dict[str, str]) -> None:
+        with self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO pulse_index (key, fp, status, category, record) "
+                                   "VALUES (?, ?, ?, ?, ?)", upserts)
+            self._conn.executemany("DELETE FROM pulse_index WHERE key = ?", [(k,) for k in deletes])
+            self._conn.executemany("INSERT OR REPLACE INTO pulse_meta (k, v) VALUES (?, ?)", list(meta.items()))
+
+    def records(self) -> Dict[str, Any]:
+        return {k: json.loads(r) for k, r in self._conn.execute("SELECT key, record FROM pulse_index")}
+
+
 class Lifecycle_Pulse_Monitor:
     """
     Background scanner (default 12-hour interval) tracking additions, deletions,
     and status changes across Global_Patient_Resources, Advanced_Therapeutic_Assets,
     and Principal_Investigator_Registry. Access: only via get_latest_snapshot when D ≤ 0.79.
+
+    The index is a keyed SQLite store of per-record fingerprints; a cycle whose source files are
+    unchanged (stat) is skipped, one whose whole-index digest matches does no per-record work, and
+    otherwise a single-pass set diff writes only the delta. The changelog is append-only JSONL,
+    compacted to the newest MAX_CHANGELOG_ENTRIES once it holds twice that many lines.
     """
 
     DEFAULT_INTERVAL_SECONDS = 12 * 3600
-    INDEX_FILENAME = "centurion_pulse_index.json"
-    CHANGELOG_FILENAME = "centurion_pulse_changelog.json"
+    INDEX_FILENAME = "centurion_pulse_index.json"  # legacy full-JSON index, imported once
+    INDEX_DB_FILENAME = "centurion_pulse_index.sqlite"
+    CHANGELOG_FILENAME = "centurion_pulse_changelog.json"  # legacy JSON changelog, imported once
+    CHANGELOG_JSONL_FILENAME = "centurion_pulse_changelog.jsonl"
     MAX_CHANGELOG_ENTRIES = 5000
+    RACY_MTIME_WINDOW_NS = 2_000_000_000
 
     def __init__(
         self,
@@ -272,105 +504,194 @@ class Lifecycle_Pulse_Monitor:
         self._interval = interval_seconds or self.DEFAULT_INTERVAL_SECONDS
         self._data_dir = os.path.abspath(data_dir or os.path.dirname(__file__))
         self._index_path = os.path.join(self._data_dir, self.INDEX_FILENAME)
+        self._index_db_path = os.path.join(self._data_dir, self.INDEX_DB_FILENAME)
         self._changelog_path = os.path.join(self._data_dir, self.CHANGELOG_FILENAME)
-        self._last_snapshot: Optional[Dict[str, Any]] = None
+        self._changelog_jsonl_path = os.path.join(self._data_dir, self.CHANGELOG_JSONL_FILENAME)
+        self._store: Optional[_PulseIndexStore] = None
+        self._changelog_lines: Optional[int] = None
+        self._ingested_signature: Optional[str] = None
+        self._last_snapshot: Optional[MappingProxyType] = None
         self._changelog: List[Dict[str, Any]] = []
         self._snapshot_lock = threading.Lock()
+        self._cycle_lock = threading.Lock()
         self._stop = threading.Event()
         self._thread: Optional[threading.Thread] = None
 
+    def _source_paths(self) -> List[str]:
+        paths = [os.path.join(self._c1._data_dir, self._c1.DEFAULT_SOURCE)]
+        paths += [os.path.join(self._c2._data_dir, src) for src in self._c2.SOURCE_FILES]
+        paths.append(os.path.join(self._c3._data_dir, self._c3.DEFAULT_SOURCE))
+        return paths
+
+    def _source_signature(self) -> tuple:
+        """(signature string, newest mtime in ns) over the component source files."""
+        sig, newest = [], 0
+        for path in self._source_paths():
+            try:
+                st = os.stat(path)
+                sig.append(f"{path}:{st.st_mtime_ns}:{st.st_size}")
+                newest = max(newest, st.st_mtime_ns)
+            except OSError:
+                sig.append(f"{path}:-")
+        return "|".join(sig), newest
+
+    def _index_store(self) -> _PulseIndexStore:
+        if self._store is None:
+            self._store = _PulseIndexStore(self._index_db_path)
+            if self._store.is_empty() and os.path.isfile(self._index_path):
+                legacy = self._load_index()
+                rows = [(k, _record_fingerprint(k, v), v.get("status"), v.get("category"),
+                         json.dumps(v, ensure_ascii=False)) for k, v in legacy.items()]
+                self._store.apply(rows, [], {"digest": _index_digest(r[1] for r in rows)})
+        return self._store
+
     def _load_index(self) -> Dict[str, Any]:
+        """Legacy full-JSON index (only read to seed the keyed store)."""
         try:
             with open(self._index_path, "r", encoding="utf-8") as f:
                 return json.load(f)
         except Exception:
             return {}
 
-    def _save_index(self, index: Dict[str, Any]) -> None:
-        try:
-            with open(self._index_path, "w", encoding="utf-8") as f:
-                json.dump(index, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            logger.warning("Lifecycle_Pulse_Monitor failed to save index: %s", e)
+    def load_index(self) -> Dict[str, Any]:
+        """Current persisted index as {"COMP:id": record} (reads the whole store; for inspection / export)."""
+        return self._index_store().records()
 
     def _append_changelog(self, entries: List[Dict[str, Any]]) -> None:
         try:
-            existing: List[Dict[str, Any]] = []
-            if os.path.isfile(self._changelog_path):
-                with open(self._changelog_path, "r", encoding="utf-8") as f:
-                    existing = json.load(f)
-            existing.extend(entries)
-            with open(self._changelog_path, "w", encoding="utf-8") as f:
-                json.dump(existing[-self.MAX_CHANGELOG_ENTRIES :], f, ensure_ascii=False, indent=2)
+            if not entries:
+                return
+            if self._changelog_lines is None:
+                self._changelog_lines = self._count_changelog_lines()
+            with open(self._changelog_jsonl_path, "a", encoding="utf-8") as f:
+                f.writelines(json.dumps(e, ensure_ascii=False) + "\n" for e in entries)
+            self._changelog_lines += len(entries)
+            if self._changelog_lines > 2 * self.MAX_CHANGELOG_ENTRIES:
+                self._compact_changelog()
         except Exception as e:
             logger.warning("Lifecycle_Pulse_Monitor failed to append changelog: %s", e)
 
+    def _count_changelog_lines(self) -> int:
+        if not os.path.isfile(self._changelog_jsonl_path):
+            if os.path.isfile(self._changelog_path):
+                # one-time carry-over of the legacy JSON changelog
+                with open(self._changelog_path, "r", encoding="utf-8") as f:
+                    legacy = json.load(f)
+                with open(self._changelog_jsonl_path, "w", encoding="utf-8") as f:
+                    f.writelines(json.dumps(e, ensure_ascii=False) + "\n" for e in legacy)
+                return len(legacy)
+            return 0
+        with open(self._changelog_jsonl_path, "rb") as f:
+            return sum(1 for _ in f)
+
+    def _compact_changelog(self) -> None:
+        """Keep the newest MAX_CHANGELOG_ENTRIES lines (atomic replace)."""
+        from collections import deque
+        with open(self._changelog_jsonl_path, "r", encoding="utf-8") as f:
+            tail = deque(f, maxlen=self.MAX_CHANGELOG_ENTRIES)
+        tmp = self._changelog_jsonl_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.writelines(tail)
+        os.replace(tmp, self._changelog_jsonl_path)
+        self._changelog_lines = len(tail)
+
+    def read_changelog(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Changelog entries, oldest first (newest `limit` entries when given)."""
+        from collections import deque
+        if not os.path.isfile(self._changelog_jsonl_path):
+            return []
+        with open(self._changelog_jsonl_path, "r", encoding="utf-8") as f:
+            lines = deque(f, maxlen=limit) if limit else f.readlines()
+        return [json.loads(line) for line in lines if line.strip()]
+
+    def _current_state(self) -> Dict[str, Dict[str, Any]]:
+        current = {}
+        for prefix, comp in (("GPR", self._c1), ("ATA", self._c2), ("PI", self._c3)):
+            for k, v in comp.get_snapshot()["index"].items():
+                current[f"{prefix}:{k}"] = v
+        return current
+
+    def _summary(self, changelog: List[Dict[str, Any]], fast_path: str, records: int, t0: float,
+                 ingest_s: float = 0.0) -> Dict[str, Any]:
+        counts = {"ADDITION": 0, "DELETION": 0, "STATUS_CHANGE": 0}
+        for e in changelog:
+            counts[e["event"]] = counts.get(e["event"], 0) + 1
+        return {
+            "ts": datetime.utcnow().isoformat() + "Z",
+            "additions": counts["ADDITION"],
+            "deletions": counts["DELETION"],
+            "status_changes": counts["STATUS_CHANGE"],
+            "changelog_count": len(changelog),
+            "records": records,
+            "fast_path": fast_path,
+            "ingest_ms": round(ingest_s * 1000, 2),
+            "elapsed_ms": round((time.perf_counter() - t0) * 1000, 2),
+        }
+
     def run_cycle(self) -> Dict[str, Any]:
         """Run one scan cycle: diff against previous index, record additions, deletions, status changes."""
-        self._c1.ingest()
-        self._c2.ingest()
-        c2_ids = list(self._c2.get_snapshot().get("index", {}).keys())
-        self._c3.ingest(therapeutic_asset_ids=c2_ids)
-
-        # Build unified current state keyed by (component, id)
-        current = {}
-        for k, v in self._c1.get_snapshot().get("index", {}).items():
-            current[("GPR", k)] = {**v, "component": "Global_Patient_Resources"}
-        for k, v in self._c2.get_snapshot().get("index", {}).items():
-            current[("ATA", k)] = {**v, "component": "Advanced_Therapeutic_Assets"}
-        for k, v in self._c3.get_snapshot().get("index", {}).items():
-            current[("PI", k)] = {**v, "component": "Principal_Investigator_Registry"}
+        with self._cycle_lock:
+            snapshot = self._run_cycle()
+        with self._snapshot_lock:
+            self._last_snapshot = MappingProxyType(dict(snapshot))
+        return snapshot
 
-        old_index = self._load_index()
-        changelog = []
+    def _run_cycle(self) -> Dict[str, Any]:
+        t0 = time.perf_counter()
+        store = self._index_store()
+        signature, newest_mtime = self._source_signature()
+        if signature == self._ingested_signature and store.meta("sources") == signature:
+            # sources untouched since this monitor last ingested them: nothing can have changed
+            return self._summary([], "sources_unchanged", int(store.meta("records") or 0), t0)
 
+        started_ns = time.time_ns()
+        self._c1.ingest()
+        self._c2.ingest()
+        self._c3.ingest(therapeutic_asset_ids=self._c2.get_snapshot()["index"].keys())
+        ingest_s = time.perf_counter() - t0
+        # a file written within the mtime granularity of this ingest could change again without changing
+        # its signature; such "racy" signatures are not trusted for the stat fast path next cycle
+        racy = newest_mtime >= started_ns - self.RACY_MTIME_WINDOW_NS
+        self._ingested_signature = None if racy else signature
+        current = self._current_state()
+        fps = {key: _record_fingerprint(key, rec) for key, rec in current.items()}
+        digest = _index_digest(fps.values())
+        meta = {"sources": signature, "digest": digest, "records": str(len(current))}
+        if digest == store.meta("digest"):
+            store.apply([], [], meta)
+            return self._summary([], "digest_match", len(current), t0, ingest_s)
+
+        # single-pass set diff: every key is looked up once in the previous fingerprints
+        previous = store.fingerprints()
+        changelog: List[Dict[str, Any]] = []
+        upserts: List[tuple] = []
+        ts = datetime.utcnow().isoformat() + "Z"
         for key, norm in current.items():
-            comp, raw_id = key
-            key_str = f"{comp}:{raw_id}"
-            if key_str not in old_index:
+            fp = fps[key]
+            prev = previous.pop(key, None)
+            if prev is not None and prev[0] == fp:
+                continue
+            comp, raw_id = key.split(":", 1)
+            status, category = norm.get("status"), norm.get("category")
+            if prev is None:
+                changelog.append({"ts": ts, "event": "ADDITION", "component": comp, "id": raw_id, "agid": norm.get("agid")})
+            elif prev[1] != status or prev[2] != category:
                 changelog.append({
-                    "ts": datetime.utcnow().isoformat() + "Z",
-                    "event": "ADDITION",
+                    "ts": ts,
+                    "event": "STATUS_CHANGE",
                     "component": comp,
                     "id": raw_id,
                     "agid": norm.get("agid"),
+                    "changes": {"status": [prev[1], status], "category": [prev[2], category]},
                 })
-            else:
-                old = old_index[key_str]
-                if old.get("status") != norm.get("status") or old.get("category") != norm.get("category"):
-                    changelog.append({
-                        "ts": datetime.utcnow().isoformat() + "Z",
-                        "event": "STATUS_CHANGE",
-                        "component": comp,
-                        "id": raw_id,
-                        "agid": norm.get("agid"),
-                        "changes": {"status": [old.get("status"), norm.get("status")], "category": [old.get("category"), norm.get("category")]},
-                    })
-            old_index[key_str] = {k: v for k, v in norm.items() if k != "component"}
-
-        for key_str in list(old_index.keys()):
-            if key_str not in {f"{c}:{i}" for (c, i) in current.keys()}:
-                changelog.append({
-                    "ts": datetime.utcnow().isoformat() + "Z",
-                    "event": "DELETION",
-                    "key": key_str,
-                    "note": "No longer present in component sources.",
-                })
-                del old_index[key_str]
+            upserts.append((key, fp, status, category, json.dumps(dict(norm), ensure_ascii=False)))
+        deletes = list(previous)
+        for key_str in deletes:
+            changelog.append({"ts": ts, "event": "DELETION", "key": key_str, "note": "No longer present in component sources."})
 
-        self._save_index(old_index)
+        store.apply(upserts, deletes, meta)
         self._append_changelog(changelog)
-
-        snapshot = {
-            "ts": datetime.utcnow().isoformat() + "Z",
-            "additions": sum(1 for e in changelog if e.get("event") == "ADDITION"),
-            "deletions": sum(1 for e in changelog if e.get("event") == "DELETION"),
-            "status_changes": sum(1 for e in changelog if e.get("event") == "STATUS_CHANGE"),
-            "changelog_count": len(changelog),
-        }
-        with self._snapshot_lock:
-            self._last_snapshot = snapshot
-        return snapshot
+        return self._summary(changelog, "diff", len(current), t0, ingest_s)
 
     def run_once(self) -> Dict[str, Any]:
         """Execute one scan cycle synchronously."""
@@ -399,10 +720,10 @@ class Lifecycle_Pulse_Monitor:
             self._thread.join(timeout=2.0)
         self._thread = None
 
-    def get_snapshot(self) -> Optional[Dict[str, Any]]:
-        """Return latest lifecycle summary (call only when D ≤ 0.79)."""
+    def get_snapshot(self) -> Optional[MappingProxyType]:
+        """Return latest lifecycle summary (call only when D ≤ 0.79) as a read-only view."""
         with self._snapshot_lock:
-            return dict(self._last_snapshot) if self._last_snapshot else None
+            return self._last_snapshot
 
 
 # ------------------------------------------------------------------------------
@@ -426,16 +747,17 @@ def _enrich_snapshot_via_layer_2_5(layer_2_snapshot: Dict[str, Any], d_precision
     c1 = (layer_2_snapshot.get("Component_1_Global_Patient_Resources") or {}).get("index") or {}
     initial_asset = {}
     agid_list = []
+    # islice: only the first 20 keys are read, never the whole (possibly shared, read-only) index
     if c2:
-        first_id = next(iter(c2.keys()), None)
+        first_id = next(iter(c2), None)
         if first_id:
             initial_asset = c2[first_id]
-            agid_list = list(c2.keys())[:20]
+            agid_list = list(islice(c2, 20))
     if not initial_asset and c1:
-        first_id = next(iter(c1.keys()), None)
+        first_id = next(iter(c1), None)
         if first_id:
             initial_asset = c1[first_id]
-            agid_list = list(c1.keys())[:20]
+            agid_list = list(islice(c1, 20))
     if not initial_asset:
         initial_asset = {"id": "default_seed", "agid": "AGID-VALUE-SEED-DEFAULT"}
     # Multi-point Journey Plan (Treatment -> Recovery -> Psychology)
@@ -464,13 +786,16 @@ def _enrich_snapshot_via_layer_2_5(layer_2_snapshot: Dict[str, Any], d_precision
 
 
 def _dispatch_to_layer_3(enriched: Dict[str, Any]) -> Dict[str, Any]:
-    """Pass enriched snapshot (Layer 2 + Layer 2.5) to Layer 3 Global Nexus."""
+    """
+    Pass enriched snapshot (Layer 2 + Layer 2.5) to Layer 3 Global Nexus. The Layer-3 result leaves the
+    orchestrator, so read-only views in it are copied to plain dicts (the result is small; indexes are not in it).
+    """
     try:
         from amani_global_nexus_v4 import GlobalNexus
         nexus = GlobalNexus()
-        return nexus.dispatch(enriched)
+        return _to_plain(nexus.dispatch(enriched))
     except Exception:
-        return {
+        return _to_plain({
             "ts": enriched.get("ts") or datetime.utcnow().isoformat() + "Z",
             "layer": "Layer_3_Global_Nexus",
             "d_precision": enriched.get("d_precision"),
@@ -479,20 +804,55 @@ def _dispatch_to_layer_3(enriched: Dict[str, Any]) -> Dict[str, Any]:
             "multi_point_journey_plan": enriched.get("layer_2_5_multi_point_journey_plan") or [],
             "nexus_status": "DISPATCHED",
             "audit_ready": True,
-        }
+        })
 
 
 # ==============================================================================
 # Core Access Logic: Second Layer Orchestrator
 # All 4 components accessible only via get_latest_snapshot when D ≤ 0.79.
 # ==============================================================================
+_COMPONENT_KEYS = (
+    "Component_1_Global_Patient_Resources",
+    "Component_2_Advanced_Therapeutic_Assets",
+    "Component_3_Principal_Investigator_Registry",
+    "Component_4_Lifecycle_Pulse_Monitor",
+)
+# keyed sections of the cross-process snapshot file: (component key, field)
+_SHARED_SECTIONS = (
+    (_COMPONENT_KEYS[0], "index"),
+    (_COMPONENT_KEYS[1], "index"),
+    (_COMPONENT_KEYS[2], "index"),
+    (_COMPONENT_KEYS[2], "project_to_pi"),
+)
+
+
+class _LayerSnapshot:
+    """
+    One published, immutable version of the four component snapshots. Readers share the object;
+    a newer version replaces the orchestrator's reference and this one is freed with its last reader.
+    """
+
+    __slots__ = ("version", "ts", "components")
+
+    def __init__(self, version: int, components: tuple):
+        self.version = version
+        self.ts = _utc_ts()
+        self.components = components
+
+    def same_sources(self, components: tuple) -> bool:
+        return all(a is b for a, b in zip(self.components, components))
+
+
 class SecondLayerOrchestrator:
     """
     Single entry point for the second layer. All four components are accessible
     only through get_latest_snapshot(d_precision). Returns None when D > 0.79.
+    Snapshots are versioned read-only views (no index copies); with shared_snapshot_path set,
+    each new version of Components 1–3 is also serialized once for read_shared_snapshot() readers.
     """
 
-    def __init__(self, data_dir: Optional[str] = None, start_pulse_background: bool = False):
+    def __init__(self, data_dir: Optional[str] = None, start_pulse_background: bool = False,
+                 shared_snapshot_path: Optional[str] = None):
         base = os.path.abspath(data_dir or os.path.dirname(__file__))
         self._component_1 = Global_Patient_Resources(data_dir=base)
         self._component_2 = Advanced_Therapeutic_Assets(data_dir=base)
@@ -500,13 +860,51 @@ class SecondLayerOrchestrator:
         self._component_4 = Lifecycle_Pulse_Monitor(
             self._component_1, self._component_2, self._component_3, data_dir=base
         )
+        self._shared_path = os.path.abspath(shared_snapshot_path) if shared_snapshot_path else None
+        self._published: Optional[_LayerSnapshot] = None
+        self._shared_exported: Optional[_LayerSnapshot] = None
+        self._publish_lock = threading.Lock()
         if start_pulse_background:
             self._component_4.start_background()
 
+    def _layer_snapshot(self) -> _LayerSnapshot:
+        """Current published version; a new one is built (and exported) only when a component changed."""
+        components = (self._component_1.get_snapshot(), self._component_2.get_snapshot(),
+                      self._component_3.get_snapshot(), self._component_4.get_snapshot())
+        current = self._published
+        if current is not None and current.same_sources(components):
+            return current
+        with self._publish_lock:
+            current = self._published
+            if current is None or not current.same_sources(components):
+                current = _LayerSnapshot((current.version + 1) if current else 1, components)
+                self._published = current  # atomic reference swap
+            if self._shared_path:
+                self._export_shared(current)
+        return current
+
+    def _export_shared(self, layer: _LayerSnapshot) -> None:
+        """Serialize once per change of Components 1–3; a pulse-summary-only change does not rewrite the file."""
+        exported = self._shared_exported
+        if exported is not None and all(a is b for a, b in zip(exported.components[:3], layer.components[:3])):
+            return
+        try:
+            from shared_snapshot import write_snapshot
+            by_key = dict(zip(_COMPONENT_KEYS, layer.components))
+            header = {"ts": layer.ts, _COMPONENT_KEYS[3]: by_key[_COMPONENT_KEYS[3]]}
+            for key in _COMPONENT_KEYS[:3]:
+                header[key] = {f: v for f, v in by_key[key].items() if (key, f) not in _SHARED_SECTIONS}
+            sections = {f"{key}.{f}": by_key[key][f] for key, f in _SHARED_SECTIONS}
+            write_snapshot(self._shared_path, layer.version, header, sections)
+            self._shared_exported = layer
+        except Exception as e:
+            logger.warning("Shared snapshot export to %s failed: %s", self._shared_path, e)
+
     def get_latest_snapshot(self, d_precision: Optional[float] = None) -> Optional[Dict[str, Any]]:
         """
         Core access logic: return snapshot of all 4 components only when D ≤ 0.79.
         Otherwise return None. No direct access to components outside this gate.
+        Component entries are shared read-only views of the current version (O(1), no copies).
         """
         threshold = d_precision if d_precision is not None else _get_d_threshold()
         if threshold > D_PRECISION_HARD_LOCK:
@@ -514,16 +912,51 @@ class SecondLayerOrchestrator:
         # Ensure one cycle has run so Component_4 has data
         if self._component_4.get_snapshot() is None:
             self._component_4.run_once()
+        layer = self._layer_snapshot()
         return {
             "ts": datetime.utcnow().isoformat() + "Z",
             "d_precision": threshold,
-            "Component_1_Global_Patient_Resources": self._component_1.get_snapshot(),
-            "Component_2_Advanced_Therapeutic_Assets": self._component_2.get_snapshot(),
-            "Component_3_Principal_Investigator_Registry": self._component_3.get_snapshot(),
-            "Component_4_Lifecycle_Pulse_Monitor": self._component_4.get_snapshot(),
+            "snapshot_version": layer.version,
+            **dict(zip(_COMPONENT_KEYS, layer.components)),
         }
 
 
+_SHARED_READERS: Dict[str, Any] = {}
+_SHARED_READERS_LOCK = threading.Lock()
+
+
+def read_shared_snapshot(path: str, d_precision: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    """
+    Cross-process counterpart of SecondLayerOrchestrator.get_latest_snapshot: maps the exported file
+    (remapping when a newer version was published) and returns the same layout, with the keyed
+    sections as lazy Mapping views that decode one record per lookup. None when D > 0.79 or no file.
+    """
+    threshold = d_precision if d_precision is not None else _get_d_threshold()
+    if threshold > D_PRECISION_HARD_LOCK:
+        return None
+    from shared_snapshot import SharedSnapshotReader
+    path = os.path.abspath(path)
+    with _SHARED_READERS_LOCK:
+        reader = _SHARED_READERS.get(path)
+        if reader is None:
+            if not os.path.isfile(path):
+                return None
+            reader = _SHARED_READERS[path] = SharedSnapshotReader(path)
+    reader.refresh()
+    header = reader.header
+    out: Dict[str, Any] = {
+        "ts": datetime.utcnow().isoformat() + "Z",
+        "d_precision": threshold,
+        "snapshot_version": reader.version,
+        _COMPONENT_KEYS[3]: header.get(_COMPONENT_KEYS[3]),
+    }
+    for key in _COMPONENT_KEYS[:3]:
+        out[key] = dict(header.get(key) or {})
+    for key, field in _SHARED_SECTIONS:
+        out[key][field] = reader.section(f"{key}.{field}")
+    return out
+
+
 # ==============================================================================
 # AMAHCenturionInjector — Chroma injection + Second Layer orchestration
 # ==============================================================================
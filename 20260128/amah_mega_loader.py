@@ -4,10 +4,38 @@ import random
 import time
 from chromadb.config import Settings
 
+HUBS = ["Jacksonville", "Houston", "Boston", "Cleveland", "Palo Alto", "New York"]
+SPECIALTIES = ["STN-DBS", "Focused-Ultrasound", "Neuro-Regeneration", "Gene-Therapy"]
+
+def generate_high_fidelity_batch(count, start=0):
+    """生成大规模高精专家镜像数据（id 从 start 起连续编号，分批生成时不互相覆盖）"""
+    batch_data = []
+    for i in range(start, start + count):
+        hub = random.choice(HUBS)
+        spec = random.choice(SPECIALTIES)
+        expert = {
+            "id": f"mega_exp_{i:06d}",
+            "name": f"Dr. Elite_{hub}_{i}",
+            "document": f"{hub} {spec} Precision Medicine Medicare Travel-Concierge latest clinical trials {spec}",
+            "metadata": {
+                "hub": hub,
+                "specialty": spec,
+                "services": json.dumps(["Hospital-Docking", "Travel-Concierge"])
+            }
+        }
+        batch_data.append(expert)
+    return batch_data
+
+def iter_high_fidelity_records(total_count, batch_size=500):
+    """流水线第一段：按批惰性生成 (id, document, metadata)，不整体载入内存"""
+    for i in range(0, total_count, batch_size):
+        for e in generate_high_fidelity_batch(min(batch_size, total_count - i), start=i):
+            yield e["id"], e["document"], e["metadata"]
+
 class AMAHMegaLoader:
-    def __init__(self):
+    def __init__(self, path="./amah_vector_db"):
         # 初始化持久化存储
-        self.client = chromadb.PersistentClient(path="./amah_vector_db")
+        self.client = chromadb.PersistentClient(path=path)
         # 针对大规模数据调优 HNSW 索引
         self.collection = self.client.get_or_create_collection(
             name="expert_map_global",
@@ -18,35 +46,28 @@ class AMAHMegaLoader:
             }
         )
 
-    def generate_high_fidelity_batch(self, count):
+    def generate_high_fidelity_batch(self, count, start=0):
         """生成大规模高精专家镜像数据"""
-        hubs = ["Jacksonville", "Houston", "Boston", "Cleveland", "Palo Alto", "New York"]
-        specialties = ["STN-DBS", "Focused-Ultrasound", "Neuro-Regeneration", "Gene-Therapy"]
-        
-        batch_data = []
-        for i in range(count):
-            hub = random.choice(hubs)
-            spec = random.choice(specialties)
-            expert = {
-                "id": f"mega_exp_{i:06d}",
-                "name": f"Dr. Elite_{hub}_{i}",
-                "document": f"{hub} {spec} Precision Medicine Medicare Travel-Concierge latest clinical trials {spec}",
-                "metadata": {
-                    "hub": hub,
-                    "specialty": spec,
-                    "services": json.dumps(["Hospital-Docking", "Travel-Concierge"])
-                }
-            }
-            batch_data.append(expert)
-        return batch_data
+        return generate_high_fidelity_batch(count, start=start)
 
-    def execute_bulk_import(self, total_count, batch_size=500):
-        """执行大规模分批导入"""
+    def execute_bulk_import(self, total_count, batch_size=500, pipelined=False, workers=None, threads=None):
+        """
+        执行大规模分批导入（默认逐批内联 embedding）。pipelined=True 走 bulk_pipeline 三段流水线：
+        生成 → 进程池 embedding → 单写线程 upsert（有界队列背压，批大小取 Chroma 上限，
+        每个 worker 的 ONNX 线程数按 核数 // worker 数 封顶）。
+        """
         print(f"🚀 开始硬化 {total_count} 个专家节点至向量空间...")
         start_time = time.time()
-        
+
+        if pipelined:
+            from bulk_pipeline import pipelined_upsert
+            stats = pipelined_upsert(self.collection, iter_high_fidelity_records(total_count, batch_size),
+                                     workers=workers, threads=threads, progress=lambda n: print(f"✅ 已完成: {n}/{total_count}"))
+            print(f"🏁 导入完成。总耗时: {time.time() - start_time:.2f}s | {stats['records_per_sec']} 条/秒")
+            return stats
+
         for i in range(0, total_count, batch_size):
-            batch = self.generate_high_fidelity_batch(min(batch_size, total_count - i))
+            batch = self.generate_high_fidelity_batch(min(batch_size, total_count - i), start=i)
             
             self.collection.upsert(
                 ids=[e["id"] for e in batch],
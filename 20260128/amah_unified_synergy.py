@@ -17,6 +17,13 @@ class AMAHUnifiedSynergy:
         # 挂载核心分片
         self.assets = self.client.get_collection("neurology_assets")
         self.experts = self.client.get_collection("expert_map_global")
+        # vector_sharding.enabled 且专家库学科分片未过期时按意图路由，只检索 1~2 个分片
+        self.expert_router = None
+        try:
+            from shard_router import open_router
+            self.expert_router = open_router(self.client, "expert_map_global")
+        except Exception as e:
+            logger.warning("Expert shard router unavailable, querying expert_map_global: %s", e)
         print("✅ AMAH V10.0 全链路商业闭环引擎已激活")
 
     async def execute_strategic_matching(self, user_query):
@@ -37,7 +44,10 @@ class AMAHUnifiedSynergy:
         matched_asset = asset_res['documents'][0][0]
         
         expert_query = f"{safe_query} using {matched_asset}"
-        expert_res = self.experts.query(query_texts=[expert_query], n_results=1)
+        if self.expert_router is not None:
+            expert_res = self.expert_router.query(expert_query, n_results=1)
+        else:
+            expert_res = self.experts.query(query_texts=[expert_query], n_results=1)
         
         matched_expert_doc = expert_res['documents'][0][0]
         expert_meta = expert_res['metadatas'][0][0]
@@ -8,6 +8,8 @@ import json
 import hashlib
 import numpy as np
 
+from entropy_kernel import sliding_entropy
+
 # ------------------------------------------------------------------------------
 # AGID 体系
 # ------------------------------------------------------------------------------
@@ -17,25 +19,10 @@ def to_agid(namespace: str, node_type: str, raw_id) -> str:
 
 
 def calculate_sliding_entropy(text, window_size=5):
-    """V4.0 注入：波形熵检测（轻量实现，无 PyTorch 依赖）。"""
-    tokens = list(text)
-    seq_len = len(tokens)
-    entropy_seq = []
-    for i in range(seq_len):
-        start = max(0, i - window_size // 2)
-        end = min(seq_len, i + window_size // 2 + 1)
-        window = tokens[start:end]
-        counts = {}
-        for t in window:
-            counts[t] = counts.get(t, 0) + 1
-        ent = 0.0
-        total = len(window)
-        for c in counts.values():
-            p = c / total
-            ent -= p * math.log2(p) if p > 0 else 0
-        entropy_seq.append(ent)
-    variance = float(np.var(entropy_seq)) if entropy_seq else 0.0
-    return entropy_seq, variance
+    """V4.0 注入：波形熵检测（共享 entropy_kernel 向量化实现，无 PyTorch 依赖）。"""
+    entropy_seq = sliding_entropy(text or "", window_size)
+    variance = float(np.var(entropy_seq)) if len(entropy_seq) else 0.0
+    return list(entropy_seq), variance
 
 
 VARIANCE_INTERCEPT_THRESHOLD = 0.005
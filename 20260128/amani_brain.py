@@ -11,12 +11,12 @@
 # Patent Claims: No. 10 & 11 (Holographic Entropy & GNN Anchoring)
 # ==============================================================================
 
-import math
-import collections
 import hashlib
 import numpy as np
 import time
 
+from entropy_kernel import sliding_entropy
+
 try:
     import torch
     import torch.nn as nn
@@ -45,27 +45,13 @@ class EntropyUtils:
         计算文本的'熵纹理' (Entropy Texture) — 波形检测核心。
         输出随时间变化的密度波形，用于 V4.0 硬化检测。
         """
-        tokens = list(text)
-        seq_len = len(tokens)
-        entropy_seq = []
+        entropy_seq = sliding_entropy(text, window_size)
 
-        if seq_len == 0:
+        if len(entropy_seq) == 0:
             return torch.zeros(1, 1, 1), 0.0
 
-        for i in range(seq_len):
-            start = max(0, i - window_size // 2)
-            end = min(seq_len, i + window_size // 2 + 1)
-            window = tokens[start:end]
-            counts = collections.Counter(window)
-            ent = 0.0
-            total = len(window)
-            for count in counts.values():
-                p = count / total
-                ent -= p * math.log2(p) if p > 0 else 0
-            entropy_seq.append(ent)
-
-        tensor = torch.tensor(entropy_seq, dtype=torch.float32).unsqueeze(0).unsqueeze(2)
-        variance = np.var(entropy_seq) if entropy_seq else 0.0
+        tensor = torch.from_numpy(entropy_seq.astype(np.float32)).unsqueeze(0).unsqueeze(2)
+        variance = np.var(entropy_seq)
         return tensor, variance
 
     @staticmethod
@@ -7,12 +7,12 @@
 # Channel 1 = 语义嵌入 | Channel 2 = EntropyUtils.calculate_sliding_entropy 实时熵波形
 # ==============================================================================
 
-import math
-import collections
 import hashlib
 import numpy as np
 import time
 
+from entropy_kernel import sliding_entropy
+
 try:
     import torch
     import torch.nn as nn
@@ -39,28 +39,14 @@ class EntropyUtils:
         计算文本熵纹理（波形）。实时输出，强制作为 E-CNN 第二通道输入，禁止模拟拼接。
         返回 (tensor [1, seq, 1], variance)
         """
-        tokens = list(text)
-        seq_len = len(tokens)
-        entropy_seq = []
+        entropy_seq = sliding_entropy(text, window_size)
 
-        if seq_len == 0:
+        if len(entropy_seq) == 0:
             return torch.zeros(1, 1, 1), 0.0
 
-        for i in range(seq_len):
-            start = max(0, i - window_size // 2)
-            end = min(seq_len, i + window_size // 2 + 1)
-            window = tokens[start:end]
-            counts = collections.Counter(window)
-            ent = 0.0
-            total = len(window)
-            for count in counts.values():
-                p = count / total
-                ent -= p * math.log2(p) if p > 0 else 0
-            entropy_seq.append(ent)
-
         # 实时熵序列 → [1, seq_len, 1]，作为 E-CNN 第二通道唯一来源
-        channel2_entropy = torch.tensor(entropy_seq, dtype=torch.float32).unsqueeze(0).unsqueeze(2)
-        variance = np.var(entropy_seq) if entropy_seq else 0.0
+        channel2_entropy = torch.from_numpy(entropy_seq.astype(np.float32)).unsqueeze(0).unsqueeze(2)
+        variance = np.var(entropy_seq)
         return channel2_entropy, variance
 
     @staticmethod
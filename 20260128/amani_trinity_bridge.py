@@ -10,9 +10,9 @@
 # L4: Delegates to Interface Layer (UIPresenter). All docstrings in English.
 # ------------------------------------------------------------------------------
 
-import math
 import hashlib
 import logging
+import time
 from typing import Any, Dict, List, Optional, Tuple
 
 try:
@@ -20,6 +20,8 @@ try:
 except ImportError:
     np = None
 
+from entropy_kernel import entropy_stats
+
 # ------------------------------------------------------------------------------
 # Layer 1 alignment (Sovereign Protocols)
 # ------------------------------------------------------------------------------
@@ -50,26 +52,7 @@ logger = logging.getLogger(__name__)
 # ------------------------------------------------------------------------------
 def _shannon_entropy(text: str, window_size: int = 5) -> Tuple[float, float]:
     """Compute Shannon entropy over sliding windows. Returns (mean_entropy, variance)."""
-    tokens = list(text) if text else []
-    if not tokens:
-        return 0.0, 0.0
-    entropies = []
-    for i in range(len(tokens)):
-        start = max(0, i - window_size // 2)
-        end = min(len(tokens), i + window_size // 2 + 1)
-        window = tokens[start:end]
-        counts: Dict[str, int] = {}
-        for t in window:
-            counts[t] = counts.get(t, 0) + 1
-        ent = 0.0
-        n = len(window)
-        for c in counts.values():
-            p = c / n
-            ent -= p * math.log2(p) if p > 0 else 0
-        entropies.append(ent)
-    mean_ent = sum(entropies) / len(entropies) if entropies else 0.0
-    variance = sum((e - mean_ent) ** 2 for e in entropies) / len(entropies) if entropies else 0.0
-    return mean_ent, variance
+    return entropy_stats(text or "", window_size)
 
 
 class ECNNSentinel:
@@ -233,32 +216,114 @@ def _extract_hard_anchors(text: str, base_dir: str) -> List[str]:
     return found
 
 
+def _anchor_where_document(hard_anchors: List[str]) -> Dict[str, Any]:
+    """
+    Translate hard anchors into a ChromaDB where_document filter. $contains is case-sensitive,
+    so each anchor is expanded to its literal, lower and upper-case spellings (each extra clause
+    costs one more document scan, so mixed-case spellings are left to the widening re-rank).
+    """
+    variants: List[str] = []
+    for a in hard_anchors:
+        for v in (a, a.lower(), a.upper()):
+            if v and v not in variants:
+                variants.append(v)
+    clauses = [{"$contains": v} for v in variants]
+    return clauses[0] if len(clauses) == 1 else {"$or": clauses}
+
+
+def _has_anchor(doc: Optional[str], meta: Any, hard_anchors: List[str]) -> bool:
+    """Case-insensitive hard-anchor check over a candidate's document and metadata."""
+    text_lower = ((doc or "") + " " + str(meta or "")).lower()
+    return any(a and a.lower() in text_lower for a in hard_anchors)
+
+
+def _scored_candidates(res: Dict[str, Any], include: List[str]) -> List[Tuple[str, float, str, Any]]:
+    """Flatten a single-query ChromaDB result into (id, score, document, metadata); score = 1 - distance."""
+    ids = (res.get("ids") or [[]])[0]
+    dists = (res.get("distances") or [[]])[0]
+    docs = (res.get("documents") or [[]])[0] if "documents" in include else []
+    metas = (res.get("metadatas") or [[]])[0] if "metadatas" in include else []
+    out = []
+    for i, aid in enumerate(ids):
+        d = dists[i] if i < len(dists) else 0.0
+        score = max(0.0, 1.0 - d) if d else 1.0
+        out.append((aid, float(score), docs[i] if i < len(docs) else "", metas[i] if i < len(metas) else {}))
+    return out
+
+
 # ------------------------------------------------------------------------------
 # Protocol audit and concurrency guard (config-driven)
 # ------------------------------------------------------------------------------
-_bridge_semaphore = None
-_bridge_semaphore_max = 0
+_bridge_limiter = None
+_bridge_limiter_key: Optional[Tuple[Any, ...]] = None
 
 
-def _get_bridge_semaphore(max_calls: int) -> Optional[Any]:
-    """Return module-level semaphore for run_safe concurrency limit; create if needed."""
-    global _bridge_semaphore, _bridge_semaphore_max
+def _guard_key(guard_cfg: Dict[str, Any]) -> Optional[Tuple[Any, ...]]:
+    """(initial, algorithm, min, max, caller_quota) of the run_safe guard for guard_cfg; None when it is off."""
+    max_calls = int(guard_cfg.get("max_concurrent_bridge_calls", 8))
     if max_calls <= 0:
         return None
-    if _bridge_semaphore is None or _bridge_semaphore_max != max_calls:
+    adaptive = bool(guard_cfg.get("adaptive", False))
+    return (
+        max_calls,
+        guard_cfg.get("algorithm", "gradient") if adaptive else "fixed",
+        int(guard_cfg.get("min_concurrent_bridge_calls", 1)) if adaptive else max_calls,
+        int(guard_cfg.get("max_adaptive_bridge_calls", 64)) if adaptive else max_calls,
+        float(guard_cfg.get("caller_quota", 1.0)),
+    )
+
+
+def bridge_guard_bounds(guard_cfg: Dict[str, Any]) -> Optional[Tuple[int, int, int]]:
+    """(initial, min, max) concurrent run_safe calls the guard admits for guard_cfg; None when it is disabled."""
+    key = _guard_key(guard_cfg) if guard_cfg.get("enabled", False) else None
+    return None if key is None else (key[0], key[2], key[3])
+
+
+def _get_bridge_limiter(guard_cfg: Dict[str, Any]) -> Optional[Any]:
+    """
+    Return module-level AdaptiveConcurrencyLimiter for run_safe; (re)create when its config changes.
+    max_concurrent_bridge_calls is the starting limit (and the fixed limit when adaptive is off).
+    """
+    global _bridge_limiter, _bridge_limiter_key
+    key = _guard_key(guard_cfg)
+    if key is None:
+        return None
+    if _bridge_limiter is None or _bridge_limiter_key != key:
         try:
-            import threading
-            _bridge_semaphore = threading.Semaphore(max_calls)
-            _bridge_semaphore_max = max_calls
-        except Exception:
+            from adaptive_limiter import AdaptiveConcurrencyLimiter
+            _bridge_limiter = AdaptiveConcurrencyLimiter(
+                initial_limit=key[0], algorithm=key[1], min_limit=key[2], max_limit=key[3], caller_quota=key[4],
+            )
+            _bridge_limiter_key = key
+        except Exception as e:
+            logger.warning("Concurrency limiter unavailable, guard disabled: %s", e)
             return None
-    return _bridge_semaphore
+    return _bridge_limiter
+
+
+def bridge_limiter_limit() -> Optional[int]:
+    """Current run_safe guard limit (None before first use or with the guard off); cheap enough to poll."""
+    return _bridge_limiter.limit if _bridge_limiter is not None else None
+
+
+def bridge_limiter_stats() -> Optional[Dict[str, Any]]:
+    """Queue depth, wait-time and limit metrics of the run_safe concurrency guard (None before first use)."""
+    return _bridge_limiter.stats() if _bridge_limiter is not None else None
 
 
-def _append_protocol_audit(base_dir: str, log_path: str, result: Dict[str, Any], intercepted: bool) -> None:
-    """Append one line to sovereignty audit log: ts, intercepted, d_effective, variance, l3_origin."""
+def _append_protocol_audit(
+    base_dir: str,
+    log_path: str,
+    result: Dict[str, Any],
+    intercepted: bool,
+    writer_cfg: Optional[Dict[str, Any]] = None,
+) -> None:
+    """
+    Append one line to sovereignty audit log: ts, intercepted, d_effective, variance, l3_origin.
+    With writer_cfg["async_writer"], the line is handed to the shared background AsyncAuditWriter
+    (batched, rotating) instead of being written synchronously on the request path.
+    """
     import os as _os_audit
-    import time
     path = log_path if _os_audit.path.isabs(log_path) else _os_audit.path.join(base_dir, log_path)
     l1 = result.get("l1_sentinel") or {}
     d = l1.get("d_effective")
@@ -267,6 +332,13 @@ def _append_protocol_audit(base_dir: str, log_path: str, result: Dict[str, Any],
     origin = l3.get("l3_origin", "")
     ts = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime())
     line = f"{ts}\tintercepted={intercepted}\td_effective={d}\tvariance={var}\tl3_origin={origin}\n"
+    if writer_cfg and writer_cfg.get("async_writer", False):
+        try:
+            from audit_writer import get_audit_writer
+            get_audit_writer(path, writer_cfg).write(line)
+            return
+        except Exception as e:
+            logger.warning("Async audit writer unavailable, writing synchronously: %s", e)
     try:
         with open(path, "a", encoding="utf-8") as f:
             f.write(line)
@@ -282,6 +354,8 @@ class GNNAssetAnchor:
     """
     L3 Nexus: maps intent (and L2 strategy) to AGIDs using GAT-style logic or ChromaDB.
     When chromadb_path/collection_name are set, queries ChromaDB; otherwise uses in-memory asset table.
+    embedding_function is the one the collection was built with (as constructed by the loader); without it
+    query embeddings follow the collection's persisted embedding configuration.
     """
 
     def __init__(
@@ -290,6 +364,11 @@ class GNNAssetAnchor:
         feature_dim: int = 64,
         chromadb_path: Optional[str] = None,
         collection_name: str = "expert_map_global",
+        query_embedding_cache: Optional[Dict[str, Any]] = None,
+        shard_routing: Optional[Dict[str, Any]] = None,
+        ann_snapshot: Optional[Dict[str, Any]] = None,
+        hybrid_retrieval: Optional[Dict[str, Any]] = None,
+        embedding_function: Any = None,
     ):
         self._num_assets = num_assets
         self._feature_dim = feature_dim
@@ -298,11 +377,29 @@ class GNNAssetAnchor:
         self._chroma_client = None
         self._chroma_collection = None
         self._cached_count = None  # Cache count() to avoid repeated slow calls
-        if chromadb_path:
+        self._snapshot = None
+        if (ann_snapshot or {}).get("enabled", False) and ann_snapshot.get("path"):
+            # Read-only mmap snapshot of the collection: no PersistentClient, no contention with ingestion
+            try:
+                from ann_snapshot import SnapshotRetriever
+                self._snapshot = SnapshotRetriever(
+                    ann_snapshot["path"],
+                    embedding_fn=embedding_function,
+                    refresh_interval=float(ann_snapshot.get("refresh_interval", 1.0)),
+                    quantized=ann_snapshot.get("quantized", False),
+                    rerank=int(ann_snapshot.get("rerank_candidates", 200)),
+                )
+                self._chroma_collection = self._snapshot
+                self._cached_count = self._snapshot.count()
+            except Exception as e:
+                logger.warning("ANN snapshot unavailable, falling back to the live collection: %s", e)
+                self._snapshot = None
+        if chromadb_path and self._snapshot is None:
             try:
                 import chromadb
                 self._chroma_client = chromadb.PersistentClient(path=chromadb_path)
-                self._chroma_collection = self._chroma_client.get_collection(collection_name)
+                self._chroma_collection = self._chroma_client.get_collection(
+                    collection_name, **({"embedding_function": embedding_function} if embedding_function else {}))
                 # Cache count on init to avoid slow calls during batch processing
                 try:
                     self._cached_count = self._chroma_collection.count()
@@ -311,6 +408,52 @@ class GNNAssetAnchor:
             except Exception:
                 self._chroma_client = None
                 self._chroma_collection = None
+        self._embedding_cache = None
+        if self._chroma_collection is not None and (query_embedding_cache or {}).get("enabled", False):
+            try:
+                from embedding_cache import collection_embedding_fn, get_shared_cache
+                fn = collection_embedding_fn(self._chroma_collection, embedding_function)
+                if fn is not None:
+                    self._embedding_cache = get_shared_cache(
+                        fn,
+                        capacity=int(query_embedding_cache.get("capacity", 4096)),
+                        disk_path=query_embedding_cache.get("disk_path"),
+                    )
+            except Exception as e:
+                logger.warning("Query embedding cache unavailable, using query_texts: %s", e)
+                self._embedding_cache = None
+        self._shard_router = None
+        if self._chroma_client is not None and (shard_routing or {}).get("enabled", False):
+            try:
+                from shard_router import open_router
+                self._shard_router = open_router(self._chroma_client, collection_name, shard_routing,
+                                                 embedding_function=embedding_function)
+                if self._shard_router is None:
+                    logger.warning("Shard routing enabled but %s has no fresh discipline shards; querying it directly",
+                                   collection_name)
+            except Exception as e:
+                logger.warning("Discipline shard router unavailable, querying the monolithic collection: %s", e)
+                self._shard_router = None
+        self._lexical = None
+        self._hybrid_cfg = dict(hybrid_retrieval or {})
+        if self._chroma_collection is not None and self._hybrid_cfg.get("enabled", False):
+            try:
+                import os
+                from lexical_index import LexicalIndex, default_index_path
+                path = self._hybrid_cfg.get("path") or (default_index_path(chromadb_path, collection_name)
+                                                        if chromadb_path else None)
+                if path and os.path.isfile(path):
+                    lexical = LexicalIndex(path)
+                    if lexical.count():
+                        self._lexical = lexical
+                    else:
+                        lexical.close()
+                if self._lexical is None:
+                    logger.warning("Hybrid retrieval enabled but no BM25 index at %s (python lexical_index.py --build %s)",
+                                   path, collection_name)
+            except Exception as e:
+                logger.warning("BM25 index unavailable, using vector retrieval only: %s", e)
+                self._lexical = None
         if self._chroma_collection is None:
             self._init_fake_assets()
         else:
@@ -336,6 +479,129 @@ class GNNAssetAnchor:
             vec[len(intent_summary) % self._feature_dim] = 1.0
         return vec / (np.linalg.norm(vec) + 1e-8)
 
+    def _query(
+        self,
+        text: str,
+        n_results: int,
+        include: List[str],
+        where_document: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Query ChromaDB by cached embedding when the cache is on; otherwise let Chroma embed query_texts.
+        With discipline shards, the query goes to the shards of its detected domain instead.
+        """
+        kwargs: Dict[str, Any] = {"n_results": n_results, "include": include}
+        if where_document:
+            kwargs["where_document"] = where_document
+        if self._shard_router is not None:
+            try:
+                emb = self._embedding_cache.embed([text])[0] if self._embedding_cache is not None else None
+                return self._shard_router.query(text, query_embedding=emb, **kwargs)
+            except Exception as e:
+                logger.warning("Sharded query failed, querying the monolithic collection: %s", e)
+        if self._embedding_cache is not None:
+            try:
+                emb = self._embedding_cache.embed([text])
+                return self._chroma_collection.query(query_embeddings=emb, **kwargs)
+            except Exception as e:
+                logger.warning("Cached-embedding query failed, retrying with query_texts: %s", e)
+        return self._chroma_collection.query(query_texts=[text], **kwargs)
+
+    def embedding_cache_stats(self) -> Optional[Dict[str, Any]]:
+        """Hit-rate metrics of the query-embedding cache, or None when disabled."""
+        return self._embedding_cache.stats() if self._embedding_cache is not None else None
+
+    def _pool_rerank(
+        self,
+        intent_summary: str,
+        top_k: int,
+        pool_n: int,
+        total: int,
+        hard_anchors: Optional[List[str]],
+    ) -> List[Tuple[str, float]]:
+        """Legacy path: fetch pool_n candidates (with documents when anchors are set) and re-rank in Python."""
+        n_results = min(max(pool_n, top_k), total) if total else top_k
+        include = ["distances", "documents", "metadatas"] if hard_anchors else ["distances"]
+        res = self._query(intent_summary[:2000], n_results, include)
+        out = _scored_candidates(res, include)
+        if hard_anchors and out:
+            # Re-rank: candidates that contain any hard_anchor go first, then by score
+            with_anchor = [(a, s) for a, s, d, m in out if _has_anchor(d, m, hard_anchors)]
+            without_anchor = [(a, s) for a, s, d, m in out if not _has_anchor(d, m, hard_anchors)]
+            with_anchor.sort(key=lambda x: x[1], reverse=True)
+            without_anchor.sort(key=lambda x: x[1], reverse=True)
+            return with_anchor + without_anchor
+        out = [(a, s) for a, s, _, _ in out]
+        out.sort(key=lambda x: x[1], reverse=True)
+        return out
+
+    def _pushdown_rerank(
+        self,
+        intent_summary: str,
+        top_k: int,
+        pool_n: int,
+        total: int,
+        hard_anchors: Optional[List[str]],
+    ) -> List[Tuple[str, float]]:
+        """
+        Firewall pushed into the vector store: hard anchors become a where_document $contains filter,
+        so anchored candidates come from the whole collection rather than a 100-row pool. Only when
+        fewer than top_k anchored hits exist does the query widen (pool doubling up to pool_n) and
+        fetch documents/metadatas to re-rank the remainder (mixed-case or metadata-only anchors).
+        """
+        text = intent_summary[:2000]
+        cap = min(max(pool_n, top_k), total) if total else top_k
+        if not hard_anchors:
+            res = self._query(text, min(top_k, cap), ["distances"])
+            out = [(a, s) for a, s, _, _ in _scored_candidates(res, ["distances"])]
+            out.sort(key=lambda x: x[1], reverse=True)
+            return out
+        res = self._query(text, min(top_k, cap), ["distances"], where_document=_anchor_where_document(hard_anchors))
+        anchored = {a: s for a, s, _, _ in _scored_candidates(res, ["distances"])}
+        if len(anchored) >= top_k:
+            return sorted(anchored.items(), key=lambda x: x[1], reverse=True)
+        include = ["distances", "documents", "metadatas"]
+        n = min(cap, max(2 * top_k, top_k + len(anchored)))
+        while True:
+            res = self._query(text, n, include)
+            widened = [c for c in _scored_candidates(res, include) if c[0] not in anchored]
+            extra = {a: s for a, s, d, m in widened if _has_anchor(d, m, hard_anchors)}
+            rest = [(a, s) for a, s, d, m in widened if a not in extra]
+            if len(anchored) + len(extra) >= top_k or n >= cap:  # rest (no anchor) never stops the widening
+                break
+            n = min(cap, n * 2)
+        with_anchor = sorted({**anchored, **extra}.items(), key=lambda x: x[1], reverse=True)
+        rest.sort(key=lambda x: x[1], reverse=True)
+        return with_anchor + rest
+
+    def _hybrid_rerank(
+        self,
+        intent_summary: str,
+        top_k: int,
+        total: int,
+        hard_anchors: Optional[List[str]],
+    ) -> List[Tuple[str, float]]:
+        """
+        Vector and BM25 top-N candidates fused (lexical_index.fuse). BM25 matches only the identifiers of the
+        intent plus the hard anchors (none: vector hits alone); as the downgrade firewall, candidates whose text
+        contains an anchor are ranked first.
+        """
+        from lexical_index import fuse, query_weights
+        cfg = self._hybrid_cfg
+        text = intent_summary[:2000]
+        n = max(int(cfg.get("candidates", 50)), top_k)
+        res = self._query(text, min(n, total) if total else n, ["distances"])
+        vector_hits = [(a, s) for a, s, _, _ in _scored_candidates(res, ["distances"])]
+        lexical_query = " ".join([text] + list(hard_anchors or []))
+        lexical_hits = self._lexical.search_identifiers(text, n, hard_anchors or (), within=[a for a, _ in vector_hits])
+        vw, lw = query_weights(lexical_query, float(cfg.get("vector_weight", 1.0)), float(cfg.get("lexical_weight", 1.0)),
+                               float(cfg.get("identifier_boost", 2.0)))
+        fused = fuse(vector_hits, lexical_hits, cfg.get("fusion", "weighted"), vw, lw, int(cfg.get("rrf_k", 60)))
+        if hard_anchors and fused:
+            anchored = self._lexical.containing([a for a, _ in fused], hard_anchors)
+            return [c for c in fused if c[0] in anchored] + [c for c in fused if c[0] not in anchored]
+        return fused
+
     def map_to_agids(
         self,
         intent_summary: str,
@@ -343,61 +609,40 @@ class GNNAssetAnchor:
         retrieval_pool_n: Optional[int] = None,
         hard_anchors: Optional[List[str]] = None,
         downgrade_firewall: bool = True,
+        anchor_pushdown: bool = True,
     ) -> List[Tuple[str, float]]:
         """
-        Return top-k (agid, score). First retrieves up to retrieval_pool_n (default 100) candidates;
-        if hard_anchors present and downgrade_firewall, re-ranks by hard-anchor coverage (firewall
-        against downgrade matching), then returns top_k.
+        Return top-k (agid, score). With anchor_pushdown, hard anchors are applied as a ChromaDB
+        where_document filter and the pool widens only when anchored hits run short; otherwise
+        retrieves up to retrieval_pool_n (default 100) candidates and, if hard_anchors present and
+        downgrade_firewall, re-ranks by hard-anchor coverage (firewall against downgrade matching).
         """
         pool_n = retrieval_pool_n if retrieval_pool_n is not None else 100
+        anchors = hard_anchors if hard_anchors and downgrade_firewall else None
         if self._chroma_collection is not None and intent_summary:
+            # Use cached count to avoid slow repeated calls during batch processing
             try:
-                # Use cached count to avoid slow repeated calls during batch processing
                 total = self._cached_count if self._cached_count is not None else self._chroma_collection.count()
-                n_results = min(max(pool_n, top_k), total) if total else top_k
-                include = ["distances"]
-                if hard_anchors and downgrade_firewall:
-                    include = ["distances", "documents", "metadatas"]
-                res = self._chroma_collection.query(
-                    query_texts=[intent_summary[:2000]],
-                    n_results=n_results,
-                    include=include,
-                )
-                ids = (res.get("ids") or [[]])[0]
-                dists = (res.get("distances") or [[]])[0]
-                docs = (res.get("documents") or [[]])[0] if "documents" in include else []
-                metas = (res.get("metadatas") or [[]])[0] if "metadatas" in include else []
-                out = []
-                for i, aid in enumerate(ids):
-                    d = dists[i] if i < len(dists) else 0.0
-                    score = max(0.0, 1.0 - d) if d else 1.0
-                    out.append((aid, float(score), docs[i] if i < len(docs) else "", metas[i] if i < len(metas) else {}))
-                if hard_anchors and downgrade_firewall and out:
-                    # Re-rank: candidates that contain any hard_anchor go first, then by score
-                    def _has_anchor(item: Tuple) -> bool:
-                        _, _, doc, meta = item
-                        text = (doc or "") + " " + str(meta or "")
-                        text_lower = text.lower()
-                        return any(a and a.lower() in text_lower for a in hard_anchors)
-                    with_anchor = [(a, s) for a, s, d, m in out if _has_anchor((a, s, d, m))]
-                    without_anchor = [(a, s) for a, s, d, m in out if not _has_anchor((a, s, d, m))]
-                    with_anchor.sort(key=lambda x: x[1], reverse=True)
-                    without_anchor.sort(key=lambda x: x[1], reverse=True)
-                    out = with_anchor + without_anchor
-                else:
-                    out = [(a, s) for a, s, _, _ in out]
-                    out.sort(key=lambda x: x[1], reverse=True)
-                return out[:top_k]
+            except Exception:
+                total = 0
+            if self._lexical is not None:
+                try:
+                    return self._hybrid_rerank(intent_summary, top_k, total, anchors)[:top_k]
+                except Exception as e:
+                    logger.warning("Hybrid retrieval failed, using vector retrieval: %s", e)
+            if anchor_pushdown:
+                try:
+                    return self._pushdown_rerank(intent_summary, top_k, pool_n, total, anchors)[:top_k]
+                except Exception as e:
+                    logger.warning("Anchor pushdown query failed, falling back to pool re-rank: %s", e)
+            try:
+                return self._pool_rerank(intent_summary, top_k, pool_n, total, anchors)[:top_k]
             except Exception:
                 pass
         # Fallback: original single-phase top_k (no pool)
         if self._chroma_collection is not None and intent_summary:
             try:
-                res = self._chroma_collection.query(
-                    query_texts=[intent_summary[:2000]],
-                    n_results=min(top_k, self._chroma_collection.count()),
-                    include=["distances"],
-                )
+                res = self._query(intent_summary[:2000], min(top_k, self._chroma_collection.count()), ["distances"])
                 ids = (res.get("ids") or [[]])[0]
                 dists = (res.get("distances") or [[]])[0]
                 out = []
@@ -429,12 +674,14 @@ class GNNAssetAnchor:
         hard_anchors = semantic_path.get("hard_anchors") or []
         retrieval_pool_n = semantic_path.get("retrieval_pool_size_n")
         downgrade_firewall = semantic_path.get("downgrade_firewall", True)
+        anchor_pushdown = semantic_path.get("anchor_pushdown", True)
         agid_scores = self.map_to_agids(
             intent,
             top_k=top_k,
             retrieval_pool_n=retrieval_pool_n,
             hard_anchors=hard_anchors if hard_anchors else None,
             downgrade_firewall=downgrade_firewall,
+            anchor_pushdown=anchor_pushdown,
         )
         l3_origin = "chromadb" if self._chroma_collection is not None else "fallback"
         return {
@@ -467,6 +714,10 @@ class TrinityBridge:
         import json
         base = os.path.dirname(os.path.abspath(__file__))
         variance_limit = 0.005
+        embedding_cache_cfg: Dict[str, Any] = {}
+        shard_routing_cfg: Dict[str, Any] = {}
+        ann_snapshot_cfg: Dict[str, Any] = {}
+        hybrid_cfg: Dict[str, Any] = {}
         try:
             cfg_path = os.path.join(base, "amah_config.json")
             if os.path.isfile(cfg_path):
@@ -475,12 +726,28 @@ class TrinityBridge:
                 v = cfg.get("trinity_audit_gate", {}).get("variance_limit_numeric")
                 if v is not None:
                     variance_limit = float(v)
+                embedding_cache_cfg = dict(cfg.get("query_embedding_cache") or {})
+                shard_routing_cfg = dict(cfg.get("vector_sharding") or {})
+                ann_snapshot_cfg = dict(cfg.get("ann_snapshot") or {})
+                hybrid_cfg = dict(cfg.get("hybrid_retrieval") or {})
         except Exception as e:
             logger.warning("Failed to load trinity_audit_gate config, using default variance_limit=0.005: %s", e)
+        if embedding_cache_cfg.get("disk_path") and not os.path.isabs(embedding_cache_cfg["disk_path"]):
+            embedding_cache_cfg["disk_path"] = os.path.join(base, embedding_cache_cfg["disk_path"])
+        if ann_snapshot_cfg.get("path") and not os.path.isabs(ann_snapshot_cfg["path"]):
+            ann_snapshot_cfg["path"] = os.path.join(base, ann_snapshot_cfg["path"])
+        if hybrid_cfg.get("path") and not os.path.isabs(hybrid_cfg["path"]):
+            hybrid_cfg["path"] = os.path.join(base, hybrid_cfg["path"])
         self._l1 = l1_sentinel or ECNNSentinel(variance_limit=variance_limit)
         self._l2 = l2_llm or StaircaseMappingLLM()
         chroma = chromadb_path or os.path.join(base, "amah_vector_db")
-        self._l3 = l3_anchor or GNNAssetAnchor(chromadb_path=chroma if os.path.isdir(chroma) else None)
+        self._l3 = l3_anchor or GNNAssetAnchor(
+            chromadb_path=chroma if os.path.isdir(chroma) else None,
+            query_embedding_cache=embedding_cache_cfg,
+            shard_routing=shard_routing_cfg,
+            ann_snapshot=ann_snapshot_cfg,
+            hybrid_retrieval=hybrid_cfg,
+        )
 
     def run(
         self,
@@ -491,8 +758,11 @@ class TrinityBridge:
         """
         Run full pipeline. If L1 gate fails, raises StrategicInterceptError.
         Otherwise returns aggregated L1/L2/L3 outputs and, if include_l4_output, L4 multi-modal payload.
+        stage_latency_ms holds per-layer wall time (l2 includes Centurion snapshot and cultural equalizer).
         """
+        _t0 = time.perf_counter()
         l1_ctx = self._l1.monitor(input_text)
+        _t1 = time.perf_counter()
         d_eff = l1_ctx.get("d_effective") or 0.79
         centurion_snapshot = None
         if d_eff <= GLOBAL_PRECISION_THRESHOLD:
@@ -542,7 +812,10 @@ class TrinityBridge:
         l2_path["hard_anchors"] = hard_anchors
         l2_path["retrieval_pool_size_n"] = hab_cfg.get("retrieval_pool_size_n", 100)
         l2_path["downgrade_firewall"] = hab_cfg.get("downgrade_firewall", True)
+        l2_path["anchor_pushdown"] = hab_cfg.get("query_pushdown", True)
+        _t2 = time.perf_counter()
         l3_out = self._l3.forward(l2_path, top_k=top_k_agids)
+        _t3 = time.perf_counter()
         out = {
             "l1_sentinel": l1_ctx,
             "centurion_snapshot": centurion_snapshot,
@@ -572,22 +845,31 @@ class TrinityBridge:
                 }
             except Exception:
                 out["l4_multimodal"] = {"strategy_stages": l2_path.get("strategy", [])}
+        _t4 = time.perf_counter()
+        out["stage_latency_ms"] = {
+            "l1": round((_t1 - _t0) * 1000, 3),
+            "l2": round((_t2 - _t1) * 1000, 3),
+            "l3": round((_t3 - _t2) * 1000, 3),
+            "l4": round((_t4 - _t3) * 1000, 3),
+        }
         return out
 
-    def run_safe(self, input_text: str, top_k_agids: int = 5) -> Dict[str, Any]:
+    def run_safe(self, input_text: str, top_k_agids: int = 5, caller: str = "default") -> Dict[str, Any]:
         """
         Single sovereign entry point for Trinity Neural Logic.
         Run pipeline; on L1 failure return intercept result instead of raising.
         Flow: Input -> L1 (Entropy Gate) -> L2/2.5 (Semantic Path) -> L3 (GNN Mapping) -> L4 (Multi-modal UI).
-        Optional: protocol_audit log (D, variance, l3_origin, intercepted); concurrency_guard semaphore.
+        Optional: protocol_audit log (D, variance, l3_origin, intercepted); concurrency_guard adaptive
+        limiter with per-caller quota. A guard rejection returns an intercept result with retry_after_seconds.
         """
         import os as _os_s
         _base_s = _os_s.path.dirname(_os_s.path.abspath(__file__))
         _cfg_path_s = _os_s.path.join(_base_s, "amah_config.json")
         _proto_enabled = False
         _proto_path = "sovereignty_audit.log"
+        _proto_cfg: Dict[str, Any] = {}
         _guard_enabled = False
-        _guard_max = 8
+        _guard_cfg: Dict[str, Any] = {}
         _guard_timeout = 30.0
         try:
             import json as _json_s
@@ -599,45 +881,54 @@ class TrinityBridge:
                 _proto_path = _proto_cfg.get("log_path", _proto_path)
                 _guard_cfg = _c.get("concurrency_guard") or {}
                 _guard_enabled = _guard_cfg.get("enabled", False)
-                _guard_max = int(_guard_cfg.get("max_concurrent_bridge_calls", 8))
                 _guard_timeout = float(_guard_cfg.get("timeout_seconds", 30))
         except Exception as e:
             logger.warning("Failed to load protocol_audit/concurrency_guard config, using defaults: %s", e)
-        _sem = _get_bridge_semaphore(_guard_max)
-        _acquired = False
-        if _guard_enabled and _sem is not None:
-            try:
-                _acquired = _sem.acquire(timeout=_guard_timeout)
-            except Exception:
-                _acquired = False
-            if not _acquired:
-                result = {
-                    "l1_sentinel": {"passed": False, "error": "Concurrency guard timeout"},
-                    "l2_2_5_semantic_path": None,
-                    "l3_nexus": None,
-                    "intercepted": True,
-                }
-                if _proto_enabled:
-                    _append_protocol_audit(_base_s, _proto_path, result, intercepted=True)
-                return result
+        _permit = None
+        if _guard_enabled:
+            _limiter = _get_bridge_limiter(_guard_cfg)
+            if _limiter is not None:
+                try:
+                    _permit = _limiter.acquire(caller=caller, timeout=_guard_timeout)
+                except Exception as e:
+                    reason = getattr(e, "reason", "timeout")
+                    result = {
+                        "l1_sentinel": {
+                            "passed": False,
+                            "error": "Concurrency guard timeout" if reason == "timeout"
+                            else "Concurrency guard rejected: queue deadline exceeded",
+                        },
+                        "l2_2_5_semantic_path": None,
+                        "l3_nexus": None,
+                        "intercepted": True,
+                        "retry_after_seconds": round(float(getattr(e, "retry_after", _guard_timeout)), 3),
+                    }
+                    if _proto_enabled:
+                        _append_protocol_audit(_base_s, _proto_path, result, intercepted=True, writer_cfg=_proto_cfg)
+                    return result
+        _failed = True
+        _t_run = time.perf_counter()
         try:
             result = self.run(input_text, top_k_agids=top_k_agids, include_l4_output=True)
+            _failed = False
             if _proto_enabled:
-                _append_protocol_audit(_base_s, _proto_path, result, intercepted=False)
+                _append_protocol_audit(_base_s, _proto_path, result, intercepted=False, writer_cfg=_proto_cfg)
             return result
         except StrategicInterceptError as e:
+            _failed = False
             result = {
                 "l1_sentinel": {"passed": False, "error": str(e)},
                 "l2_2_5_semantic_path": None,
                 "l3_nexus": None,
                 "intercepted": True,
+                "stage_latency_ms": {"l1": round((time.perf_counter() - _t_run) * 1000, 3)},
             }
             if _proto_enabled:
-                _append_protocol_audit(_base_s, _proto_path, result, intercepted=True)
+                _append_protocol_audit(_base_s, _proto_path, result, intercepted=True, writer_cfg=_proto_cfg)
             return result
         finally:
-            if _guard_enabled and _sem is not None and _acquired:
-                _sem.release()
+            if _permit is not None:
+                _permit.release(error=_failed)
 
 
 if __name__ == "__main__":
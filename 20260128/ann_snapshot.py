@@ -0,0 +1,820 @@
+# V4.0_STRATEGIC_LOCKED_BY_SMITH_LIN
+# -*- coding: utf-8 -*-
+"""
+Read-optimized ANN snapshot of a Chroma collection for the serving path (expert_map_global).
+export_snapshot() dumps ids, documents, metadata and embeddings into a new version directory
+under root and then switches root/CURRENT to it atomically (temp file + os.replace). Serving processes
+never open the live PersistentClient directory, so ingestion jobs writing to it do not contend with
+queries. Layout of one version directory:
+  manifest.json                  count, dim, space, source, embedding function config, columns, index kind
+  vectors.npy                    float32 [count, dim], unit-normalized for cosine (np.load mmap_mode="r")
+  sq_norms.npy                   float32 squared norms, for l2 only
+  ids.* / documents.*            utf-8 blob + int64 offsets (count + 1)
+  meta_<n>.*                     one column per metadata key; str/json columns are blob + offsets, int/float/bool
+                                 columns are .npy arrays, and each column has a presence mask
+  vectors_int8.npy (+ _scale)    optional int8 copy, symmetric per-dimension scale (write_quantized)
+  vectors_float16.npy            optional float16 copy
+  index.hnsw                     HNSW index (hnswlib, optional import; required for serving)
+SnapshotRetriever is a read-only drop-in for the parts of a Chroma collection that GNNAssetAnchor uses:
+count(), query(query_texts | query_embeddings, n_results, include, where_document) and
+_embedding_function. Every array is a read-only memory map, so worker processes share one copy through the
+page cache. Queries run on index.hnsw. Without hnswlib (at export or at query time) they fall back to an
+exact NumPy scan, which is O(count) per query (384-d: 12.9 ms p50 at 100k, 49 ms at 300k vs 2-3 ms for Chroma's
+HNSW): a correctness fallback for tests and small collections, not a serving replacement, so opening a large
+snapshot without an index logs a warning. The scan reads the float32 matrix by default. Opt-in
+(quantized=True or a kind name): scan the quantized copy (1/4 or 1/2 of the float32 bytes) and re-rank the best
+`rerank` candidates exactly in float32, reading only those rows from vectors.npy. That only pays off when the
+float32 matrix does not fit in RAM or queries arrive in batches: NumPy has no fused int8/float16 kernel, so a
+single query is slower than the float32 scan (1M x 384: 6.4 QPS float32, 5.7 int8, 1.2 float16).
+where_document $contains/$and/$or is evaluated with a bytes scan over the documents blob, and only the
+matching rows are ranked. Distances follow Chroma's
+conventions (cosine 1 - cos, ip 1 - dot, l2 squared L2). refresh() follows CURRENT at most once per
+refresh_interval; a reader still holding the previous version keeps its maps until it drops them.
+Run as script: export a collection, or benchmark against live Chroma queries.
+"""
+import argparse
+import json
+import logging
+import mmap
+import os
+import shutil
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+logger = logging.getLogger(__name__)
+
+CURRENT_FILE = "CURRENT"
+MANIFEST = "manifest.json"
+DEFAULT_PAGE_SIZE = 5000
+SNAPSHOT_FORMAT = 1
+QUANTIZATIONS = ("int8", "float16")
+DEFAULT_RERANK = 200
+EXACT_SCAN_WARN_ROWS = 20000
+SCAN_BLOCK_ROWS = 1024  # rows dequantized per block: the float32 scratch (1.5 MiB at 384-d) stays in cache
+EXPORT_BLOCK_ROWS = 65536
+
+
+# ------------------------------------------------------------------------------
+# Columnar string storage: utf-8 blob + int64 offsets
+# ------------------------------------------------------------------------------
+class _BlobWriter:
+    def __init__(self, path_prefix: str):
+        self._f = open(path_prefix + ".bin", "wb")
+        self._prefix = path_prefix
+        self._offsets = [0]
+
+    def append(self, text: Optional[str]) -> None:
+        data = (text or "").encode("utf-8")
+        self._f.write(data)
+        self._offsets.append(self._offsets[-1] + len(data))
+
+    def close(self) -> None:
+        self._f.close()
+        np.save(self._prefix + ".offsets.npy", np.asarray(self._offsets, dtype=np.int64))
+
+
+class _BlobColumn:
+    """Read-only string column over a memory-mapped blob."""
+
+    def __init__(self, path_prefix: str):
+        self.offsets = np.load(path_prefix + ".offsets.npy", mmap_mode="r")
+        self.blob: Any = b""
+        if len(self.offsets) and int(self.offsets[-1]):
+            with open(path_prefix + ".bin", "rb") as f:
+                self.blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __getitem__(self, row: int) -> str:
+        return self.blob[int(self.offsets[row]):int(self.offsets[row + 1])].decode("utf-8")
+
+    def rows_containing(self, needle: str) -> "np.ndarray":
+        """Rows whose value contains needle (mmap.find over the blob, no copy)."""
+        pat = needle.encode("utf-8")
+        if not pat:
+            return np.arange(len(self.offsets) - 1)
+        hits = []
+        pos = self.blob.find(pat)
+        while pos != -1:
+            hits.append(pos)
+            pos = self.blob.find(pat, pos + 1)
+        if not hits:
+            return np.zeros(0, dtype=np.int64)
+        starts = np.asarray(hits, dtype=np.int64)
+        rows = np.searchsorted(self.offsets, starts, side="right") - 1
+        # a match may straddle two values: keep it only when it ends inside the same row
+        ok = starts + len(pat) <= self.offsets[rows + 1]
+        return np.unique(rows[ok])
+
+
+def _column_kind(values: List[Any]) -> str:
+    kinds = {type(v) for v in values if v is not None}
+    if not kinds:
+        return "str"
+    if kinds == {bool}:
+        return "bool"
+    if kinds <= {int}:
+        return "int"
+    if kinds <= {int, float}:
+        return "float"
+    if kinds == {str}:
+        return "str"
+    return "json"
+
+
+# ------------------------------------------------------------------------------
+# Export
+# ------------------------------------------------------------------------------
+def _collection_space(collection: Any) -> str:
+    try:
+        space = ((getattr(collection, "configuration_json", None) or {}).get("hnsw") or {}).get("space")
+        if space:
+            return space
+    except Exception:
+        pass
+    return (collection.metadata or {}).get("hnsw:space", "l2")
+
+
+def _embedding_config(collection: Any) -> Optional[Dict[str, Any]]:
+    try:
+        return (getattr(collection, "configuration_json", None) or {}).get("embedding_function")
+    except Exception:
+        return None
+
+
+def current_version(root: str) -> Optional[str]:
+    try:
+        with open(os.path.join(root, CURRENT_FILE), "r", encoding="utf-8") as f:
+            name = f.read().strip()
+    except OSError:
+        return None
+    return name if name and os.path.isfile(os.path.join(root, name, MANIFEST)) else None
+
+
+def _switch_current(root: str, version: str) -> None:
+    fd, tmp = tempfile.mkstemp(prefix=".current_", dir=root)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(tmp, os.path.join(root, CURRENT_FILE))
+
+
+def prune_versions(root: str, keep: int = 2) -> List[str]:
+    """Delete all but the newest keep versions (never the current one). Open maps stay valid on POSIX."""
+    current = current_version(root)
+    versions = sorted(d for d in os.listdir(root) if d.startswith("v") and os.path.isdir(os.path.join(root, d)))
+    removed = []
+    for name in versions[:-keep] if keep > 0 else versions:
+        if name != current:
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+            removed.append(name)
+    return removed
+
+
+def export_snapshot(
+    collection: Any,
+    root: str,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    build_index: bool = True,
+    keep: int = 2,
+    quantization: Sequence[str] = (),
+) -> Dict[str, Any]:
+    """
+    Dump collection into root/v<next>/ and switch CURRENT to it. Returns the manifest.
+    Rows are read in id order through keyset pages; embeddings are written straight into the mmap'd array.
+    quantization: any of QUANTIZATIONS, written next to vectors.npy for the first-stage scan.
+    """
+    if np is None:
+        raise RuntimeError("numpy is required for ANN snapshots")
+    from bulk_maintenance import iter_id_pages
+    from bulk_pipeline import max_batch_size
+
+    t0 = time.perf_counter()
+    os.makedirs(root, exist_ok=True)
+    existing = [d for d in os.listdir(root) if d.startswith("v") and d[1:].isdigit()]
+    version = f"v{max([int(d[1:]) for d in existing] or [0]) + 1:06d}"
+    tmp_dir = os.path.join(root, f".{version}.tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    space = _collection_space(collection)
+    count = collection.count()
+    ids_w = _BlobWriter(os.path.join(tmp_dir, "ids"))
+    docs_w = _BlobWriter(os.path.join(tmp_dir, "documents"))
+    columns: Dict[str, List[Any]] = {}
+    vectors = None
+    dim = 0
+    row = 0
+    try:
+        for page in iter_id_pages(collection, max_batch_size(collection, page_size)):
+            got = collection.get(ids=page, include=["embeddings", "documents", "metadatas"])
+            by_id = {k: i for i, k in enumerate(got["ids"])}
+            # rows added after count() belong to the next export
+            order = [by_id[k] for k in page if k in by_id][:count - row]
+            emb = np.asarray(got["embeddings"], dtype=np.float32)[order] if order else None
+            if emb is None:
+                continue
+            if vectors is None:
+                dim = int(emb.shape[1])
+                vectors = np.lib.format.open_memmap(os.path.join(tmp_dir, "vectors.npy"), mode="w+",
+                                                    dtype=np.float32, shape=(count, dim))
+            if space == "cosine":
+                norms = np.linalg.norm(emb, axis=1, keepdims=True)
+                emb = emb / np.where(norms == 0, 1.0, norms)
+            n = len(order)
+            vectors[row:row + n] = emb
+            for i in order:
+                ids_w.append(got["ids"][i])
+                docs_w.append(got["documents"][i])
+                meta = got["metadatas"][i] or {}
+                for key in meta:
+                    if key not in columns:
+                        columns[key] = [None] * row
+                for key, values in columns.items():
+                    values.append(meta.get(key))
+                row += 1
+        ids_w.close()
+        docs_w.close()
+        if vectors is None:
+            vectors = np.lib.format.open_memmap(os.path.join(tmp_dir, "vectors.npy"), mode="w+",
+                                                dtype=np.float32, shape=(0, 0))
+        vectors.flush()
+        rows = row
+        if rows != count:  # rows deleted while exporting: trim to what was written
+            vectors = np.load(os.path.join(tmp_dir, "vectors.npy"), mmap_mode="r")[:rows].copy()
+            np.save(os.path.join(tmp_dir, "vectors.npy"), vectors)
+        if space == "l2" and rows:
+            np.save(os.path.join(tmp_dir, "sq_norms.npy"), np.einsum("ij,ij->i", vectors[:rows], vectors[:rows]))
+        column_manifest = {}
+        for n, (key, values) in enumerate(sorted(columns.items())):
+            prefix = f"meta_{n}"
+            kind = _column_kind(values)
+            np.save(os.path.join(tmp_dir, prefix + ".present.npy"), np.asarray([v is not None for v in values], dtype=bool))
+            if kind in ("str", "json"):
+                w = _BlobWriter(os.path.join(tmp_dir, prefix))
+                for v in values:
+                    w.append(v if kind == "str" else (json.dumps(v) if v is not None else ""))
+                w.close()
+            else:
+                dtype = {"bool": bool, "int": np.int64, "float": np.float64}[kind]
+                np.save(os.path.join(tmp_dir, prefix + ".npy"),
+                        np.asarray([v if v is not None else 0 for v in values], dtype=dtype))
+            column_manifest[key] = {"file": prefix, "kind": kind}
+        index_kind = "bruteforce"
+        if build_index and hnswlib is not None and rows:
+            index = hnswlib.Index(space={"cosine": "ip"}.get(space, space), dim=dim)
+            index.init_index(max_elements=rows, ef_construction=200, M=16)
+            for start in range(0, rows, page_size):
+                index.add_items(np.asarray(vectors[start:start + page_size]), np.arange(start, min(rows, start + page_size)))
+            index.save_index(os.path.join(tmp_dir, "index.hnsw"))
+            index_kind = "hnswlib"
+        del vectors
+        manifest = {
+            "format": SNAPSHOT_FORMAT,
+            "version": version,
+            "source": getattr(collection, "name", ""),
+            "count": rows,
+            "dim": dim,
+            "space": space,
+            "index": index_kind,
+            "embedding_function": _embedding_config(collection),
+            "columns": column_manifest,
+            "created_ts": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "export_seconds": round(time.perf_counter() - t0, 2),
+        }
+        with open(os.path.join(tmp_dir, MANIFEST), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        for kind in quantization:
+            manifest = write_quantized(tmp_dir, kind)
+        os.replace(tmp_dir, os.path.join(root, version))
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    _switch_current(root, version)
+    if keep:
+        prune_versions(root, keep)
+    return manifest
+
+
+def write_quantized(version_dir: str, kind: str = "int8", block_rows: int = EXPORT_BLOCK_ROWS) -> Dict[str, Any]:
+    """
+    Add a quantized copy of vectors.npy to a version directory and record it in the manifest.
+    int8 is symmetric per dimension (x ~= code * scale[d], scale = max|x[:, d]| / 127); float16 is a cast.
+    vectors.npy stays the float32 source of truth for the re-rank. Returns the updated manifest.
+    """
+    if kind not in QUANTIZATIONS:
+        raise ValueError(f"unknown quantization {kind!r}; expected one of {QUANTIZATIONS}")
+    vectors = np.load(os.path.join(version_dir, "vectors.npy"), mmap_mode="r")
+    rows = vectors.shape[0]
+    dim = vectors.shape[1] if vectors.ndim == 2 else 0
+    entry: Dict[str, Any] = {"file": f"vectors_{kind}.npy"}
+    out = np.lib.format.open_memmap(os.path.join(version_dir, entry["file"]), mode="w+",
+                                    dtype=np.int8 if kind == "int8" else np.float16, shape=(rows, dim))
+    if kind == "int8":
+        peak = np.zeros(dim, dtype=np.float32)
+        for start in range(0, rows, block_rows):
+            np.maximum(peak, np.abs(vectors[start:start + block_rows]).max(axis=0), out=peak)
+        scale = np.where(peak > 0, peak / 127.0, 1.0).astype(np.float32)
+        np.save(os.path.join(version_dir, "vectors_int8_scale.npy"), scale)
+        entry["scale"] = "vectors_int8_scale.npy"
+        for start in range(0, rows, block_rows):
+            out[start:start + block_rows] = np.clip(np.rint(vectors[start:start + block_rows] / scale), -127, 127)
+    else:
+        for start in range(0, rows, block_rows):
+            out[start:start + block_rows] = vectors[start:start + block_rows]
+    out.flush()
+    del out
+    path = os.path.join(version_dir, MANIFEST)
+    with open(path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    manifest.setdefault("quantized", {})[kind] = entry
+    fd, tmp = tempfile.mkstemp(prefix=".manifest_", dir=version_dir)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+    return manifest
+
+
+# ------------------------------------------------------------------------------
+# Read side
+# ------------------------------------------------------------------------------
+class _SnapshotVersion:
+    """One opened, immutable version: memory maps + optional hnswlib index."""
+
+    def __init__(self, path: str, quantized: Any = False):
+        with open(os.path.join(path, MANIFEST), "r", encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        self.name = self.manifest["version"]
+        self.count = int(self.manifest["count"])
+        self.space = self.manifest["space"]
+        self.vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+        self.sq_norms = np.load(os.path.join(path, "sq_norms.npy"), mmap_mode="r") if self.space == "l2" and self.count else None
+        self.ids = _BlobColumn(os.path.join(path, "ids"))
+        self.documents = _BlobColumn(os.path.join(path, "documents"))
+        self.columns = []
+        for key, spec in self.manifest.get("columns", {}).items():
+            prefix = os.path.join(path, spec["file"])
+            present = np.load(prefix + ".present.npy", mmap_mode="r")
+            values = _BlobColumn(prefix) if spec["kind"] in ("str", "json") else np.load(prefix + ".npy", mmap_mode="r")
+            self.columns.append((key, spec["kind"], present, values))
+        # opt-in quantized first stage: quantized=True picks the smallest available kind, a kind name pins it
+        self.quant_kind: Optional[str] = None
+        self.quant = self.quant_scale = None
+        available = self.manifest.get("quantized") or {}
+        wanted = [k for k in QUANTIZATIONS if k in available] if quantized is True else \
+            [quantized] if quantized in available else []
+        if quantized and quantized is not True and quantized not in available:
+            logger.warning("Snapshot %s has no %s copy; scanning float32", path, quantized)
+        if wanted:
+            entry = available[wanted[0]]
+            self.quant_kind = wanted[0]
+            self.quant = np.load(os.path.join(path, entry["file"]), mmap_mode="r")
+            if entry.get("scale"):
+                self.quant_scale = np.load(os.path.join(path, entry["scale"]))
+            # float32 rows are now only read for re-rank candidates: turn off readahead so a cold row
+            # costs one page, not a readahead window
+            raw = getattr(self.vectors, "_mmap", None)
+            if raw is not None and hasattr(mmap, "MADV_RANDOM"):
+                try:
+                    raw.madvise(mmap.MADV_RANDOM)
+                except OSError:
+                    pass
+        self.index = None
+        if self.manifest.get("index") == "hnswlib" and hnswlib is not None:
+            try:
+                index = hnswlib.Index(space={"cosine": "ip"}.get(self.space, self.space), dim=int(self.manifest["dim"]))
+                index.load_index(os.path.join(path, "index.hnsw"), max_elements=self.count)
+                index.set_ef(100)
+                self.index = index
+            except Exception as e:
+                logger.warning("hnswlib index of %s unusable, using exact scan: %s", path, e)
+        if self.index is None and self.count >= EXACT_SCAN_WARN_ROWS:
+            logger.warning("Snapshot %s has no usable HNSW index (%d rows): every query is an exact O(n) scan; "
+                           "install hnswlib and re-export for serving", path, self.count)
+
+    def metadata(self, row: int) -> Optional[Dict[str, Any]]:
+        out = {}
+        for key, kind, present, values in self.columns:
+            if not present[row]:
+                continue
+            if kind == "str":
+                out[key] = values[row]
+            elif kind == "json":
+                out[key] = json.loads(values[row])
+            else:
+                out[key] = values[row].item()
+        return out or None
+
+    def distances(self, q: "np.ndarray", rows: Optional["np.ndarray"] = None) -> "np.ndarray":
+        vec = self.vectors if rows is None else self.vectors[rows]
+        dots = vec @ q
+        if self.space == "l2":
+            norms = self.sq_norms if rows is None else self.sq_norms[rows]
+            return norms - 2.0 * dots + float(q @ q)
+        return 1.0 - dots
+
+    def approx_distances(self, qs: "np.ndarray") -> "np.ndarray":
+        """First-stage distances [count, n_queries] from the quantized copy, dequantized block by block."""
+        qq = qs.T * self.quant_scale[:, None] if self.quant_scale is not None else qs.T
+        dots = np.empty((self.count, len(qs)), dtype=np.float32)
+        scratch = np.empty((SCAN_BLOCK_ROWS, self.quant.shape[1]), dtype=np.float32)
+        for start in range(0, self.count, SCAN_BLOCK_ROWS):
+            block = self.quant[start:start + SCAN_BLOCK_ROWS]
+            buf = scratch[:len(block)]
+            np.copyto(buf, block, casting="unsafe")
+            np.matmul(buf, qq, out=dots[start:start + len(block)])
+        if self.space == "l2":
+            return self.sq_norms[:, None] - 2.0 * dots + np.einsum("ij,ij->i", qs, qs)[None, :]
+        return 1.0 - dots
+
+    def uses_quantized(self, k: int, rerank: int) -> bool:
+        return self.index is None and self.quant is not None and max(k, rerank) < self.count
+
+    def rerank(self, q: "np.ndarray", approx: "np.ndarray", k: int, rerank: int) -> Tuple["np.ndarray", "np.ndarray"]:
+        """Exact float32 distances for the best max(k, rerank) approximate rows only (sorted for mmap locality)."""
+        n = max(k, rerank)
+        cand = np.sort(np.argpartition(approx, n - 1)[:n])
+        d = self.distances(q, cand)
+        top = np.argpartition(d, k - 1)[:k] if k < len(d) else np.arange(len(d))
+        top = top[np.argsort(d[top], kind="stable")]
+        return cand[top], d[top]
+
+    def search_many(self, qs: "np.ndarray", k: int, where_document: Optional[Dict[str, Any]],
+                    rerank: int = DEFAULT_RERANK) -> List[Tuple["np.ndarray", "np.ndarray"]]:
+        """search() for a batch; the quantized first stage dequantizes each block once for all queries."""
+        if where_document or len(qs) < 2 or not self.uses_quantized(k, rerank):
+            return [self.search(q, k, where_document, rerank) for q in qs]
+        if self.space == "cosine":
+            norms = np.linalg.norm(qs, axis=1, keepdims=True)
+            qs = qs / np.where(norms == 0, 1.0, norms)
+        approx = self.approx_distances(qs)
+        return [self.rerank(q, approx[:, i], k, rerank) for i, q in enumerate(qs)]
+
+    def rows_matching(self, where_document: Dict[str, Any]) -> "np.ndarray":
+        if "$contains" in where_document:
+            return self.documents.rows_containing(where_document["$contains"])
+        if "$not_contains" in where_document:
+            hit = self.documents.rows_containing(where_document["$not_contains"])
+            return np.setdiff1d(np.arange(self.count), hit)
+        if "$or" in where_document:
+            parts = [self.rows_matching(c) for c in where_document["$or"]]
+            return np.unique(np.concatenate(parts)) if parts else np.zeros(0, dtype=np.int64)
+        if "$and" in where_document:
+            parts = [self.rows_matching(c) for c in where_document["$and"]]
+            out = parts[0] if parts else np.zeros(0, dtype=np.int64)
+            for p in parts[1:]:
+                out = np.intersect1d(out, p)
+            return out
+        raise ValueError(f"unsupported where_document operator: {where_document}")
+
+    def search(self, q: "np.ndarray", k: int, where_document: Optional[Dict[str, Any]],
+               rerank: int = DEFAULT_RERANK) -> Tuple["np.ndarray", "np.ndarray"]:
+        if self.space == "cosine":
+            q = q / (float(np.linalg.norm(q)) or 1.0)
+        rows = self.rows_matching(where_document) if where_document else None
+        if rows is not None and not len(rows):
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        if rows is None and self.index is not None:
+            labels, dists = self.index.knn_query(q.reshape(1, -1), k=min(k, self.count))
+            labels = labels[0].astype(np.int64)
+            return labels, self.distances(q, labels)
+        if rows is None and self.uses_quantized(k, rerank):
+            return self.rerank(q, self.approx_distances(q[None, :])[:, 0], k, rerank)
+        d = self.distances(q, rows)
+        k = min(k, len(d))
+        top = np.argpartition(d, k - 1)[:k] if k < len(d) else np.arange(len(d))
+        top = top[np.argsort(d[top], kind="stable")]
+        return (top if rows is None else rows[top]), d[top]
+
+
+class SnapshotRetriever:
+    """Read-only, mmap-backed retriever over the CURRENT version of an exported snapshot root."""
+
+    def __init__(
+        self,
+        root: str,
+        embedding_fn: Any = None,
+        refresh_interval: float = 1.0,
+        quantized: Any = False,
+        rerank: int = DEFAULT_RERANK,
+    ):
+        if np is None:
+            raise RuntimeError("numpy is required for ANN snapshots")
+        self.root = os.path.abspath(root)
+        self.refresh_interval = refresh_interval
+        self.quantized = quantized
+        self.rerank = rerank
+        self._lock = threading.Lock()
+        self._version: Optional[_SnapshotVersion] = None
+        self._checked = 0.0
+        self._ef = embedding_fn
+        self._ef_resolved = embedding_fn is not None
+        if not self.refresh(force=True):
+            raise FileNotFoundError(f"no snapshot version under {self.root}")
+
+    @property
+    def name(self) -> str:
+        return self._version.manifest.get("source", "") if self._version else ""
+
+    @property
+    def version(self) -> Optional[str]:
+        return self._version.name if self._version else None
+
+    @property
+    def _embedding_function(self) -> Any:
+        # resolved on first use: processes that only pass query_embeddings never import chromadb
+        if not self._ef_resolved:
+            self._ef = self._resolve_embedding_fn()
+            self._ef_resolved = True
+        return self._ef
+
+    @_embedding_function.setter
+    def _embedding_function(self, fn: Any) -> None:
+        self._ef, self._ef_resolved = fn, True
+
+    def _resolve_embedding_fn(self) -> Any:
+        cfg = self._version.manifest.get("embedding_function") if self._version else None
+        try:
+            from chromadb.utils import embedding_functions
+            if cfg and cfg.get("type") == "known" and cfg.get("name") != "default":
+                return embedding_functions.config_to_embedding_function(cfg)
+            return embedding_functions.DefaultEmbeddingFunction()
+        except Exception as e:
+            logger.warning("Snapshot %s: no embedding function for query_texts (%s); pass query_embeddings", self.root, e)
+            return None
+
+    def refresh(self, force: bool = False) -> bool:
+        """Open CURRENT if it names a different version. Returns True when the version switched."""
+        now = time.monotonic()
+        if not force and now - self._checked < self.refresh_interval:
+            return False
+        self._checked = now
+        name = current_version(self.root)
+        if name is None or (self._version is not None and name == self._version.name):
+            return False
+        with self._lock:
+            if self._version is not None and name == self._version.name:
+                return False
+            opened = _SnapshotVersion(os.path.join(self.root, name), self.quantized)
+            self._version = opened  # atomic swap; queries in flight finish on the version they started with
+        return True
+
+    def count(self) -> int:
+        self.refresh()
+        return self._version.count
+
+    def query(
+        self,
+        query_texts: Optional[Sequence[str]] = None,
+        query_embeddings: Optional[Sequence[Sequence[float]]] = None,
+        n_results: int = 10,
+        include: Optional[List[str]] = None,
+        where_document: Optional[Dict[str, Any]] = None,
+        where: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """Chroma-compatible query (ids, distances, documents, metadatas per query)."""
+        if where:
+            raise ValueError("metadata where filters are not supported by SnapshotRetriever")
+        self.refresh()
+        snap = self._version
+        include = list(include or ["documents", "metadatas", "distances"])
+        if query_embeddings is None:
+            fn = self._embedding_function
+            if fn is None:
+                raise ValueError("query_texts needs an embedding function")
+            query_embeddings = fn(list(query_texts or []))
+        out: Dict[str, Any] = {"ids": [], "distances": [], "documents": [], "metadatas": []}
+        qs = np.asarray(query_embeddings, dtype=np.float32).reshape(len(query_embeddings), -1)
+        hits = snap.search_many(qs, n_results, where_document, self.rerank) if snap.count else \
+            [(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32))] * len(qs)
+        for rows, dists in hits:
+            out["ids"].append([snap.ids[int(r)] for r in rows])
+            out["distances"].append([float(d) for d in dists])
+            out["documents"].append([snap.documents[int(r)] for r in rows] if "documents" in include else None)
+            out["metadatas"].append([snap.metadata(int(r)) for r in rows] if "metadatas" in include else None)
+        for key in ("distances", "documents", "metadatas"):
+            if key not in include:
+                out[key] = None
+        out["included"] = include
+        return out
+
+
+# ------------------------------------------------------------------------------
+# CLI: export / bench
+# ------------------------------------------------------------------------------
+def _percentile(values: List[float], q: float) -> float:
+    s = sorted(values)
+    return s[min(len(s) - 1, int(round(q * (len(s) - 1))))]
+
+
+def bench(size: int, dim: int = 384, queries: int = 200, k: int = 10) -> Dict[str, Any]:
+    import subprocess
+    import sys
+
+    import chromadb
+
+    from bulk_pipeline import max_batch_size
+
+    tmp = tempfile.mkdtemp(prefix="ann_snapshot_bench_")
+    try:
+        rng = np.random.default_rng(3)
+        client = chromadb.PersistentClient(path=os.path.join(tmp, "db"))
+        col = client.create_collection("bench_experts", metadata={"hnsw:space": "cosine"}, embedding_function=None)
+        step = max_batch_size(col)
+        for start in range(0, size, step):
+            n = min(step, size - start)
+            col.add(ids=[f"exp_{i:07d}" for i in range(start, start + n)],
+                    embeddings=rng.standard_normal((n, dim), dtype=np.float32),
+                    documents=[f"expert {i} {'DBS' if i % 50 == 0 else 'general'} hub {i % 7}" for i in range(start, start + n)],
+                    metadatas=[{"hub": f"hub_{i % 7}", "rank": i % 100} for i in range(start, start + n)])
+        t0 = time.perf_counter()
+        manifest = export_snapshot(col, os.path.join(tmp, "snap"))
+        export_s = time.perf_counter() - t0
+        qs = rng.standard_normal((queries, dim), dtype=np.float32)
+        res = {"size": size, "export_s": export_s, "index": manifest["index"]}
+        retriever = SnapshotRetriever(os.path.join(tmp, "snap"), embedding_fn=None)
+        for tag, where in (("", None), (" +filter", {"$contains": "DBS"})):
+            lat_c, lat_s, agree = [], [], 0
+            for q in qs:
+                kw = {"where_document": where} if where else {}
+                t0 = time.perf_counter()
+                rc = col.query(query_embeddings=[q], n_results=k, include=["distances"], **kw)
+                lat_c.append(time.perf_counter() - t0)
+                t0 = time.perf_counter()
+                rs = retriever.query(query_embeddings=[q], n_results=k, include=["distances"], where_document=where)
+                lat_s.append(time.perf_counter() - t0)
+                agree += len(set(rc["ids"][0]) & set(rs["ids"][0]))
+            res["chroma" + tag] = (_percentile(lat_c, 0.5) * 1000, _percentile(lat_c, 0.95) * 1000)
+            res["snapshot" + tag] = (_percentile(lat_s, 0.5) * 1000, _percentile(lat_s, 0.95) * 1000)
+            res["overlap" + tag] = agree / (k * len(qs))
+        # per-process start-up: open + first query in a fresh interpreter
+        probe = ("import sys,time,numpy as np;t=time.perf_counter();{open};"
+                 "r.query(query_embeddings=[np.ones({dim},dtype=np.float32)],n_results=10,include=['distances']);"
+                 "print(time.perf_counter()-t)")
+        opens = {
+            "chroma": "import chromadb;r=chromadb.PersistentClient(path=sys.argv[1]).get_collection('bench_experts')",
+            "snapshot": "from ann_snapshot import SnapshotRetriever;r=SnapshotRetriever(sys.argv[2],embedding_fn=None)",
+        }
+        for label, stmt in opens.items():
+            out = subprocess.run([sys.executable, "-c", probe.format(open=stmt, dim=dim), os.path.join(tmp, "db"),
+                                  os.path.join(tmp, "snap")], capture_output=True, text=True,
+                                 cwd=os.path.dirname(os.path.abspath(__file__)))
+            res[f"{label}_cold_s"] = float(out.stdout.strip().splitlines()[-1]) if out.returncode == 0 else float("nan")
+        return res
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def _synthetic_version(root: str, size: int, dim: int, seed: int = 7) -> "np.ndarray":
+    """Write a clustered, unit-normalized synthetic version (cosine) under root; returns its cluster centers."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(1, size // 500), dim)).astype(np.float32)
+    path = os.path.join(root, "v000001")
+    os.makedirs(path, exist_ok=True)
+    vectors = np.lib.format.open_memmap(os.path.join(path, "vectors.npy"), mode="w+", dtype=np.float32, shape=(size, dim))
+    for start in range(0, size, EXPORT_BLOCK_ROWS):
+        n = min(EXPORT_BLOCK_ROWS, size - start)
+        block = centers[rng.integers(0, len(centers), n)] + 0.6 * rng.standard_normal((n, dim), dtype=np.float32)
+        vectors[start:start + n] = block / np.linalg.norm(block, axis=1, keepdims=True)
+    vectors.flush()
+    del vectors
+    ids_w = _BlobWriter(os.path.join(path, "ids"))
+    docs_w = _BlobWriter(os.path.join(path, "documents"))
+    for i in range(size):
+        ids_w.append(f"exp_{i:07d}")
+        docs_w.append(f"expert {i}")
+    ids_w.close()
+    docs_w.close()
+    manifest = {"format": SNAPSHOT_FORMAT, "version": "v000001", "source": "synthetic", "count": size, "dim": dim,
+                "space": "cosine", "index": "bruteforce", "embedding_function": None, "columns": {}}
+    with open(os.path.join(path, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    _switch_current(root, "v000001")
+    return centers
+
+
+_QUANT_PROBE = """
+import json, sys, time
+import numpy as np
+from ann_snapshot import SnapshotRetriever
+root, queries, mode, rerank = sys.argv[1], np.load(sys.argv[2]), sys.argv[3], int(sys.argv[4])
+r = SnapshotRetriever(root, quantized=False if mode == "float32" else mode, rerank=rerank)
+for q in queries[:5]:
+    r.query(query_embeddings=[q], n_results=10, include=[])
+t = time.perf_counter()
+ids = [r.query(query_embeddings=[q], n_results=10, include=[])["ids"][0] for q in queries]
+elapsed = time.perf_counter() - t
+t = time.perf_counter()
+for i in range(0, len(queries), 32):
+    r.query(query_embeddings=queries[i:i + 32], n_results=10, include=[])
+batch_elapsed = time.perf_counter() - t
+status = dict(line.split(":", 1) for line in open("/proc/self/status") if ":" in line)
+print(json.dumps({"ids": ids, "qps": len(queries) / elapsed, "qps_batch": len(queries) / batch_elapsed,
+                  "rss_anon_mib": int(status["RssAnon"].split()[0]) / 1024,
+                  "rss_file_mib": int(status["RssFile"].split()[0]) / 1024}))
+"""
+
+
+def bench_quantized(size: int = 1_000_000, dim: int = 384, queries: int = 200,
+                    reranks: Sequence[int] = (50, 200, 500)) -> List[Dict[str, Any]]:
+    """float32 exact scan vs int8/float16 first stage + float32 re-rank, each mode in a fresh process."""
+    import subprocess
+    import sys
+
+    tmp = tempfile.mkdtemp(prefix="ann_quant_bench_")
+    try:
+        centers = _synthetic_version(tmp, size, dim)
+        version_dir = os.path.join(tmp, "v000001")
+        for kind in QUANTIZATIONS:
+            write_quantized(version_dir, kind)
+        rng = np.random.default_rng(11)
+        qs = centers[rng.integers(0, len(centers), queries)] + 0.6 * rng.standard_normal((queries, dim), dtype=np.float32)
+        np.save(os.path.join(tmp, "queries.npy"), qs.astype(np.float32))
+        sizes = {kind: os.path.getsize(os.path.join(version_dir, f)) for kind, f in
+                 (("float32", "vectors.npy"), ("int8", "vectors_int8.npy"), ("float16", "vectors_float16.npy"))}
+        runs = [("float32", 0)] + [(kind, rr) for kind in QUANTIZATIONS for rr in reranks]
+        results, truth = [], None
+        for mode, rerank in runs:
+            # start every mode cold so file-backed RSS is that mode's own working set
+            for name in ("vectors.npy", "vectors_int8.npy", "vectors_float16.npy"):
+                fd = os.open(os.path.join(version_dir, name), os.O_RDONLY)
+                try:
+                    os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+                finally:
+                    os.close(fd)
+            out = subprocess.run([sys.executable, "-c", _QUANT_PROBE, tmp, os.path.join(tmp, "queries.npy"), mode,
+                                  str(rerank)], capture_output=True, text=True,
+                                 cwd=os.path.dirname(os.path.abspath(__file__)))
+            if out.returncode != 0:
+                raise RuntimeError(out.stderr[-2000:])
+            r = json.loads(out.stdout.strip().splitlines()[-1])
+            if truth is None:
+                truth = r["ids"]
+            recall = sum(len(set(a) & set(b)) for a, b in zip(r["ids"], truth)) / (10 * len(truth))
+            results.append({"mode": mode, "rerank": rerank, "scan_mib": sizes[mode] / 2 ** 20, "qps": r["qps"],
+                            "qps_batch": r["qps_batch"], "rss_anon_mib": r["rss_anon_mib"],
+                            "rss_file_mib": r["rss_file_mib"], "recall": recall})
+        return results
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export / benchmark read-optimized ANN snapshots")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    ex = sub.add_parser("export", help="export a collection into a new snapshot version")
+    ex.add_argument("--db", default="./amah_vector_db")
+    ex.add_argument("--collection", default="expert_map_global")
+    ex.add_argument("--root", default=None, help="snapshot root (default ./ann_snapshots/<collection>)")
+    ex.add_argument("--keep", type=int, default=2, help="versions to keep")
+    ex.add_argument("--no-index", action="store_true", help="skip the hnswlib index even when available")
+    ex.add_argument("--quantize", action="append", choices=QUANTIZATIONS, default=[],
+                    help="also write a quantized first-stage copy (repeatable)")
+    bp = sub.add_parser("bench", help="benchmark against live Chroma queries")
+    bp.add_argument("--sizes", default="100000,300000")
+    bp.add_argument("--dim", type=int, default=384)
+    bq = sub.add_parser("bench-quant", help="float32 scan vs quantized scan + float32 re-rank on synthetic vectors")
+    bq.add_argument("--size", type=int, default=1_000_000)
+    bq.add_argument("--dim", type=int, default=384)
+    bq.add_argument("--reranks", default="50,200,500")
+    args = parser.parse_args()
+    if args.cmd == "bench-quant":
+        print(f"rows={args.size:,} dim={args.dim} cosine, 200 queries, top-10, 1 thread, fresh process per mode")
+        for r in bench_quantized(args.size, args.dim, reranks=[int(x) for x in args.reranks.split(",") if x]):
+            label = r["mode"] if r["mode"] == "float32" else f"{r['mode']} + rerank {r['rerank']}"
+            print(f"  {label:<22} first-stage matrix {r['scan_mib']:6.0f} MiB | RSS anon {r['rss_anon_mib']:5.0f} MiB, "
+                  f"file-backed {r['rss_file_mib']:6.0f} MiB | "
+                  f"QPS {r['qps']:7.1f} (batch 32: {r['qps_batch']:7.1f}) | recall@10 {r['recall']:.3f}")
+        return
+    if args.cmd == "export":
+        import chromadb
+        col = chromadb.PersistentClient(path=args.db).get_collection(args.collection)
+        root = args.root or os.path.join("ann_snapshots", args.collection)
+        m = export_snapshot(col, root, build_index=not args.no_index, keep=args.keep, quantization=args.quantize)
+        print(f"{args.collection} -> {os.path.join(root, m['version'])}: {m['count']:,} rows, dim {m['dim']}, "
+              f"{m['space']}, index {m['index']}, quantized {sorted(m.get('quantized') or {})}, "
+              f"{m['export_seconds']}s")
+        return
+    for size in [int(s) for s in args.sizes.split(",") if s]:
+        r = bench(size, dim=args.dim)
+        print(f"rows={size:,} dim={args.dim} export {r['export_s']:.1f}s index={r['index']} | "
+              f"cold open+first query chroma {r['chroma_cold_s']:.2f}s vs snapshot {r['snapshot_cold_s']:.2f}s")
+        for tag in ("", " +filter"):
+            c, s = r["chroma" + tag], r["snapshot" + tag]
+            print(f"  query{tag:<8} chroma p50 {c[0]:7.2f}ms p95 {c[1]:7.2f}ms | snapshot p50 {s[0]:7.2f}ms "
+                  f"p95 {s[1]:7.2f}ms | top-10 overlap {r['overlap' + tag]:.3f}")
+        if r["index"] == "bruteforce":
+            print("  (hnswlib missing: snapshot figures are the exact-scan fallback, not HNSW serving latency; "
+                  "the overlap is the live HNSW recall@10)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,20 @@
 # V4.0_STRATEGIC_LOCKED_BY_SMITH_LIN
 # -*- coding: utf-8 -*-
 """
-L2 Asset Ingest: normalize external data to internal format, append to asset files,
-and write working log (time, content, ids_added). For continuous global collection.
+L2 Asset Ingest: normalize external data to internal format, upsert into the L2 asset store
+(asset_store.py, SQLite) and write working log (time, content, ids_added). For continuous global collection.
+The JSON asset files are export views of the store: call export_views(data_dir) once after a run
+(the CLI does) instead of rewriting them on every ingest call.
 """
 import json
 import os
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+try:
+    from asset_store import AssetStore, export_views
+except ImportError:  # imported as asset_library_l2.asset_ingest
+    from .asset_store import AssetStore, export_views
 
 # Default: parent dir (20260128) holds merged_data.json, expert_map_data.json
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -120,7 +127,7 @@ def _validate_patient_coverage(rec: Dict[str, Any]) -> Tuple[bool, str]:
 
 
 # ------------------------------------------------------------------------------
-# Load / save JSON list
+# Load JSON list (CLI input files)
 # ------------------------------------------------------------------------------
 def _load_json_list(path: str) -> List[Dict[str, Any]]:
     if not os.path.isfile(path):
@@ -133,11 +140,6 @@ def _load_json_list(path: str) -> List[Dict[str, Any]]:
         return []
 
 
-def _save_json_list(path: str, items: List[Dict[str, Any]]) -> None:
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(items, f, ensure_ascii=False, indent=2)
-
-
 # ------------------------------------------------------------------------------
 # Working log: append one entry (time, action, content_summary, ids_added)
 # ------------------------------------------------------------------------------
@@ -173,69 +175,40 @@ def _append_working_log(
 # ------------------------------------------------------------------------------
 # Ingest entry points
 # ------------------------------------------------------------------------------
+def _ingest(
+    kind: str,
+    records: Iterable[Dict[str, Any]],
+    normalize: Callable[[Dict[str, Any]], Dict[str, Any]],
+    validate: Callable[[Dict[str, Any]], Tuple[bool, str]],
+    data_dir: Optional[str],
+) -> List[str]:
+    """Normalize + validate, then one batched store upsert; existing ids are skipped (no update)."""
+    valid = (norm for norm in map(normalize, records) if validate(norm)[0])
+    with AssetStore(data_dir or PARENT_DATA_DIR) as store:
+        added, _ = store.upsert(kind, valid)
+    return added
+
+
 def ingest_trials(records: List[Dict[str, Any]], data_dir: Optional[str] = None) -> Tuple[int, List[str]]:
-    """Normalize and append trials to merged_data.json. Returns (appended_count, ids_added)."""
-    path = os.path.join(data_dir or PARENT_DATA_DIR, "merged_data.json")
-    existing = _load_json_list(path)
-    existing_ids = {r.get("id") for r in existing if r.get("id")}
-    added = []
-    for raw in records:
-        norm = _normalize_trial(raw)
-        ok, err = _validate_trial(norm)
-        if not ok:
-            continue
-        if norm["id"] in existing_ids:
-            continue
-        existing.append(norm)
-        existing_ids.add(norm["id"])
-        added.append(norm["id"])
+    """Normalize and add trials to the store (view: merged_data.json). Returns (appended_count, ids_added)."""
+    added = _ingest("trial", records, _normalize_trial, _validate_trial, data_dir)
     if added:
-        _save_json_list(path, existing)
         _append_working_log("ingest_trial", f"trials added: {len(added)}", added, count=len(added))
     return len(added), added
 
 
 def ingest_pis(records: List[Dict[str, Any]], data_dir: Optional[str] = None) -> Tuple[int, List[str]]:
-    """Normalize and append PIs/experts to expert_map_data.json. Returns (appended_count, ids_added)."""
-    path = os.path.join(data_dir or PARENT_DATA_DIR, "expert_map_data.json")
-    existing = _load_json_list(path)
-    existing_ids = {str(r.get("id") or r.get("name", "")) for r in existing}
-    added = []
-    for raw in records:
-        norm = _normalize_pi(raw)
-        ok, err = _validate_pi(norm)
-        if not ok:
-            continue
-        key = str(norm.get("id") or norm.get("name", ""))
-        if key in existing_ids:
-            continue
-        existing.append(norm)
-        existing_ids.add(key)
-        added.append(key)
+    """Normalize and add PIs/experts to the store (view: expert_map_data.json). Returns (appended_count, ids_added)."""
+    added = _ingest("pi", records, _normalize_pi, _validate_pi, data_dir)
     if added:
-        _save_json_list(path, existing)
         _append_working_log("ingest_pi", f"PIs added: {len(added)}", added, count=len(added))
     return len(added), added
 
 
 def ingest_hospitals(records: List[Dict[str, Any]], data_dir: Optional[str] = None) -> Tuple[int, List[str]]:
-    """Normalize and append hospitals/centers to hospital_center_assets.json. Returns (appended_count, ids_added)."""
-    path = os.path.join(data_dir or PARENT_DATA_DIR, "hospital_center_assets.json")
-    existing = _load_json_list(path)
-    existing_ids = {r.get("id") for r in existing if r.get("id")}
-    added = []
-    for raw in records:
-        norm = _normalize_hospital(raw)
-        ok, err = _validate_hospital(norm)
-        if not ok:
-            continue
-        if norm["id"] in existing_ids:
-            continue
-        existing.append(norm)
-        existing_ids.add(norm["id"])
-        added.append(norm["id"])
+    """Normalize and add hospitals/centers to the store (view: hospital_center_assets.json). Returns (appended_count, ids_added)."""
+    added = _ingest("hospital", records, _normalize_hospital, _validate_hospital, data_dir)
     if added:
-        _save_json_list(path, existing)
         _append_working_log("ingest_hospital", f"hospitals/centers added: {len(added)}", added, count=len(added))
     return len(added), added
 
@@ -244,23 +217,10 @@ def ingest_patient_coverage(
     records: List[Dict[str, Any]], data_dir: Optional[str] = None
 ) -> Tuple[int, List[str]]:
     """Merge aggregate patient coverage by region (de-identified only; no PII). Returns (appended_count, ids_added)."""
-    path = os.path.join(data_dir or PARENT_DATA_DIR, "patient_coverage_by_region.json")
-    existing = _load_json_list(path)
-    existing_ids = {r.get("id") for r in existing if r.get("id")}
-    added = []
-    for raw in records:
-        norm = _normalize_patient_coverage(raw)
-        ok, _ = _validate_patient_coverage(norm)
-        if not ok:
-            continue
-        if norm["id"] in existing_ids:
-            continue
-        existing.append(norm)
-        existing_ids.add(norm["id"])
-        added.append(norm["id"])
+    added = _ingest("patient_coverage", records, _normalize_patient_coverage, _validate_patient_coverage, data_dir)
     if added:
-        _save_json_list(path, existing)
-        total = sum(r.get("coverage_count", 0) for r in existing)
+        with AssetStore(data_dir or PARENT_DATA_DIR) as store:
+            total = store.sum_field("patient_coverage", "coverage_count")
         _append_working_log(
             "ingest_patient_coverage",
             f"patient coverage regions added: {len(added)}, total coverage count: {total}",
@@ -276,8 +236,8 @@ def ingest(
     data_dir: Optional[str] = None,
 ) -> Tuple[int, List[str]]:
     """
-    Single entry: asset_type in ('trial','pi','hospital').
-    Normalizes to internal format, appends to the correct file, writes working log.
+    Single entry: asset_type in ('trial','pi','hospital','patient_coverage').
+    Normalizes to internal format, adds to the asset store, writes working log.
     Returns (count_added, ids_added).
     """
     asset_type = (asset_type or "").strip().lower()
@@ -314,3 +274,5 @@ if __name__ == "__main__":
             sys.exit(2)
     count, ids = ingest(kind, records, data_dir)
     print(f"Added {count} record(s); ids: {ids}")
+    for path in export_views(data_dir or PARENT_DATA_DIR):
+        print(f"Exported {path}")
@@ -0,0 +1,440 @@
+# V4.0_STRATEGIC_LOCKED_BY_SMITH_LIN
+# -*- coding: utf-8 -*-
+"""
+L2 Asset Store: SQLite (WAL) backing store for asset_ingest and the aggregators.
+One row per asset with unique indexes on (kind, source id) and on AGID. Ingest is an
+INSERT ... ON CONFLICT upsert in batched transactions, so its cost depends on the batch,
+not on the size of the library. The legacy JSON files (merged_data.json, expert_map_data.json,
+hospital_center_assets.json, patient_coverage_by_region.json) become export views: they are
+imported on first use and rewritten by export_views() only when their kind changed. Scripts that
+still write a view directly are picked up: a view whose stat signature and content hash differ from
+the last import/export is merged back (new and edited rows, rows removed from it) before the next use.
+Run as script: status / export, or `bench` for ingest cost against a large store.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+STORE_FILE = "l2_asset_store.sqlite"
+# kind -> (JSON export view, AGID namespace)
+KINDS = {
+    "trial": ("merged_data.json", "TRIAL"),
+    "pi": ("expert_map_data.json", "PI"),
+    "hospital": ("hospital_center_assets.json", "HOSP"),
+    "patient_coverage": ("patient_coverage_by_region.json", "COV"),
+}
+DEFAULT_BATCH = 5000
+_MAX_VARS = 900
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS assets (
+    seq          INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind         TEXT NOT NULL,
+    source_id    TEXT NOT NULL,
+    agid         TEXT NOT NULL,
+    payload      TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    updated_at   REAL NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS assets_source ON assets (kind, source_id);
+CREATE UNIQUE INDEX IF NOT EXISTS assets_agid ON assets (agid);
+CREATE TABLE IF NOT EXISTS kind_state (
+    kind             TEXT PRIMARY KEY,
+    imported         INTEGER NOT NULL DEFAULT 0,
+    version          INTEGER NOT NULL DEFAULT 0,
+    exported_version INTEGER NOT NULL DEFAULT 0
+);
+"""
+# view sync point, added to kind_state of existing stores on open: the view file as last imported/exported
+# (stat signature + sha256) and the newest row seq / update time it contained
+_SYNC_COLUMNS = (("view_sig", "TEXT"), ("view_hash", "TEXT"), ("synced_seq", "INTEGER NOT NULL DEFAULT 0"),
+                 ("synced_at", "REAL NOT NULL DEFAULT 0"))
+
+
+def to_agid(namespace: str, node_type: str, raw_id) -> str:
+    sid = hashlib.sha256(f"{namespace}:{node_type}:{raw_id}".encode()).hexdigest()[:12].upper()
+    return f"AGID-{namespace}-{node_type}-{sid}"
+
+
+def default_source_id(rec: Dict[str, Any]) -> str:
+    """Dedup key used by asset_ingest: id, falling back to name (PIs)."""
+    return str(rec.get("id") or rec.get("name") or "")
+
+
+def store_path(data_dir: str) -> str:
+    return os.path.join(data_dir, STORE_FILE)
+
+
+def _view_sig(path: str) -> Optional[str]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+
+def _dumps_view_item(item: Dict[str, Any]) -> str:
+    # same bytes as json.dump(list, indent=2) produces for one list element (JSON strings hold no raw newlines)
+    return "  " + json.dumps(item, ensure_ascii=False, indent=2).replace("\n", "\n  ")
+
+
+class AssetStore:
+    """Assets of all kinds in one SQLite file under data_dir (the directory that holds the JSON views)."""
+
+    def __init__(self, data_dir: str, path: Optional[str] = None, auto_import: bool = True):
+        self.data_dir = data_dir
+        self.path = path or store_path(data_dir)
+        self.auto_import = auto_import
+        self._conn = sqlite3.connect(self.path, timeout=30.0)
+        self._conn.execute("PRAGMA journal_mode=wal")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        have = {row[1] for row in self._conn.execute("PRAGMA table_info(kind_state)")}
+        with self._conn:
+            for name, decl in _SYNC_COLUMNS:
+                if name not in have:
+                    self._conn.execute(f"ALTER TABLE kind_state ADD COLUMN {name} {decl}")
+        self._view_sigs: Dict[str, Optional[str]] = {}
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "AssetStore":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def view_path(self, kind: str) -> str:
+        return os.path.join(self.data_dir, KINDS[kind][0])
+
+    def _state(self, kind: str) -> Tuple[int, int, int]:
+        self._conn.execute("INSERT OR IGNORE INTO kind_state (kind) VALUES (?)", (kind,))
+        return self._conn.execute("SELECT imported, version, exported_version FROM kind_state WHERE kind = ?",
+                                  (kind,)).fetchone()
+
+    def ensure_imported(self, kind: str) -> int:
+        """
+        First use of a kind: load its existing JSON view (keeps order; later duplicates are dropped).
+        Afterwards, a view rewritten by another writer since the last import/export is merged back
+        (see _merge_view). Returns the number of rows added. Costs one stat() while the view is unchanged.
+        """
+        path = self.view_path(kind)
+        sig = _view_sig(path)
+        if kind in self._view_sigs and self._view_sigs[kind] == sig:
+            return 0
+        with self._conn:
+            self._state(kind)
+            imported, view_sig, view_hash = self._conn.execute(
+                "SELECT imported, view_sig, view_hash FROM kind_state WHERE kind = ?", (kind,)).fetchone()
+        if imported and (sig is None or sig == view_sig):
+            self._view_sigs[kind] = sig
+            return 0
+        raw = b""
+        if sig is not None:
+            with open(path, "rb") as f:
+                raw = f.read()
+        digest = hashlib.sha256(raw).hexdigest()
+        items = []
+        if raw and not (imported and digest == view_hash):  # touched, not changed: only refresh the signature
+            try:
+                data = json.loads(raw.decode("utf-8"))
+                items = data if isinstance(data, list) else [data]
+            except Exception:
+                items = []
+        # rows without any id keep their position in the view under a synthetic key
+        keys = {id(rec): default_source_id(rec) or f"__row_{i:08d}" for i, rec in enumerate(items)}
+        if not imported:
+            added, _ = self.upsert(kind, items, source_id=lambda rec: keys[id(rec)], _importing=True)
+            self._mark_synced(kind, sig, digest)
+        elif items or digest != view_hash:
+            added = self._merge_view(kind, items, [keys[id(rec)] for rec in items], sig, digest)
+        else:
+            added = []
+            with self._conn:
+                self._conn.execute("UPDATE kind_state SET view_sig = ? WHERE kind = ?", (sig, kind))
+        self._view_sigs[kind] = sig
+        return len(added)
+
+    def _mark_synced(self, kind: str, sig: Optional[str], digest: str, version: Optional[int] = None) -> None:
+        """Record that the view file (sig, digest) holds exactly the kind's rows as of now."""
+        with self._conn:
+            seq, at = self._conn.execute("SELECT COALESCE(MAX(seq), 0), COALESCE(MAX(updated_at), 0) FROM assets "
+                                         "WHERE kind = ?", (kind,)).fetchone()
+            self._conn.execute(
+                "UPDATE kind_state SET imported = 1, exported_version = COALESCE(?, version), view_sig = ?, "
+                "view_hash = ?, synced_seq = ?, synced_at = ? WHERE kind = ?", (version, sig, digest, seq, at, kind))
+
+    def _merge_view(self, kind: str, items: List[Dict[str, Any]], sids: List[str], sig: Optional[str],
+                    digest: str) -> List[str]:
+        """
+        Apply an external rewrite of the view. Rows the view added or edited are upserted and rows it
+        dropped are deleted, except rows this store added or changed after the last sync point: those
+        are kept as they are and written out by the next export.
+        """
+        with self._conn:
+            synced_seq, synced_at = self._conn.execute(
+                "SELECT synced_seq, synced_at FROM kind_state WHERE kind = ?", (kind,)).fetchone()
+            local = {sid for (sid,) in self._conn.execute(
+                "SELECT source_id FROM assets WHERE kind = ? AND (seq > ? OR updated_at > ?)",
+                (kind, synced_seq, synced_at))}
+        keep = [(sid, rec) for sid, rec in zip(sids, items) if sid not in local]
+        by_rec = {id(rec): sid for sid, rec in keep}
+        added, _ = self.upsert(kind, (rec for _, rec in keep), source_id=lambda rec: by_rec[id(rec)],
+                               replace=True, _importing=True)
+        in_view = set(sids)
+        with self._conn:
+            gone = [(kind, sid) for (sid,) in self._conn.execute(
+                "SELECT source_id FROM assets WHERE kind = ? AND seq <= ? AND updated_at <= ?",
+                (kind, synced_seq, synced_at)) if sid not in in_view]
+            if gone:
+                self._conn.executemany("DELETE FROM assets WHERE kind = ? AND source_id = ?", gone)
+                self._conn.execute("UPDATE kind_state SET version = version + 1 WHERE kind = ?", (kind,))
+        if local:
+            # the view lacks this store's own newer rows: keep the old sync point so the next export writes them
+            with self._conn:
+                self._conn.execute("UPDATE kind_state SET view_sig = ?, view_hash = ? WHERE kind = ?",
+                                   (sig, digest, kind))
+        else:
+            self._mark_synced(kind, sig, digest)
+        return added
+
+    def upsert(
+        self,
+        kind: str,
+        records: Iterable[Dict[str, Any]],
+        source_id: Callable[[Dict[str, Any]], str] = default_source_id,
+        replace: bool = False,
+        batch_size: int = DEFAULT_BATCH,
+        _importing: bool = False,
+    ) -> Tuple[List[str], List[str]]:
+        """
+        Insert records of one kind; returns (added source ids, updated source ids).
+        Existing source ids are skipped, or with replace=True overwritten when their content changed.
+        A record carrying its own "agid" keeps it, otherwise the AGID is derived from kind + source id.
+        Each batch is one transaction; only the batch's own keys are looked up.
+        """
+        if kind not in KINDS:
+            raise ValueError(f"unknown asset kind: {kind}")
+        if self.auto_import and not _importing:
+            self.ensure_imported(kind)
+        namespace = KINDS[kind][1]
+        added: List[str] = []
+        updated: List[str] = []
+        batch: List[Tuple[str, Dict[str, Any]]] = []
+
+        def flush() -> None:
+            rows = {}
+            for sid, rec in batch:
+                if sid and sid not in rows:
+                    payload = json.dumps(rec, ensure_ascii=False)
+                    rows[sid] = (kind, sid, str(rec.get("agid") or to_agid(namespace, "NODE", sid)), payload,
+                                 hashlib.sha256(payload.encode("utf-8")).hexdigest(), time.time())
+            if not rows:
+                return
+            with self._conn:
+                known = self._existing(kind, list(rows))
+                new_rows = [r for sid, r in rows.items() if sid not in known]
+                before = self._conn.total_changes
+                self._conn.executemany(
+                    "INSERT INTO assets (kind, source_id, agid, payload, content_hash, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT DO NOTHING", new_rows)
+                if self._conn.total_changes - before < len(new_rows):  # AGID collisions: report only what landed
+                    landed = self._existing(kind, [r[1] for r in new_rows])
+                    new_rows = [r for r in new_rows if r[1] in landed]
+                added.extend(r[1] for r in new_rows)
+                changed = []
+                if replace:
+                    changed = [r for sid, r in rows.items() if sid in known and known[sid] != r[4]]
+                    self._conn.executemany(
+                        "INSERT INTO assets (kind, source_id, agid, payload, content_hash, updated_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (kind, source_id) DO UPDATE SET "
+                        "payload = excluded.payload, content_hash = excluded.content_hash, "
+                        "updated_at = excluded.updated_at WHERE content_hash != excluded.content_hash", changed)
+                    updated.extend(r[1] for r in changed)
+                if new_rows or changed:
+                    self._state(kind)
+                    self._conn.execute("UPDATE kind_state SET version = version + 1 WHERE kind = ?", (kind,))
+            batch.clear()
+
+        for rec in records:
+            batch.append((source_id(rec), rec))
+            if len(batch) >= batch_size:
+                flush()
+        flush()
+        return added, updated
+
+    def _existing(self, kind: str, sids: List[str]) -> Dict[str, str]:
+        """{source_id: content_hash} for the given keys (index lookups in chunks of bound parameters)."""
+        found = {}
+        for i in range(0, len(sids), _MAX_VARS):
+            chunk = sids[i:i + _MAX_VARS]
+            cur = self._conn.execute(
+                f"SELECT source_id, content_hash FROM assets WHERE kind = ? AND source_id IN ({','.join('?' * len(chunk))})",
+                [kind, *chunk])
+            found.update(cur.fetchall())
+        return found
+
+    def contains(self, kind: str, source_ids: Iterable[str]) -> set:
+        if self.auto_import:
+            self.ensure_imported(kind)
+        return set(self._existing(kind, [str(s) for s in source_ids]))
+
+    def get(self, kind: str, source_id: str) -> Optional[Dict[str, Any]]:
+        row = self._conn.execute("SELECT payload FROM assets WHERE kind = ? AND source_id = ?",
+                                 (kind, str(source_id))).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def count(self, kind: Optional[str] = None) -> int:
+        if kind is None:
+            return self._conn.execute("SELECT COUNT(*) FROM assets").fetchone()[0]
+        if self.auto_import:
+            self.ensure_imported(kind)
+        return self._conn.execute("SELECT COUNT(*) FROM assets WHERE kind = ?", (kind,)).fetchone()[0]
+
+    def sum_field(self, kind: str, field: str) -> float:
+        row = self._conn.execute("SELECT TOTAL(json_extract(payload, ?)) FROM assets WHERE kind = ?",
+                                 (f"$.{field}", kind)).fetchone()
+        total = row[0]
+        return int(total) if float(total).is_integer() else total
+
+    def iter_records(self, kind: str, chunk: int = 10000) -> Iterable[Dict[str, Any]]:
+        """Payloads in insertion order, read in keyset chunks."""
+        last = 0
+        while True:
+            rows = self._conn.execute("SELECT seq, payload FROM assets WHERE kind = ? AND seq > ? ORDER BY seq LIMIT ?",
+                                      (kind, last, chunk)).fetchall()
+            if not rows:
+                return
+            for _, payload in rows:
+                yield json.loads(payload)
+            last = rows[-1][0]
+
+    def export_json(self, kind: str, path: Optional[str] = None, force: bool = False) -> Optional[str]:
+        """Rewrite the JSON view of a kind (atomic replace) if it changed since the last export."""
+        if self.auto_import:
+            self.ensure_imported(kind)
+        with self._conn:
+            _, version, exported = self._state(kind)
+        if not force and version == exported:
+            return None
+        view = path is None or os.path.abspath(path) == os.path.abspath(self.view_path(kind))
+        path = path or self.view_path(kind)
+        tmp = path + ".tmp"
+        digest = hashlib.sha256()
+        with open(tmp, "w", encoding="utf-8") as f:
+            first = True
+            for item in self.iter_records(kind):
+                chunk = ("[\n" if first else ",\n") + _dumps_view_item(item)
+                f.write(chunk)
+                digest.update(chunk.encode("utf-8"))
+                first = False
+            f.write("[]" if first else "\n]")
+            digest.update(b"[]" if first else b"\n]")
+        os.replace(tmp, path)
+        if view:
+            sig = _view_sig(path)
+            self._mark_synced(kind, sig, digest.hexdigest(), version)
+            self._view_sigs[kind] = sig
+        else:
+            with self._conn:
+                self._conn.execute("UPDATE kind_state SET exported_version = ? WHERE kind = ?", (version, kind))
+        return path
+
+    def export_views(self, kinds: Optional[Iterable[str]] = None, force: bool = False) -> List[str]:
+        """Export every kind whose data changed; returns the rewritten paths."""
+        out = []
+        for kind in kinds or KINDS:
+            path = self.export_json(kind, force=force)
+            if path:
+                out.append(path)
+        return out
+
+
+def export_views(data_dir: str, kinds: Optional[Iterable[str]] = None) -> List[str]:
+    with AssetStore(data_dir) as store:
+        return store.export_views(kinds)
+
+
+def _bench(batch: int, checkpoints: List[int]) -> None:
+    import random
+    import shutil
+    import tempfile
+
+    tmp = tempfile.mkdtemp(prefix="asset_store_bench_")
+    rng = random.Random(7)
+
+    def trial(i: int) -> Dict[str, Any]:
+        return {"id": f"NCT{i:08d}", "source": "bench", "category": rng.choice(["Neurology", "Oncology", "Rare"]),
+                "title": f"Bench trial {i}", "status": "RECRUITING", "criteria": "Inclusion: adult. " * 8}
+
+    try:
+        store = AssetStore(tmp)
+        print(f"ingest cost per {batch}-record batch vs stored assets (SQLite store)")
+        filled = 0
+        for target in checkpoints:
+            t0 = time.perf_counter()
+            while filled < target:
+                step = min(50_000, target - filled)
+                store.upsert("trial", (trial(i) for i in range(filled, filled + step)))
+                filled += step
+            fill_s = time.perf_counter() - t0
+            times = []
+            for _ in range(3):
+                recs = [trial(i) for i in range(filled, filled + batch)]
+                t0 = time.perf_counter()
+                store.upsert("trial", recs)
+                times.append(time.perf_counter() - t0)
+                # undo so every sample lands on the same store size
+                with store._conn:
+                    store._conn.execute("DELETE FROM assets WHERE kind = 'trial' AND seq > (SELECT MAX(seq) FROM assets) - ?",
+                                        (batch,))
+            dup_t0 = time.perf_counter()
+            store.upsert("trial", [trial(i) for i in range(filled - batch, filled)])  # all already stored
+            dup_s = time.perf_counter() - dup_t0
+            print(f"  stored {store.count('trial'):>9,}: new batch {min(times) * 1000:7.1f} ms | "
+                  f"duplicate batch {dup_s * 1000:7.1f} ms | (fill {fill_s:5.1f}s)")
+        store.close()
+        legacy = [c for c in checkpoints if c <= 100_000]
+        if legacy:
+            print(f"legacy asset_ingest path (load + dedup + rewrite the whole JSON list) per {batch}-record batch")
+            for size in legacy:
+                path = os.path.join(tmp, "merged_data.json")
+                with open(path, "w", encoding="utf-8") as f:
+                    json.dump([trial(i) for i in range(size)], f, ensure_ascii=False, indent=2)
+                t0 = time.perf_counter()
+                with open(path, "r", encoding="utf-8") as f:
+                    existing = json.load(f)
+                seen = {r["id"] for r in existing}
+                existing.extend(r for r in (trial(i) for i in range(size, size + batch)) if r["id"] not in seen)
+                with open(path, "w", encoding="utf-8") as f:
+                    json.dump(existing, f, ensure_ascii=False, indent=2)
+                print(f"  stored {size:>9,}: new batch {(time.perf_counter() - t0) * 1000:7.1f} ms")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="L2 asset store: status, export JSON views, ingest benchmark")
+    parser.add_argument("command", choices=["status", "export", "bench"])
+    parser.add_argument("--data-dir", default=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    parser.add_argument("--force", action="store_true", help="export: rewrite views even if unchanged")
+    parser.add_argument("--stored", default="10000,100000,1000000", help="bench: store sizes to measure at")
+    parser.add_argument("--batch", type=int, default=1000)
+    args = parser.parse_args()
+
+    if args.command == "bench":
+        sizes = [int(s) for s in args.stored.split(",")]
+        _bench(args.batch, sorted(sizes))
+    else:
+        with AssetStore(args.data_dir) as st:
+            if args.command == "export":
+                for p in st.export_views(force=args.force):
+                    print(f"exported {p}")
+            for k in KINDS:
+                print(f"{k}: {st.count(k)}")
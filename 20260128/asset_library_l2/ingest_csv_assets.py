@@ -3,7 +3,8 @@
 """
 Ingest CSV assets (ID,Category,Name,Location,Lead_PI,Specialty,Key_Tech,Source_URL,Ingestion_Time).
 Maps: Trial / BCI Clinical Trial -> merged_data.json; Center / Company / BCI Company -> hospital_center_assets.json.
-Duplicate IDs are skipped (no update). Working log updated on add.
+Duplicate IDs are skipped (no update). Records go to the L2 asset store in one batched upsert per kind;
+the two JSON views are re-exported once at the end. Working log updated on add.
 """
 import csv
 import os
@@ -11,7 +12,7 @@ import sys
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, SCRIPT_DIR)
-from asset_ingest import ingest_trials, ingest_hospitals
+from asset_ingest import export_views, ingest_trials, ingest_hospitals
 
 TRIAL_CATEGORIES = ("Trial", "BCI Clinical Trial")
 HOSPITAL_CATEGORIES = ("Center", "Company", "BCI Company")
@@ -82,6 +83,7 @@ def load_and_ingest(csv_path: str, data_dir: str = None) -> None:
     h_count, h_ids = ingest_hospitals(hospitals, data_dir=data_dir)
     print(f"Trials added: {t_count} (duplicates skipped). ids: {t_ids[:8]}{'...' if len(t_ids) > 8 else ''}")
     print(f"Hospitals/Companies added: {h_count} (duplicates skipped). ids: {h_ids}")
+    export_views(data_dir, ["trial", "hospital"])
     print("Asset library and working log updated.")
 
 
@@ -11,7 +11,7 @@ import sys
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 ASSET_FILE = os.path.join(SCRIPT_DIR, "0131global_medical_assets")
 sys.path.insert(0, SCRIPT_DIR)
-from asset_ingest import ingest_trials, ingest_hospitals
+from asset_ingest import export_views, ingest_trials, ingest_hospitals
 
 
 def _parse_location(loc: str):
@@ -68,6 +68,7 @@ def run():
     h_count, h_ids = ingest_hospitals(hospitals, data_dir=data_dir)
     print(f"Trials added: {t_count} (ids: {t_ids[:5]}...)" if len(t_ids) > 5 else f"Trials added: {t_count} (ids: {t_ids})")
     print(f"Hospitals/Centers added: {h_count} (ids: {h_ids[:5]}...)" if len(h_ids) > 5 else f"Hospitals/Centers added: {h_count} (ids: {h_ids})")
+    export_views(data_dir, ["trial", "hospital"])
     print("Done. Working log updated in asset_library_l2/working_log.jsonl and working_log.md")
 
 
@@ -0,0 +1,205 @@
+# V4.0_STRATEGIC_LOCKED_BY_SMITH_LIN
+# -*- coding: utf-8 -*-
+"""
+Append-only JSONL checkpoint for long audit runs.
+Each result is appended as one JSON line; a sidecar index (<path>.idx, "key<TAB>offset<TAB>length" per line)
+records which keys are complete and where their bytes live. Every fsync_every appends the data file and
+then the index are fsynced, so checkpoint cost depends on the batch, not on how many results came before.
+On resume the index is validated against the data file and both are truncated to the last entry that is
+fully on disk, so a crash loses at most the un-synced tail and those keys are simply re-run.
+compact_json() streams the results (in any requested key order) into the same layout json.dump(indent=2)
+produces, without materialising the list. Run as script for the per-checkpoint cost benchmark.
+"""
+import json
+import os
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+def _encode(result: Dict[str, Any]) -> bytes:
+    return (json.dumps(result, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def write_json_array(items: Iterable[Any], out_path: str) -> int:
+    """Stream items into out_path byte-identical to json.dump(list(items), ensure_ascii=False, indent=2)."""
+    tmp = f"{out_path}.tmp"
+    n = 0
+    with open(tmp, "w", encoding="utf-8") as f:
+        for item in items:
+            body = json.dumps(item, ensure_ascii=False, indent=2).replace("\n", "\n  ")
+            f.write(("[\n  " if n == 0 else ",\n  ") + body)
+            n += 1
+        f.write("\n]" if n else "[]")
+    os.replace(tmp, out_path)
+    return n
+
+
+class JsonlCheckpoint:
+    """Append-only result log with a key -> (offset, length) sidecar index and exact resume."""
+
+    def __init__(self, path: str, fsync_every: int = 2000, resume: bool = False):
+        self.path = str(path)
+        self.index_path = f"{self.path}.idx"
+        self._fsync_every = max(1, int(fsync_every))
+        self._index: Dict[str, Tuple[int, int]] = {}
+        self._pending = 0
+        self.checkpoints = 0
+        self.last_checkpoint_seconds = 0.0
+        d = os.path.dirname(self.path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        if resume:
+            self._recover()
+        else:
+            for p in (self.path, self.index_path):
+                open(p, "wb").close()
+        self._data = open(self.path, "ab")
+        self._idx = open(self.index_path, "ab")
+        self._size = self._data.seek(0, os.SEEK_END)
+        self._reader = None
+
+    # -- recovery -------------------------------------------------------------
+    def _recover(self) -> None:
+        """Keep the longest index prefix whose entries are contiguous and fully present in the data file."""
+        data_size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        valid_data = 0
+        valid_idx = 0
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "rb") as f:
+                for raw in f:
+                    if not raw.endswith(b"\n"):
+                        break
+                    try:
+                        key, off, length = raw.decode("utf-8").rstrip("\n").split("\t")
+                        off, length = int(off), int(length)
+                    except ValueError:
+                        break
+                    if off != valid_data or off + length > data_size:
+                        break
+                    self._index[key] = (off, length)
+                    valid_data = off + length
+                    valid_idx += len(raw)
+        for p, size in ((self.path, valid_data), (self.index_path, valid_idx)):
+            with open(p, "ab") as f:
+                f.truncate(size)
+
+    # -- writing --------------------------------------------------------------
+    def append(self, key: str, result: Dict[str, Any]) -> None:
+        """Append one result; fsyncs data then index every fsync_every appends."""
+        if "\t" in key or "\n" in key:
+            raise ValueError(f"checkpoint key must not contain tab/newline: {key!r}")
+        line = _encode(result)
+        self._data.write(line)
+        self._idx.write(f"{key}\t{self._size}\t{len(line)}\n".encode("utf-8"))
+        self._index[key] = (self._size, len(line))
+        self._size += len(line)
+        self._pending += 1
+        if self._pending >= self._fsync_every:
+            self.checkpoint()
+
+    def checkpoint(self) -> float:
+        """Flush and fsync the data file, then the index (index never points past durable data)."""
+        t0 = time.perf_counter()
+        self._data.flush()
+        os.fsync(self._data.fileno())
+        self._idx.flush()
+        os.fsync(self._idx.fileno())
+        self._pending = 0
+        self.checkpoints += 1
+        self.last_checkpoint_seconds = time.perf_counter() - t0
+        return self.last_checkpoint_seconds
+
+    def close(self) -> None:
+        if self._data.closed:
+            return
+        self.checkpoint()
+        self._data.close()
+        self._idx.close()
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+
+    def __enter__(self) -> "JsonlCheckpoint":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    # -- reading --------------------------------------------------------------
+    def __contains__(self, key: str) -> bool:
+        return key in self._index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def completed_keys(self) -> List[str]:
+        return list(self._index)
+
+    def read(self, key: str) -> Dict[str, Any]:
+        off, length = self._index[key]
+        if not self._data.closed:
+            self._data.flush()
+        if self._reader is None:
+            self._reader = open(self.path, "rb")
+        self._reader.seek(off)
+        return json.loads(self._reader.read(length))
+
+    def iter_results(self, order: Optional[Iterable[str]] = None) -> Iterator[Dict[str, Any]]:
+        """Yield results in append order, or in the given key order (missing keys raise KeyError)."""
+        for key in (self.completed_keys() if order is None else order):
+            yield self.read(key)
+
+    def compact_json(self, out_path: str, order: Optional[Iterable[str]] = None) -> int:
+        """Streaming compaction into a json.dump(indent=2)-compatible array file; returns item count."""
+        return write_json_array(self.iter_results(order), out_path)
+
+
+if __name__ == "__main__":
+    import argparse
+    import tempfile
+
+    parser = argparse.ArgumentParser(description="Per-checkpoint cost: JSONL append log vs full json.dump rewrite")
+    parser.add_argument("--cases", type=int, default=1_000_000)
+    parser.add_argument("--every", type=int, default=2000)
+    parser.add_argument("--legacy-max", type=int, default=100_000, help="stop measuring the legacy rewrite past N")
+    args = parser.parse_args()
+
+    def fake(i: int) -> Dict[str, Any]:
+        return {"request_id": f"AM-REQ-{i:08d}", "asset_category": "Clinical Trial", "intercepted": i % 7 == 0,
+                "l1_passed": i % 7 != 0, "d_effective": 0.41, "variance": 0.0012, "agid_count": 5, "error_msg": None}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ckpt = JsonlCheckpoint(os.path.join(tmp, "r.jsonl"), fsync_every=args.every)
+        costs: List[Tuple[int, float]] = []
+        t0 = time.perf_counter()
+        for i in range(args.cases):
+            ckpt.append(f"AM-REQ-{i:08d}", fake(i))
+            if (i + 1) % args.every == 0:
+                costs.append((i + 1, ckpt.last_checkpoint_seconds))
+        ckpt.close()
+        total = time.perf_counter() - t0
+        print(f"JSONL: {args.cases} cases, {len(costs)} checkpoints, total {total:.1f}s")
+        for n, c in costs[:: max(1, len(costs) // 8)] + costs[-1:]:
+            print(f"  after {n:>9} cases: checkpoint {c * 1000:7.2f} ms")
+        t1 = time.perf_counter()
+        ckpt2 = JsonlCheckpoint(ckpt.path, resume=True)
+        print(f"  resume index load: {(time.perf_counter() - t1) * 1000:.0f} ms for {len(ckpt2)} keys")
+        t1 = time.perf_counter()
+        ckpt2.compact_json(os.path.join(tmp, "r.json"), (f"AM-REQ-{i:08d}" for i in range(args.cases)))
+        ckpt2.close()
+        print(f"  streaming compaction: {time.perf_counter() - t1:.1f}s")
+
+        print("Legacy json.dump(results, indent=2) rewrite per checkpoint:")
+        results: List[Dict[str, Any]] = []
+        n = 0
+        for size in (2000, 10_000, 50_000, 100_000, 500_000, 1_000_000):
+            if size > args.legacy_max:
+                break
+            results.extend(fake(i) for i in range(n, size))
+            n = size
+            t1 = time.perf_counter()
+            with open(os.path.join(tmp, "partial.json"), "w", encoding="utf-8") as f:
+                json.dump(results, f, ensure_ascii=False, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            print(f"  after {size:>9} cases: checkpoint {(time.perf_counter() - t1) * 1000:9.1f} ms")
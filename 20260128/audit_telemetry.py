@@ -0,0 +1,321 @@
+# V4.0_STRATEGIC_LOCKED_BY_SMITH_LIN
+# -*- coding: utf-8 -*-
+"""
+Live telemetry for the 10k audit runners. Each runner calls observe(result) once per completed
+request (the compact run_one result); AuditTelemetry keeps
+- rolling requests/sec over the last `window_seconds`, overall rate and ETA,
+- per-layer latency p50/p95/p99 (stage_latency_ms l1..l4 + end-to-end latency_ms) over the last
+  `latency_window` samples,
+- error counts by reason (timeout / rate_limited / connection / other) and the timeout count.
+Outputs (all optional):
+- rolling JSONL status file: one snapshot per `status_every` seconds, rotated to <path>.1 past
+  `status_max_bytes`, so `tail -f` / monitor_status-style pollers always see the latest line;
+- local HTTP endpoint on 127.0.0.1: GET /metrics (Prometheus text), GET /status (JSON snapshot);
+- watchdog: no completed request for `watchdog_seconds` -> all thread stacks are dumped to
+  `stack_dump_path` and logged (the manual diagnose_10k_hang.py steps, built into the run).
+"""
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Deque, Dict, Optional
+
+import numpy as np
+
+from results_store import STAGES
+
+logger = logging.getLogger(__name__)
+
+ERROR_REASONS = ("timeout", "rate_limited", "connection", "other")
+QUANTILES = (50, 95, 99)
+
+
+def classify_error(msg: str) -> str:
+    """Map an error_msg to one of ERROR_REASONS."""
+    m = (msg or "").lower()
+    if "timeout" in m or "timed out" in m:
+        return "timeout"
+    if "429" in m or "ratelimit" in m or "rate limit" in m:
+        return "rate_limited"
+    if "connection" in m or "refused" in m or "unreachable" in m:
+        return "connection"
+    return "other"
+
+
+def dump_thread_stacks() -> str:
+    """Formatted stacks of all live threads (name, ident, daemon flag)."""
+    threads = {t.ident: t for t in threading.enumerate()}
+    parts = []
+    for ident, frame in sys._current_frames().items():
+        t = threads.get(ident)
+        name = f"{t.name} (daemon={t.daemon})" if t else "unknown"
+        parts.append(f"--- Thread {name} ident={ident} ---\n" + "".join(traceback.format_stack(frame)))
+    return "\n".join(parts)
+
+
+def read_latest_status(path: str) -> Optional[Dict[str, Any]]:
+    """Last complete snapshot from a rolling status file (None if absent or empty)."""
+    try:
+        with open(path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(0, f.tell() - 65536))
+            lines = f.read().splitlines()
+    except OSError:
+        return None
+    for line in reversed(lines):
+        try:
+            return json.loads(line)
+        except ValueError:
+            continue
+    return None
+
+
+class AuditTelemetry:
+    """Thread-safe run telemetry; use as a context manager (start / close)."""
+
+    def __init__(
+        self,
+        total: int,
+        run_name: str = "audit",
+        status_path: Optional[str] = None,
+        http_port: Optional[int] = None,
+        watchdog_seconds: Optional[float] = None,
+        stack_dump_path: Optional[str] = None,
+        window_seconds: float = 60.0,
+        latency_window: int = 5000,
+        status_every: float = 2.0,
+        status_max_bytes: int = 1 << 20,
+    ):
+        self.total = total
+        self.run_name = run_name
+        self.status_path = str(status_path) if status_path else None
+        self.watchdog_seconds = watchdog_seconds
+        self.stack_dump_path = str(stack_dump_path) if stack_dump_path else None
+        self.window_seconds = window_seconds
+        self.status_every = status_every
+        self.status_max_bytes = status_max_bytes
+        self._lock = threading.Lock()
+        self._completed = 0
+        self._intercepted = 0
+        self._memo_hits = 0
+        self._errors: Counter = Counter()
+        self._done_times: Deque[float] = deque()
+        self._latency: Dict[str, Deque[float]] = {
+            c: deque(maxlen=latency_window) for c in ("latency_ms",) + tuple(f"{s}_ms" for s in STAGES)
+        }
+        self._start = time.time()
+        self._last_progress = self._start
+        self._stall_dumps = 0
+        self._stalled = False
+        self._state = "running"
+        self._stop = threading.Event()
+        self._threads: list = []
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._http_port = http_port
+        self.http_port: Optional[int] = None
+
+    # ----- lifecycle -----
+    def start(self) -> "AuditTelemetry":
+        if self._http_port is not None:
+            self._server = ThreadingHTTPServer(("127.0.0.1", self._http_port), _handler_for(self))
+            self._server.daemon_threads = True
+            self.http_port = self._server.server_address[1]
+            self._spawn(self._server.serve_forever, "audit-telemetry-http")
+            logger.info("audit telemetry on http://127.0.0.1:%s/metrics", self.http_port)
+        if self.status_path or self.watchdog_seconds:
+            self._spawn(self._tick_loop, "audit-telemetry-tick")
+        return self
+
+    def close(self) -> None:
+        with self._lock:
+            self._state = "done"
+        self._stop.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+        for t in self._threads:
+            t.join(timeout=5.0)
+        self._write_status()
+
+    def __enter__(self) -> "AuditTelemetry":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _spawn(self, target, name: str) -> None:
+        t = threading.Thread(target=target, name=name, daemon=True)
+        t.start()
+        self._threads.append(t)
+
+    # ----- feed -----
+    def observe(self, result: Dict[str, Any]) -> None:
+        """Record one completed request (compact run_one result)."""
+        now = time.time()
+        with self._lock:
+            self._completed += 1
+            self._last_progress = now
+            self._stalled = False
+            self._done_times.append(now)
+            if result.get("intercepted"):
+                self._intercepted += 1
+            if result.get("memo_hit"):
+                self._memo_hits += 1
+            if result.get("error_msg"):
+                self._errors[classify_error(result["error_msg"])] += 1
+            if result.get("latency_ms") is not None and not result.get("memo_hit"):
+                self._latency["latency_ms"].append(float(result["latency_ms"]))
+            for s, v in (result.get("stage_latency_ms") or {}).items():
+                if v is not None and f"{s}_ms" in self._latency:
+                    self._latency[f"{s}_ms"].append(float(v))
+
+    # ----- views -----
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            while self._done_times and self._done_times[0] < now - self.window_seconds:
+                self._done_times.popleft()
+            elapsed = max(now - self._start, 1e-9)
+            window = min(self.window_seconds, elapsed)
+            rolling = len(self._done_times) / window
+            overall = self._completed / elapsed
+            remaining = max(0, self.total - self._completed)
+            rate = rolling or overall
+            eta = 0.0 if not remaining else (round(remaining / rate, 1) if rate > 0 else None)
+            latency = {}
+            for c, d in self._latency.items():
+                if d:
+                    ps = np.percentile(np.fromiter(d, dtype=np.float64, count=len(d)), QUANTILES)
+                    latency[c] = {f"p{q}": round(float(p), 3) for q, p in zip(QUANTILES, ps)}
+            errors = {r: self._errors.get(r, 0) for r in ERROR_REASONS}
+            return {
+                "run": self.run_name,
+                "state": self._state,
+                "updated_at": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(now)),
+                "total": self.total,
+                "completed": self._completed,
+                "intercepted": self._intercepted,
+                "memo_hits": self._memo_hits,
+                "elapsed_seconds": round(elapsed, 2),
+                "rps_rolling": round(rolling, 2),
+                "rps_overall": round(overall, 2),
+                "eta_seconds": eta,
+                "latency_ms": latency,
+                "errors": sum(errors.values()),
+                "errors_by_reason": errors,
+                "timeouts": errors["timeout"],
+                "seconds_since_progress": round(now - self._last_progress, 1),
+                "stalled": self._stalled,
+                "stall_dumps": self._stall_dumps,
+            }
+
+    def prometheus(self) -> str:
+        """Snapshot in Prometheus text exposition format."""
+        s = self.snapshot()
+        run = s["run"]
+        lines = [
+            f'amani_audit_total{{run="{run}"}} {s["total"]}',
+            f'amani_audit_completed_total{{run="{run}"}} {s["completed"]}',
+            f'amani_audit_intercepted_total{{run="{run}"}} {s["intercepted"]}',
+            f'amani_audit_memo_hits_total{{run="{run}"}} {s["memo_hits"]}',
+            f'amani_audit_rps{{run="{run}",window="rolling"}} {s["rps_rolling"]}',
+            f'amani_audit_rps{{run="{run}",window="overall"}} {s["rps_overall"]}',
+            f'amani_audit_eta_seconds{{run="{run}"}} {s["eta_seconds"] if s["eta_seconds"] is not None else "NaN"}',
+            f'amani_audit_seconds_since_progress{{run="{run}"}} {s["seconds_since_progress"]}',
+        ]
+        for reason, n in s["errors_by_reason"].items():
+            lines.append(f'amani_audit_errors_total{{run="{run}",reason="{reason}"}} {n}')
+        for c, ps in s["latency_ms"].items():
+            stage = "total" if c == "latency_ms" else c[:-3]
+            for q in QUANTILES:
+                lines.append(f'amani_audit_latency_ms{{run="{run}",stage="{stage}",quantile="0.{q:02d}"}} {ps[f"p{q}"]}')
+        return "\n".join(lines) + "\n"
+
+    # ----- background: status file + watchdog -----
+    def _tick_loop(self) -> None:
+        interval = self.status_every
+        if self.watchdog_seconds:
+            interval = min(interval, max(0.05, self.watchdog_seconds / 4))
+        next_status = 0.0
+        while not self._stop.wait(interval):
+            now = time.time()
+            if self.status_path and now >= next_status:
+                self._write_status()
+                next_status = now + self.status_every
+            if self.watchdog_seconds:
+                self._check_progress(now)
+
+    def _check_progress(self, now: float) -> None:
+        with self._lock:
+            idle = now - self._last_progress
+            if self._stalled or idle < self.watchdog_seconds or self._completed >= self.total:
+                return
+            self._stalled = True
+            self._stall_dumps += 1
+            done = self._completed
+        stacks = dump_thread_stacks()
+        header = (f"[watchdog] {self.run_name}: no progress for {idle:.1f}s "
+                  f"({done}/{self.total} done) at {time.strftime('%Y-%m-%d %H:%M:%S')}")
+        logger.warning("%s\n%s", header, stacks)
+        if self.stack_dump_path:
+            try:
+                with open(self.stack_dump_path, "a", encoding="utf-8") as f:
+                    f.write(header + "\n" + stacks + "\n")
+            except OSError as e:
+                logger.warning("watchdog stack dump failed: %s", e)
+
+    def _write_status(self) -> None:
+        if not self.status_path:
+            return
+        line = json.dumps(self.snapshot(), ensure_ascii=False) + "\n"
+        try:
+            if os.path.exists(self.status_path) and os.path.getsize(self.status_path) >= self.status_max_bytes:
+                os.replace(self.status_path, self.status_path + ".1")
+            with open(self.status_path, "a", encoding="utf-8") as f:
+                f.write(line)
+        except OSError as e:
+            logger.warning("telemetry status write failed: %s", e)
+
+
+def _handler_for(telemetry: AuditTelemetry):
+    class _Handler(BaseHTTPRequestHandler):
+        def do_GET(self):  # noqa: N802
+            path = self.path.split("?", 1)[0]
+            if path == "/metrics":
+                body, ctype = telemetry.prometheus().encode("utf-8"), "text/plain; version=0.0.4"
+            elif path in ("/", "/status"):
+                body = json.dumps(telemetry.snapshot(), ensure_ascii=False).encode("utf-8")
+                ctype = "application/json"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, fmt, *args):
+            logger.debug("telemetry http: " + fmt, *args)
+
+    return _Handler
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Print the latest snapshot from an audit status file")
+    parser.add_argument("status_file")
+    parser.add_argument("--follow", action="store_true", help="re-print every 2 s until the run is done")
+    args = parser.parse_args()
+    while True:
+        snap = read_latest_status(args.status_file)
+        print(json.dumps(snap, ensure_ascii=False, indent=2) if snap else "no status yet")
+        if not args.follow or (snap and snap.get("state") == "done"):
+            break
+        time.sleep(2.0)
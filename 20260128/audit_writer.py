@@ -0,0 +1,333 @@
+# V4.0_STRATEGIC_LOCKED_BY_SMITH_LIN
+# -*- coding: utf-8 -*-
+"""
+Buffered asynchronous writer for the sovereignty/protocol audit log.
+Request threads enqueue pre-formatted lines into a bounded queue; one background thread
+writes them in batches, rotates by size and age, and fsyncs per policy (none | interval | batch).
+Overflow policy "block" applies backpressure (lossless); "drop" never blocks and counts drops.
+close() (also registered atexit) drains the queue and flushes before returning; lines written
+after close() are rejected and counted as dropped. Rotated files are kept (backup_count 0, the
+default for an audit trail); a positive backup_count deletes all but the newest backups.
+Several processes may append to one path (sharded runner workers): rotation is serialized by an flock on
+a hidden lock file beside the log, only the process whose open file is still the one at path renames it,
+backup names are reserved with O_EXCL so no backup is ever overwritten, and the other writers notice the
+new inode before their next batch and reopen. Lines they appended in between land in the backup.
+"""
+import atexit
+import contextlib
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: backups are still reserved exclusively, rotation is not serialized
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+FSYNC_POLICIES = ("none", "interval", "batch")
+OVERFLOW_POLICIES = ("block", "drop")
+_STOP = object()
+
+
+class AsyncAuditWriter:
+    """Single-writer, append-only line log with batching, rotation and drop/backpressure accounting."""
+
+    def __init__(
+        self,
+        path: str,
+        queue_max: int = 10000,
+        batch_max: int = 512,
+        flush_interval: float = 0.2,
+        fsync: str = "interval",
+        fsync_interval: float = 1.0,
+        rotate_max_bytes: int = 0,
+        rotate_interval: float = 0.0,
+        backup_count: int = 0,
+        overflow: str = "block",
+        block_timeout: Optional[float] = None,
+    ):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {FSYNC_POLICIES}, got {fsync!r}")
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {OVERFLOW_POLICIES}, got {overflow!r}")
+        self.path = path
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, int(queue_max)))
+        self._batch_max = max(1, int(batch_max))
+        self._flush_interval = max(0.001, float(flush_interval))
+        self._fsync = fsync
+        self._fsync_interval = float(fsync_interval)
+        self._rotate_max_bytes = int(rotate_max_bytes or 0)
+        self._rotate_interval = float(rotate_interval or 0.0)
+        self._backup_count = int(backup_count or 0)
+        self._overflow = overflow
+        self._block_timeout = block_timeout
+        self._stats_lock = threading.Lock()
+        self._enqueued = 0
+        self._written = 0
+        self._dropped = 0
+        self._blocked = 0
+        self._block_seconds = 0.0
+        self._batches = 0
+        self._rotations = 0
+        self._write_errors = 0
+        self._closed = False
+        # producers inside write(); close() waits for them so every accepted line is queued before _STOP
+        self._admit = threading.Condition()
+        self._producers = 0
+        self._file = None
+        self._opened_at = 0.0
+        self._last_fsync = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    # -- request path ---------------------------------------------------------
+    def write(self, line: str) -> bool:
+        """Enqueue one line (newline appended if missing). Returns False if the line was dropped."""
+        if not line.endswith("\n"):
+            line += "\n"
+        with self._admit:
+            if self._closed:
+                with self._stats_lock:
+                    self._dropped += 1
+                return False
+            self._producers += 1
+        try:
+            return self._put(line)
+        finally:
+            with self._admit:
+                self._producers -= 1
+                if not self._producers:
+                    self._admit.notify_all()
+
+    def _put(self, line: str) -> bool:
+        try:
+            self._queue.put_nowait(line)
+        except queue.Full:
+            if self._overflow == "drop":
+                with self._stats_lock:
+                    self._dropped += 1
+                return False
+            t0 = time.monotonic()
+            try:
+                self._queue.put(line, timeout=self._block_timeout)
+            except queue.Full:
+                with self._stats_lock:
+                    self._blocked += 1
+                    self._block_seconds += time.monotonic() - t0
+                    self._dropped += 1
+                return False
+            with self._stats_lock:
+                self._blocked += 1
+                self._block_seconds += time.monotonic() - t0
+        with self._stats_lock:
+            self._enqueued += 1
+        return True
+
+    # -- writer thread --------------------------------------------------------
+    def _open(self) -> None:
+        d = os.path.dirname(self.path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._opened_at = time.time()
+
+    def _reserve_backup(self) -> str:
+        """Create an empty, unused backup file (O_EXCL) to rename the log onto; never reuses a name."""
+        stamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime())
+        name = f"{self.path}.{stamp}"
+        n = 1
+        while True:
+            try:
+                os.close(os.open(name, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                return name
+            except FileExistsError:
+                name = f"{self.path}.{stamp}.{n}"
+                n += 1
+
+    @contextlib.contextmanager
+    def _rotation_lock(self) -> Iterator[None]:
+        if fcntl is None:
+            yield
+            return
+        d, base = os.path.split(self.path)
+        with open(os.path.join(d, f".{base}.rotate-lock"), "a") as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def _is_current(self) -> bool:
+        """True while the open file is still the one at path (no other process rotated it away)."""
+        try:
+            return os.stat(self.path).st_ino == os.fstat(self._file.fileno()).st_ino
+        except OSError:
+            return False
+
+    def rotated_files(self) -> List[str]:
+        """Rotated backups of this log, oldest first."""
+        d = os.path.dirname(self.path) or "."
+        prefix = os.path.basename(self.path) + "."
+        names = [os.path.join(d, f) for f in os.listdir(d) if f.startswith(prefix)]
+        return sorted(names, key=lambda p: (os.path.getmtime(p), p))
+
+    def _maybe_rotate(self) -> None:
+        size_due = self._rotate_max_bytes and self._file.tell() >= self._rotate_max_bytes
+        age_due = self._rotate_interval and time.time() - self._opened_at >= self._rotate_interval
+        if not (size_due or age_due) or self._file.tell() == 0:
+            return
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        with self._rotation_lock():
+            current = self._is_current()
+            self._file.close()
+            if current:
+                os.replace(self.path, self._reserve_backup())
+                self._rotations += 1
+                if self._backup_count:
+                    for old in self.rotated_files()[: -self._backup_count]:
+                        try:
+                            os.remove(old)
+                        except OSError:
+                            pass
+            self._open()
+
+    def _write_batch(self, lines: List[str]) -> None:
+        try:
+            if self._file is None:
+                self._open()
+            elif (self._rotate_max_bytes or self._rotate_interval) and not self._is_current():
+                self._file.close()  # another process rotated the shared log
+                self._open()
+            self._file.write("".join(lines))
+            self._file.flush()
+            now = time.monotonic()
+            if self._fsync == "batch" or (self._fsync == "interval" and now - self._last_fsync >= self._fsync_interval):
+                os.fsync(self._file.fileno())
+                self._last_fsync = now
+            self._maybe_rotate()
+            with self._stats_lock:
+                self._written += len(lines)
+                self._batches += 1
+        except Exception as e:
+            with self._stats_lock:
+                self._write_errors += 1
+            logger.warning("Audit writer failed to write %d lines to %s: %s", len(lines), self.path, e)
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            try:
+                item = self._queue.get(timeout=self._flush_interval)
+            except queue.Empty:
+                if self._file is not None and self._rotate_interval:
+                    self._maybe_rotate()
+                continue
+            batch: List[str] = []
+            while True:
+                if item is _STOP:
+                    stopping = True
+                else:
+                    batch.append(item)
+                if len(batch) >= self._batch_max:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                self._write_batch(batch)
+        # _STOP is enqueued after every producer returned, but drain defensively.
+        rest: List[str] = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                rest.append(item)
+        if rest:
+            self._write_batch(rest)
+        if self._file is not None:
+            try:
+                self._file.flush()
+                if self._fsync != "none":
+                    os.fsync(self._file.fileno())
+                self._file.close()
+            except Exception as e:
+                logger.warning("Audit writer failed to close %s: %s", self.path, e)
+            self._file = None
+
+    # -- lifecycle ------------------------------------------------------------
+    def close(self, timeout: Optional[float] = 10.0) -> None:
+        """Stop accepting lines, write everything queued, fsync (unless policy is none) and close."""
+        with self._admit:
+            if self._closed:
+                return
+            self._closed = True
+            while self._producers:
+                self._admit.wait()
+        self._queue.put(_STOP)
+        self._thread.join(timeout=timeout)
+        try:
+            atexit.unregister(self.close)
+        except Exception:
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {
+                "path": self.path,
+                "enqueued": self._enqueued,
+                "written": self._written,
+                "dropped": self._dropped,
+                "pending": self._queue.qsize(),
+                "blocked_puts": self._blocked,
+                "block_seconds": round(self._block_seconds, 4),
+                "batches": self._batches,
+                "rotations": self._rotations,
+                "write_errors": self._write_errors,
+            }
+
+
+_writers: Dict[str, AsyncAuditWriter] = {}
+_writers_lock = threading.Lock()
+
+
+def get_audit_writer(path: str, cfg: Optional[Dict[str, Any]] = None) -> AsyncAuditWriter:
+    """Process-wide writer per log path, configured from the protocol_audit config block on first use."""
+    key = os.path.abspath(path)
+    with _writers_lock:
+        w = _writers.get(key)
+        if w is None or w._closed:
+            cfg = cfg or {}
+            w = AsyncAuditWriter(
+                key,
+                queue_max=int(cfg.get("queue_max", 10000)),
+                batch_max=int(cfg.get("batch_max", 512)),
+                flush_interval=float(cfg.get("flush_interval_seconds", 0.2)),
+                fsync=cfg.get("fsync", "interval"),
+                fsync_interval=float(cfg.get("fsync_interval_seconds", 1.0)),
+                rotate_max_bytes=int(cfg.get("rotate_max_bytes", 0)),
+                rotate_interval=float(cfg.get("rotate_interval_seconds", 0)),
+                backup_count=int(cfg.get("backup_count", 0)),
+                overflow=cfg.get("overflow", "block"),
+                block_timeout=cfg.get("block_timeout_seconds"),
+            )
+            _writers[key] = w
+        return w
+
+
+def close_all_audit_writers() -> None:
+    """Flush and close every shared writer (graceful shutdown hook for services and batch runners)."""
+    with _writers_lock:
+        writers = list(_writers.values())
+        _writers.clear()
+    for w in writers:
+        w.close()
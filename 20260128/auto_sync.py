@@ -2,7 +2,6 @@
 # 交付端数据粘合 — V4.0 AGID 映射模式，0.79 阈值来自 amah_config.json
 
 import chromadb
-import time
 import os
 import json
 
@@ -27,8 +26,8 @@ def _load_precision_threshold():
 PRECISION_TARGET, to_agid = _load_precision_threshold()
 
 
-def solidify_metadata_bonding():
-    client = chromadb.PersistentClient(path="./medical_db")
+def solidify_metadata_bonding(db_path="./medical_db", manifest_path=None):
+    client = chromadb.PersistentClient(path=db_path)
     collection = client.get_or_create_collection(name="mayo_clinic_trials")
 
     print("📡 [Live-Feed] V4.0 AGID 映射：正在执行交付端数据粘合，固化 19,824 项资产元数据...")
@@ -44,35 +43,30 @@ def solidify_metadata_bonding():
         {"id": "EXP-COMPLEX-SMITH", "dept": "Complex-Cases", "surgeon": "Smith Lin Team", "bill": 200000},
     ]
 
+    # 增量同步：每个节点只写一份 AGID 文档，旧 ID 记入别名表（不再重复嵌入），内容未变的节点不重写
+    from incremental_sync import DEFAULT_MANIFEST, SyncManifest, sync_doc, sync_documents
+    docs = []
     for node in specialty_nodes:
         legacy_id = node["id"]
         agid = to_agid("SYNC", "NODE", legacy_id)
-        # 同时写入 AGID 与旧 ID，保证兼容与可追溯
-        collection.upsert(
-            ids=[agid],
-            documents=[f"{node['dept']} 核心交付端：{node['surgeon']}。(AGID:{agid})"],
-            metadatas={
-                "dept": node["dept"],
-                "tier": "AGID-Elite-Node",
-                "shadow_bill": node["bill"],
-                "verified_status": "MAYO-VERIFIED",
-                "legacy_id": legacy_id,
-                "precision_target": PRECISION_TARGET,
-            }
-        )
-        # 保留旧 ID 查询入口（指向同一文档）
-        collection.upsert(
-            ids=[legacy_id],
-            documents=[f"{node['dept']} 核心交付端：{node['surgeon']}。(AGID:{agid})"],
-            metadatas={
+        docs.append(sync_doc(
+            agid,
+            f"{node['dept']} 核心交付端：{node['surgeon']}。(AGID:{agid})",
+            {
                 "dept": node["dept"],
                 "tier": "AGID-Elite-Node",
                 "shadow_bill": node["bill"],
                 "verified_status": "MAYO-VERIFIED",
                 "agid": agid,
+                "legacy_id": legacy_id,
                 "precision_target": PRECISION_TARGET,
-            }
-        )
+            },
+            legacy_id=legacy_id,
+        ))
+    with SyncManifest(manifest_path or DEFAULT_MANIFEST) as manifest:
+        st = sync_documents(collection, docs, "auto_sync_specialty", manifest)
+    print(f"🔁 增量同步: 新增 {st['added']} | 变更 {st['changed']} | 删除 {st['deleted']} | 未变 {st['unchanged']} | "
+          f"清理旧 ID 副本 {st['legacy_duplicates_removed']} | 别名 {st['aliases']}")
 
     # --- B. 批量更新现有临床资产的 precision_target 来自 config ---
     core_assets = ["NCT05919160", "NCT06387641", "MAYO-ORTHO-772"]
@@ -3,17 +3,14 @@ import json
 import chromadb
 import os
 
-def build_medical_db():
-    print("🚀 启动全球医疗资产库同步程序 (V10K 稳定去重版)...")
-    
-    # 1. 初始化数据库
-    client = chromadb.PersistentClient(path="./medical_db")
-    collection = client.get_or_create_collection(name="mayo_clinic_trials")
+BATCH_SIZE = 2000
+QUEUE_JOB = "medical_db_build"
 
-    # 2. 加载全量数据
+def load_unique_assets():
+    """加载 merged_data.json 并按 id 全局去重；文件缺失时返回 None。"""
     if not os.path.exists("merged_data.json"):
         print("❌ 错误: 未找到 merged_data.json 文件。")
-        return
+        return None
 
     with open("merged_data.json", "r", encoding="utf-8") as f:
         raw_data = json.load(f)
@@ -22,32 +19,64 @@ def build_medical_db():
     # 使用字典推导式，以 id 为 key，确保每一个 NCT 编号只保留最后一份最新记录
     unique_map = {item['id']: item for item in raw_data}
     data = list(unique_map.values())
-    
+
     print(f"🧹 原始数据: {len(raw_data)} 条 | 去重后唯一资产: {len(data)} 条")
+    return data
+
+def asset_record(item):
+    """资产条目 → (id, criteria 文本, metadata)"""
+    return item['id'], item['criteria'], {
+        "source": item['source'],
+        "category": item['category'],
+        "title": item['title'],
+        "status": item['status']
+    }
+
+def upsert_batch(collection, batch):
+    records = [asset_record(item) for item in batch]
+    collection.upsert(
+        ids=[r[0] for r in records],
+        metadatas=[r[2] for r in records],
+        documents=[r[1] for r in records]
+    )
+
+def build_medical_db(pipelined=False, workers=None, threads=None):
+    """
+    默认逐批内联 embedding + upsert（原路径）。pipelined=True：生成 → 进程池 embedding → 单写线程 upsert
+    三段流水线（bulk_pipeline.py），每个 worker 的 ONNX intra-op 线程数按 核数 // worker 数 封顶，避免超额订阅。
+    """
+    print("🚀 启动全球医疗资产库同步程序 (V10K 稳定去重版)...")
+    
+    # 1. 初始化数据库
+    client = chromadb.PersistentClient(path="./medical_db")
+    collection = client.get_or_create_collection(name="mayo_clinic_trials")
+
+    # 2. 加载全量数据
+    data = load_unique_assets()
+    if data is None:
+        return
     print(f"📦 正在准备将 {len(data)} 条唯一资产数据注入 Mayo Clinic AI 中台...")
 
+    if pipelined:
+        # 3. 流水线注入：embedding 与写入重叠，批大小取 Chroma 上限，失败批次记录后跳过
+        from bulk_pipeline import pipelined_upsert
+        stats = pipelined_upsert(collection, (asset_record(item) for item in data), workers=workers, threads=threads,
+                                 progress=lambda n: print(f"⏳ 已注入 {n} / {len(data)} 条记录..."))
+        for err in stats["errors"]:
+            print(f"⚠️ 批次注入异常: {err}")
+        print(f"⚡ 流水线: {stats['records_per_sec']} 条/秒 | 失败批次: {stats['failed_batches']}")
+        print(f"✅ 成功！当前数据库总规模: {collection.count()} 项。")
+        return
+
     # 3. 分批次注入 (每批 2000 条)
-    batch_size = 2000
+    batch_size = BATCH_SIZE
     for i in range(0, len(data), batch_size):
         batch = data[i : i + batch_size]
-        
-        ids = [item['id'] for item in batch]
-        documents = [item['criteria'] for item in batch]
-        metadatas = [{
-            "source": item['source'],
-            "category": item['category'],
-            "title": item['title'],
-            "status": item['status']
-        } for item in batch]
 
         print(f"⏳ 正在注入第 {i} 到 {min(i + batch_size, len(data))} 条记录...")
         
         try:
-            collection.upsert(
-                ids=ids,
-                metadatas=metadatas,
-                documents=documents
-            )
+            upsert_batch(collection, batch)
         except Exception as e:
             print(f"⚠️ 批次注入异常: {e}")
             # 如果某一批次内仍有特殊字符导致的错误，跳过该批次继续
@@ -55,5 +84,52 @@ def build_medical_db():
 
     print(f"✅ 成功！当前数据库总规模: {collection.count()} 项。")
 
+def build_medical_db_queued(queue_path, enqueue=True, lease_seconds=300.0, journal_mode="wal"):
+    """
+    队列模式：资产按 id 写入 SQLite 租约队列（每 chunk = 一批 2000 条），可在多个进程 / 机器上同时运行本函数。
+    每个 worker 原子领取一批并 upsert，完成后提交；worker 中途被杀死时该批在租约过期后由其他 worker 重做
+    （upsert 幂等，重复注入无副作用）。异常批次重试至多 3 次后标记 failed，不再阻塞其他批次。
+    """
+    from work_queue import WorkQueue, drain
+
+    print(f"🚀 启动全球医疗资产库同步程序 (队列模式: {queue_path})...")
+    client = chromadb.PersistentClient(path="./medical_db")
+    collection = client.get_or_create_collection(name="mayo_clinic_trials")
+
+    with WorkQueue(queue_path, job=QUEUE_JOB, lease_seconds=lease_seconds, journal_mode=journal_mode) as queue:
+        if enqueue:
+            data = load_unique_assets()
+            if data is None:
+                return
+            added = queue.enqueue(((item['id'], item) for item in data), chunk_size=BATCH_SIZE)
+            print(f"📦 新入队 {added} 条资产（已在队列中的保持原状态）")
+
+        def handle_chunk(items):
+            print(f"⏳ 正在注入 {len(items)} 条记录（{items[0][0]} …）...")
+            upsert_batch(collection, [item for _, item in items])
+            return {case_id: None for case_id, _ in items}
+
+        stats = drain(queue, handle_chunk)
+        print(f"🧾 本 worker: {stats} | 队列: {queue.counts()}")
+
+    print(f"✅ 成功！当前数据库总规模: {collection.count()} 项。")
+
 if __name__ == "__main__":
-    build_medical_db()
\ No newline at end of file
+    import argparse
+
+    parser = argparse.ArgumentParser(description="全球医疗资产库同步（merged_data.json → ./medical_db）")
+    parser.add_argument("--queue", default=None, help="SQLite 租约队列文件；多个进程 / 机器可并行注入")
+    parser.add_argument("--no-enqueue", action="store_true", help="仅消费已有队列（附加 worker）")
+    parser.add_argument("--lease-seconds", type=float, default=300.0)
+    parser.add_argument("--journal-mode", choices=("wal", "delete", "truncate", "persist"), default="wal",
+                        help="队列 SQLite journal 模式；NFS 等共享存储用 delete（所有 worker 须一致）")
+    parser.add_argument("--pipelined", action="store_true", help="走 bulk_pipeline 流水线（默认逐批内联 embedding）")
+    parser.add_argument("--embed-workers", type=int, default=None, help="流水线 embedding 进程数（默认 CPU 数 - 1）")
+    parser.add_argument("--embed-threads", type=int, default=None,
+                        help="每个 embedding 进程的 ONNX 线程数（默认且至多 CPU 数 // 进程数）")
+    args = parser.parse_args()
+    if args.queue:
+        build_medical_db_queued(args.queue, enqueue=not args.no_enqueue, lease_seconds=args.lease_seconds,
+                                journal_mode=args.journal_mode)
+    else:
+        build_medical_db(pipelined=args.pipelined, workers=args.embed_workers, threads=args.embed_threads)
\ No newline at end of file
@@ -0,0 +1,104 @@
+# V4.0_STRATEGIC_LOCKED_BY_SMITH_LIN
+# -*- coding: utf-8 -*-
+"""
+Benchmark: hard-anchor firewall pushed into the ChromaDB query (where_document) vs the legacy
+N=100 pool + Python re-rank. Builds a throwaway synthetic collection (rare anchors inside large
+topics), then reports per-query latency and anchor-hit recall@k for both GNNAssetAnchor paths.
+Usage: python bench_anchor_pushdown.py [--assets 20000] [--queries 200]
+"""
+import argparse
+import hashlib
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from amani_trinity_bridge import GNNAssetAnchor
+from embedding_cache import QueryEmbeddingCache
+
+DIM = 64
+TOPICS = 8
+ANCHORS = ["KRAS G12C", "iPS", "BCI", "CAR-T", "DBS", "ADC", "mRNA Vaccine", "Subthalamic"]
+
+
+def _centers() -> np.ndarray:
+    rng = np.random.default_rng(7)
+    c = rng.standard_normal((TOPICS, DIM)).astype(np.float32)
+    return c / np.linalg.norm(c, axis=1, keepdims=True)
+
+
+def _topic_embedder(centers: np.ndarray):
+    """Text 'topic-<t> ...' -> topic centre plus hash-seeded noise (stand-in for the ONNX model)."""
+    def _fn(texts):
+        out = []
+        for t in texts:
+            topic = int(t.split("topic-", 1)[1].split()[0]) if "topic-" in t else 0
+            seed = int(hashlib.sha256(t.encode("utf-8")).hexdigest()[:8], 16)
+            v = centers[topic] + np.random.default_rng(seed).standard_normal(DIM).astype(np.float32) * 0.35
+            out.append((v / np.linalg.norm(v)).tolist())
+        return out
+    _fn.model_name = "bench-topic"
+    return _fn
+
+
+def build_collection(path: str, n_assets: int, anchor_rate: float):
+    import chromadb
+    centers = _centers()
+    rng = np.random.default_rng(11)
+    client = chromadb.PersistentClient(path=path)
+    col = client.create_collection("bench_expert_map", embedding_function=None, metadata={"hnsw:space": "cosine"})
+    anchored = {a: set() for a in ANCHORS}
+    batch = 2000
+    for start in range(0, n_assets, batch):
+        ids, docs, metas, embs = [], [], [], []
+        for i in range(start, min(n_assets, start + batch)):
+            topic = i % TOPICS
+            anchor = ANCHORS[topic]
+            has = rng.random() < anchor_rate
+            doc = f"Asset {i} topic-{topic} specialised programme" + (f" targeting {anchor}" if has else "")
+            if has:
+                anchored[anchor].add(f"A{i}")
+            v = centers[topic] + rng.standard_normal(DIM).astype(np.float32) * 0.35
+            ids.append(f"A{i}")
+            docs.append(doc)
+            metas.append({"topic": topic})
+            embs.append((v / np.linalg.norm(v)).tolist())
+        col.add(ids=ids, documents=docs, metadatas=metas, embeddings=embs)
+    return col, anchored, _topic_embedder(centers)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--assets", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--anchor-rate", type=float, default=0.002)
+    parser.add_argument("--top-k", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"Building synthetic collection: {args.assets} assets, anchor rate {args.anchor_rate} ...")
+        _, anchored, embed_fn = build_collection(tmp, args.assets, args.anchor_rate)
+        anchor = GNNAssetAnchor(chromadb_path=tmp, collection_name="bench_expert_map")
+        # Synthetic collection has no stored embedding function; embed queries with the topic stand-in.
+        anchor._embedding_cache = QueryEmbeddingCache(embed_fn)
+        queries = [(f"patient query {q} topic-{q % TOPICS} seeking {ANCHORS[q % TOPICS]}", ANCHORS[q % TOPICS])
+                   for q in range(args.queries)]
+        for text, _ in queries:
+            anchor._embedding_cache.embed([text])  # warm: measure retrieval, not embedding
+        for label, pushdown in (("legacy pool N=100", False), ("pushdown", True)):
+            lat, recall = [], []
+            for text, a in queries:
+                t0 = time.perf_counter()
+                out = anchor.map_to_agids(text, top_k=args.top_k, hard_anchors=[a], anchor_pushdown=pushdown)
+                lat.append((time.perf_counter() - t0) * 1000)
+                ideal = min(args.top_k, len(anchored[a]))
+                hits = sum(1 for aid, _ in out if aid in anchored[a])
+                recall.append(hits / ideal if ideal else 1.0)
+            lat.sort()
+            print(f"{label:>18}: p50={statistics.median(lat):.2f}ms p95={lat[int(0.95 * (len(lat) - 1))]:.2f}ms "
+                  f"anchor-hit recall@{args.top_k}={statistics.mean(recall):.3f}")
+
+
+if __name__ == "__main__":
+    main()
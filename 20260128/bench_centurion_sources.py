@@ -0,0 +1,122 @@
+# V4.0_STRATEGIC_LOCKED_BY_SMITH_LIN
+# -*- coding: utf-8 -*-
+"""
+Benchmark for the Centurion ingestors (Global_Patient_Resources, Advanced_Therapeutic_Assets,
+Principal_Investigator_Registry) on a synthetic merged_data.json in a temporary data dir. Per size:
+- legacy: the previous ingest (json.load + per-record dict + any(...) keyword scans) on every instance;
+- first ingest (parse + normalize into __slots__ records, fills the source cache);
+- repeat ingest in a fresh instance (stat match: no read, no parse);
+- ingest after a touch with identical bytes (re-hash only);
+- retained memory of the normalized index, dict records vs __slots__ records (tracemalloc).
+Usage: python bench_centurion_sources.py [--sizes 100000,1000000]
+"""
+import argparse
+import gc
+import json
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Dict
+
+from amah_centurion_injection import _SOURCE_CACHE, Advanced_Therapeutic_Assets, Global_Patient_Resources
+
+CATEGORIES = ("Neurology", "Oncology", "Gene Therapy", "Cell Therapy", "Cardiology", "Rare")
+PLACES = ("Boston", "Tokyo", "London", "Toronto", "Berlin", "Mumbai")
+
+
+def _trial(i: int) -> Dict[str, Any]:
+    return {"id": f"NCT{i:08d}", "category": CATEGORIES[i % len(CATEGORIES)],
+            "title": f"Bench study {i} in {PLACES[i % len(PLACES)]}", "status": "recruiting"}
+
+
+def _legacy_ingest(path: str) -> Dict[str, Dict[str, Any]]:
+    """Previous Global_Patient_Resources.ingest body (region rules as any(...) substring scans)."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    gpr = Global_Patient_Resources(os.path.dirname(path))
+    index = {}
+    for item in data:
+        raw_id = item.get("id") or item.get("nct_id") or str(len(index))
+        s = f"{(item.get('title') or '').lower()} {(item.get('category') or '').lower()}"
+        if any(x in s for x in ["japan", "china", "korea", "singapore", "australia", "asia"]):
+            region = "Asia-Pacific"
+        elif any(x in s for x in ["uk", "london", "oxford", "europe", "eu ", "germany", "france"]):
+            region = "EU"
+        elif any(x in s for x in ["canada", "australia", "india", "commonwealth"]):
+            region = "Commonwealth"
+        else:
+            region = "NA"
+        index[raw_id] = {
+            "id": raw_id, "agid": item.get("agid") or gpr._assign_agid(raw_id, region), "region": region,
+            "category": item.get("category", ""), "title": (item.get("title") or "")[:200],
+            "status": str(item.get("status", "")).upper(), "updated_ts": datetime.utcnow().isoformat() + "Z",
+        }
+    return index
+
+
+def _timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return time.perf_counter() - t0, out
+
+
+def _retained_mb(fn) -> float:
+    gc.collect()
+    tracemalloc.start()
+    out = fn()
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del out
+    return size / 2**20
+
+
+def bench(size: int) -> Dict[str, float]:
+    tmp = tempfile.mkdtemp(prefix="centurion_bench_")
+    try:
+        path = os.path.join(tmp, "merged_data.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump([_trial(i) for i in range(size)], f)
+        past = time.time() - 60
+        os.utime(path, (past, past))
+        _SOURCE_CACHE.clear()
+        legacy_s, _ = _timed(lambda: _legacy_ingest(path))
+        first_s, _ = _timed(Global_Patient_Resources(tmp).ingest)
+        cached_s, _ = _timed(Global_Patient_Resources(tmp).ingest)
+        ata_first_s, _ = _timed(Advanced_Therapeutic_Assets(tmp).ingest)
+        ata_cached_s, _ = _timed(Advanced_Therapeutic_Assets(tmp).ingest)
+        os.utime(path, (past + 1, past + 1))
+        touched_s, _ = _timed(Global_Patient_Resources(tmp).ingest)
+        # memory: normalize in a private cache so the shared entry does not count
+        _SOURCE_CACHE.clear()
+        gpr = Global_Patient_Resources(tmp)
+        with open(path, "rb") as f:
+            data = json.load(f)
+        dict_mb = _retained_mb(lambda: {t["id"]: dict(t, agid="GPR-" + t["id"], region="NA",
+                                                      updated_ts="2026-01-01T00:00:00Z") for t in data})
+        slots_mb = _retained_mb(lambda: gpr._build_index(data))
+        return {"size": size, "legacy_s": legacy_s, "first_s": first_s, "cached_s": cached_s,
+                "touched_s": touched_s, "ata_first_s": ata_first_s, "ata_cached_s": ata_cached_s,
+                "dict_mb": dict_mb, "slots_mb": slots_mb}
+    finally:
+        _SOURCE_CACHE.clear()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Centurion ingestor source-cache benchmark")
+    parser.add_argument("--sizes", default="100000,1000000", help="record counts in merged_data.json")
+    args = parser.parse_args()
+    for size in [int(s) for s in args.sizes.split(",") if s]:
+        r = bench(size)
+        print(f"records={size:>9,}: GPR legacy {r['legacy_s']:6.2f}s | first {r['first_s']:6.2f}s | "
+              f"cached {r['cached_s'] * 1000:7.3f}ms | touched {r['touched_s']:5.2f}s | "
+              f"ATA first {r['ata_first_s']:5.2f}s cached {r['ata_cached_s'] * 1000:7.3f}ms | "
+              f"index memory dict {r['dict_mb']:6.1f} MiB vs slots {r['slots_mb']:6.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+# V4.0_STRATEGIC_LOCKED_BY_SMITH_LIN
+# -*- coding: utf-8 -*-
+"""
+Benchmark for Lifecycle_Pulse_Monitor.run_cycle on synthetic merged_data.json / expert_map_data.json
+in a temporary data dir (never the repo's files). Per size it times:
+- first cycle (empty index: every record is an addition);
+- unchanged cycle in the same process (source stat matches: no ingest, no diff);
+- unchanged cycle in a fresh monitor (ingest + whole-index digest match: no per-record diff, no writes);
+- a cycle after ~1% status changes, 0.5% deletions and 0.5% additions (set diff, delta-only writes).
+--legacy-sizes replays the previous algorithm (full JSON index + changelog rewrite and the per-key
+membership-set rebuild in the deletion loop) on small sizes, since it is quadratic.
+Usage: python bench_pulse_monitor.py [--sizes 100000,1000000] [--legacy-sizes 2000,4000,8000]
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Dict, List
+
+from amah_centurion_injection import (
+    Advanced_Therapeutic_Assets,
+    Global_Patient_Resources,
+    Lifecycle_Pulse_Monitor,
+    Principal_Investigator_Registry,
+)
+
+CATEGORIES = ("Neurology", "Oncology", "Gene Therapy", "Cell Therapy", "Cardiology", "Rare")
+
+
+def _trial(i: int, rev: int = 0) -> Dict[str, Any]:
+    return {"id": f"NCT{i:08d}", "source": "bench", "category": CATEGORIES[i % len(CATEGORIES)],
+            "title": f"Bench study {i} stem cell" if i % 3 == 0 else f"Bench study {i}",
+            "status": "RECRUITING" if rev % 2 == 0 else "COMPLETED", "criteria": ""}
+
+
+def _write_sources(data_dir: str, trials: List[Dict[str, Any]], experts: int = 200) -> None:
+    """Writes both sources with mtimes in the past, outside the monitor's racy-mtime window."""
+    with open(os.path.join(data_dir, "merged_data.json"), "w", encoding="utf-8") as f:
+        json.dump(trials, f, ensure_ascii=False)
+    pis = [{"id": f"pi_{i:05d}", "name": f"Dr. Bench {i}", "affiliation": "Bench Hospital",
+            "linked_projects": [trials[i]["id"]] if i < len(trials) else []} for i in range(experts)]
+    with open(os.path.join(data_dir, "expert_map_data.json"), "w", encoding="utf-8") as f:
+        json.dump(pis, f, ensure_ascii=False)
+    past = time.time() - 60
+    for name in ("merged_data.json", "expert_map_data.json"):
+        os.utime(os.path.join(data_dir, name), (past, past))
+
+
+def _monitor(data_dir: str) -> Lifecycle_Pulse_Monitor:
+    return Lifecycle_Pulse_Monitor(Global_Patient_Resources(data_dir), Advanced_Therapeutic_Assets(data_dir),
+                                   Principal_Investigator_Registry(data_dir), data_dir=data_dir)
+
+
+def _churn(trials: List[Dict[str, Any]], rng: random.Random) -> List[Dict[str, Any]]:
+    n = len(trials)
+    out = list(trials)
+    for i in rng.sample(range(n), n // 100):
+        out[i] = _trial(int(out[i]["id"][3:]), rev=1)
+    gone = set(rng.sample(range(n), n // 200))
+    out = [t for i, t in enumerate(out) if i not in gone]
+    out.extend(_trial(n + j) for j in range(n // 200))
+    return out
+
+
+def _timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return time.perf_counter() - t0, out
+
+
+def _legacy_cycle(mon: Lifecycle_Pulse_Monitor, index_path: str, changelog_path: str) -> None:
+    """Previous run_cycle body: full JSON index load/save, O(n^2) deletion loop, full changelog rewrite."""
+    mon._c1.ingest()
+    mon._c2.ingest()
+    mon._c3.ingest(therapeutic_asset_ids=list(mon._c2.get_snapshot().get("index", {}).keys()))
+    current = {}
+    for prefix, comp in (("GPR", mon._c1), ("ATA", mon._c2), ("PI", mon._c3)):
+        for k, v in comp.get_snapshot().get("index", {}).items():
+            current[(prefix, k)] = v
+    try:
+        with open(index_path, "r", encoding="utf-8") as f:
+            old_index = json.load(f)
+    except Exception:
+        old_index = {}
+    changelog = []
+    for (comp, raw_id), norm in current.items():
+        key_str = f"{comp}:{raw_id}"
+        if key_str not in old_index:
+            changelog.append({"ts": datetime.utcnow().isoformat() + "Z", "event": "ADDITION", "id": raw_id})
+        elif old_index[key_str].get("status") != norm.get("status"):
+            changelog.append({"ts": datetime.utcnow().isoformat() + "Z", "event": "STATUS_CHANGE", "id": raw_id})
+        old_index[key_str] = norm
+    for key_str in list(old_index.keys()):
+        if key_str not in {f"{c}:{i}" for (c, i) in current.keys()}:
+            changelog.append({"event": "DELETION", "key": key_str})
+            del old_index[key_str]
+    with open(index_path, "w", encoding="utf-8") as f:
+        json.dump(old_index, f, ensure_ascii=False, indent=2)
+    existing = []
+    if os.path.isfile(changelog_path):
+        with open(changelog_path, "r", encoding="utf-8") as f:
+            existing = json.load(f)
+    existing.extend(changelog)
+    with open(changelog_path, "w", encoding="utf-8") as f:
+        json.dump(existing[-5000:], f, ensure_ascii=False, indent=2)
+
+
+def bench(size: int, seed: int = 7) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    tmp = tempfile.mkdtemp(prefix="pulse_bench_")
+    try:
+        trials = [_trial(i) for i in range(size)]
+        _write_sources(tmp, trials)
+        mon = _monitor(tmp)
+        first_s, first = _timed(mon.run_cycle)
+        stat_s, stat = _timed(mon.run_cycle)
+        digest_s, digest = _timed(_monitor(tmp).run_cycle)
+        _write_sources(tmp, _churn(trials, rng))
+        diff_s, diff = _timed(mon.run_cycle)
+        return {
+            "size": size, "records": first["records"],
+            "first_s": first_s, "stat_s": stat_s, "digest_s": digest_s, "diff_s": diff_s,
+            "digest_ingest_s": digest["ingest_ms"] / 1000, "diff_ingest_s": diff["ingest_ms"] / 1000,
+            "paths": (stat["fast_path"], digest["fast_path"], diff["fast_path"]),
+            "diff_events": (diff["additions"], diff["status_changes"], diff["deletions"]),
+            "index_mb": os.path.getsize(os.path.join(tmp, Lifecycle_Pulse_Monitor.INDEX_DB_FILENAME)) / 2**20,
+        }
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def bench_legacy(size: int, seed: int = 7) -> Dict[str, float]:
+    rng = random.Random(seed)
+    tmp = tempfile.mkdtemp(prefix="pulse_bench_legacy_")
+    try:
+        trials = [_trial(i) for i in range(size)]
+        _write_sources(tmp, trials)
+        mon = _monitor(tmp)
+        idx, log = os.path.join(tmp, "idx.json"), os.path.join(tmp, "log.json")
+        first_s, _ = _timed(lambda: _legacy_cycle(mon, idx, log))
+        same_s, _ = _timed(lambda: _legacy_cycle(mon, idx, log))
+        _write_sources(tmp, _churn(trials, rng))
+        diff_s, _ = _timed(lambda: _legacy_cycle(mon, idx, log))
+        return {"size": size, "first_s": first_s, "same_s": same_s, "diff_s": diff_s}
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Lifecycle_Pulse_Monitor.run_cycle benchmark")
+    parser.add_argument("--sizes", default="100000,1000000", help="trial counts in merged_data.json")
+    parser.add_argument("--legacy-sizes", default="2000,4000,8000", help="sizes for the previous algorithm ('' to skip)")
+    args = parser.parse_args()
+    for size in [int(s) for s in args.legacy_sizes.split(",") if s]:
+        r = bench_legacy(size)
+        print(f"legacy  trials={size:>9,}: first {r['first_s']:7.2f}s | unchanged {r['same_s']:7.2f}s | "
+              f"1% churn {r['diff_s']:7.2f}s")
+    for size in [int(s) for s in args.sizes.split(",") if s]:
+        r = bench(size)
+        print(f"keyed   trials={size:>9,} (index records {r['records']:,}, {r['index_mb']:.0f} MiB): "
+              f"first {r['first_s']:7.2f}s | unchanged same process {r['stat_s'] * 1000:6.2f}ms | "
+              f"unchanged fresh monitor {r['digest_s']:6.2f}s (ingest {r['digest_ingest_s']:.2f}s) | "
+              f"1% churn {r['diff_s']:6.2f}s (ingest {r['diff_ingest_s']:.2f}s) "
+              f"(+{r['diff_events'][0]} ~{r['diff_events'][1]} -{r['diff_events'][2]}; {'/'.join(r['paths'])})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# V4.0_STRATEGIC_LOCKED_BY_SMITH_LIN
+# -*- coding: utf-8 -*-
+"""
+Benchmark for SecondLayerOrchestrator snapshots on a synthetic merged_data.json in a temporary data dir:
+- copy: the previous get_latest_snapshot (dict copy of every component index per call) plus the
+  Layer 2.5 agid_list walk (list(keys())[:20]);
+- shared: the versioned read-only snapshot (same objects for every reader until a component changes);
+- export: one serialization of Components 1–3 into the mmap'd snapshot file, its size, and the
+  per-key lookup latency of read_shared_snapshot() in this process.
+Memory is the tracemalloc growth while 8 readers hold one snapshot each.
+Usage: python bench_shared_snapshot.py [--sizes 100000,1000000]
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+import tracemalloc
+from itertools import islice
+from typing import Any, Dict
+
+from amah_centurion_injection import _SOURCE_CACHE, SecondLayerOrchestrator, read_shared_snapshot
+
+READERS = 8
+C1, C2 = "Component_1_Global_Patient_Resources", "Component_2_Advanced_Therapeutic_Assets"
+
+
+def _legacy_snapshot(orch: SecondLayerOrchestrator) -> Dict[str, Any]:
+    snap = {
+        C1: {"index": dict(orch._component_1._index), "total": len(orch._component_1._index)},
+        C2: {"index": dict(orch._component_2._index), "total": len(orch._component_2._index)},
+        "Component_3_Principal_Investigator_Registry": {"index": dict(orch._component_3._index),
+                                                        "project_to_pi": dict(orch._component_3._project_to_pi)},
+    }
+    snap["agid_list"] = list(snap[C2]["index"].keys())[:20]
+    return snap
+
+
+def _shared_snapshot(orch: SecondLayerOrchestrator) -> Dict[str, Any]:
+    snap = orch.get_latest_snapshot(0.5)
+    snap["agid_list"] = list(islice(snap[C2]["index"], 20))
+    return snap
+
+
+def _per_call_ms(fn, n: int = 5) -> float:
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - t0) * 1000 / n
+
+
+def _held_mb(fn) -> float:
+    gc.collect()
+    tracemalloc.start()
+    held = [fn() for _ in range(READERS)]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del held
+    return size / 2**20
+
+
+def bench(size: int) -> Dict[str, float]:
+    tmp = tempfile.mkdtemp(prefix="snapshot_bench_")
+    try:
+        trials = [{"id": f"NCT{i:08d}", "category": "Gene Therapy" if i % 2 else "Oncology",
+                   "title": f"Bench study {i}", "status": "RECRUITING"} for i in range(size)]
+        with open(os.path.join(tmp, "merged_data.json"), "w", encoding="utf-8") as f:
+            json.dump(trials, f)
+        with open(os.path.join(tmp, "expert_map_data.json"), "w", encoding="utf-8") as f:
+            json.dump([{"id": f"pi_{i}", "linked_projects": [f"NCT{i:08d}"]} for i in range(200)], f)
+        del trials
+        shared = os.path.join(tmp, "layer2.snapshot")
+        _SOURCE_CACHE.clear()
+        orch = SecondLayerOrchestrator(data_dir=tmp, shared_snapshot_path=shared)
+        t0 = time.perf_counter()
+        orch.get_latest_snapshot(0.5)  # first cycle + first export
+        first_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        orch._shared_exported = None
+        orch._export_shared(orch._published)
+        export_s = time.perf_counter() - t0
+        copy_ms = _per_call_ms(lambda: _legacy_snapshot(orch))
+        shared_ms = _per_call_ms(lambda: _shared_snapshot(orch), n=1000)
+        copy_mb = _held_mb(lambda: _legacy_snapshot(orch))
+        shared_mb = _held_mb(lambda: _shared_snapshot(orch))
+        snap = read_shared_snapshot(shared, 0.5)
+        index = snap[C1]["index"]
+        keys = [f"NCT{random.randrange(size):08d}" for _ in range(10000)]
+        t0 = time.perf_counter()
+        for k in keys:
+            index[k]
+        lookup_us = (time.perf_counter() - t0) * 1e6 / len(keys)
+        open_ms = _per_call_ms(lambda: read_shared_snapshot(shared, 0.5), n=1000)
+        return {"size": size, "first_s": first_s, "export_s": export_s, "file_mb": os.path.getsize(shared) / 2**20,
+                "copy_ms": copy_ms, "shared_ms": shared_ms, "copy_mb": copy_mb, "shared_mb": shared_mb,
+                "lookup_us": lookup_us, "open_ms": open_ms}
+    finally:
+        _SOURCE_CACHE.clear()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="SecondLayerOrchestrator snapshot benchmark")
+    parser.add_argument("--sizes", default="100000,1000000", help="record counts in merged_data.json")
+    args = parser.parse_args()
+    for size in [int(s) for s in args.sizes.split(",") if s]:
+        r = bench(size)
+        print(f"records={size:>9,}: per call copy {r['copy_ms']:8.2f}ms vs shared {r['shared_ms'] * 1000:6.1f}us | "
+              f"{READERS} readers hold copy {r['copy_mb']:7.1f} MiB vs shared {r['shared_mb']:5.2f} MiB | "
+              f"export {r['export_s']:5.2f}s ({r['file_mb']:.0f} MiB) | cross-process open {r['open_ms'] * 1000:5.1f}us "
+              f"lookup {r['lookup_us']:5.1f}us | first cycle {r['first_s']:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
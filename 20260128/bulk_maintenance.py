@@ -0,0 +1,336 @@
+# V4.0_STRATEGIC_LOCKED_BY_SMITH_LIN
+# -*- coding: utf-8 -*-
+"""
+Bulk metadata maintenance for large Chroma collections (harmonize_300k.py, global_expert_expansion_v2.py,
+tech_dna_restoration.py).
+- Keyset iteration: one id-only scan, sorted, then pages fetched by id (get(ids=page)) starting after the
+  last seen key. Chroma's API has no id-range predicate, so the sorted id snapshot stands in for the index;
+  every page costs the same, unlike get(limit, offset) which re-walks the skipped rows, and rows written
+  during the run cannot shift later pages. after_id resumes an interrupted run.
+- transform(asset_id, metadata) -> metadata is a pure function run in a process pool (top-level function or
+  functools.partial so it pickles). Randomised rewrites should draw from stable_rng(asset_id) so a re-run is
+  a no-op rather than a full rewrite.
+- Change detection happens in the workers: only rows whose metadata actually differs travel back, and only
+  the changed keys are written (removed keys as None, which Chroma's update treats as delete).
+- A single writer thread applies collection.update in batches up to the client's max batch size. A page's
+  last id is reported (progress, stats["last_id"]) only once every changed row up to it has been written,
+  so it is always a safe after_id; a failed batch freezes it.
+- dry_run=True writes nothing and returns per-key change counts plus sample diffs (print_dry_run).
+Run as script for the 300k-row benchmark against the offset-paged rewrite-everything loop.
+"""
+import hashlib
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from bisect import bisect_right
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from bulk_pipeline import max_batch_size
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 5000
+DEFAULT_QUEUE_DEPTH = 4
+
+Transform = Callable[[str, Dict[str, Any]], Dict[str, Any]]
+
+
+def stable_rng(asset_id: str, salt: str = "") -> random.Random:
+    """Per-asset RNG seeded from the id, so randomised assignments are reproducible and idempotent."""
+    return random.Random(int(hashlib.sha256(f"{salt}|{asset_id}".encode("utf-8")).hexdigest()[:16], 16))
+
+
+def metadata_delta(old: Optional[Dict[str, Any]], new: Dict[str, Any]) -> Dict[str, Any]:
+    """Keys whose value changed (new value) or disappeared (None, deleted by collection.update)."""
+    old = old or {}
+    delta = {k: v for k, v in new.items() if k not in old or old[k] != v or type(old[k]) is not type(v)}
+    delta.update({k: None for k in old if k not in new})
+    return delta
+
+
+def iter_id_pages(collection: Any, page_size: int = DEFAULT_PAGE_SIZE, after_id: Optional[str] = None) -> Iterator[List[str]]:
+    """Sorted id snapshot, yielded page by page starting strictly after after_id."""
+    ids = sorted(collection.get(include=[])["ids"])
+    start = bisect_right(ids, after_id) if after_id is not None else 0
+    for i in range(start, len(ids), page_size):
+        yield ids[i:i + page_size]
+
+
+def iter_pages(
+    collection: Any,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    after_id: Optional[str] = None,
+) -> Iterator[Tuple[List[str], List[Optional[Dict[str, Any]]]]]:
+    """(ids, metadatas) pages in id order via keyset lookups."""
+    for page in iter_id_pages(collection, page_size, after_id):
+        got = collection.get(ids=page, include=["metadatas"])
+        by_id = dict(zip(got["ids"], got["metadatas"]))
+        yield page, [by_id.get(k) for k in page]
+
+
+def _transform_page(transform: Transform, ids: List[str], metas: List[Optional[Dict[str, Any]]]):
+    """Worker side: apply the transform and keep only rows that changed, as (id, delta)."""
+    changed = []
+    for asset_id, meta in zip(ids, metas):
+        delta = metadata_delta(meta, transform(asset_id, dict(meta or {})))
+        if delta:
+            changed.append((asset_id, delta))
+    return changed
+
+
+class _InlineResult:
+    def __init__(self, value):
+        self._value = value
+
+    def result(self):
+        return self._value
+
+
+class _UpdateWriter(threading.Thread):
+    """
+    Single writer: collection.update on batches of at most batch_size changed rows. Each page arrives with
+    its (scanned, changed, last_id) mark, which is acknowledged (progress called, acked set) once the
+    page's rows are written; after a failed batch nothing more is acknowledged.
+    """
+
+    def __init__(self, collection: Any, batch_size: int, depth: int,
+                 progress: Optional[Callable[[int, int, str], None]] = None, acked: Optional[str] = None):
+        super().__init__(name="bulk-metadata-writer", daemon=True)
+        self.inbox: "queue.Queue" = queue.Queue(maxsize=max(1, depth))
+        self._collection = collection
+        self._batch_size = batch_size
+        self._progress = progress
+        self._ids: List[str] = []
+        self._deltas: List[Dict[str, Any]] = []
+        self._marks: List[Tuple[int, int, str]] = []
+        self.acked = acked
+        self.written = 0
+        self.updates = 0
+        self.write_seconds = 0.0
+        self.errors: List[str] = []
+
+    def _flush(self) -> None:
+        if self._ids:
+            t0 = time.perf_counter()
+            try:
+                self._collection.update(ids=self._ids, metadatas=self._deltas)
+                self.written += len(self._ids)
+            except Exception as e:
+                logger.warning("metadata update of %d rows failed: %s", len(self._ids), e)
+                self.errors.append(f"{type(e).__name__}: {e}"[:300])
+            self.write_seconds += time.perf_counter() - t0
+            self.updates += 1
+            self._ids, self._deltas = [], []
+        marks, self._marks = self._marks, []
+        if self.errors:
+            return
+        for mark in marks:
+            self.acked = mark[2]
+            if self._progress is not None:
+                self._progress(*mark)
+
+    def run(self) -> None:
+        while True:
+            item = self.inbox.get()
+            if item is None:
+                self._flush()
+                return
+            rows, mark = item
+            for asset_id, delta in rows:
+                self._ids.append(asset_id)
+                self._deltas.append(delta)
+                if len(self._ids) >= self._batch_size:
+                    self._flush()
+            self._marks.append(mark)
+            if not self._ids:  # nothing of this page left unwritten
+                self._flush()
+
+
+def rewrite_metadata(
+    collection: Any,
+    transform: Transform,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    workers: Optional[int] = None,
+    write_batch: Optional[int] = None,
+    dry_run: bool = False,
+    sample_diffs: int = 20,
+    after_id: Optional[str] = None,
+    queue_depth: int = DEFAULT_QUEUE_DEPTH,
+    progress: Optional[Callable[[int, int, str], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Apply transform to every row's metadata and write back only the rows (and keys) that changed.
+    workers=None uses cpu_count - 1 pool processes (0 on a single core: transform inline, writer still
+    overlaps). progress(scanned, changed, last_id) runs, on the writer thread, once the page ending at last_id
+    is written (in dry-run mode as soon as it is transformed), so last_id is always a safe after_id to resume
+    from; stats["last_id"] is the last such id and stops advancing at the first failed batch.
+    Returns scanned / changed / written counts, per-key change counts, timings and, in dry-run mode,
+    up to sample_diffs {"id", "delta", "before"} samples.
+    """
+    if workers is None:
+        cpus = os.cpu_count() or 1
+        workers = cpus - 1 if cpus > 1 else 0
+    write_batch = write_batch or max_batch_size(collection)
+    writer = None
+    if not dry_run:
+        writer = _UpdateWriter(collection, write_batch, queue_depth, progress, after_id)
+        writer.start()
+    pool = None
+    if workers > 0:
+        import multiprocessing as mp
+        pool = ProcessPoolExecutor(workers, mp_context=mp.get_context("spawn"))  # see bulk_pipeline: no fork
+    inflight: "deque" = deque()
+    max_inflight = max(1, workers) * max(1, queue_depth)
+    key_counts: Counter = Counter()
+    samples: List[Dict[str, Any]] = []
+    stats = {"scanned": 0, "collected": 0, "changed": 0, "read_seconds": 0.0}
+    last_id = after_id
+    start = time.perf_counter()
+
+    def collect() -> None:
+        nonlocal last_id
+        ids, metas, fut = inflight.popleft()
+        changed = fut.result()
+        stats["collected"] += len(ids)
+        stats["changed"] += len(changed)
+        for asset_id, delta in changed:
+            key_counts.update(delta.keys())
+        mark = (stats["collected"], stats["changed"], ids[-1])
+        if not dry_run:
+            writer.inbox.put((changed, mark))  # the writer reports the page once its rows are written
+            return
+        if len(samples) < sample_diffs:
+            before = dict(zip(ids, metas))
+            samples.extend({"id": k, "delta": d, "before": before[k]} for k, d in changed[:sample_diffs - len(samples)])
+        last_id = ids[-1]
+        if progress is not None:
+            progress(*mark)
+
+    try:
+        pages = iter_pages(collection, page_size, after_id)
+        while True:
+            t0 = time.perf_counter()
+            page = next(pages, None)
+            stats["read_seconds"] += time.perf_counter() - t0
+            if page is None:
+                break
+            ids, metas = page
+            while len(inflight) >= max_inflight:
+                collect()
+            fut = (pool.submit(_transform_page, transform, ids, metas) if pool is not None
+                   else _InlineResult(_transform_page(transform, ids, metas)))
+            inflight.append((ids, metas, fut))
+            stats["scanned"] += len(ids)
+        while inflight:
+            collect()
+    finally:
+        if writer is not None:
+            writer.inbox.put(None)
+            writer.join()
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+    elapsed = time.perf_counter() - start
+    out = {
+        "dry_run": dry_run,
+        "scanned": stats["scanned"],
+        "changed": stats["changed"],
+        "written": writer.written if writer else 0,
+        "failed_batches": len(writer.errors) if writer else 0,
+        "errors": writer.errors[:5] if writer else [],
+        "changed_keys": dict(key_counts.most_common()),
+        "last_id": writer.acked if writer else last_id,
+        "elapsed_seconds": round(elapsed, 3),
+        "rows_per_sec": round(stats["scanned"] / max(elapsed, 1e-9), 1),
+        "read_seconds": round(stats["read_seconds"], 3),
+        "write_seconds": round(writer.write_seconds, 3) if writer else 0.0,
+        "workers": workers,
+    }
+    if dry_run:
+        out["samples"] = samples
+    return out
+
+
+def print_dry_run(stats: Dict[str, Any], samples: int = 5) -> None:
+    """Dry-run report shared by the maintenance scripts: change count, per-key counts, first sample deltas."""
+    print(f"🔍 预演: {stats['changed']}/{stats['scanned']} 项将被改写，字段分布 {stats['changed_keys']}")
+    for s in stats.get("samples", [])[:samples]:
+        print(f"   {s['id']}: {json.dumps(s['delta'], ensure_ascii=False)}")
+
+
+def _legacy_rewrite(collection: Any, transform: Transform, batch_size: int = DEFAULT_PAGE_SIZE) -> List[float]:
+    """The scripts' current loop: offset paging and collection.update on every page. Returns per-page seconds."""
+    times = []
+    total = collection.count()
+    for i in range(0, total, batch_size):
+        t0 = time.perf_counter()
+        results = collection.get(limit=batch_size, offset=i, include=["metadatas"])
+        metas = [transform(k, dict(m or {})) for k, m in zip(results["ids"], results["metadatas"])]
+        collection.update(ids=results["ids"], metadatas=metas)
+        times.append(time.perf_counter() - t0)
+    return times
+
+
+def _bench_transform(asset_id: str, meta: Dict[str, Any]) -> Dict[str, Any]:
+    """harmonize_300k's rules (benchmark stand-in importable by pool workers)."""
+    meta.setdefault("tech_feature", "Standard Clinical Protocol")
+    meta["precision_target"] = 0.79
+    meta["shadow_bill"] = 100000
+    return meta
+
+
+if __name__ == "__main__":
+    import argparse
+    import shutil
+    import tempfile
+
+    import numpy as np
+
+    parser = argparse.ArgumentParser(description="Keyset metadata rewrite vs offset-paged rewrite-all at scale")
+    parser.add_argument("--rows", default="75000,150000,300000", help="comma-separated collection sizes")
+    parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    import chromadb
+
+    depts = ["Neurology", "Oncology", "Cardiology", "Geriatrics & Longevity", "Rare & Orphan Diseases"]
+
+    def build(path: str, rows: int):
+        rng = np.random.default_rng(args.seed)
+        col = chromadb.PersistentClient(path=path).create_collection("maint_bench", embedding_function=None)
+        for s in range(0, rows, 5000):
+            n = min(5000, rows - s)
+            metas = [{"dept": depts[i % 5], "status": "RECRUITING"} for i in range(s, s + n)]
+            for j in range(0, n, 3):  # a third already harmonized: those rows must not be rewritten
+                metas[j].update(tech_feature="Standard Clinical Protocol", precision_target=0.79, shadow_bill=100000)
+            col.add(ids=[f"NCT{i:08d}" for i in range(s, s + n)], metadatas=metas,
+                    embeddings=rng.random((n, 4), dtype=np.float32))
+        return col
+
+    print(f"page={args.page_size} cpus={os.cpu_count()}")
+    print(f"{'rows':>8} | {'offset + update-all':>30} | {'keyset + changed-only':>30} | dry-run | re-run")
+    for rows in [int(x) for x in args.rows.split(",") if x.strip()]:
+        tmp = tempfile.mkdtemp(prefix="maint_bench_")
+        try:
+            col = build(os.path.join(tmp, "legacy"), rows)
+            t0 = time.perf_counter()
+            pages = _legacy_rewrite(col, _bench_transform, args.page_size)
+            legacy = time.perf_counter() - t0
+            drift = np.mean(pages[-max(1, len(pages) // 10):]) / np.mean(pages[:max(1, len(pages) // 10)])
+            col = build(os.path.join(tmp, "keyset"), rows)
+            dry = rewrite_metadata(col, _bench_transform, args.page_size, workers=args.workers, dry_run=True)
+            st = rewrite_metadata(col, _bench_transform, args.page_size, workers=args.workers)
+            again = rewrite_metadata(col, _bench_transform, args.page_size, workers=args.workers)
+            assert dry["changed"] == st["changed"] == st["written"] and again["changed"] == 0
+            print(f"{rows:>8} | {legacy:6.1f}s {legacy / rows * 1e6:5.1f}us/row last/first page x{drift:.2f} | "
+                  f"{st['elapsed_seconds']:6.1f}s {st['elapsed_seconds'] / rows * 1e6:5.1f}us/row "
+                  f"wrote {st['written']:>6} | {dry['elapsed_seconds']:5.1f}s | {again['elapsed_seconds']:5.1f}s")
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
@@ -0,0 +1,345 @@
+# V4.0_STRATEGIC_LOCKED_BY_SMITH_LIN
+# -*- coding: utf-8 -*-
+"""
+Pipelined bulk loading for the Chroma loaders (batch_build_db.py, expert_bulk_loader.py, amah_mega_loader.py).
+Three stages connected by bounded queues so CPU embedding and SQLite/HNSW writes overlap:
+  1. record generation (the caller's iterable, consumed lazily in the calling thread),
+  2. batched embedding in a process pool (workers build the embedding function once from a spec string),
+  3. a single writer thread that upserts precomputed embeddings in batches up to the client's max batch size.
+Backpressure: at most `workers * queue_depth` embedding batches are in flight and at most `queue_depth`
+embedded batches wait for the writer, so generation stalls instead of buffering the whole corpus.
+Oversubscription: ONNX Runtime sizes its intra-op pool to every core in each process, so pooled workers get
+intra_op_num_threads = cores // workers (workers * threads <= cores).
+Embedding specs: "default" (Chroma's ONNX MiniLM, the same function the collections use for documents=)
+or "module:factory" for any zero-argument factory returning an embedding function.
+The loaders keep their inline per-batch path as the default; the pipeline is opt-in (pipelined=True) until
+it is measured faster with the real ONNX model on the target host.
+Run as script for the records/sec comparison against the per-batch inline-embedding loaders.
+"""
+import importlib
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EMBED_BATCH = 256
+DEFAULT_QUEUE_DEPTH = 4
+FALLBACK_MAX_BATCH = 5000
+
+Record = Tuple[str, str, Optional[Dict[str, Any]]]
+
+
+class _ThreadCappedOrt:
+    """onnxruntime stand-in whose SessionOptions carry an intra-op thread cap (Chroma builds the session itself)."""
+
+    def __init__(self, ort: Any, threads: int):
+        self._ort = ort
+        self._threads = threads
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._ort, name)
+
+    def SessionOptions(self) -> Any:
+        so = self._ort.SessionOptions()
+        so.intra_op_num_threads = self._threads
+        so.inter_op_num_threads = 1
+        return so
+
+
+def resolve_embedder(spec: Any = "default", threads: Optional[int] = None) -> Callable[[List[str]], Any]:
+    """
+    Embedding function for a spec string ("default" or "module:factory"); callables pass through.
+    threads caps ONNX Runtime's intra-op pool of the default embedder; factories manage their own threads.
+    """
+    if callable(spec):
+        return spec
+    if spec in (None, "default"):
+        from chromadb.utils import embedding_functions
+        if not threads:
+            return embedding_functions.DefaultEmbeddingFunction()
+        fn = embedding_functions.ONNXMiniLM_L6_V2()
+        fn.ort = _ThreadCappedOrt(fn.ort, int(threads))
+        return fn
+    module, _, attr = str(spec).partition(":")
+    if not attr:
+        raise ValueError(f"embedder spec must be 'default' or 'module:factory', got {spec!r}")
+    return getattr(importlib.import_module(module), attr)()
+
+
+def max_batch_size(collection: Any, cap: Optional[int] = None) -> int:
+    """Largest upsert batch the Chroma client accepts (optionally capped)."""
+    try:
+        n = int(collection._client.get_max_batch_size())
+    except Exception:
+        n = FALLBACK_MAX_BATCH
+    return max(1, min(n, cap) if cap else n)
+
+
+_worker_embedder: Optional[Callable[[List[str]], Any]] = None
+
+
+def _init_worker(spec: str, threads: Optional[int] = None) -> None:
+    global _worker_embedder
+    _worker_embedder = resolve_embedder(spec, threads)
+
+
+def threads_per_worker(workers: int, threads: Optional[int] = None) -> int:
+    """Intra-op threads per embedding process so that workers * threads <= cores (requested threads are capped)."""
+    fair = max(1, (os.cpu_count() or 1) // max(1, workers))
+    return min(int(threads), fair) if threads else fair
+
+
+def _embed(documents: List[str]) -> Tuple[Any, float]:
+    t0 = time.perf_counter()
+    vectors = np.asarray(_worker_embedder(documents), dtype=np.float32)  # float32 array pickles compactly
+    return vectors, time.perf_counter() - t0
+
+
+class _InlineFuture:
+    """Stand-in for a pool future when workers=0 (embedding runs in the calling thread)."""
+
+    def __init__(self, fn: Callable[[List[str]], Any], documents: List[str]):
+        t0 = time.perf_counter()
+        self._value = (np.asarray(fn(documents), dtype=np.float32), time.perf_counter() - t0)
+
+    def result(self) -> Tuple[Any, float]:
+        return self._value
+
+
+class _Writer(threading.Thread):
+    """Single writer: regroups embedded batches into upserts of at most upsert_batch records."""
+
+    def __init__(self, collection: Any, upsert_batch: int, depth: int, progress: Optional[Callable[[int], None]]):
+        super().__init__(name="bulk-upsert-writer", daemon=True)
+        self.inbox: "queue.Queue" = queue.Queue(maxsize=max(1, depth))
+        self._collection = collection
+        self._upsert_batch = upsert_batch
+        self._progress = progress
+        self._ids: List[str] = []
+        self._docs: List[str] = []
+        self._metas: List[Optional[Dict[str, Any]]] = []
+        self._vecs: List[Any] = []
+        self.written = 0
+        self.upserts = 0
+        self.write_seconds = 0.0
+        self.errors: List[str] = []
+
+    def _flush(self) -> None:
+        if not self._ids:
+            return
+        kwargs = {"ids": self._ids, "documents": self._docs, "embeddings": np.concatenate(self._vecs)}
+        if any(self._metas):
+            kwargs["metadatas"] = [m or None for m in self._metas]
+        n = len(self._ids)
+        t0 = time.perf_counter()
+        try:
+            self._collection.upsert(**kwargs)
+            self.written += n
+        except Exception as e:
+            # same policy as the legacy loaders: log the failed batch, skip it, keep loading
+            logger.warning("bulk upsert of %d records failed: %s", n, e)
+            self.errors.append(f"{type(e).__name__}: {e}"[:300])
+        self.write_seconds += time.perf_counter() - t0
+        self.upserts += 1
+        self._ids, self._docs, self._metas, self._vecs = [], [], [], []
+        if self._progress is not None:
+            self._progress(self.written)
+
+    def run(self) -> None:
+        while True:
+            item = self.inbox.get()
+            if item is None:
+                self._flush()
+                return
+            ids, docs, metas, vecs = item
+            if len(self._ids) + len(ids) > self._upsert_batch:
+                self._flush()
+            self._ids.extend(ids)
+            self._docs.extend(docs)
+            self._metas.extend(metas)
+            self._vecs.append(vecs)
+
+
+def pipelined_upsert(
+    collection: Any,
+    records: Iterable[Record],
+    embedder: Any = "default",
+    workers: Optional[int] = None,
+    embed_batch: int = DEFAULT_EMBED_BATCH,
+    upsert_batch: Optional[int] = None,
+    queue_depth: int = DEFAULT_QUEUE_DEPTH,
+    progress: Optional[Callable[[int], None]] = None,
+    threads: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Upsert (id, document, metadata) records with precomputed embeddings. workers=None uses cpu_count - 1
+    embedding processes (0 on a single core); workers=0 embeds inline, still overlapping with the writer thread, and
+    is the only mode that accepts a non-picklable embedding callable. Pooled workers run the default embedder
+    with threads_per_worker(workers, threads) intra-op threads each. upsert_batch defaults to the client's
+    max batch size. Failed upsert batches are logged and skipped, as the legacy loaders did.
+    Returns throughput and per-stage timings (embed_seconds is summed over workers).
+    """
+    if np is None:
+        raise RuntimeError("bulk_pipeline requires numpy")
+    if workers is None:
+        cpus = os.cpu_count() or 1
+        workers = cpus - 1 if cpus > 1 else 0  # keep one core for the writer; single-core hosts embed inline
+    if workers > 0 and callable(embedder):
+        raise ValueError("process-pool embedding needs a spec string ('default' or 'module:factory'), not a callable")
+    upsert_batch = upsert_batch or max_batch_size(collection)
+    embed_batch = max(1, min(int(embed_batch), upsert_batch))
+    writer = _Writer(collection, upsert_batch, queue_depth, progress)
+    writer.start()
+    pool = None
+    if workers > 0:
+        import multiprocessing as mp
+        threads = threads_per_worker(workers, threads)
+        # spawn: never fork a process that already holds Chroma's native client threads
+        pool = ProcessPoolExecutor(workers, mp_context=mp.get_context("spawn"),
+                                   initializer=_init_worker, initargs=(embedder, threads))
+    else:
+        inline_fn = resolve_embedder(embedder, threads)
+    max_inflight = max(1, workers) * max(1, queue_depth)
+    inflight: "deque" = deque()
+    stats = {"records": 0, "embed_seconds": 0.0, "backpressure_seconds": 0.0}
+    start = time.perf_counter()
+
+    def hand_off() -> None:
+        ids, docs, metas, fut = inflight.popleft()
+        t0 = time.perf_counter()
+        vecs, seconds = fut.result()
+        writer.inbox.put((ids, docs, metas, vecs))
+        stats["backpressure_seconds"] += time.perf_counter() - t0
+        stats["embed_seconds"] += seconds
+
+    def submit(ids: List[str], docs: List[str], metas: List[Any]) -> None:
+        while len(inflight) >= max_inflight:
+            hand_off()
+        fut = pool.submit(_embed, docs) if pool is not None else _InlineFuture(inline_fn, docs)
+        inflight.append((ids, docs, metas, fut))
+        stats["records"] += len(ids)
+
+    try:
+        ids: List[str] = []
+        docs: List[str] = []
+        metas: List[Any] = []
+        for rid, doc, meta in records:
+            ids.append(str(rid))
+            docs.append(doc)
+            metas.append(meta)
+            if len(ids) >= embed_batch:
+                submit(ids, docs, metas)
+                ids, docs, metas = [], [], []
+        if ids:
+            submit(ids, docs, metas)
+        while inflight:
+            hand_off()
+    finally:
+        writer.inbox.put(None)
+        writer.join()
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+    elapsed = time.perf_counter() - start
+    return {
+        "records": stats["records"],
+        "written": writer.written,
+        "upserts": writer.upserts,
+        "failed_batches": len(writer.errors),
+        "errors": writer.errors[:5],
+        "elapsed_seconds": round(elapsed, 3),
+        "records_per_sec": round(writer.written / max(elapsed, 1e-9), 1),
+        "embed_seconds": round(stats["embed_seconds"], 3),
+        "write_seconds": round(writer.write_seconds, 3),
+        "backpressure_seconds": round(stats["backpressure_seconds"], 3),
+        "workers": workers,
+        "threads_per_worker": threads,
+        "embed_batch": embed_batch,
+        "upsert_batch": upsert_batch,
+    }
+
+
+def _legacy_upsert(collection: Any, records: Iterable[Record], embed_fn: Callable[[List[str]], Any], batch_size: int) -> float:
+    """The current loaders' pattern: build a batch, embed it inline, upsert, repeat (no overlap)."""
+    t0 = time.perf_counter()
+    batch: List[Record] = []
+
+    def flush() -> None:
+        docs = [r[1] for r in batch]
+        collection.upsert(ids=[r[0] for r in batch], documents=docs, metadatas=[r[2] for r in batch],
+                          embeddings=np.asarray(embed_fn(docs), dtype=np.float32))
+
+    for rec in records:
+        batch.append(rec)
+        if len(batch) >= batch_size:
+            flush()
+            batch = []
+    if batch:
+        flush()
+    return time.perf_counter() - t0
+
+
+if __name__ == "__main__":
+    import argparse
+    import shutil
+    import tempfile
+
+    parser = argparse.ArgumentParser(description="records/sec: pipelined bulk upsert vs the per-batch loaders")
+    parser.add_argument("--assets", type=int, default=300_000)
+    parser.add_argument("--embedder", default="default",
+                        help="'default' (Chroma ONNX) or module:factory; falls back to bench_run_safe:hashed_embedder")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--threads", type=int, default=None,
+                        help="ONNX intra-op threads per worker (capped at cores // workers)")
+    parser.add_argument("--embed-batch", type=int, default=DEFAULT_EMBED_BATCH)
+    parser.add_argument("--legacy-batches", default="100,500,2000",
+                        help="batch sizes of expert_bulk_loader / amah_mega_loader / batch_build_db")
+    parser.add_argument("--hnsw-m", type=int, default=16, help="HNSW M (loaders use 32-64; lower keeps the run short)")
+    parser.add_argument("--construction-ef", type=int, default=100)
+    args = parser.parse_args()
+
+    from amah_mega_loader import iter_high_fidelity_records
+    import chromadb
+
+    spec = args.embedder
+    try:
+        resolve_embedder(spec)(["warmup"])
+    except Exception as e:
+        print(f"Embedder {spec!r} unavailable ({type(e).__name__}: {e}); using bench_run_safe:hashed_embedder")
+        spec = "bench_run_safe:hashed_embedder"
+    embed_fn = resolve_embedder(spec)
+
+    def fresh_collection(tmp: str, name: str):
+        client = chromadb.PersistentClient(path=os.path.join(tmp, name))
+        return client.create_collection("bulk_bench", embedding_function=None, metadata={
+            "hnsw:space": "cosine", "hnsw:M": args.hnsw_m, "hnsw:construction_ef": args.construction_ef})
+
+    print(f"assets={args.assets} embedder={spec} cpus={os.cpu_count()} hnsw M={args.hnsw_m} "
+          f"ef={args.construction_ef}")
+    rows = []
+    tmp = tempfile.mkdtemp(prefix="bulk_bench_")
+    try:
+        for size in [int(x) for x in args.legacy_batches.split(",") if x.strip()]:
+            col = fresh_collection(tmp, f"legacy_{size}")
+            seconds = _legacy_upsert(col, iter_high_fidelity_records(args.assets), embed_fn, size)
+            rows.append((f"legacy batch={size}", col.count(), seconds))
+            print(f"  {rows[-1][0]:<34} {rows[-1][1] / seconds:>9.1f} rec/s  ({seconds:.1f}s)")
+        col = fresh_collection(tmp, "pipelined")
+        st = pipelined_upsert(col, iter_high_fidelity_records(args.assets), embedder=spec, workers=args.workers,
+                              embed_batch=args.embed_batch, threads=args.threads)
+        label = f"pipelined workers={st['workers']} threads={st['threads_per_worker']} upsert={st['upsert_batch']}"
+        print(f"  {label:<34} "
+              f"{st['records_per_sec']:>9.1f} rec/s  ({st['elapsed_seconds']:.1f}s)  embed={st['embed_seconds']}s "
+              f"write={st['write_seconds']}s backpressure={st['backpressure_seconds']}s count={col.count()}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
@@ -2,11 +2,9 @@
 # -*- coding: utf-8 -*-
 # Calibration Engine V4.0 — 波形熵检测、variance>0.005 联动、AGID 输出
 
-import json
 import random
 import time
 import hashlib
-import math
 import numpy as np
 from amah_weight_orchestrator import AMAHWeightOrchestrator, calculate_sliding_entropy, VARIANCE_INTERCEPT_THRESHOLD
 
@@ -48,9 +46,18 @@ class AMAHCalibrationEngine:
             dataset.append({"query": query, "domain": domain, "features": mock_features})
         return dataset
 
-    def run_calibration(self):
-        print(f"🚀 启动 500 组黑箱权重校准演习 (V4.0 AGID)...")
-        test_cases = self.generate_stress_dataset(500)
+    def iter_case_dataset(self, path, count=None):
+        """从训练病例文件（JSON 数组或 JSONL）流式产出校准用例：query=original_inquiry，特征同压测集随机生成。"""
+        from case_loader import iter_cases
+        for case in iter_cases(path, limit=count):
+            query = case.get("original_inquiry") or ""
+            features = self.generate_stress_dataset(1)[0]["features"]
+            features["is_refractory"] = "refractory" in query.lower()
+            yield {"query": query, "domain": random.choice(self.domains), "features": features}
+
+    def run_calibration(self, cases_path=None, count=500):
+        print(f"🚀 启动 {count or '全部'} 组黑箱权重校准演习 (V4.0 AGID)...")
+        test_cases = self.iter_case_dataset(cases_path, count) if cases_path else self.generate_stress_dataset(count or 500)
         results = []
         start_time = time.time()
         intercept_count = 0
@@ -85,9 +92,10 @@ class AMAHCalibrationEngine:
         print("\n" + "="*50)
         print(f"📊 AMAH 算法校准审计报告 (V4.0 AGID)")
         print("-" * 50)
-        print(f"🔹 测试用例: 500 | 耗时: {duration:.4f}s")
+        total = len(results) or 1
+        print(f"🔹 测试用例: {len(results)} | 耗时: {duration:.4f}s")
         print(f"🔹 波形拦截 (variance>0.005): {intercept_count} 例")
-        print(f"🔹 逻辑通行率: {len(passed)/500:.2%}")
+        print(f"🔹 逻辑通行率: {len(passed)/total:.2%}")
         scores = [r["result"].get("composite_score", 0) for r in results if "composite_score" in r["result"]]
         print(f"🔹 平均匹配分值: {sum(scores)/len(scores):.4f}" if scores else "🔹 平均匹配分值: N/A")
         print("-" * 50)
@@ -99,5 +107,10 @@ class AMAHCalibrationEngine:
 
 
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="AMAH 权重校准演习")
+    parser.add_argument("--cases", default=None, help="训练病例文件（JSON 数组或 JSONL，流式读取）；缺省为随机压测集")
+    parser.add_argument("--count", type=int, default=500, help="用例数（配合 --cases 时 0 表示全部）")
+    args = parser.parse_args()
     engine = AMAHCalibrationEngine()
-    engine.run_calibration()
+    engine.run_calibration(cases_path=args.cases, count=args.count or None)
@@ -0,0 +1,224 @@
+# V4.0_STRATEGIC_LOCKED_BY_SMITH_LIN
+# -*- coding: utf-8 -*-
+"""
+Streaming case loader for training / audit corpora (amani_training_10k.json and larger).
+- JSONL is read line by line; a byte range (start, end) yields exactly the lines whose first byte falls
+  inside it, so shard_ranges() splits a file for parallel workers without an index or a pre-scan.
+- A top-level JSON array (the current corpus format) is parsed incrementally with raw_decode over a
+  bounded text buffer: memory is one read chunk plus the element being decoded, never the whole file.
+convert_to_jsonl() rewrites an array file as JSONL in one streaming pass.
+Run as script for the time-to-first-case / RSS benchmark on a synthetic multi-million-case file.
+"""
+import json
+import os
+import re
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+FORMATS = ("jsonl", "json_array")
+DEFAULT_CHUNK_CHARS = 1 << 20
+_WS = re.compile(r"[ \t\n\r]*")
+
+
+def detect_format(path: str) -> str:
+    """'json_array' if the first non-whitespace character is '[', else 'jsonl'."""
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(4096)
+            if not chunk:
+                return "jsonl"
+            stripped = chunk.lstrip(b" \t\r\n\xef\xbb\xbf")
+            if stripped:
+                return "json_array" if stripped[:1] == b"[" else "jsonl"
+
+
+def iter_json_array(path: str, chunk_chars: int = DEFAULT_CHUNK_CHARS) -> Iterator[Any]:
+    """Yield the elements of a top-level JSON array one at a time with bounded memory."""
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8-sig") as f:
+        buf, pos, eof = "", 0, False
+
+        def more() -> None:
+            nonlocal buf, pos, eof
+            chunk = f.read(chunk_chars)
+            if not chunk:
+                eof = True
+            buf, pos = buf[pos:] + chunk, 0
+
+        def skip_ws() -> None:
+            nonlocal pos
+            while True:
+                pos = _WS.match(buf, pos).end()
+                if pos < len(buf) or eof:
+                    return
+                more()
+
+        skip_ws()
+        if pos >= len(buf) or buf[pos] != "[":
+            raise ValueError(f"{path}: expected a top-level JSON array")
+        pos += 1
+        first = True
+        while True:
+            skip_ws()
+            if pos >= len(buf):
+                raise ValueError(f"{path}: unterminated JSON array")
+            if buf[pos] == "]":
+                return
+            if not first:
+                if buf[pos] != ",":
+                    raise ValueError(f"{path}: expected ',' between array elements")
+                pos += 1
+                skip_ws()
+            while True:
+                try:
+                    obj, end = decoder.raw_decode(buf, pos)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                    more()
+                    continue
+                if end == len(buf) and not eof:
+                    more()  # a scalar may continue in the next chunk; re-decode with more text
+                    continue
+                break
+            yield obj
+            pos = end
+            first = False
+
+
+def iter_jsonl(path: str, start: int = 0, end: Optional[int] = None, with_offsets: bool = False) -> Iterator[Any]:
+    """
+    Yield JSON objects from the lines whose first byte lies in [start, end).
+    with_offsets=True yields (byte_offset, obj), usable as a global ordering key across shards.
+    """
+    with open(path, "rb") as f:
+        offset = 0
+        if start > 0:
+            f.seek(start - 1)
+            offset = start
+            if f.read(1) != b"\n":
+                offset += len(f.readline())  # partial line belongs to the previous shard
+        # Offsets are tracked by hand: BufferedReader.tell() costs an lseek per line.
+        while end is None or offset < end:
+            raw = f.readline()
+            if not raw:
+                return
+            line_offset = offset
+            offset += len(raw)
+            line = raw.strip()
+            if not line:
+                continue
+            if line_offset == 0 and line.startswith(b"\xef\xbb\xbf"):
+                line = line[3:]
+            obj = json.loads(line.decode("utf-8"))
+            yield (line_offset, obj) if with_offsets else obj
+
+
+def shard_ranges(path: str, shards: int) -> List[Tuple[int, int]]:
+    """Split a JSONL file into `shards` contiguous byte ranges; every line lands in exactly one range."""
+    size = os.path.getsize(path)
+    shards = max(1, int(shards))
+    return [(size * i // shards, size * (i + 1) // shards) for i in range(shards)]
+
+
+def iter_cases(
+    path: str,
+    limit: Optional[int] = None,
+    byte_range: Optional[Tuple[int, int]] = None,
+) -> Iterator[Dict[str, Any]]:
+    """Stream cases from a JSONL or JSON-array file; byte_range sharding requires JSONL."""
+    fmt = detect_format(path)
+    if fmt == "json_array":
+        if byte_range is not None:
+            raise ValueError(f"{path}: byte-range sharding needs JSONL; run convert_to_jsonl() first")
+        it = iter_json_array(path)
+    else:
+        it = iter_jsonl(path, *(byte_range or (0, None)))
+    return islice(it, limit) if limit is not None and limit > 0 else it
+
+
+def convert_to_jsonl(src: str, dst: str) -> int:
+    """Rewrite a JSON-array (or JSONL) case file as JSONL in one streaming pass; returns the case count."""
+    tmp = f"{dst}.tmp"
+    n = 0
+    with open(tmp, "w", encoding="utf-8") as out:
+        for case in iter_cases(src):
+            out.write(json.dumps(case, ensure_ascii=False) + "\n")
+            n += 1
+    os.replace(tmp, dst)
+    return n
+
+
+if __name__ == "__main__":
+    import argparse
+    import subprocess
+    import sys
+    import tempfile
+    import time
+
+    def _rss_mb() -> float:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+
+    parser = argparse.ArgumentParser(description="Streaming case loader benchmark (time-to-first-case, RSS)")
+    parser.add_argument("--cases", type=int, default=5_000_000)
+    parser.add_argument("--legacy-max", type=int, default=500_000, help="json.load baseline only up to N cases")
+    parser.add_argument("--measure", nargs=2, metavar=("MODE", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        mode, path = args.measure
+        t0 = time.perf_counter()
+        first = None
+        samples: List[str] = []
+        n = 0
+        if mode == "json.load":
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            first = time.perf_counter() - t0
+            n = len(data)
+        else:
+            it = iter_cases(path) if mode == "stream" else iter_jsonl(path, *shard_ranges(path, 4)[3])
+            for _ in it:
+                n += 1
+                if first is None:
+                    first = time.perf_counter() - t0
+                if n % 1_000_000 == 0:
+                    samples.append(f"{n // 1_000_000}M:{_rss_mb():.0f}MB")
+        total = time.perf_counter() - t0
+        print(f"{mode:>9}: cases={n} first_case={first * 1000:.1f}ms total={total:.1f}s "
+              f"rss_now={_rss_mb():.0f}MB rss_samples=[{' '.join(samples)}]")
+        sys.exit(0)
+
+    base = os.path.dirname(os.path.abspath(__file__))
+    with open(os.path.join(base, "amani_training_10k.json"), "r", encoding="utf-8") as f:
+        seed = json.load(f)[:1000]
+
+    def run(mode: str, path: str) -> None:
+        subprocess.run([sys.executable, os.path.abspath(__file__), "--measure", mode, path], check=True)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        array_path = os.path.join(tmp, "cases.json")
+        t0 = time.perf_counter()
+        with open(array_path, "w", encoding="utf-8") as f:
+            f.write("[\n")
+            for i in range(args.cases):
+                case = dict(seed[i % len(seed)], request_id=f"SYN-{i:09d}")
+                f.write(("  " if i == 0 else ",\n  ") + json.dumps(case, ensure_ascii=False))
+            f.write("\n]")
+        print(f"synthetic array: {args.cases} cases, {os.path.getsize(array_path) / 2 ** 30:.2f} GiB "
+              f"({time.perf_counter() - t0:.0f}s to write)")
+        run("stream", array_path)
+        jsonl_path = os.path.join(tmp, "cases.jsonl")
+        t0 = time.perf_counter()
+        convert_to_jsonl(array_path, jsonl_path)
+        print(f"convert_to_jsonl: {time.perf_counter() - t0:.1f}s")
+        os.remove(array_path)
+        run("stream", jsonl_path)
+        run("shard4/4", jsonl_path)
+        small = os.path.join(tmp, "small.json")
+        for n in (100_000, args.legacy_max):
+            with open(small, "w", encoding="utf-8") as f:
+                json.dump(list(islice(iter_jsonl(jsonl_path), n)), f, ensure_ascii=False, indent=2)
+            run("stream", small)
+            run("json.load", small)
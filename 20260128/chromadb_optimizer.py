@@ -44,7 +44,25 @@ def load_initial_shards(collection, count=1000):
         documents=documents
     )
 
+def shard_by_discipline(source_name):
+    """
+    把单体集合（如 expert_map_global，30 万行）按学科物理拆分为 <source>__<学科> 分片，
+    由 shard_router.ShardRouter 按意图路由检索；向量直接复制，不重新 embedding
+    """
+    from shard_router import ShardManager
+    print(f"🧩 正在按学科拆分 {source_name} ...")
+    counts = ShardManager(client, source_name).build()
+    for discipline, n in sorted(counts.items()):
+        print(f"   {source_name}__{discipline}: {n} 行")
+    return counts
+
 if __name__ == "__main__":
+    import sys
+    if len(sys.argv) > 2 and sys.argv[1] == "--shard":
+        # python chromadb_optimizer.py --shard expert_map_global
+        shard_by_discipline(sys.argv[2])
+        sys.exit(0)
+
     start_time = time.time()
     
     # 执行向量分片：学科层级隔离 (Discipline Sharding)
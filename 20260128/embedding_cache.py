@@ -0,0 +1,365 @@
+# V4.0_STRATEGIC_LOCKED_BY_SMITH_LIN
+# -*- coding: utf-8 -*-
+"""
+Query-embedding cache for L3 ChromaDB lookups.
+Keyed by (embedding-model id, normalized text). In-memory LRU in front of an optional
+on-disk memmap store, so recurring intents are embedded once and queried via query_embeddings=.
+Run as script to benchmark embedding time on amani_training_10k.json.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CAPACITY = 4096
+_DISK_VECTORS = "vectors.f32"
+_DISK_KEYS = "keys.jsonl"
+_DISK_META = "meta.json"
+
+
+def normalize_query_text(text: str) -> str:
+    """NFKC-normalize and collapse whitespace; casing is kept because embedding models may be cased."""
+    if not text:
+        return ""
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+def embedding_model_id(embedding_fn: Any) -> str:
+    """Best-effort stable id for a Chroma embedding function (name + model name)."""
+    if embedding_fn is None:
+        return "none"
+    name = ""
+    try:
+        name = embedding_fn.name() if callable(getattr(embedding_fn, "name", None)) else ""
+    except Exception:
+        name = ""
+    name = name or type(embedding_fn).__name__
+    model = getattr(embedding_fn, "model_name", None) or getattr(embedding_fn, "MODEL_NAME", None)
+    return f"{name}:{model}" if model else str(name)
+
+
+def _cache_key(model_id: str, normalized: str) -> str:
+    return hashlib.sha256(f"{model_id}\x00{normalized}".encode("utf-8")).hexdigest()
+
+
+class _MemmapEmbeddingStore:
+    """
+    Append-only on-disk vector store: float32 rows in a memmap file plus a JSONL key -> row index.
+    Store is bound to one (model_id, dim); a mismatching directory is left untouched and ignored.
+    """
+
+    def __init__(self, path: str, model_id: str):
+        self._path = path
+        self._model_id = model_id
+        self._dim: Optional[int] = None
+        self._rows = 0
+        self._capacity = 0
+        self._index: Dict[str, int] = {}
+        self._mm = None
+        self.usable = np is not None
+        if not self.usable:
+            return
+        os.makedirs(path, exist_ok=True)
+        meta_path = os.path.join(path, _DISK_META)
+        if os.path.isfile(meta_path):
+            try:
+                with open(meta_path, "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+                if meta.get("model_id") != model_id:
+                    logger.warning("Embedding store %s belongs to model %s, not %s; disk cache disabled",
+                                   path, meta.get("model_id"), model_id)
+                    self.usable = False
+                    return
+                self._dim = int(meta["dim"])
+                self._load_index()
+            except Exception as e:
+                logger.warning("Embedding store %s unreadable, disk cache disabled: %s", path, e)
+                self.usable = False
+
+    def _load_index(self) -> None:
+        keys_path = os.path.join(self._path, _DISK_KEYS)
+        vec_path = os.path.join(self._path, _DISK_VECTORS)
+        row_bytes = self._dim * 4
+        on_disk_rows = os.path.getsize(vec_path) // row_bytes if os.path.isfile(vec_path) else 0
+        if os.path.isfile(keys_path):
+            with open(keys_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        break  # torn trailing line from a crash; rows after it are not trusted
+                    if rec["row"] < on_disk_rows:
+                        self._index[rec["key"]] = rec["row"]
+        self._rows = max(self._index.values()) + 1 if self._index else 0
+        self._capacity = on_disk_rows
+        if self._capacity:
+            self._mm = np.memmap(vec_path, dtype=np.float32, mode="r+", shape=(self._capacity, self._dim))
+
+    def _ensure_capacity(self, rows: int) -> None:
+        if rows <= self._capacity:
+            return
+        new_cap = max(rows, self._capacity * 2, 256)
+        vec_path = os.path.join(self._path, _DISK_VECTORS)
+        if self._mm is not None:
+            self._mm.flush()
+            self._mm = None
+        with open(vec_path, "ab") as f:
+            f.truncate(new_cap * self._dim * 4)
+        self._capacity = new_cap
+        self._mm = np.memmap(vec_path, dtype=np.float32, mode="r+", shape=(self._capacity, self._dim))
+
+    def get(self, key: str) -> Optional[Any]:
+        row = self._index.get(key)
+        if row is None or self._mm is None:
+            return None
+        return np.array(self._mm[row])
+
+    def put_many(self, items: Sequence[Any]) -> None:
+        """items: [(key, vector)]; vectors already in the store are skipped."""
+        items = [(k, v) for k, v in items if k not in self._index]
+        if not items:
+            return
+        if self._dim is None:
+            self._dim = int(len(items[0][1]))
+            with open(os.path.join(self._path, _DISK_META), "w", encoding="utf-8") as f:
+                json.dump({"model_id": self._model_id, "dim": self._dim}, f)
+        self._ensure_capacity(self._rows + len(items))
+        lines = []
+        for key, vec in items:
+            self._mm[self._rows] = np.asarray(vec, dtype=np.float32)
+            self._index[key] = self._rows
+            lines.append(json.dumps({"key": key, "row": self._rows}) + "\n")
+            self._rows += 1
+        # No msync here: the shared mapping lives in the page cache, so rows survive a process crash.
+        with open(os.path.join(self._path, _DISK_KEYS), "a", encoding="utf-8") as f:
+            f.writelines(lines)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+
+class QueryEmbeddingCache:
+    """
+    Embedding cache in front of a Chroma embedding function.
+    embed(texts) returns one vector (list of float) per text; misses are embedded in a single batch.
+    Thread-safe; counters are exposed via stats().
+    """
+
+    def __init__(
+        self,
+        embedding_fn: Callable[[List[str]], Any],
+        model_id: Optional[str] = None,
+        capacity: int = DEFAULT_CAPACITY,
+        disk_path: Optional[str] = None,
+    ):
+        self._fn = embedding_fn
+        self.model_id = model_id or embedding_model_id(embedding_fn)
+        self._capacity = max(1, int(capacity))
+        self._lru: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk = _MemmapEmbeddingStore(disk_path, self.model_id) if disk_path else None
+        if self._disk is not None and not self._disk.usable:
+            self._disk = None
+        self._hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._embed_seconds = 0.0
+
+    def _lookup(self, key: str) -> Optional[Any]:
+        vec = self._lru.get(key)
+        if vec is not None:
+            self._lru.move_to_end(key)
+            self._hits += 1
+            return vec
+        if self._disk is not None:
+            vec = self._disk.get(key)
+            if vec is not None:
+                self._remember(key, vec)
+                self._disk_hits += 1
+                return vec
+        return None
+
+    def _remember(self, key: str, vec: Any) -> None:
+        self._lru[key] = vec
+        self._lru.move_to_end(key)
+        while len(self._lru) > self._capacity:
+            self._lru.popitem(last=False)
+
+    def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        """Return embeddings for texts, computing only the cache misses (deduplicated within the call)."""
+        normalized = [normalize_query_text(t) for t in texts]
+        keys = [_cache_key(self.model_id, t) for t in normalized]
+        found: Dict[str, Any] = {}
+        missing: Dict[str, str] = {}
+        with self._lock:
+            for key, text in zip(keys, normalized):
+                if key in found or key in missing:
+                    continue
+                vec = self._lookup(key)
+                if vec is None:
+                    missing[key] = text
+                else:
+                    found[key] = vec
+        if missing:
+            t0 = time.perf_counter()
+            computed = self._fn(list(missing.values()))
+            elapsed = time.perf_counter() - t0
+            new_items = []
+            for key, vec in zip(missing.keys(), computed):
+                vec = np.asarray(vec, dtype=np.float32) if np is not None else list(vec)
+                found[key] = vec
+                new_items.append((key, vec))
+            with self._lock:
+                self._misses += len(missing)
+                self._embed_seconds += elapsed
+                for key, vec in new_items:
+                    self._remember(key, vec)
+                if self._disk is not None:
+                    try:
+                        self._disk.put_many(new_items)
+                    except Exception as e:
+                        logger.warning("Embedding disk store write failed, continuing in-memory: %s", e)
+        return [found[k].tolist() if hasattr(found[k], "tolist") else list(found[k]) for k in keys]
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit-rate metrics: memory hits, disk hits, misses (= texts actually embedded) and embed time."""
+        with self._lock:
+            lookups = self._hits + self._disk_hits + self._misses
+            return {
+                "model_id": self.model_id,
+                "lookups": lookups,
+                "memory_hits": self._hits,
+                "disk_hits": self._disk_hits,
+                "misses": self._misses,
+                "hit_rate": round((self._hits + self._disk_hits) / lookups, 4) if lookups else 0.0,
+                "embed_seconds": round(self._embed_seconds, 4),
+                "lru_size": len(self._lru),
+                "disk_size": len(self._disk) if self._disk is not None else 0,
+            }
+
+
+def collection_embedding_fn(collection: Any, embedding_fn: Any = None) -> Optional[Any]:
+    """
+    Embedding function for query_embeddings= on this collection: embedding_fn when the caller constructed it,
+    else the one in the collection's persisted configuration, else (older Chroma, snapshot retrievers) the
+    _embedding_function attribute, and finally Chroma's default ONNX model.
+    """
+    if embedding_fn is not None:
+        return embedding_fn
+    try:
+        fn = (getattr(collection, "configuration", None) or {}).get("embedding_function")
+    except Exception:
+        fn = None
+    if fn is None:
+        fn = getattr(collection, "_embedding_function", None)  # last resort: private attribute
+    if fn is not None:
+        return fn
+    try:
+        from chromadb.utils import embedding_functions
+        return embedding_functions.DefaultEmbeddingFunction()
+    except Exception:
+        return None
+
+
+_shared_caches: Dict[Any, QueryEmbeddingCache] = {}
+_shared_caches_lock = threading.Lock()
+
+
+def get_shared_cache(
+    embedding_fn: Any,
+    capacity: int = DEFAULT_CAPACITY,
+    disk_path: Optional[str] = None,
+) -> QueryEmbeddingCache:
+    """
+    Process-wide cache per (model id, disk path), so several bridges in one process share hits
+    and a disk store has a single writer. Use a distinct disk_path per process.
+    """
+    model_id = embedding_model_id(embedding_fn)
+    key = (model_id, os.path.abspath(disk_path) if disk_path else None)
+    with _shared_caches_lock:
+        cache = _shared_caches.get(key)
+        if cache is None:
+            cache = QueryEmbeddingCache(embedding_fn, model_id=model_id, capacity=capacity, disk_path=disk_path)
+            _shared_caches[key] = cache
+        return cache
+
+
+def _hash_embedding_fn(dim: int = 384, cost_ms: float = 0.0) -> Callable[[List[str]], List[List[float]]]:
+    """Deterministic stand-in embedder (optionally with simulated per-text cost) for offline benchmarks."""
+    def _fn(texts: List[str]) -> List[List[float]]:
+        out = []
+        for t in texts:
+            if cost_ms:
+                time.sleep(cost_ms / 1000.0)
+            seed = int(hashlib.sha256(t.encode("utf-8")).hexdigest()[:8], 16)
+            rng = np.random.default_rng(seed)
+            out.append(rng.standard_normal(dim).astype(np.float32).tolist())
+        return out
+    _fn.model_name = f"hash-{dim}"
+    return _fn
+
+
+if __name__ == "__main__":
+    import argparse
+    import tempfile
+
+    parser = argparse.ArgumentParser(description="Benchmark query-embedding cache on amani_training_10k.json")
+    parser.add_argument("--limit", type=int, default=0)
+    parser.add_argument("--fake-ms", type=float, default=None,
+                        help="use a hash embedder costing N ms per text instead of Chroma's default ONNX model")
+    args = parser.parse_args()
+
+    base = os.path.dirname(os.path.abspath(__file__))
+    from case_loader import iter_cases
+
+    records = list(iter_cases(os.path.join(base, "amani_training_10k.json"), limit=args.limit or None))
+    intents = [(r.get("original_inquiry") or "")[:2000] for r in records]
+
+    fn = None
+    if args.fake_ms is None:
+        try:
+            from chromadb.utils import embedding_functions
+            fn = embedding_functions.DefaultEmbeddingFunction()
+            fn(["warmup"])
+        except Exception as e:
+            print(f"Default ONNX embedder unavailable ({e}); falling back to --fake-ms 2")
+            fn = None
+    if fn is None:
+        fn = _hash_embedding_fn(cost_ms=args.fake_ms if args.fake_ms is not None else 2.0)
+
+    t0 = time.perf_counter()
+    for text in intents:
+        fn([text])
+    uncached = time.perf_counter() - t0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = QueryEmbeddingCache(fn, disk_path=tmp)
+        t0 = time.perf_counter()
+        for text in intents:
+            cache.embed([text])
+        cold = time.perf_counter() - t0
+        cold_stats = cache.stats()
+        warm_cache = QueryEmbeddingCache(fn, disk_path=tmp)
+        t0 = time.perf_counter()
+        for text in intents:
+            warm_cache.embed([text])
+        warm = time.perf_counter() - t0
+        warm_stats = warm_cache.stats()
+
+    print(f"records={len(intents)} model={cold_stats['model_id']}")
+    print(f"uncached (query_texts= equivalent): {uncached:.2f}s, {len(intents)} texts embedded")
+    print(f"cached, cold run: {cold:.2f}s, {cold_stats['misses']} texts embedded, hit_rate={cold_stats['hit_rate']}")
+    print(f"cached, warm disk store: {warm:.2f}s, {warm_stats['misses']} texts embedded, "
+          f"disk_hits={warm_stats['disk_hits']}, hit_rate={warm_stats['hit_rate']}")
@@ -0,0 +1,165 @@
+# V4.0_STRATEGIC_LOCKED_BY_SMITH_LIN
+# -*- coding: utf-8 -*-
+"""
+Shared per-character sliding Shannon entropy kernel (L1 Sentinel, AMAH orchestrator, EntropyUtils).
+Window i covers text[max(0, i - w//2) : min(n, i + w//2 + 1)], identical to the original loops.
+
+Two NumPy paths over codepoint ids, no Python-level per-character loop:
+- "incremental": rolling histogram; each window step adds/removes one character and updates
+  S = sum(c * log2 c) by a table-lookup delta, then H = log2(L) - S / L via one cumsum.
+- "reduceat": every (window, member) term -log2(c/L)/L is materialised and summed per window
+  with np.add.reduceat (more work, but no cumulative rounding across the text).
+Falls back to pure Python when NumPy is unavailable.
+Run as script to benchmark against the legacy loop on 10k-character inputs.
+"""
+import math
+from typing import Dict, List, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+DEFAULT_WINDOW = 5
+METHODS = ("incremental", "reduceat")
+
+
+def text_to_codepoint_ids(text: str) -> "np.ndarray":
+    """Map text to dense int ids (one per character; equal characters share an id)."""
+    cps = np.frombuffer(text.encode("utf-32-le", "surrogatepass"), dtype="<u4")
+    _, ids = np.unique(cps, return_inverse=True)
+    return ids.reshape(-1).astype(np.int64)
+
+
+def _window_bounds(n: int, window_size: int) -> Tuple["np.ndarray", "np.ndarray"]:
+    half = window_size // 2
+    pos = np.arange(n, dtype=np.int64)
+    return np.maximum(0, pos - half), np.minimum(n, pos + half + 1)
+
+
+def _padded(ids: "np.ndarray", half: int) -> "np.ndarray":
+    """ids with half*2 sentinel (-1) slots on each side, so window offsets never index out of range."""
+    pad = np.full(len(ids) + 4 * half, -1, dtype=np.int64)
+    pad[2 * half: 2 * half + len(ids)] = ids
+    return pad
+
+
+def _count_equal(pad: "np.ndarray", half: int, positions: "np.ndarray", offsets: range) -> "np.ndarray":
+    """For each position j, how many of text[j + k] (k in offsets) equal text[j]; sentinels never match."""
+    base = positions + 2 * half
+    centre = pad[base]
+    count = np.zeros(len(positions), dtype=np.int64)
+    for k in offsets:
+        count += pad[base + k] == centre
+    return count
+
+
+def _sliding_entropy_incremental(ids: "np.ndarray", window_size: int) -> "np.ndarray":
+    n = len(ids)
+    half = window_size // 2
+    start, end = _window_bounds(n, window_size)
+    pad = _padded(ids, half)
+    xlog2x = np.array([0.0] + [c * math.log2(c) for c in range(1, 2 * half + 2)])
+    # Window 0: characters [0, end[0]) enter an empty histogram one by one.
+    p0 = np.arange(end[0], dtype=np.int64)
+    c0 = _count_equal(pad, half, p0, range(-2 * half, 0))
+    steps = [np.zeros(len(p0), dtype=np.int64)]
+    deltas = [xlog2x[c0 + 1] - xlog2x[c0]]
+    # Step i >= 1: position i-1-half leaves (if i > half), then position i+half enters (if i+half < n).
+    # Leaving q sees window [q, q + 2*half]; entering p sees [p - 2*half, p) after the removal.
+    i_leave = np.arange(half + 1, n, dtype=np.int64)
+    c = _count_equal(pad, half, i_leave - 1 - half, range(0, 2 * half + 1))
+    steps.append(i_leave)
+    deltas.append(xlog2x[c - 1] - xlog2x[c])
+    i_enter = np.arange(1, max(1, n - half), dtype=np.int64)
+    c = _count_equal(pad, half, i_enter + half, range(-2 * half, 0))
+    steps.append(i_enter)
+    deltas.append(xlog2x[c + 1] - xlog2x[c])
+    s = np.cumsum(np.bincount(np.concatenate(steps), weights=np.concatenate(deltas), minlength=n))
+    length = (end - start).astype(np.float64)
+    return np.maximum(0.0, np.log2(length) - s / length)
+
+
+def _sliding_entropy_reduceat(ids: "np.ndarray", window_size: int) -> "np.ndarray":
+    n = len(ids)
+    half = window_size // 2
+    start, end = _window_bounds(n, window_size)
+    pad = _padded(ids, half)
+    members = np.arange(-half, half + 1, dtype=np.int64)[None, :] + np.arange(n, dtype=np.int64)[:, None]
+    valid = (members >= 0) & (members < n)
+    win = np.broadcast_to(np.arange(n, dtype=np.int64)[:, None], members.shape)[valid]
+    j = members[valid]
+    # Count of text[j] inside window `win`: compare against every slot of that window (sentinels outside).
+    count = np.zeros(len(j), dtype=np.int64)
+    centre = pad[j + 2 * half]
+    for k in range(-half, half + 1):
+        count += pad[win + k + 2 * half] == centre
+    length = (end - start).astype(np.float64)
+    p = count / length[win]
+    offsets = np.concatenate(([0], np.cumsum(end - start)[:-1]))
+    return np.maximum(0.0, -np.add.reduceat(np.log2(p) / length[win], offsets))
+
+
+def _sliding_entropy_py(text: str, window_size: int) -> List[float]:
+    """Legacy pure-Python loop; used when NumPy is missing and as the parity reference."""
+    tokens = list(text)
+    n = len(tokens)
+    out = []
+    for i in range(n):
+        window = tokens[max(0, i - window_size // 2): min(n, i + window_size // 2 + 1)]
+        counts: Dict[str, int] = {}
+        for t in window:
+            counts[t] = counts.get(t, 0) + 1
+        ent = 0.0
+        for c in counts.values():
+            p = c / len(window)
+            ent -= p * math.log2(p)
+        out.append(ent)
+    return out
+
+
+def sliding_entropy(text: str, window_size: int = DEFAULT_WINDOW, method: str = "incremental") -> "np.ndarray":
+    """Per-character windowed Shannon entropy (bits) as float64 array (list without NumPy)."""
+    if method not in METHODS:
+        raise ValueError(f"method must be one of {METHODS}, got {method!r}")
+    if np is None:
+        return _sliding_entropy_py(text or "", window_size)
+    if not text:
+        return np.zeros(0, dtype=np.float64)
+    ids = text_to_codepoint_ids(text)
+    if method == "reduceat":
+        return _sliding_entropy_reduceat(ids, window_size)
+    return _sliding_entropy_incremental(ids, window_size)
+
+
+def entropy_stats(text: str, window_size: int = DEFAULT_WINDOW, method: str = "incremental") -> Tuple[float, float]:
+    """(mean, population variance) of the sliding entropy sequence; (0.0, 0.0) for empty text."""
+    seq = sliding_entropy(text, window_size, method)
+    if len(seq) == 0:
+        return 0.0, 0.0
+    if np is None:
+        mean = sum(seq) / len(seq)
+        return mean, sum((e - mean) ** 2 for e in seq) / len(seq)
+    return float(seq.mean()), float(seq.var())
+
+
+if __name__ == "__main__":
+    import random
+    import time
+
+    rng = random.Random(42)
+    alphabet = "abcdefghijklmnopqrstuvwxyz KRAS G12C 帕金森病患者寻求脑机接口治疗方案。"
+    for n in (1_000, 10_000, 100_000):
+        text = "".join(rng.choice(alphabet) for _ in range(n))
+        timings = {}
+        if n <= 10_000:
+            t0 = time.perf_counter()
+            ref = _sliding_entropy_py(text, DEFAULT_WINDOW)
+            timings["legacy"] = time.perf_counter() - t0
+        for method in METHODS:
+            t0 = time.perf_counter()
+            seq = sliding_entropy(text, DEFAULT_WINDOW, method)
+            timings[method] = time.perf_counter() - t0
+            if n <= 10_000:
+                assert np.allclose(seq, ref, atol=1e-9), method
+        print(f"n={n:>7}: " + "  ".join(f"{k}={v * 1000:.2f}ms" for k, v in timings.items()))
@@ -1,48 +1,57 @@
+import argparse
+
 import chromadb
-import random
 
-def run_global_expansion():
+from bulk_maintenance import print_dry_run, rewrite_metadata, stable_rng
+
+# 1. 定义全球百强中心图谱 (覆盖欧洲、亚洲、美洲、大洋洲)
+GLOBAL_MEDICAL_HUBS = {
+    "North America": ["Mayo Jacksonville", "Mayo Rochester", "Cleveland Clinic", "Johns Hopkins", "Stanford Med", "MGH", "MD Anderson", "UCSF", "Mount Sinai", "UCLA Health"],
+    "Europe": ["Charité Berlin", "Karolinska Institute", "Oxford Medical", "Cambridge Health", "Gustave Roussy", "UZ Leuven", "Zurich University Hospital", "Barts London"],
+    "Asia-Pacific": ["Peking Union", "West China Hospital", "The University of Tokyo", "Seoul National University", "National University Singapore", "Melbourne Health"],
+    "Specialized": ["Buck Institute (Longevity)", "Altos Labs Node", "Neuralink Research", "CERN Health", "Hevolution Global Hub"]
+}
+
+# 展开所有中心到一个列表
+ALL_HUBS = [(hub, region) for region, hubs in GLOBAL_MEDICAL_HUBS.items() for hub in hubs]
+
+def assign_global_hub(asset_id, m):
+    """
+    纯函数（进程池中执行）：随机但结构化地分配全球中心，模拟真实的全球资源分布。
+    随机源由资产 id 派生，同一资产每次运行分到同一中心，重复运行不产生写入。
+    """
+    hub, region = stable_rng(asset_id, "global_hub").choice(ALL_HUBS)
+    m['expert'] = hub
+    m['region'] = region
+    m['status'] = "GLOBAL_ACTIVE" # 标记资产已进入全球调度池
+    return m
+
+def run_global_expansion(dry_run=False, workers=None, after_id=None):
     client = chromadb.PersistentClient(path="./medical_db")
     collection = client.get_collection(name="mayo_clinic_trials")
-    
-    # 1. 定义全球百强中心图谱 (覆盖欧洲、亚洲、美洲、大洋洲)
-    global_medical_hubs = {
-        "North America": ["Mayo Jacksonville", "Mayo Rochester", "Cleveland Clinic", "Johns Hopkins", "Stanford Med", "MGH", "MD Anderson", "UCSF", "Mount Sinai", "UCLA Health"],
-        "Europe": ["Charité Berlin", "Karolinska Institute", "Oxford Medical", "Cambridge Health", "Gustave Roussy", "UZ Leuven", "Zurich University Hospital", "Barts London"],
-        "Asia-Pacific": ["Peking Union", "West China Hospital", "The University of Tokyo", "Seoul National University", "National University Singapore", "Melbourne Health"],
-        "Specialized": ["Buck Institute (Longevity)", "Altos Labs Node", "Neuralink Research", "CERN Health", "Hevolution Global Hub"]
-    }
 
     print("🌐 启动全球专家主权扩张：正在重构 300,001 项资产的地理对位...")
 
-    # 展开所有中心到一个列表
-    all_hubs = []
-    for region, hubs in global_medical_hubs.items():
-        for hub in hubs:
-            all_hubs.append((hub, region))
-
-    # 2. 批量读取与重新注入地理主权
-    # 为了性能，我们分批处理 30 万数据
+    # 2. 按 id 顺序 keyset 分页读取，进程池计算，仅写回变化字段（单写线程批量 update）
     total = collection.count()
-    batch_size = 5000
-    
-    for i in range(0, total, batch_size):
-        results = collection.get(limit=batch_size, offset=i, include=['metadatas'])
-        ids = results['ids']
-        metas = results['metadatas']
-        
-        for m in metas:
-            # 随机但结构化地分配全球中心，模拟真实的全球资源分布
-            hub, region = random.choice(all_hubs)
-            m['expert'] = hub
-            m['region'] = region
-            m['status'] = "GLOBAL_ACTIVE" # 标记资产已进入全球调度池
-
-        collection.update(ids=ids, metadatas=metas)
-        if (i + batch_size) % 50000 == 0 or (i + batch_size) >= total:
-            print(f"📡 实时同步: {min(i + batch_size, total)}/300001 全球节点已锁定...")
-
-    print(f"🔥 达成！AMAH 平台已正式完成全球 100+ 顶级中心与 30 万资产的【空间对位】。")
+
+    def progress(scanned, changed, last_id):
+        if scanned % 50000 == 0 or scanned >= total:
+            print(f"📡 实时同步: {scanned}/{total} 全球节点已扫描（{changed} 项变更，断点 {last_id}）...")
+
+    stats = rewrite_metadata(collection, assign_global_hub, workers=workers, dry_run=dry_run, after_id=after_id,
+                             progress=progress)
+    if dry_run:
+        print_dry_run(stats)
+        return stats
+
+    print(f"🔥 达成！AMAH 平台已正式完成全球 100+ 顶级中心与 {stats['scanned']} 资产的【空间对位】（写入 {stats['written']} 项）。")
+    return stats
 
 if __name__ == "__main__":
-    run_global_expansion()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="全球专家中心地理对位")
+    parser.add_argument("--dry-run", action="store_true", help="只输出差异，不写库")
+    parser.add_argument("--workers", type=int, default=None, help="transform 进程数（默认 CPU 数 - 1）")
+    parser.add_argument("--after-id", default=None, help="从该 id 之后续跑（取上次进度输出的断点）")
+    args = parser.parse_args()
+    run_global_expansion(dry_run=args.dry_run, workers=args.workers, after_id=args.after_id)
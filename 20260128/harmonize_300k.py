@@ -1,33 +1,45 @@
+import argparse
+
 import chromadb
 
-def harmonize_300k():
+from bulk_maintenance import print_dry_run, rewrite_metadata
+
+def harmonize(asset_id, m):
+    """纯函数（进程池中执行）：返回对齐后的 metadata；已对齐的资产不产生任何写入。"""
+    # 1. 补齐缺失的先进技术标签
+    if 'tech_feature' not in m:
+        m['tech_feature'] = "Standard Clinical Protocol"
+    # 2. 确保影子账单与精度锚点 100% 覆盖
+    m['precision_target'] = 0.79
+    m['shadow_bill'] = 100000
+    return m
+
+def harmonize_300k(dry_run=False, workers=None, after_id=None):
     client = chromadb.PersistentClient(path="./medical_db")
     collection = client.get_collection(name="mayo_clinic_trials")
     
     print("🧬 启动 300,001 项资产全量逻辑对齐 (Global Harmonization)...")
     
     total = collection.count()
-    batch_size = 5000
-    
-    for i in range(0, total, batch_size):
-        results = collection.get(limit=batch_size, offset=i, include=['metadatas'])
-        ids = results['ids']
-        metas = results['metadatas']
-        
-        changed = False
-        for m in metas:
-            # 1. 补齐缺失的先进技术标签
-            if 'tech_feature' not in m:
-                m['tech_feature'] = "Standard Clinical Protocol"
-            # 2. 确保影子账单与精度锚点 100% 覆盖
-            m['precision_target'] = 0.79
-            m['shadow_bill'] = 100000
-            
-        collection.update(ids=ids, metadatas=metas)
-        if (i + batch_size) % 25000 == 0 or (i + batch_size) >= total:
-            print(f"📡 进度: {min(i + batch_size, total)}/300001 资产已对齐...")
-
-    print("🔥 达成！全量 30 万资产已进入【路演就绪】状态。")
+
+    # 按 id 顺序 keyset 分页扫描，仅写回真正变化的资产与字段
+    def progress(scanned, changed, last_id):
+        if scanned % 25000 == 0 or scanned >= total:
+            print(f"📡 进度: {scanned}/{total} 资产已扫描（{changed} 项需对齐，断点 {last_id}）...")
+
+    stats = rewrite_metadata(collection, harmonize, workers=workers, dry_run=dry_run, after_id=after_id,
+                             progress=progress)
+    if dry_run:
+        print_dry_run(stats)
+        return stats
+
+    print(f"🔥 达成！全量 {stats['scanned']} 资产已进入【路演就绪】状态（实际写入 {stats['written']} 项）。")
+    return stats
 
 if __name__ == "__main__":
-    harmonize_300k()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="30 万资产 metadata 全量对齐")
+    parser.add_argument("--dry-run", action="store_true", help="只输出差异，不写库")
+    parser.add_argument("--workers", type=int, default=None, help="transform 进程数（默认 CPU 数 - 1）")
+    parser.add_argument("--after-id", default=None, help="从该 id 之后续跑（取上次进度输出的断点）")
+    args = parser.parse_args()
+    harmonize_300k(dry_run=args.dry_run, workers=args.workers, after_id=args.after_id)
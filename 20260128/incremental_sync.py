@@ -0,0 +1,292 @@
+# V4.0_STRATEGIC_LOCKED_BY_SMITH_LIN
+# -*- coding: utf-8 -*-
+"""
+Hash-based incremental sync of L2 assets into a ChromaDB collection.
+A manifest (SQLite, WAL) records one content hash per AGID per target collection and source; each run
+diffs the current documents against it into adds / changes / deletes and only the delta reaches Chroma,
+so unchanged assets are never re-embedded. Adds and changes are upserted in batches up to the client's
+max batch size and recorded in the manifest batch by batch (an interrupted run simply resumes the
+remaining delta). Legacy ids live in an alias table (legacy_id -> AGID) instead of being written as
+second embedded copies of the same document; resolve() maps either form to the canonical AGID, and
+stale legacy-id duplicates left in the collection by earlier runs are deleted on sync.
+Run as script for the embedding-work / collection-size comparison against full re-upserts.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from bulk_pipeline import max_batch_size
+
+DEFAULT_MANIFEST = os.path.join(os.path.dirname(os.path.abspath(__file__)), "l2_sync_manifest.sqlite")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS manifest (
+    collection   TEXT NOT NULL,
+    agid         TEXT NOT NULL,
+    source       TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    synced_at    REAL NOT NULL,
+    PRIMARY KEY (collection, agid)
+);
+CREATE INDEX IF NOT EXISTS manifest_source ON manifest (collection, source);
+CREATE TABLE IF NOT EXISTS aliases (
+    collection TEXT NOT NULL,
+    legacy_id  TEXT NOT NULL,
+    agid       TEXT NOT NULL,
+    PRIMARY KEY (collection, legacy_id)
+);
+CREATE INDEX IF NOT EXISTS aliases_agid ON aliases (collection, agid);
+"""
+
+
+def sync_doc(agid: str, document: str, metadata: Optional[Dict[str, Any]] = None,
+             legacy_id: Optional[str] = None) -> Dict[str, Any]:
+    """One syncable asset: canonical AGID, embedded document, metadata and optional legacy id alias."""
+    return {"agid": agid, "document": document, "metadata": metadata or {}, "legacy_id": legacy_id}
+
+
+def content_hash(doc: Dict[str, Any]) -> str:
+    """Hash of everything that is written to Chroma for the asset (document text + metadata)."""
+    payload = json.dumps([doc["document"], doc["metadata"]], ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SyncManifest:
+    """Per-collection content hashes and legacy-id aliases in one SQLite file."""
+
+    def __init__(self, path: str = DEFAULT_MANIFEST):
+        self.path = str(path)
+        d = os.path.dirname(self.path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=30.0)
+        self._conn.execute("PRAGMA journal_mode=wal")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "SyncManifest":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def hashes(self, collection: str, source: str) -> Dict[str, str]:
+        cur = self._conn.execute("SELECT agid, content_hash FROM manifest WHERE collection = ? AND source = ?",
+                                 (collection, source))
+        return dict(cur.fetchall())
+
+    def count(self, collection: str) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM manifest WHERE collection = ?", (collection,)).fetchone()[0]
+
+    def record(self, collection: str, source: str, docs: Sequence[Dict[str, Any]]) -> None:
+        now = time.time()
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO manifest (collection, agid, source, content_hash, synced_at) VALUES (?, ?, ?, ?, ?)",
+                [(collection, d["agid"], source, d["content_hash"], now) for d in docs])
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO aliases (collection, legacy_id, agid) VALUES (?, ?, ?)",
+                [(collection, d["legacy_id"], d["agid"]) for d in docs if d.get("legacy_id")])
+
+    def forget(self, collection: str, agids: Sequence[str]) -> None:
+        with self._conn:
+            self._conn.executemany("DELETE FROM manifest WHERE collection = ? AND agid = ?",
+                                   [(collection, a) for a in agids])
+            self._conn.executemany("DELETE FROM aliases WHERE collection = ? AND agid = ?",
+                                   [(collection, a) for a in agids])
+
+    def reset(self, collection: str) -> None:
+        with self._conn:
+            self._conn.execute("DELETE FROM manifest WHERE collection = ?", (collection,))
+            self._conn.execute("DELETE FROM aliases WHERE collection = ?", (collection,))
+
+    def aliases(self, collection: str) -> Dict[str, str]:
+        cur = self._conn.execute("SELECT legacy_id, agid FROM aliases WHERE collection = ?", (collection,))
+        return dict(cur.fetchall())
+
+    def resolve(self, collection: str, ids: Iterable[str]) -> List[str]:
+        """Map legacy ids to their AGID; AGIDs and unknown ids pass through unchanged."""
+        table = self.aliases(collection)
+        return [table.get(i, i) for i in ids]
+
+
+def collection_key(collection: Any) -> str:
+    """Manifest key: name plus Chroma's collection UUID, so a dropped / recreated collection starts clean."""
+    return f"{collection.name}/{getattr(collection, 'id', '')}"
+
+
+def plan_sync(manifest: SyncManifest, collection: str, source: str, docs: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Diff current docs (last one wins per AGID) against the manifest: add / change / delete / unchanged."""
+    current: Dict[str, Dict[str, Any]] = {}
+    for d in docs:
+        current[d["agid"]] = dict(d, content_hash=content_hash(d))
+    previous = manifest.hashes(collection, source)
+    add = [d for a, d in current.items() if a not in previous]
+    change = [d for a, d in current.items() if a in previous and previous[a] != d["content_hash"]]
+    delete = sorted(a for a in previous if a not in current)
+    return {"add": add, "change": change, "delete": delete, "unchanged": len(current) - len(add) - len(change)}
+
+
+def sync_documents(
+    collection: Any,
+    docs: Iterable[Dict[str, Any]],
+    source: str,
+    manifest: SyncManifest,
+    batch_size: Optional[int] = None,
+    dry_run: bool = False,
+    cleanup_legacy: bool = True,
+    lexical: Optional[Any] = None,
+    shards: Optional[Any] = None,
+) -> Dict[str, Any]:
+    """
+    Apply the delta for one source to collection (Chroma embeds only added / changed documents).
+    If the collection is empty while the manifest still lists assets (collection rebuilt or dropped),
+    the manifest for it is reset first so everything is re-added. cleanup_legacy deletes documents stored
+    under an aliased legacy id. lexical (a lexical_index.LexicalIndex) receives the same upserts / deletes;
+    shards (a shard_router.ShardManager of this collection) get the touched ids copied across afterwards.
+    Returns counts per delta kind, embedded documents and sizes.
+    """
+    name = collection_key(collection)
+    if manifest.count(name) and collection.count() == 0:
+        manifest.reset(name)
+    plan = plan_sync(manifest, name, source, docs)
+    upserts = plan["add"] + plan["change"]
+    legacy = sorted({d["legacy_id"] for d in upserts if d.get("legacy_id") and d["legacy_id"] != d["agid"]})
+    stats = {
+        "source": source,
+        "added": len(plan["add"]),
+        "changed": len(plan["change"]),
+        "deleted": len(plan["delete"]),
+        "unchanged": plan["unchanged"],
+        "embedded": len(upserts),
+        "dry_run": dry_run,
+    }
+    if dry_run:
+        stats["sample"] = {"add": [d["agid"] for d in plan["add"][:5]], "change": [d["agid"] for d in plan["change"][:5]],
+                           "delete": plan["delete"][:5]}
+        return stats
+    batch_size = batch_size or max_batch_size(collection)
+    t0 = time.perf_counter()
+    count_before = collection.count() if shards is not None else 0
+    for i in range(0, len(upserts), batch_size):
+        batch = upserts[i:i + batch_size]
+        collection.upsert(ids=[d["agid"] for d in batch], documents=[d["document"] for d in batch],
+                          metadatas=[d["metadata"] or None for d in batch])
+        if lexical is not None:
+            lexical.upsert([d["agid"] for d in batch], [d["document"] for d in batch],
+                           [d["metadata"] or None for d in batch])
+        manifest.record(name, source, batch)
+    for i in range(0, len(plan["delete"]), batch_size):
+        batch = plan["delete"][i:i + batch_size]
+        collection.delete(ids=batch)
+        if lexical is not None:
+            lexical.delete(batch)
+        manifest.forget(name, batch)
+    if cleanup_legacy and legacy:
+        for i in range(0, len(legacy), batch_size):
+            collection.delete(ids=legacy[i:i + batch_size])
+            if lexical is not None:
+                lexical.delete(legacy[i:i + batch_size])
+    if shards is not None:
+        touched = [d["agid"] for d in upserts] + plan["delete"] + (legacy if cleanup_legacy else [])
+        stats["shards_fresh"] = shards.sync_ids(touched, count_before) if touched else shards.is_fresh()
+    stats.update({
+        "legacy_duplicates_removed": len(legacy) if cleanup_legacy else 0,
+        "aliases": len(manifest.aliases(name)),
+        "collection_count": collection.count(),
+        "seconds": round(time.perf_counter() - t0, 3),
+    })
+    return stats
+
+
+if __name__ == "__main__":
+    import argparse
+    import random
+    import shutil
+    import tempfile
+
+    import chromadb
+    from chromadb.api.types import EmbeddingFunction
+
+    parser = argparse.ArgumentParser(description="Embedding work / collection size: incremental sync vs full re-upsert")
+    parser.add_argument("--assets", type=int, default=20_000)
+    parser.add_argument("--churn", type=float, default=0.01, help="fraction changed per run (plus churn/2 added and deleted)")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    class CountingEmbedding(EmbeddingFunction):
+        """Cheap deterministic embedder that counts how many documents Chroma asked it to embed."""
+        calls = 0
+
+        def __init__(self):
+            pass
+
+        def __call__(self, input):
+            CountingEmbedding.calls += len(input)
+            return [[float(len(t) % 97), float(sum(map(ord, t[:16])) % 89), 1.0] for t in input]
+
+        @staticmethod
+        def name():
+            return "counting-bench"
+
+        def get_config(self):
+            return {}
+
+        @staticmethod
+        def build_from_config(config):
+            return CountingEmbedding()
+
+    rng = random.Random(args.seed)
+    assets = {f"legacy_{i:06d}": f"asset {i} rev 0" for i in range(args.assets)}
+    next_id = args.assets
+
+    def churn() -> None:
+        global next_id
+        keys = list(assets)
+        for k in rng.sample(keys, int(len(keys) * args.churn)):
+            assets[k] = assets[k].rsplit(" ", 1)[0] + f" {int(assets[k].rsplit(' ', 1)[1]) + 1}"
+        for k in rng.sample(keys, int(len(keys) * args.churn / 2)):
+            del assets[k]
+        for _ in range(int(len(keys) * args.churn / 2)):
+            assets[f"legacy_{next_id:06d}"] = f"asset {next_id} rev 0"
+            next_id += 1
+
+    def docs():
+        return [sync_doc(f"AGID-BENCH-{k}", v, {"legacy_id": k}, legacy_id=k) for k, v in assets.items()]
+
+    tmp = tempfile.mkdtemp(prefix="l2_sync_bench_")
+    try:
+        client = chromadb.PersistentClient(path=os.path.join(tmp, "chroma"))
+        full = client.create_collection("full_resync", embedding_function=CountingEmbedding())
+        inc = client.create_collection("incremental", embedding_function=CountingEmbedding())
+        manifest = SyncManifest(os.path.join(tmp, "manifest.sqlite"))
+        print(f"assets={args.assets} churn/run={args.churn:.1%} runs={args.runs}")
+        print(f"{'run':>4} | {'full re-upsert (AGID + legacy copy)':>36} | {'incremental (manifest + aliases)':>40}")
+        for run in range(args.runs):
+            if run:
+                churn()
+            current = docs()
+            CountingEmbedding.calls = 0
+            t0 = time.perf_counter()
+            # legacy behaviour: everything under its AGID and again under its legacy id; deletions never propagate
+            for i in range(0, len(current), 5000):
+                b = current[i:i + 5000]
+                full.upsert(ids=[d["agid"] for d in b], documents=[d["document"] for d in b])
+                full.upsert(ids=[d["legacy_id"] for d in b], documents=[d["document"] for d in b])
+            full_s, full_calls = time.perf_counter() - t0, CountingEmbedding.calls
+            CountingEmbedding.calls = 0
+            t0 = time.perf_counter()
+            st = sync_documents(inc, current, "bench", manifest)
+            inc_s = time.perf_counter() - t0
+            print(f"{run:>4} | {full_calls:>8} embeds {full_s:6.1f}s size {full.count():>7} | "
+                  f"{CountingEmbedding.calls:>8} embeds {inc_s:6.1f}s size {inc.count():>7} "
+                  f"(+{st['added']} ~{st['changed']} -{st['deleted']}, aliases {st['aliases']})")
+        manifest.close()
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
@@ -3,8 +3,11 @@
 """
 Ingest global top 100 hospitals + lead experts/teams + representative clinical research.
 Data: asset_library_l2/top100_hospitals_data.json (Newsweek/Statista World's Best Hospitals 2025 + extended).
-Run from 20260128: python ingest_top100_hospitals.py
+Run from 20260128: python ingest_top100_hospitals.py [--no-sync]
+After ingest, new / changed expert and hospital nodes are synced incrementally to ChromaDB
+(sync_l2_to_chromadb.sync_l2_assets); re-running with unchanged data embeds nothing.
 """
+import argparse
 import json
 import os
 import sys
@@ -73,7 +76,21 @@ def to_trial_records(hospitals, max_per_hospital=1):
     return trials
 
 
-def main():
+def sync_to_chroma():
+    """Incremental L2 -> ChromaDB sync; skipped with a note when chromadb is unavailable."""
+    try:
+        from sync_l2_to_chromadb import sync_l2_assets
+        for st in sync_l2_assets(SCRIPT_DIR):
+            print(f"Chroma sync {st['source']}: +{st['added']} ~{st['changed']} -{st['deleted']} "
+                  f"={st['unchanged']} (embedded {st['embedded']}, collection {st['collection_count']})")
+    except Exception as e:
+        print(f"Chroma sync skip: {e}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ingest top 100 hospitals, lead teams and representative trials")
+    parser.add_argument("--no-sync", action="store_true", help="skip the incremental ChromaDB sync after ingest")
+    args = parser.parse_args(argv)
     sys.path.insert(0, ASSET_LIB)
     import asset_ingest
 
@@ -101,6 +118,12 @@ def main():
     n_t, ids_t = asset_ingest.ingest_trials(trial_records, data_dir=SCRIPT_DIR)
     print(f"Trials (representative): added {n_t}; ids (first 5): {ids_t[:5]}")
 
+    # 4) Refresh the JSON views of the asset store for file readers (registry build, Chroma sync)
+    asset_ingest.export_views(SCRIPT_DIR, ["hospital", "pi", "trial"])
+
+    if not args.no_sync:
+        sync_to_chroma()
+
     print("\nDone. Regenerate physical node registry: python sync_l2_to_chromadb.py")
     return 0
 
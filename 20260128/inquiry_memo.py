@@ -0,0 +1,125 @@
+# V4.0_STRATEGIC_LOCKED_BY_SMITH_LIN
+# -*- coding: utf-8 -*-
+"""
+Inquiry-level memoization for audit runs over template-generated corpora.
+Key = sha256(config fingerprint, inquiry) over the exact text run_safe receives: L1's sliding entropy
+depends on whitespace and Unicode form, so inquiries are not normalized (unlike the query-embedding
+cache, which only affects L3 vectors). A hit reuses the full compact result of the first occurrence with the per-record fields (request_id, asset_category) rewritten, so without timings
+a memoized run's output is identical to an unmemoized one (with timings, hits carry memo_hit=True
+and their own lookup latency). The fingerprint covers amah_config.json and the bridge
+mode (mock / endpoint / top_k), so a config change never serves stale results.
+Disable memoization (enabled=False / --no-memo) for latency-measurement runs.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+RECORD_FIELDS = ("request_id", "asset_category")
+
+
+def config_fingerprint(base_dir: Optional[str] = None, **extra: Any) -> str:
+    """sha256 over amah_config.json bytes and extra run parameters (mock, top_k, endpoint, ...)."""
+    base_dir = base_dir or os.path.dirname(os.path.abspath(__file__))
+    h = hashlib.sha256()
+    try:
+        with open(os.path.join(base_dir, "amah_config.json"), "rb") as f:
+            h.update(f.read())
+    except OSError:
+        h.update(b"no-config")
+    h.update(json.dumps(extra, sort_keys=True, default=str).encode("utf-8"))
+    return h.hexdigest()[:16]
+
+
+def reuse_result(cached: Dict[str, Any], record: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of a cached compact result with the record-specific fields rewritten for `record`."""
+    out = json.loads(json.dumps(cached))
+    for field in RECORD_FIELDS:
+        out[field] = record.get(field, "")
+    return out
+
+
+class InquiryMemo:
+    """Thread-safe in-process memo of compact audit results keyed by the exact inquiry text."""
+
+    def __init__(self, fingerprint: str, enabled: bool = True):
+        self.fingerprint = fingerprint
+        self.enabled = enabled
+        self._results: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._miss_seconds = 0.0
+        self._hit_seconds = 0.0
+
+    def key(self, record: Dict[str, Any]) -> str:
+        text = record.get("original_inquiry") or ""  # verbatim: run_safe sees the raw text
+        return hashlib.sha256(f"{self.fingerprint}\x00{text}".encode("utf-8")).hexdigest()
+
+    def lookup(self, record: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            return self._results.get(self.key(record))
+
+    def store(self, record: Dict[str, Any], result: Dict[str, Any]) -> None:
+        # Errored results are not memoized: a transient failure must not be replayed to duplicates.
+        if self.enabled and not result.get("error_msg"):
+            with self._lock:
+                self._results.setdefault(self.key(record), result)
+
+    def _hit(self, cached: Dict[str, Any], record: Dict[str, Any], t0: float) -> Dict[str, Any]:
+        out = reuse_result(cached, record)
+        if "latency_ms" in cached:
+            out["latency_ms"] = round((time.perf_counter() - t0) * 1000, 3)
+            out["stage_latency_ms"] = {}
+            out["memo_hit"] = True
+        with self._lock:
+            self._hits += 1
+            self._hit_seconds += time.perf_counter() - t0
+        return out
+
+    def serve(self, record: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Reused result for `record` on a hit (counted), None on a miss (not counted)."""
+        t0 = time.perf_counter()
+        cached = self.lookup(record)
+        return None if cached is None else self._hit(cached, record, t0)
+
+    def fan_out(self, cached: Dict[str, Any], record: Dict[str, Any]) -> Dict[str, Any]:
+        """Counted hit for a duplicate whose first occurrence was computed elsewhere (sharded runner)."""
+        return self._hit(cached, record, time.perf_counter())
+
+    def record_miss(self, record: Dict[str, Any], result: Dict[str, Any], seconds: float) -> None:
+        """Count a computed result (seconds = its compute time) and memoize it."""
+        with self._lock:
+            self._misses += 1
+            self._miss_seconds += seconds
+        self.store(record, result)
+
+    def get_or_run(self, record: Dict[str, Any], compute: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """Return a reused result on a hit; otherwise run compute() (timed) and memoize its output."""
+        out = self.serve(record)
+        if out is not None:
+            return out
+        t0 = time.perf_counter()
+        result = compute()
+        self.record_miss(record, result, time.perf_counter() - t0)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            per_miss = self._miss_seconds / self._misses if self._misses else 0.0
+            saved = self._hits * per_miss - self._hit_seconds
+            return {
+                "enabled": self.enabled,
+                "fingerprint": self.fingerprint,
+                "lookups": lookups,
+                "hits": self._hits,
+                "misses": self._misses,
+                "distinct": len(self._results),
+                "dedup_ratio": round(self._hits / lookups, 4) if lookups else 0.0,
+                "saved_seconds_est": round(max(0.0, saved), 2),
+            }
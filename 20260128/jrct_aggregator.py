@@ -1,8 +1,12 @@
 # 文件名: jrct_aggregator.py
 import requests
-import json
+import os
+import sys
 import time
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "asset_library_l2"))
+from asset_store import AssetStore
+
 def fetch_japanese_assets():
     print("🇯🇵 启动日本 jRCT 专项资产抓取程序...")
     
@@ -12,15 +16,9 @@ def fetch_japanese_assets():
         "Parkinson", "DBS", "spinal cord injury", "exosome"
     ]
     
-    all_assets = []
-    # 加载现有 ID 避免重复
-    try:
-        with open("merged_data.json", "r", encoding="utf-8") as f:
-            existing_data = json.load(f)
-            seen_ids = {item['id'] for item in existing_data}
-            all_assets = existing_data
-    except:
-        seen_ids = set()
+    # L2 资产库（SQLite）：按唯一索引去重，每次检索结果一批写入，不再整表读写 merged_data.json
+    store = AssetStore(".")
+    seen_ids = set()
 
     session = requests.Session()
     
@@ -43,13 +41,14 @@ def fetch_japanese_assets():
             if response.status_code != 200: continue
             
             trials = response.json().get('trials', [])
+            batch = []
             for t in trials:
                 tid = t.get('TrialID')
                 if tid not in seen_ids:
                     seen_ids.add(tid)
                     
                     # 映射至您的统一数据模型
-                    all_assets.append({
+                    batch.append({
                         "id": tid,
                         "source": "jRCT_Japan_Official",
                         "category": "Regenerative", # 日本资源多为此类
@@ -57,17 +56,17 @@ def fetch_japanese_assets():
                         "status": "Active",
                         "criteria": t.get('Inclusion_Criteria', '') + "\n" + t.get('Exclusion_Criteria', '')
                     })
+            added, _ = store.upsert("trial", batch)
             
-            print(f"✅ 已整合 {len(trials)} 项日本项目。")
+            print(f"✅ 已整合 {len(trials)} 项日本项目（新增 {len(added)} 项）。")
             time.sleep(1)
         except Exception as e:
             print(f"⚠️ 日本节点响应异常: {e}")
 
-    # 保存全量数据
-    with open("merged_data.json", "w", encoding="utf-8") as f:
-        json.dump(all_assets, f, ensure_ascii=False, indent=2)
-    
-    print(f"🔥 战略资产库已更新，当前规模: {len(all_assets)} 项")
+    # 导出 merged_data.json 视图（仅在有新增时重写），供现有读取方使用
+    store.export_views(["trial"])
+    print(f"🔥 战略资产库已更新，当前规模: {store.count('trial')} 项")
+    store.close()
 
 if __name__ == "__main__":
     fetch_japanese_assets()
@@ -0,0 +1,624 @@
+# V4.0_STRATEGIC_LOCKED_BY_SMITH_LIN
+# -*- coding: utf-8 -*-
+"""
+Lexical (BM25) index over asset documents, kept next to a Chroma collection, and rank fusion with
+vector results. Dense embeddings blur exact identifiers (EGFR L858R vs T790M, KRAS G12C vs G12D, NCT ids,
+drug codes); BM25 over identifier-preserving tokens ranks them exactly.
+Storage is one SQLite (WAL) file per collection: an FTS5 table of pre-tokenized terms plus a docs table
+(id, content hash). Tokens are lower-case alphanumeric runs; hyphen/slash/dot compounds also emit the
+joined form (STN-DBS -> stn, dbs, stndbs; AMG-510 -> amg, 510, amg510); CJK runs become character bigrams.
+Maintenance and use are gated on hybrid_retrieval.enabled in amah_config.json (open_lexical): with it off,
+writers leave the index alone and callers stay vector-only; rebuild (--build) after turning it on.
+Maintenance:
+  - incremental_sync.sync_documents(..., lexical=index) mirrors every upsert / delete it sends to Chroma
+  - LexicalIndex.sync_from_collection() hash-diffs a collection page by page (first build / catch-up)
+Fusion: reciprocal_rank_fusion() (weighted RRF, k=60) or weighted_fusion() (min-max normalized scores).
+hybrid_query() runs both retrievers over a small top-k union and returns a Chroma-shaped result. Its BM25 stage is
+bounded: only identifier terms of the query (NCT ids, gene symbols, variants, drug codes) are matched, at most
+MAX_IDENTIFIER_TERMS of them with LIMIT <= MAX_LEXICAL_CANDIDATES; terms in more than MAX_TERM_DOCS documents
+(gene symbols on a large collection) only re-score the vector candidates, and a query naming no identifier skips
+the lexical stage (LexicalIndex.search_identifiers).
+Run as script: build / sync an index, or benchmark precision@k on a labeled synthetic set.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    from chromadb.api.types import EmbeddingFunction as _EmbeddingFunction
+except ImportError:  # the index and fusion need no chromadb; only the benchmark embedder subclasses it
+    _EmbeddingFunction = object
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CANDIDATES = 50
+DEFAULT_FUSION = "weighted"
+RRF_K = 60
+IDENTIFIER_BOOST = 2.0
+MAX_QUERY_TERMS = 64
+MAX_IDENTIFIER_TERMS = 8
+MAX_LEXICAL_CANDIDATES = 100
+MAX_TERM_DOCS = 1000
+_MAX_VARS = 900
+
+_TOKEN_RE = re.compile(r"[0-9a-z]+(?:[-/.][0-9a-z]+)*|[㐀-䶿一-鿿]+")
+_SPLIT_RE = re.compile(r"[-/.]")
+_CJK_RE = re.compile(r"[㐀-䶿一-鿿]")
+# exact identifiers: letter+digit mixes (G12C, L858R, NCT04589845, AMG-510) or upper-case symbols (KRAS, EGFR)
+_IDENTIFIER_RE = re.compile(r"\b(?:[A-Za-z]+[-]?\d[\w-]*|\d+[A-Za-z][\w-]*|[A-Z][A-Z0-9]{2,})\b")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in into is it of on or the this that to with without "
+    "patient patients study trial".split())
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    rowid        INTEGER PRIMARY KEY,
+    id           TEXT NOT NULL UNIQUE,
+    content_hash TEXT NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS terms USING fts5(body, tokenize = 'unicode61 remove_diacritics 0');
+CREATE VIRTUAL TABLE IF NOT EXISTS terms_vocab USING fts5vocab(terms, 'row');
+"""
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Identifier-preserving tokens (see module docstring); stopwords dropped, order kept."""
+    out: List[str] = []
+    for run in _TOKEN_RE.findall(unicodedata.normalize("NFKC", text or "").lower()):
+        if _CJK_RE.match(run):
+            out.extend([run] if len(run) == 1 else [run[i:i + 2] for i in range(len(run) - 1)])
+            continue
+        parts = _SPLIT_RE.split(run)
+        out.extend(p for p in parts if p not in _STOPWORDS)
+        if len(parts) > 1:
+            out.append("".join(parts))
+    return out
+
+
+def index_text(document: Optional[str], metadata: Optional[Dict[str, Any]] = None) -> str:
+    """Indexed text of one asset: document plus its string metadata values (names, titles, codes)."""
+    values = [v for v in (metadata or {}).values() if isinstance(v, str)]
+    return " ".join([document or ""] + values)
+
+
+def _hash(document: Optional[str], metadata: Optional[Dict[str, Any]]) -> str:
+    payload = json.dumps([document or "", metadata or {}], ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _match_any(tokens: Iterable[str]) -> str:
+    seen = list(dict.fromkeys(tokens))[:MAX_QUERY_TERMS]
+    return " OR ".join(f'"{t}"' for t in seen)
+
+
+def has_identifier(text: Optional[str]) -> bool:
+    return bool(_IDENTIFIER_RE.search(text or ""))
+
+
+def identifier_terms(text: Optional[str], anchors: Sequence[str] = (), limit: int = MAX_IDENTIFIER_TERMS) -> List[str]:
+    """
+    Index terms of the identifiers named in text, anchors first: a compound keeps only its joined form
+    (AMG-510 -> amg510), so generic parts (amg, 510) never reach the MATCH. At most `limit` terms.
+    """
+    terms: List[str] = []
+    for word in " ".join([a for a in anchors if a] + _IDENTIFIER_RE.findall(text or "")).split():
+        toks = tokenize(word)
+        terms.extend(toks if toks and _CJK_RE.match(toks[0]) else toks[-1:])
+    return list(dict.fromkeys(terms))[:limit]
+
+
+def query_weights(query: str, vector_weight: float = 1.0, lexical_weight: float = 1.0,
+                  identifier_boost: float = IDENTIFIER_BOOST) -> Tuple[float, float]:
+    """(vector, lexical) fusion weights; the lexical side counts identifier_boost times when the query names an identifier."""
+    return vector_weight, lexical_weight * (identifier_boost if has_identifier(query) else 1.0)
+
+
+def default_index_path(chromadb_path: str, collection_name: str) -> str:
+    """<db dir>_lexical/<collection>.sqlite: next to the Chroma directory, never inside it."""
+    return os.path.join(os.path.abspath(chromadb_path).rstrip(os.sep) + "_lexical", f"{collection_name}.sqlite")
+
+
+def load_hybrid_config(base_dir: Optional[str] = None) -> Dict[str, Any]:
+    """The hybrid_retrieval block of amah_config.json ({} when missing or unreadable)."""
+    path = os.path.join(base_dir or os.path.dirname(os.path.abspath(__file__)), "amah_config.json")
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return dict(json.load(f).get("hybrid_retrieval") or {})
+    except Exception:
+        return {}
+
+
+def open_lexical(chromadb_path: str, collection_name: str, cfg: Optional[Dict[str, Any]] = None,
+                 base_dir: Optional[str] = None, path: Optional[str] = None,
+                 create: bool = False) -> Optional["LexicalIndex"]:
+    """
+    LexicalIndex of a collection when hybrid_retrieval.enabled is set, else None (callers stay vector-only,
+    writers skip index maintenance). cfg defaults to the block in amah_config.json; path defaults to
+    default_index_path. Without create, a missing index file also gives None.
+    """
+    cfg = load_hybrid_config(base_dir) if cfg is None else cfg
+    if not cfg.get("enabled", False):
+        return None
+    path = path or default_index_path(chromadb_path, collection_name)
+    if not create and not os.path.isfile(path):
+        return None
+    return LexicalIndex(path)
+
+
+class LexicalIndex:
+    """BM25 over one collection's documents (SQLite FTS5). Thread-safe; one connection behind a lock."""
+
+    def __init__(self, path: str):
+        self.path = str(path)
+        d = os.path.dirname(self.path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30.0, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=wal")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self) -> "LexicalIndex":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def _rows(self, ids: Sequence[str]) -> Dict[str, Tuple[int, str]]:
+        found: Dict[str, Tuple[int, str]] = {}
+        for i in range(0, len(ids), _MAX_VARS):
+            chunk = ids[i:i + _MAX_VARS]
+            cur = self._conn.execute(
+                f"SELECT id, rowid, content_hash FROM docs WHERE id IN ({','.join('?' * len(chunk))})", chunk)
+            found.update((doc_id, (rowid, h)) for doc_id, rowid, h in cur.fetchall())
+        return found
+
+    def upsert(self, ids: Sequence[str], documents: Sequence[Optional[str]],
+               metadatas: Optional[Sequence[Optional[Dict[str, Any]]]] = None) -> int:
+        """Index or re-index ids; rows whose document + metadata hash is unchanged are skipped. Returns rows written."""
+        metadatas = metadatas if metadatas is not None else [None] * len(ids)
+        written = 0
+        with self._lock, self._conn:
+            existing = self._rows(list(ids))
+            for doc_id, doc, meta in zip(ids, documents, metadatas):
+                h = _hash(doc, meta)
+                rowid, old = existing.get(doc_id, (None, None))
+                if rowid is not None:
+                    if old == h:
+                        continue
+                    self._conn.execute("DELETE FROM terms WHERE rowid = ?", (rowid,))
+                    self._conn.execute("UPDATE docs SET content_hash = ? WHERE rowid = ?", (h, rowid))
+                else:
+                    rowid = self._conn.execute("INSERT INTO docs (id, content_hash) VALUES (?, ?)", (doc_id, h)).lastrowid
+                existing[doc_id] = (rowid, h)
+                self._conn.execute("INSERT INTO terms (rowid, body) VALUES (?, ?)",
+                                   (rowid, " ".join(tokenize(index_text(doc, meta)))))
+                written += 1
+        return written
+
+    def delete(self, ids: Sequence[str]) -> int:
+        with self._lock, self._conn:
+            rowids = [rowid for rowid, _ in self._rows(list(ids)).values()]
+            self._conn.executemany("DELETE FROM terms WHERE rowid = ?", [(r,) for r in rowids])
+            self._conn.executemany("DELETE FROM docs WHERE rowid = ?", [(r,) for r in rowids])
+        return len(rowids)
+
+    def search(self, query: str, k: int = DEFAULT_CANDIDATES) -> List[Tuple[str, float]]:
+        """Top-k (id, bm25 score) for any query term; higher is better."""
+        return self._match(_match_any(tokenize(query)), k)
+
+    def search_identifiers(self, query: str, k: int = DEFAULT_CANDIDATES, anchors: Sequence[str] = (),
+                           within: Sequence[str] = ()) -> List[Tuple[str, float]]:
+        """
+        Bounded search for the serving path over identifier_terms(query, anchors); [] when the query names no
+        identifier, and callers fall back to vector hits. Terms found in at most MAX_TERM_DOCS documents retrieve
+        the top-k by BM25 (k capped at MAX_LEXICAL_CANDIDATES, so at most MAX_IDENTIFIER_TERMS * MAX_TERM_DOCS
+        rows are ranked); those hits and the ids in `within` (the vector candidates) are then scored by the idf
+        of the identifier terms their indexed text carries. Common terms (gene symbols on a large collection)
+        therefore only re-score candidates and never scan their posting lists.
+        """
+        terms = identifier_terms(query, anchors)
+        if not terms:
+            return []
+        with self._lock:
+            df = dict(self._conn.execute(
+                f"SELECT term, doc FROM terms_vocab WHERE term IN ({','.join('?' * len(terms))})", terms).fetchall())
+            if not df:
+                return []
+            n = self._conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+            rowids = {}
+            expr = _match_any(t for t, c in df.items() if c <= MAX_TERM_DOCS)
+            if expr:
+                rowids.update(self._conn.execute(
+                    "SELECT t.rowid, d.id FROM terms t JOIN docs d ON d.rowid = t.rowid "
+                    "WHERE terms MATCH ? ORDER BY t.rank LIMIT ?", (expr, min(int(k), MAX_LEXICAL_CANDIDATES))).fetchall())
+            rest = [d for d in list(within)[:MAX_LEXICAL_CANDIDATES] if d not in rowids.values()]
+            rowids.update((rowid, doc_id) for doc_id, (rowid, _) in self._rows(rest).items())
+            bodies = self._conn.execute(
+                f"SELECT rowid, body FROM terms WHERE rowid IN ({','.join('?' * len(rowids))})",
+                list(rowids)).fetchall() if rowids else []
+        idf = {t: math.log((n - c + 0.5) / (c + 0.5) + 1.0) for t, c in df.items()}
+        hits = []
+        for rowid, body in bodies:
+            score = sum(idf[t] for t in idf.keys() & set(body.split()))
+            if score:
+                hits.append((rowids[rowid], score))
+        return sorted(hits, key=lambda x: x[1], reverse=True)
+
+    def _match(self, expr: str, k: int) -> List[Tuple[str, float]]:
+        if not expr:
+            return []
+        with self._lock:
+            cur = self._conn.execute(
+                "SELECT d.id, -t.rank FROM terms t JOIN docs d ON d.rowid = t.rowid "
+                "WHERE terms MATCH ? ORDER BY t.rank LIMIT ?", (expr, int(k)))
+            return [(doc_id, float(score)) for doc_id, score in cur.fetchall()]
+
+    def containing(self, ids: Sequence[str], phrases: Sequence[str]) -> set:
+        """Subset of ids whose indexed text contains any phrase (token sequence match, case-insensitive)."""
+        quoted = [" ".join(tokenize(p)) for p in phrases]
+        expr = " OR ".join(f'"{q}"' for q in quoted if q)
+        if not expr or not ids:
+            return set()
+        out = set()
+        with self._lock:
+            for i in range(0, len(ids), _MAX_VARS):
+                chunk = list(ids[i:i + _MAX_VARS])
+                cur = self._conn.execute(
+                    "SELECT d.id FROM terms t JOIN docs d ON d.rowid = t.rowid "
+                    f"WHERE terms MATCH ? AND d.id IN ({','.join('?' * len(chunk))})", [expr] + chunk)
+                out.update(r[0] for r in cur.fetchall())
+        return out
+
+    def sync_from_collection(self, collection: Any, page_size: int = 2000) -> Dict[str, int]:
+        """Hash-diff the whole collection into the index: re-index changed rows, drop ids no longer present."""
+        from bulk_maintenance import iter_id_pages
+        from bulk_pipeline import max_batch_size
+
+        t0 = time.perf_counter()
+        seen = set()
+        written = 0
+        for page in iter_id_pages(collection, max_batch_size(collection, page_size)):
+            got = collection.get(ids=page, include=["documents", "metadatas"])
+            written += self.upsert(got["ids"], got["documents"], got["metadatas"])
+            seen.update(got["ids"])
+        with self._lock:
+            stale = [r[0] for r in self._conn.execute("SELECT id FROM docs").fetchall() if r[0] not in seen]
+        removed = self.delete(stale) if stale else 0
+        with self._lock, self._conn:
+            self._conn.execute("INSERT INTO terms (terms) VALUES ('optimize')")
+        return {"indexed": len(seen), "written": written, "removed": removed,
+                "seconds": round(time.perf_counter() - t0, 2)}
+
+
+# ------------------------------------------------------------------------------
+# Fusion
+# ------------------------------------------------------------------------------
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int = RRF_K,
+                           weights: Optional[Sequence[float]] = None) -> List[Tuple[str, float]]:
+    """Weighted RRF: score(d) = sum_i w_i / (k + rank_i(d)), ranks from 1. Ties keep first-seen order."""
+    weights = list(weights) if weights is not None else [1.0] * len(rankings)
+    scores: Dict[str, float] = {}
+    for w, ranking in zip(weights, rankings):
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + w / (k + rank)
+    return sorted(scores.items(), key=lambda x: x[1], reverse=True)
+
+
+def weighted_fusion(scored: Sequence[Sequence[Tuple[str, float]]],
+                    weights: Optional[Sequence[float]] = None) -> List[Tuple[str, float]]:
+    """Min-max normalize each list's scores (higher is better) to [0, 1] and sum them with weights."""
+    weights = list(weights) if weights is not None else [1.0] * len(scored)
+    scores: Dict[str, float] = {}
+    for w, items in zip(weights, scored):
+        if not items:
+            continue
+        lo = min(s for _, s in items)
+        span = max(s for _, s in items) - lo
+        for doc_id, s in items:
+            # a list whose scores are all equal (e.g. a single hit) counts fully for every entry
+            scores[doc_id] = scores.get(doc_id, 0.0) + w * ((s - lo) / span if span else 1.0)
+    return sorted(scores.items(), key=lambda x: x[1], reverse=True)
+
+
+def fuse(vector_hits: Sequence[Tuple[str, float]], lexical_hits: Sequence[Tuple[str, float]], method: str = DEFAULT_FUSION,
+         vector_weight: float = 1.0, lexical_weight: float = 1.0, rrf_k: int = RRF_K) -> List[Tuple[str, float]]:
+    """
+    Fuse (id, similarity) vector hits with (id, bm25) lexical hits. Scores are scaled so the best possible
+    document scores 1.0 (RRF: first in every list; weighted: top of every list).
+    """
+    total = (vector_weight if vector_hits else 0.0) + (lexical_weight if lexical_hits else 0.0) or 1.0
+    if method == "weighted":
+        fused = weighted_fusion([vector_hits, lexical_hits], [vector_weight, lexical_weight])
+        return [(d, s / total) for d, s in fused]
+    if method != "rrf":
+        raise ValueError(f"unknown fusion method {method!r}; expected 'rrf' or 'weighted'")
+    fused = reciprocal_rank_fusion([[d for d, _ in vector_hits], [d for d, _ in lexical_hits]], rrf_k,
+                                   [vector_weight, lexical_weight])
+    best = total / (rrf_k + 1)
+    return [(d, s / best) for d, s in fused]
+
+
+def hybrid_query(
+    collection: Any,
+    lexical: Optional[LexicalIndex],
+    query_text: str,
+    n_results: int = 10,
+    candidates: int = DEFAULT_CANDIDATES,
+    method: str = DEFAULT_FUSION,
+    vector_weight: float = 1.0,
+    lexical_weight: float = 1.0,
+    identifier_boost: float = IDENTIFIER_BOOST,
+    include: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """
+    Vector top-`candidates` and BM25 top-`candidates` (identifier terms only, see search_identifiers), fused;
+    documents / metadatas of the fused top n_results are fetched in one get(). Returns a Chroma-shaped result plus "scores" (fused, best = 1.0).
+    """
+    vector_weight, lexical_weight = query_weights(query_text, vector_weight, lexical_weight, identifier_boost)
+    include = list(include or ["documents", "metadatas", "distances"])
+    k = max(n_results, candidates)
+    res = collection.query(query_texts=[query_text], n_results=k, include=["distances"])
+    ids, dists = (res.get("ids") or [[]])[0], (res.get("distances") or [[]])[0]
+    vector_hits = [(a, 1.0 - float(d)) for a, d in zip(ids, dists)]
+    lexical_hits = lexical.search_identifiers(query_text, k, within=ids) if lexical is not None else []
+    fused = fuse(vector_hits, lexical_hits, method, vector_weight, lexical_weight)[:n_results]
+    top = [d for d, _ in fused]
+    distance = {a: float(d) for a, d in zip(ids, dists)}
+    out: Dict[str, Any] = {"ids": [top], "scores": [[s for _, s in fused]],
+                           "distances": [[distance.get(d) for d in top]] if "distances" in include else None,
+                           "documents": None, "metadatas": None}
+    wanted = [key for key in ("documents", "metadatas") if key in include]
+    if wanted and top:
+        got = collection.get(ids=top, include=wanted)
+        pos = {a: i for i, a in enumerate(got["ids"])}
+        for key in wanted:
+            out[key] = [[got[key][pos[d]] if d in pos else None for d in top]]
+    return out
+
+
+# ------------------------------------------------------------------------------
+# Benchmark: precision@k on a labeled synthetic set
+# ------------------------------------------------------------------------------
+_DISEASES = {
+    "nsclc": ["non-small cell lung cancer", "NSCLC", "lung adenocarcinoma", "pulmonary carcinoma"],
+    "crc": ["colorectal cancer", "CRC", "colon carcinoma", "bowel cancer"],
+    "pdac": ["pancreatic cancer", "PDAC", "pancreatic adenocarcinoma", "pancreas carcinoma"],
+    "melanoma": ["melanoma", "cutaneous melanoma", "skin melanoma", "malignant melanoma"],
+    "breast": ["breast cancer", "mammary carcinoma", "HER2 positive breast tumour", "breast carcinoma"],
+    "parkinson": ["Parkinson disease", "parkinsonism", "PD tremor", "Parkinson's"],
+}
+# lay / alternative names used only in queries: no word overlap with any document
+_QUERY_SYNONYMS = {
+    "nsclc": "pulmonary neoplasm",
+    "crc": "intestinal malignancy",
+    "pdac": "exocrine neoplasm",
+    "melanoma": "melanocytic malignancy",
+    "breast": "ductal neoplasm",
+    "parkinson": "dopaminergic neurodegeneration",
+}
+_VARIANTS = {
+    "EGFR": ["L858R", "T790M", "exon19del", "C797S", "exon20ins"],
+    "KRAS": ["G12C", "G12D", "G12V", "G13D", "Q61H"],
+    "BRAF": ["V600E", "V600K", "fusion"],
+    "ALK": ["fusion", "G1202R", "L1196M"],
+    "ERBB2": ["amplification", "S310F", "exon20ins"],
+    "LRRK2": ["G2019S", "R1441C"],
+}
+_FILLER = ("open-label multicentre phase 2 study evaluating efficacy safety tolerability dose escalation "
+           "expansion cohort biomarker selected adults previously treated standard therapy progression "
+           "response rate survival endpoint centre investigator enrolment").split()
+
+
+class ShapeEmbedding(_EmbeddingFunction):
+    """
+    Stand-in for a dense sentence encoder (no model download in the benchmark): synonyms of a disease share
+    one concept direction, and alphanumeric identifiers collapse to their shape (G12C ~ G12D ~ G13D,
+    NCT05001234 ~ NCT04589845), which is the failure mode of dense retrieval on exact identifiers.
+    """
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+        self._concepts = {}
+        for concept, names in _DISEASES.items():
+            for name in names + [_QUERY_SYNONYMS[concept]]:
+                for tok in tokenize(name):
+                    self._concepts.setdefault(tok, concept)
+
+    @staticmethod
+    def name() -> str:
+        return "shape-bench"
+
+    def get_config(self) -> Dict[str, Any]:
+        return {"dim": self.dim}
+
+    @staticmethod
+    def build_from_config(config: Dict[str, Any]) -> "ShapeEmbedding":
+        return ShapeEmbedding(int(config.get("dim", 256)))
+
+    def _vec(self, key: str) -> Any:
+        import numpy as np
+        seed = int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+        return np.random.default_rng(seed).standard_normal(self.dim).astype(np.float32)
+
+    def __call__(self, input: List[str]) -> List[Any]:
+        import numpy as np
+        out = []
+        for text in input:
+            v = np.zeros(self.dim, dtype=np.float32)
+            for tok in tokenize(text):
+                if tok in self._concepts:
+                    v += 2.0 * self._vec("concept:" + self._concepts[tok])
+                elif any(c.isdigit() for c in tok):
+                    v += 0.5 * self._vec("shape:" + re.sub(r"\d", "0", re.sub(r"[a-z]", "a", tok)))
+                else:
+                    v += self._vec(tok)
+            out.append((v / (np.linalg.norm(v) or 1.0)).tolist())
+        return out
+
+
+def _bench_assets(n: int, seed: int = 5) -> List[Dict[str, Any]]:
+    import random
+    rng = random.Random(seed)
+    assets = []
+    for i in range(n):
+        disease = rng.choice(sorted(_DISEASES))
+        gene = rng.choice(sorted(_VARIANTS))
+        variant = rng.choice(_VARIANTS[gene])
+        drug = f"{rng.choice(['AMG', 'MRTX', 'JNJ', 'BAY', 'LY', 'RMC'])}-{rng.randint(100, 9999)}"
+        nct = f"NCT0{rng.randint(1000000, 6999999)}"
+        doc = " ".join([f"{drug} in {gene} {variant}", rng.choice(_DISEASES[disease])] + rng.sample(_FILLER, 8)
+                       + [nct])
+        assets.append({"id": f"asset_{i:06d}", "document": doc, "disease": disease, "gene": gene,
+                       "variant": variant, "drug": drug, "nct": nct})
+    return assets
+
+
+def _bench_queries(assets: List[Dict[str, Any]], n: int, seed: int = 9) -> List[Tuple[str, str, set]]:
+    """(kind, query text, relevant ids) with relevance derived from the asset labels."""
+    import random
+    rng = random.Random(seed)
+    by_key: Dict[Tuple[str, ...], set] = {}
+    for a in assets:
+        by_key.setdefault(("variant", a["disease"], a["gene"], a["variant"]), set()).add(a["id"])
+        by_key.setdefault(("disease", a["disease"]), set()).add(a["id"])
+    queries = []
+    for i in range(n):
+        a = rng.choice(assets)
+        syn = rng.choice(_DISEASES[a["disease"]])
+        kind = ("variant", "nct", "drug", "disease")[i % 4]
+        if kind == "variant":
+            text = f"{syn} with {a['gene']} {a['variant']} mutation after progression, targeted therapy trial"
+            rel = by_key[("variant", a["disease"], a["gene"], a["variant"])]
+        elif kind == "nct":
+            text = f"details and eligibility for {a['nct']} in {syn}"
+            rel = {a["id"]}
+        elif kind == "drug":
+            text = f"is {a['drug']} recruiting for {syn}"
+            rel = {b["id"] for b in assets if b["drug"] == a["drug"]}
+        else:
+            text = f"{_QUERY_SYNONYMS[a['disease']]} second opinion, any interventional programme"
+            rel = by_key[("disease", a["disease"])]
+        queries.append((kind, text, rel))
+    return queries
+
+
+def bench(n_assets: int = 20_000, n_queries: int = 400, k: int = 5, candidates: int = DEFAULT_CANDIDATES) -> Dict[str, Any]:
+    import shutil
+    import tempfile
+
+    import chromadb
+
+    from bulk_pipeline import max_batch_size
+
+    tmp = tempfile.mkdtemp(prefix="lexical_bench_")
+    try:
+        assets = _bench_assets(n_assets)
+        queries = _bench_queries(assets, n_queries)
+        ef = ShapeEmbedding()
+        client = chromadb.PersistentClient(path=os.path.join(tmp, "db"))
+        col = client.create_collection("bench_assets", metadata={"hnsw:space": "cosine"}, embedding_function=None)
+        step = max_batch_size(col, 5000)
+        for i in range(0, len(assets), step):
+            batch = assets[i:i + step]
+            docs = [a["document"] for a in batch]
+            col.add(ids=[a["id"] for a in batch], documents=docs, embeddings=ef(docs))
+        lex = LexicalIndex(os.path.join(tmp, "db_lexical", "bench_assets.sqlite"))
+        t0 = time.perf_counter()
+        lex.sync_from_collection(col)
+        build_s = time.perf_counter() - t0
+        modes = ("vector", "bm25", "rrf", "weighted", "rrf+boost", "weighted+boost")
+        prec = {m: {} for m in modes}
+        lat = {"vector": [], "bm25": [], "hybrid": []}
+        for kind, text, rel in queries:
+            q_emb = ef([text])
+            t0 = time.perf_counter()
+            res = col.query(query_embeddings=q_emb, n_results=k, include=["distances"])
+            lat["vector"].append(time.perf_counter() - t0)
+            vec_top = res["ids"][0]
+            t0 = time.perf_counter()
+            res = col.query(query_embeddings=q_emb, n_results=candidates, include=["distances"])
+            vector_hits = [(a, 1.0 - d) for a, d in zip(res["ids"][0], res["distances"][0])]
+            t1 = time.perf_counter()
+            lexical_hits = lex.search_identifiers(text, candidates, within=[a for a, _ in vector_hits])
+            lat["bm25"].append(time.perf_counter() - t1)
+            vw, lw = query_weights(text)
+            fused = fuse(vector_hits, lexical_hits, DEFAULT_FUSION, vw, lw)
+            lat["hybrid"].append(time.perf_counter() - t0)
+            ranked = {"vector": vec_top, "bm25": [d for d, _ in lexical_hits],
+                      f"{DEFAULT_FUSION}+boost": [d for d, _ in fused]}
+            for method in ("rrf", "weighted"):
+                ranked[method] = [d for d, _ in fuse(vector_hits, lexical_hits, method)]
+                ranked.setdefault(f"{method}+boost", [d for d, _ in fuse(vector_hits, lexical_hits, method, vw, lw)])
+            for mode in modes:
+                top = ranked[mode]
+                ideal = min(k, len(rel))
+                prec[mode].setdefault(kind, []).append(sum(d in rel for d in top[:k]) / ideal)
+        lex.close()
+        pct = lambda xs, q: sorted(xs)[min(len(xs) - 1, int(round(q * (len(xs) - 1))))] * 1000
+        return {
+            "assets": n_assets, "queries": n_queries, "k": k, "candidates": candidates, "build_s": build_s,
+            "precision": {m: {kind: sum(v) / len(v) for kind, v in per.items()} for m, per in prec.items()},
+            "overall": {m: sum(sum(v) for v in per.values()) / n_queries for m, per in prec.items()},
+            "latency_ms": {m: (pct(v, 0.5), pct(v, 0.95)) for m, v in lat.items()},
+        }
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="BM25 lexical index next to a Chroma collection")
+    parser.add_argument("--build", metavar="COLLECTION", help="build / catch up the index of COLLECTION")
+    parser.add_argument("--db", default="./amah_vector_db")
+    parser.add_argument("--index", default=None, help="index file (default <db>_lexical/<collection>.sqlite)")
+    parser.add_argument("--search", metavar="TEXT", help="BM25 search the index of --build COLLECTION")
+    parser.add_argument("--bench", action="store_true", help="precision@k: vector vs BM25 vs fusion, synthetic set")
+    parser.add_argument("--assets", type=int, default=20_000)
+    parser.add_argument("--queries", type=int, default=400)
+    parser.add_argument("-k", type=int, default=5)
+    args = parser.parse_args()
+    if args.bench:
+        r = bench(args.assets, args.queries, args.k)
+        print(f"assets={r['assets']:,} queries={r['queries']} precision@{r['k']} "
+              f"(top-{r['candidates']} union per retriever, BM25 build {r['build_s']:.1f}s)")
+        kinds = list(next(iter(r["precision"].values())))
+        print(f"  {'mode':<15}" + "".join(f"{k:>10}" for k in kinds) + f"{'overall':>10}")
+        for mode, per in r["precision"].items():
+            print(f"  {mode:<15}" + "".join(f"{per[k]:>10.3f}" for k in kinds) + f"{r['overall'][mode]:>10.3f}")
+        for mode, (p50, p95) in r["latency_ms"].items():
+            print(f"  latency {mode:<7} p50 {p50:6.2f}ms p95 {p95:6.2f}ms")
+        return
+    if not args.build:
+        parser.error("--build COLLECTION or --bench is required")
+    path = args.index or default_index_path(args.db, args.build)
+    with LexicalIndex(path) as lex:
+        if args.search:
+            for doc_id, score in lex.search(args.search, 10):
+                print(f"{score:8.3f}  {doc_id}")
+            return
+        import chromadb
+        col = chromadb.PersistentClient(path=args.db).get_collection(args.build)
+        stats = lex.sync_from_collection(col)
+        print(f"{args.build} -> {path}: {stats}")
+
+
+if __name__ == "__main__":
+    main()
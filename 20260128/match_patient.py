@@ -1,9 +1,28 @@
 # 文件名: match_patient.py
+import os
+
 import chromadb
 from langchain_openai import OpenAIEmbeddings
 
 client = chromadb.PersistentClient(path="./medical_db")
 collection = client.get_collection(name="mayo_clinic_trials")
+# 学科分片：amah_config.json 中 vector_sharding.enabled 开启且分片未过期（源库条数与构建时一致）时按意图路由；
+# 分片是一次性拷贝，batch_build_db / 批量加载后需重建（python shard_router.py --build mayo_clinic_trials --db ./medical_db）
+router = None
+try:
+    from shard_router import open_router
+    router = open_router(client, "mayo_clinic_trials", base_dir=os.path.dirname(os.path.abspath(__file__)))
+except Exception as e:
+    print(f"学科分片不可用，检索整库: {e}")
+# 混合检索：amah_config.json 中 hybrid_retrieval.enabled 开启且 BM25 词法索引
+# （python lexical_index.py --build mayo_clinic_trials --db ./medical_db）存在时做词法+向量混合检索，
+# NCT 编号、突变位点、药物代号等精确标识符由 BM25 命中
+lexical = None
+try:
+    from lexical_index import hybrid_query, open_lexical
+    lexical = open_lexical("./medical_db", "mayo_clinic_trials", base_dir=os.path.dirname(os.path.abspath(__file__)))
+except Exception as e:
+    print(f"BM25 索引不可用，仅向量检索: {e}")
 
 # 模拟一个高净值客户的中文需求
 patient_query = """
@@ -15,10 +34,17 @@ patient_query = """
 print(f"正在为患者匹配全球资源：\n{patient_query}")
 
 # 在向量空间中搜索最近的邻居
-results = collection.query(
-    query_texts=[patient_query],
-    n_results=1
-)
+if lexical is not None:
+    results = hybrid_query(collection, lexical, patient_query, n_results=1)
+    print(f"混合检索融合得分: {results['scores'][0]}")
+elif router is not None:
+    results = router.query(patient_query, n_results=1)
+    print(f"路由分片: {results['shards']}")
+else:
+    results = collection.query(
+        query_texts=[patient_query],
+        n_results=1
+    )
 
 # 输出结果
 if results['documents']:
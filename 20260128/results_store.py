@@ -0,0 +1,277 @@
+# V4.0_STRATEGIC_LOCKED_BY_SMITH_LIN
+# -*- coding: utf-8 -*-
+"""
+Columnar store for audit results (matching_audit_results_10k*.json) with vectorized statistics.
+Scalar fields are kept as typed columns: floats (D-value, variance, latencies; NaN = missing), ints,
+booleans, and dictionary-encoded strings (int32 codes into a per-column dictionary; -1 = None).
+Persistence: Parquet via pyarrow when installed, otherwise NumPy .npz plus <base>.dict.json holding
+the string dictionaries. stats() reproduces build_stats() exactly using bincount/masks; histograms and
+latency percentiles are vectorized too. Run as script to print the summary of a stored run or to benchmark.
+"""
+import json
+import logging
+import os
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+STATUSES = ("passed", "intercepted", "error")
+STRING_COLUMNS = ("request_id", "asset_category", "status", "top_agid", "error_msg")
+FLOAT_COLUMNS = ("d_effective", "variance", "latency_ms", "l1_ms", "l2_ms", "l3_ms", "l4_ms")
+INT_COLUMNS = ("agid_count",)
+BOOL_COLUMNS = ("intercepted",)
+STAGES = ("l1", "l2", "l3", "l4")
+
+
+def _status(r: Dict[str, Any]) -> str:
+    if r.get("error_msg"):
+        return "error"
+    return "intercepted" if r.get("intercepted") else "passed"
+
+
+def _float(v: Any) -> float:
+    return float("nan") if v is None else float(v)
+
+
+class ColumnarResults:
+    """Audit results as typed NumPy columns plus string dictionaries."""
+
+    def __init__(self, columns: Dict[str, np.ndarray], dictionaries: Dict[str, List[str]]):
+        self.columns = columns
+        self.dictionaries = dictionaries
+
+    def __len__(self) -> int:
+        return len(self.columns["intercepted"])
+
+    # -- build ----------------------------------------------------------------
+    @classmethod
+    def from_results(cls, results: Iterable[Dict[str, Any]]) -> "ColumnarResults":
+        """Single streaming pass over result dicts (list, generator or JsonlCheckpoint.iter_results())."""
+        codes = {c: array("i") for c in STRING_COLUMNS}
+        lookup: Dict[str, Dict[str, int]] = {c: {} for c in STRING_COLUMNS}
+        floats = {c: array("d") for c in FLOAT_COLUMNS}
+        ints = {c: array("i") for c in INT_COLUMNS}
+        bools = {c: array("b") for c in BOOL_COLUMNS}
+        for r in results:
+            stage = r.get("stage_latency_ms") or {}
+            strings = {
+                "request_id": r.get("request_id"),
+                "asset_category": r.get("asset_category") or "Unknown",
+                "status": _status(r),
+                "top_agid": r.get("top_agid"),
+                "error_msg": r.get("error_msg") or None,
+            }
+            for c, v in strings.items():
+                if v is None:
+                    codes[c].append(-1)
+                else:
+                    d = lookup[c]
+                    code = d.get(v)
+                    if code is None:
+                        code = d[v] = len(d)
+                    codes[c].append(code)
+            floats["d_effective"].append(_float(r.get("d_effective")))
+            floats["variance"].append(_float(r.get("variance")))
+            floats["latency_ms"].append(_float(r.get("latency_ms")))
+            for s in STAGES:
+                floats[f"{s}_ms"].append(_float(stage.get(s)))
+            ints["agid_count"].append(int(r.get("agid_count") or 0))
+            bools["intercepted"].append(1 if r.get("intercepted", True) else 0)
+        columns: Dict[str, np.ndarray] = {}
+        for c in STRING_COLUMNS:
+            columns[c] = np.frombuffer(codes[c], dtype=np.int32).copy()
+        for c in FLOAT_COLUMNS:
+            columns[c] = np.frombuffer(floats[c], dtype=np.float64).copy()
+        for c in INT_COLUMNS:
+            columns[c] = np.frombuffer(ints[c], dtype=np.int32).copy()
+        for c in BOOL_COLUMNS:
+            columns[c] = np.frombuffer(bools[c], dtype=np.int8).astype(bool)
+        dictionaries = {c: list(lookup[c]) for c in STRING_COLUMNS}
+        return cls(columns, dictionaries)
+
+    def decode(self, column: str) -> List[Optional[str]]:
+        d = self.dictionaries[column]
+        return [d[i] if i >= 0 else None for i in self.columns[column].tolist()]
+
+    # -- persistence ----------------------------------------------------------
+    def save(self, base: str, backend: Optional[str] = None) -> str:
+        """Write <base>.parquet (pyarrow) or <base>.npz + <base>.dict.json; returns the data file path."""
+        base = str(base)
+        backend = backend or ("parquet" if pa is not None else "npz")
+        if backend == "parquet":
+            if pa is None:
+                raise ImportError("pyarrow is required for the parquet backend")
+            arrays = {}
+            for c in STRING_COLUMNS:
+                idx = self.columns[c]
+                arrays[c] = pa.DictionaryArray.from_arrays(
+                    pa.array(idx, mask=idx < 0), pa.array(self.dictionaries[c], type=pa.string()))
+            for c in FLOAT_COLUMNS + INT_COLUMNS + BOOL_COLUMNS:
+                arrays[c] = pa.array(self.columns[c])
+            path = base + ".parquet"
+            pq.write_table(pa.table(arrays), path)
+            return path
+        path = base + ".npz"
+        tmp = base + ".tmp.npz"
+        np.savez(tmp, **self.columns)
+        os.replace(tmp, path)
+        with open(base + ".dict.json.tmp", "w", encoding="utf-8") as f:
+            json.dump(self.dictionaries, f, ensure_ascii=False)
+        os.replace(base + ".dict.json.tmp", base + ".dict.json")
+        return path
+
+    @classmethod
+    def load(cls, base: str) -> "ColumnarResults":
+        """Load from <base>.parquet or <base>.npz (+ .dict.json); base may include the extension."""
+        base = str(base)
+        for ext in (".parquet", ".npz"):
+            if base.endswith(ext):
+                base = base[: -len(ext)]
+        if os.path.exists(base + ".parquet") and pq is not None:
+            table = pq.read_table(base + ".parquet")
+            columns, dictionaries = {}, {}
+            for c in STRING_COLUMNS:
+                col = table.column(c).combine_chunks()
+                if not pa.types.is_dictionary(col.type):
+                    col = col.dictionary_encode()
+                columns[c] = col.indices.fill_null(-1).to_numpy(zero_copy_only=False).astype(np.int32)
+                dictionaries[c] = col.dictionary.to_pylist()
+            for c in FLOAT_COLUMNS + INT_COLUMNS + BOOL_COLUMNS:
+                columns[c] = table.column(c).to_numpy()
+            return cls(columns, dictionaries)
+        with np.load(base + ".npz") as z:
+            columns = {k: z[k] for k in z.files}
+        with open(base + ".dict.json", "r", encoding="utf-8") as f:
+            dictionaries = json.load(f)
+        return cls(columns, dictionaries)
+
+    # -- statistics -----------------------------------------------------------
+    def stats(self, elapsed: float = 0.0) -> Dict[str, Any]:
+        """Same dict as run_training_10k_matching_audit.build_stats, computed with vectorized masks."""
+        col = self.columns
+        total = len(self)
+        intercepted = col["intercepted"]
+        has_agids = col["agid_count"] > 0
+        errors = col["error_msg"] >= 0
+        cats = self.dictionaries["asset_category"]
+        cat = col["asset_category"]
+        n = len(cats)
+        per_total = np.bincount(cat, minlength=n)
+        per_inter = np.bincount(cat, weights=intercepted, minlength=n).astype(np.int64)
+        per_agids = np.bincount(cat, weights=~intercepted & has_agids, minlength=n).astype(np.int64)
+        # Categories in first-seen order, like the dict built by the row-wise loop.
+        by_cat = {
+            cats[i]: {
+                "total": int(per_total[i]),
+                "intercepted": int(per_inter[i]),
+                "passed": int(per_total[i] - per_inter[i]),
+                "with_agids": int(per_agids[i]),
+            }
+            for i in range(n)
+        }
+        n_inter = int(intercepted.sum())
+        return {
+            "total": total,
+            "intercepted": n_inter,
+            "passed_l1": total - n_inter,
+            "with_agids": int(has_agids.sum()),
+            "errors": int(errors.sum()),
+            "elapsed_seconds": round(elapsed, 2),
+            "by_asset_category": by_cat,
+        }
+
+    def status_counts(self) -> Dict[str, int]:
+        counts = np.bincount(self.columns["status"], minlength=len(self.dictionaries["status"]))
+        return {s: int(c) for s, c in zip(self.dictionaries["status"], counts)}
+
+    def histogram(self, column: str, bins: Any = 20, value_range: Optional[Tuple[float, float]] = None):
+        """(counts, edges) over the non-NaN values of a float column."""
+        v = self.columns[column]
+        v = v[~np.isnan(v)]
+        return np.histogram(v, bins=bins, range=value_range)
+
+    def latency_percentiles(self, qs: Sequence[float] = (50, 95, 99)) -> Dict[str, Dict[str, float]]:
+        """{column: {"p50": ms, ...}} for latency columns that have at least one sample."""
+        out: Dict[str, Dict[str, float]] = {}
+        for c in ("latency_ms",) + tuple(f"{s}_ms" for s in STAGES):
+            v = self.columns[c]
+            v = v[~np.isnan(v)]
+            if v.size:
+                out[c] = {f"p{int(q)}": round(float(p), 3) for q, p in zip(qs, np.percentile(v, qs))}
+        return out
+
+
+if __name__ == "__main__":
+    import argparse
+    import tempfile
+    import time
+
+    parser = argparse.ArgumentParser(description="Columnar audit results: summary / benchmark")
+    parser.add_argument("--summary", metavar="BASE", help="print stats for a stored run (<base>.npz/.parquet)")
+    parser.add_argument("--bench", type=int, default=0, metavar="N", help="benchmark on N synthetic results")
+    args = parser.parse_args()
+
+    if args.summary:
+        t0 = time.perf_counter()
+        store = ColumnarResults.load(args.summary)
+        st = store.stats()
+        st["status_counts"] = store.status_counts()
+        st["latency_percentiles"] = store.latency_percentiles()
+        print(json.dumps(st, ensure_ascii=False, indent=2))
+        print(f"loaded + summarized {len(store)} results in {time.perf_counter() - t0:.2f}s")
+    if args.bench:
+        import random
+
+        from run_training_10k_matching_audit import build_stats
+
+        rng = random.Random(7)
+        cats = ["BCI", "Gene_Therapy", "Stem_Cell", "Clinical_Trial"]
+
+        def fake(i: int) -> Dict[str, Any]:
+            inter = rng.random() < 0.6
+            n = 0 if inter else rng.randint(0, 5)
+            return {
+                "request_id": f"AM-REQ-{i:08d}", "asset_category": cats[i % 4], "intercepted": inter,
+                "l1_passed": not inter, "d_effective": None if inter else round(rng.random(), 4),
+                "variance": round(rng.random() * 0.01, 6), "agid_count": n,
+                "top_agid": f"AGID-{rng.randint(0, 5000)}" if n else None,
+                "error_msg": "timeout" if rng.random() < 0.001 else None,
+                "stage_latency_ms": {"l1": rng.random(), "l2": 5 * rng.random(), "l3": 20 * rng.random(), "l4": rng.random()},
+                "latency_ms": 30 * rng.random(),
+            }
+
+        results = [fake(i) for i in range(args.bench)]
+        with tempfile.TemporaryDirectory() as tmp:
+            legacy = os.path.join(tmp, "results.json")
+            with open(legacy, "w", encoding="utf-8") as f:
+                json.dump(results, f, ensure_ascii=False, indent=2)
+            t0 = time.perf_counter()
+            store = ColumnarResults.from_results(results)
+            path = store.save(os.path.join(tmp, "results"))
+            build_s = time.perf_counter() - t0
+            del results
+            t0 = time.perf_counter()
+            with open(legacy, "r", encoding="utf-8") as f:
+                legacy_stats = build_stats(json.load(f), 0.0)
+            legacy_s = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            loaded = ColumnarResults.load(path)
+            new_stats = loaded.stats(0.0)
+            loaded.latency_percentiles()
+            loaded.histogram("d_effective", 20, (0.0, 1.0))
+            new_s = time.perf_counter() - t0
+            print(f"{args.bench} results: JSON {os.path.getsize(legacy) / 2 ** 20:.0f} MiB, "
+                  f"columnar {os.path.getsize(path) / 2 ** 20:.0f} MiB ({os.path.basename(path)}), build+save {build_s:.2f}s")
+            print(f"  json.load + build_stats:           {legacy_s:.2f}s")
+            print(f"  columnar load + stats/pct/histo:   {new_s:.3f}s")
+            print(f"  stats identical: {legacy_stats == new_stats}")
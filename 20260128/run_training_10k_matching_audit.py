@@ -4,11 +4,18 @@
 对 amani_training_10k.json 中所有客户需求执行 USER_REQUEST_MATCHING_LOGIC_AUDIT 定义的匹配逻辑运行测试。
 入口：TrinityBridge.run_safe(original_inquiry)；输出：每条结果 + 汇总报告。
 """
-import json
+import os
 import sys
 import time
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterable, List, Optional
+
+from audit_checkpoint import JsonlCheckpoint
+from audit_telemetry import AuditTelemetry
+from case_loader import iter_cases
+from inquiry_memo import InquiryMemo, config_fingerprint
+from results_store import ColumnarResults
+from work_queue import JOURNAL_MODES, WorkQueue, default_owner, drain
 
 # 路径（脚本在 20260128 下运行）
 BASE = Path(__file__).resolve().parent
@@ -16,37 +23,86 @@ TRAINING_FILE = BASE / "amani_training_10k.json"
 RESULTS_JSON = BASE / "matching_audit_results_10k.json"
 SUMMARY_MD = BASE / "AMANI_TRAINING_10K_MATCHING_RESULTS_SUMMARY.md"
 PROGRESS_LOG = BASE / "run_10k_audit_log.txt"
-PARTIAL_JSON = BASE / "matching_audit_results_10k_partial.json"
+CHECKPOINT_JSONL = BASE / "matching_audit_results_10k.jsonl"
+# 队列模式 finalize 时由队列行重建的 checkpoint（独立文件，不覆盖顺序版可续跑的 CHECKPOINT_JSONL）
+QUEUE_CHECKPOINT_JSONL = BASE / "matching_audit_results_10k_queue.jsonl"
+# 列式结果（Parquet 或 .npz + .dict.json，扩展名由后端决定）
+RESULTS_COLUMNAR = BASE / "matching_audit_results_10k.columns"
+
+# 实时遥测：滚动状态 JSONL（可 tail）与 watchdog 线程栈转储
+STATUS_JSONL = BASE / "run_10k_audit_status.jsonl"
+STACK_DUMP = BASE / "run_10k_audit_stacks.txt"
+# 多进程 / 多机共享的 SQLite 租约队列（--queue），job 名区分同一文件中的不同任务
+QUEUE_DB = BASE / "run_10k_audit_queue.sqlite"
+QUEUE_JOB = "matching_audit_10k"
+QUEUE_CHUNK_SIZE = 25
+QUEUE_LEASE_SECONDS = 120.0
 
-# 进度日志与分批写盘间隔（便于诊断与恢复）
+# 进度日志与 checkpoint fsync 间隔（便于诊断与恢复）；watchdog 无进展阈值（秒）
 LOG_EVERY_N = 100
 CHECKPOINT_EVERY_N = 2000
+WATCHDOG_SECONDS = 300
 
 
-def load_training_data(limit: int = None) -> List[Dict[str, Any]]:
-    """加载 amani_training_10k.json，可选 limit 条（用于快速测试）。"""
-    with open(TRAINING_FILE, "r", encoding="utf-8") as f:
-        data = json.load(f)
-    if limit is not None and limit > 0:
-        data = data[:limit]
-    return data
+def load_training_data(limit: int = None, path: Path = None) -> List[Dict[str, Any]]:
+    """加载 amani_training_10k.json（或 JSONL），可选 limit 条（用于快速测试；只解析前 limit 条）。"""
+    return list(iter_cases(str(path or TRAINING_FILE), limit=limit))
 
 
-def run_one(bridge, record: Dict[str, Any]) -> Dict[str, Any]:
-    """对单条记录执行 TrinityBridge.run_safe(original_inquiry)，返回紧凑结果。"""
-    request_id = record.get("request_id", "")
-    asset_category = record.get("asset_category", "")
-    inquiry = record.get("original_inquiry", "")
-    out = {
-        "request_id": request_id,
-        "asset_category": asset_category,
+class LatencyInjectingBridge:
+    """包装 bridge：每次 run_safe 前 sleep latency_ms（模拟 Chroma/端点延迟，用于并发与扩展性基准）。"""
+
+    def __init__(self, bridge, latency_ms: float):
+        self._bridge = bridge
+        self._latency = latency_ms / 1000.0
+
+    def run_safe(self, input_text: str, top_k_agids: int = 5, **kwargs) -> Dict[str, Any]:
+        time.sleep(self._latency)
+        return self._bridge.run_safe(input_text, top_k_agids=top_k_agids, **kwargs)
+
+
+def make_bridge(mock: bool = False, latency_ms: float = 0.0):
+    """
+    构建审计用 TrinityBridge。mock=True：不连接 ChromaDB（L3 内存回退）且不调用 MedGemma 端点（L2 stub），
+    输出确定、可逐字节比对；latency_ms>0 时包装为 LatencyInjectingBridge。
+    """
+    from amani_trinity_bridge import TrinityBridge, GNNAssetAnchor
+    if mock:
+        os.environ.pop("MEDGEMMA_ENDPOINT", None)
+        bridge = TrinityBridge(l3_anchor=GNNAssetAnchor())
+    else:
+        bridge = TrinityBridge()
+    return LatencyInjectingBridge(bridge, latency_ms) if latency_ms > 0 else bridge
+
+
+def record_key(index: int, record: Dict[str, Any]) -> str:
+    """checkpoint / resume 使用的唯一键：request_id，缺失时退化为 #<下标>。"""
+    return str(record.get("request_id") or f"#{index}")
+
+
+def empty_result(record: Dict[str, Any], error_msg: Optional[str] = None) -> Dict[str, Any]:
+    """run_one 的结果骨架（默认视为拦截）；带 error_msg 时即工作队列中多次失败、被搁置的病例结果。"""
+    return {
+        "request_id": record.get("request_id", ""),
+        "asset_category": record.get("asset_category", ""),
         "intercepted": True,
         "l1_passed": False,
         "d_effective": None,
         "variance": None,
         "agid_count": 0,
-        "error_msg": None,
+        "top_agid": None,
+        "error_msg": error_msg,
     }
+
+
+def run_one(bridge, record: Dict[str, Any], timings: bool = False) -> Dict[str, Any]:
+    """
+    对单条记录执行 TrinityBridge.run_safe(original_inquiry)，返回紧凑结果。
+    timings=True 时附加 latency_ms 与 stage_latency_ms（各层耗时）；mock 校验运行保持 False 以便逐字节比对。
+    """
+    inquiry = record.get("original_inquiry", "")
+    out = empty_result(record)
+    t0 = time.perf_counter()
     try:
         result = bridge.run_safe(inquiry or " ", top_k_agids=5)
         intercepted = result.get("intercepted", True)
@@ -59,11 +115,66 @@ def run_one(bridge, record: Dict[str, Any]) -> Dict[str, Any]:
             l3 = result.get("l3_nexus") or {}
             agids = l3.get("agids") or []
             out["agid_count"] = len(agids)
+            out["top_agid"] = agids[0] if agids else None
+        if timings:
+            out["stage_latency_ms"] = result.get("stage_latency_ms") or {}
     except Exception as e:
         out["error_msg"] = str(e)[:500]
+    if timings:
+        out["latency_ms"] = round((time.perf_counter() - t0) * 1000, 3)
     return out
 
 
+def make_memo(mock: bool = False, enabled: bool = True) -> InquiryMemo:
+    """
+    逐字相同 inquiry 的结果复用（模板生成的训练集大量重复）。指纹覆盖 amah_config.json 与运行模式
+    （mock / top_k / 端点 / 是否计时），配置变化即失效；enabled=False（--no-memo）用于延迟测量。
+    """
+    endpoint = None if mock else os.environ.get("MEDGEMMA_ENDPOINT")
+    fingerprint = config_fingerprint(str(BASE), mock=mock, top_k=5, timings=not mock, endpoint=endpoint)
+    return InquiryMemo(fingerprint, enabled=enabled)
+
+
+def warm_memo(memo: InquiryMemo, ckpt: JsonlCheckpoint, key: str, record: Dict[str, Any]) -> None:
+    """resume 时用 checkpoint 中已完成的结果预热 memo（同一 inquiry 的后续重复直接复用）。"""
+    if memo.enabled and memo.lookup(record) is None:
+        memo.store(record, ckpt.read(key))
+
+
+def telemetry_options(args, status_path: Path, stack_path: Path) -> Optional[Dict[str, Any]]:
+    """由 --metrics-port / --status-file / --watchdog-seconds 生成 AuditTelemetry 参数（--no-telemetry 时为 None）。"""
+    if getattr(args, "no_telemetry", False):
+        return None
+    return {
+        "status_path": args.status_file or status_path,
+        "http_port": args.metrics_port,
+        "watchdog_seconds": args.watchdog_seconds or None,
+        "stack_dump_path": stack_path,
+    }
+
+
+def add_telemetry_arguments(parser) -> None:
+    """三个审计脚本共用的遥测参数。"""
+    parser.add_argument("--metrics-port", type=int, default=None, help="本地 HTTP 指标端口（/metrics、/status；0=随机端口）")
+    parser.add_argument("--status-file", type=Path, default=None, help="滚动状态 JSONL 路径（默认 <run>_status.jsonl）")
+    parser.add_argument("--watchdog-seconds", type=float, default=WATCHDOG_SECONDS,
+                        help="无进展超过 N 秒即转储全部线程栈（0=关闭）")
+    parser.add_argument("--no-telemetry", action="store_true", help="关闭状态文件、HTTP 端点与 watchdog")
+
+
+def add_queue_arguments(parser, chunk_size: bool = True) -> None:
+    """顺序版与分片版共用的 SQLite 工作队列参数（分片版已有 --chunk-size，传 chunk_size=False）。"""
+    parser.add_argument("--queue", type=Path, default=None,
+                        help=f"SQLite 租约队列文件（共享存储上多进程 / 多机并行；如 {QUEUE_DB.name}）")
+    parser.add_argument("--job", default=QUEUE_JOB, help="队列中的 job 名")
+    parser.add_argument("--worker-id", default=None, help="租约 owner（默认 host:pid:随机后缀）")
+    parser.add_argument("--lease-seconds", type=float, default=QUEUE_LEASE_SECONDS, help="租约时长（后台每 1/3 续租）")
+    parser.add_argument("--journal-mode", choices=JOURNAL_MODES, default="wal",
+                        help="队列 SQLite journal 模式：本机磁盘用 wal；NFS / SMB 等共享存储用 delete（所有 worker 须一致）")
+    if chunk_size:
+        parser.add_argument("--chunk-size", type=int, default=QUEUE_CHUNK_SIZE, help="每次领取的病例数")
+
+
 def _log_progress(log_path: Path, msg: str) -> None:
     """追加一行进度到 run_10k_audit_log.txt，立即刷新。"""
     try:
@@ -74,75 +185,187 @@ def _log_progress(log_path: Path, msg: str) -> None:
         pass
 
 
-def run_audit(limit: int = None) -> tuple:
+def run_audit(
+    limit: int = None,
+    mock: bool = False,
+    latency_ms: float = 0.0,
+    resume: bool = False,
+    path: Path = None,
+    memo: bool = True,
+    telemetry: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
     """
-    加载训练数据，对每条 original_inquiry 执行 run_safe，返回 (results_list, stats_dict)。
-    每 LOG_EVERY_N 条写入进度到 run_10k_audit_log.txt；每 CHECKPOINT_EVERY_N 条写 partial JSON。
+    流式读取训练数据（JSON 数组或 JSONL，不整体载入），对每条 original_inquiry 执行 run_safe；
+    结果逐条追加到 CHECKPOINT_JSONL（每 CHECKPOINT_EVERY_N 条 fsync）。resume=True 时跳过 checkpoint
+    中已完成的 request_id。memo=True 时逐字相同的 inquiry 复用首次结果（改写 request_id）。
+    telemetry 为 AuditTelemetry 参数（状态文件 / HTTP 端口 / watchdog），每条完成结果都会喂入。
+    结束后由 finalize 流式生成结果 JSON 与汇总，返回 stats_dict（含 memo 去重统计）。
     """
-    records = load_training_data(limit=limit)
+    path = str(path or TRAINING_FILE)
     try:
-        from amani_trinity_bridge import TrinityBridge
+        bridge = make_bridge(mock=mock, latency_ms=latency_ms)
     except Exception as e:
         print(f"Import TrinityBridge failed: {e}")
         sys.exit(1)
-    bridge = TrinityBridge()
-    results: List[Dict[str, Any]] = []
+    # 第一遍只取键（用于进度总数、resume 与最终排序），第二遍逐条执行
+    keys = [record_key(i, rec) for i, rec in enumerate(iter_cases(path, limit=limit))]
+    ckpt = JsonlCheckpoint(CHECKPOINT_JSONL, fsync_every=CHECKPOINT_EVERY_N, resume=resume)
+    inquiry_memo = make_memo(mock=mock, enabled=memo)
     start = time.time()
-    total = len(records)
-    _log_progress(PROGRESS_LOG, f"[start] total={total} at {time.strftime('%Y-%m-%d %H:%M:%S')}")
-    for i, rec in enumerate(records):
-        r = run_one(bridge, rec)
-        results.append(r)
-        n = i + 1
-        elapsed = time.time() - start
-        # 每条都记录到日志（便于诊断卡住的位置），但只显示前10条和之后每100条
-        if n <= 10 or n % LOG_EVERY_N == 0:
-            _log_progress(PROGRESS_LOG, f"[progress] {n}/{total} elapsed_sec={round(elapsed, 1)}")
-        if n % 500 == 0:
-            print(f"  Processed {n}/{total} ...")
-            sys.stdout.flush()  # 立即刷新 stdout
-        if n % CHECKPOINT_EVERY_N == 0:
-            try:
-                with open(PARTIAL_JSON, "w", encoding="utf-8") as f:
-                    json.dump(results, f, ensure_ascii=False, indent=2)
-            except Exception:
-                pass
+    total = len(keys)
+    skipped = sum(1 for k in keys if k in ckpt)
+    _log_progress(PROGRESS_LOG, f"[start] total={total} resumed={skipped} at {time.strftime('%Y-%m-%d %H:%M:%S')}")
+    n = skipped
+    with AuditTelemetry(total - skipped, run_name="sequential", **(telemetry or {})) as tele:
+        for key, rec in zip(keys, iter_cases(path, limit=limit)):
+            if key in ckpt:
+                warm_memo(inquiry_memo, ckpt, key, rec)
+                continue
+            out = inquiry_memo.get_or_run(rec, lambda: run_one(bridge, rec, timings=not mock))
+            ckpt.append(key, out)
+            tele.observe(out)
+            n += 1
+            elapsed = time.time() - start
+            # 每条都记录到日志（便于诊断卡住的位置），但只显示前10条和之后每100条
+            if n <= 10 or n % LOG_EVERY_N == 0:
+                snap = tele.snapshot()
+                _log_progress(PROGRESS_LOG, f"[progress] {n}/{total} elapsed_sec={round(elapsed, 1)} "
+                                            f"rps={snap['rps_rolling']} eta_sec={snap['eta_seconds']}")
+            if n % 500 == 0:
+                print(f"  Processed {n}/{total} ...")
+                sys.stdout.flush()  # 立即刷新 stdout
     elapsed = time.time() - start
+    _log_progress(PROGRESS_LOG, f"[telemetry] {tele.snapshot()}")
     _log_progress(PROGRESS_LOG, f"[done] {total}/{total} elapsed_sec={round(elapsed, 1)}")
-    # 统计
-    total = len(results)
-    intercepted = sum(1 for x in results if x["intercepted"])
-    passed = total - intercepted
+    _log_progress(PROGRESS_LOG, f"[memo] {inquiry_memo.stats()}")
+    return finalize(ckpt, keys, elapsed, memo_stats=inquiry_memo.stats())
+
+
+def enqueue_cases(queue: WorkQueue, limit: int = None, path: Path = None, chunk_size: int = QUEUE_CHUNK_SIZE) -> int:
+    """把训练集按 record_key 写入队列（幂等：已存在的病例保持原状态），返回新增条数。"""
+    cases = iter_cases(str(path or TRAINING_FILE), limit=limit)
+    return queue.enqueue(((record_key(i, rec), rec) for i, rec in enumerate(cases)), chunk_size=chunk_size)
+
+
+def run_queue_worker(
+    queue_path: Path = None,
+    limit: int = None,
+    mock: bool = False,
+    latency_ms: float = 0.0,
+    path: Path = None,
+    memo: bool = True,
+    owner: str = None,
+    job: str = QUEUE_JOB,
+    lease_seconds: float = QUEUE_LEASE_SECONDS,
+    chunk_size: int = QUEUE_CHUNK_SIZE,
+    enqueue: bool = True,
+    finalize_when_drained: bool = True,
+    telemetry: Optional[Dict[str, Any]] = None,
+    journal_mode: str = "wal",
+) -> Dict[str, Any]:
+    """
+    队列 worker：可在多个进程 / 多台机器上对同一个 SQLite 队列文件并行运行。每个 worker 原子领取 chunk、
+    执行期间后台续租、完成后提交结果；被杀死的 worker 租约过期后其 chunk 由其他 worker 自动回收重跑。
+    enqueue=True 时先幂等写入病例；队列排空后由唯一抢到 finalize 权的 worker 按入队顺序生成结果文件
+    （与 run_audit 相同的 checkpoint → finalize 流程），返回值含 queue（本 worker 统计）与 finalized。
+    journal_mode 为队列文件的 SQLite journal 模式（共享存储上用 "delete"，所有 worker 须一致）。
+    """
+    with WorkQueue(queue_path or QUEUE_DB, job=job, lease_seconds=lease_seconds, journal_mode=journal_mode) as queue:
+        if enqueue:
+            added = enqueue_cases(queue, limit=limit, path=path, chunk_size=chunk_size)
+            _log_progress(PROGRESS_LOG, f"[queue] enqueued={added} status={queue.status()}")
+        bridge = make_bridge(mock=mock, latency_ms=latency_ms)
+        inquiry_memo = make_memo(mock=mock, enabled=memo)
+        owner = owner or default_owner()
+        counts = queue.counts()
+
+        def handle_chunk(items):
+            return {key: inquiry_memo.get_or_run(rec, lambda: run_one(bridge, rec, timings=not mock))
+                    for key, rec in items}
+
+        with AuditTelemetry(counts["pending"] + counts["leased"], run_name=f"queue-{owner}",
+                            **(telemetry or {})) as tele:
+            worker_stats = drain(queue, handle_chunk, owner=owner, on_result=lambda _k, r: tele.observe(r))
+        _log_progress(PROGRESS_LOG, f"[queue] worker={worker_stats} status={queue.status()}")
+        stats: Dict[str, Any] = {"queue": worker_stats, "finalized": False, "memo": inquiry_memo.stats()}
+        if finalize_when_drained and queue.try_finalize(owner):
+            stats.update(finalize_queue(queue, memo_stats=inquiry_memo.stats()))
+            stats["finalized"] = True
+        return stats
+
+
+def finalize_queue(queue: WorkQueue, memo_stats: Dict[str, Any] = None) -> Dict[str, Any]:
+    """
+    已排空队列 → QUEUE_CHECKPOINT_JSONL（按入队顺序重建；failed 病例写 empty_result + 错误）→ finalize 结果文件与汇总。
+    队列本身即持久状态，故该文件每次重写；顺序版的 CHECKPOINT_JSONL 不受影响，仍可 --resume。
+    """
+    ckpt = JsonlCheckpoint(QUEUE_CHECKPOINT_JSONL, fsync_every=CHECKPOINT_EVERY_N)
+    keys: List[str] = []
+    for row in queue.rows():
+        keys.append(row["case_id"])
+        result = row["result"] if row["state"] == "done" else empty_result(row["payload"] or {}, row["error"])
+        ckpt.append(row["case_id"], result)
+    return finalize(ckpt, keys, queue.elapsed(), memo_stats=memo_stats)
+
+
+def finalize(
+    ckpt: JsonlCheckpoint,
+    keys: List[str],
+    elapsed: float,
+    memo_stats: Dict[str, Any] = None,
+) -> Dict[str, Any]:
+    """
+    流式压缩：按 keys 顺序从 checkpoint 生成 RESULTS_JSON、列式结果 RESULTS_COLUMNAR 与汇总 Markdown
+    （不整体载入内存）；统计与延迟分位数在列式数据上向量化计算。memo_stats 写入汇总（去重率、节省耗时）。
+    """
+    ckpt.checkpoint()
+    store = ColumnarResults.from_results(ckpt.iter_results(keys))
+    store.save(str(RESULTS_COLUMNAR))
+    ckpt.compact_json(str(RESULTS_JSON), keys)
+    ckpt.close()
+    stats = store.stats(elapsed)
+    stats["latency_percentiles"] = store.latency_percentiles()
+    if memo_stats is not None:
+        stats["memo"] = memo_stats
+    write_summary(stats)
+    return stats
+
+
+def build_stats(results: Iterable[Dict[str, Any]], elapsed: float) -> Dict[str, Any]:
+    """汇总统计（单次遍历，可接受生成器）：总数、L1 拦截/通过、获得 AGID、异常数，以及按 asset_category 分组。"""
+    total = intercepted = with_agids = errors = 0
     by_cat: Dict[str, Dict[str, int]] = {}
     for x in results:
+        total += 1
         c = x.get("asset_category") or "Unknown"
         if c not in by_cat:
             by_cat[c] = {"total": 0, "intercepted": 0, "passed": 0, "with_agids": 0}
         by_cat[c]["total"] += 1
-        if x["intercepted"]:
+        if x.get("intercepted"):
+            intercepted += 1
             by_cat[c]["intercepted"] += 1
         else:
             by_cat[c]["passed"] += 1
             if (x.get("agid_count") or 0) > 0:
                 by_cat[c]["with_agids"] += 1
-    errors = [x for x in results if x.get("error_msg")]
+        if (x.get("agid_count") or 0) > 0:
+            with_agids += 1
+        if x.get("error_msg"):
+            errors += 1
     stats = {
         "total": total,
         "intercepted": intercepted,
-        "passed_l1": passed,
-        "with_agids": sum(1 for x in results if (x.get("agid_count") or 0) > 0),
-        "errors": len(errors),
+        "passed_l1": total - intercepted,
+        "with_agids": with_agids,
+        "errors": errors,
         "elapsed_seconds": round(elapsed, 2),
         "by_asset_category": by_cat,
     }
-    return results, stats
+    return stats
 
 
-def write_results(results: List[Dict[str, Any]], stats: Dict[str, Any]) -> None:
-    """写入 matching_audit_results_10k.json 与 AMANI_TRAINING_10K_MATCHING_RESULTS_SUMMARY.md"""
-    with open(RESULTS_JSON, "w", encoding="utf-8") as f:
-        json.dump(results, f, ensure_ascii=False, indent=2)
-    # 汇总 Markdown
+def write_summary(stats: Dict[str, Any]) -> None:
+    """写入 AMANI_TRAINING_10K_MATCHING_RESULTS_SUMMARY.md"""
     lines = [
         "# A.M.A.N.I. 训练集 10k 客户需求 — 匹配逻辑运行测试结果汇总",
         "",
@@ -163,6 +386,15 @@ def write_results(results: List[Dict[str, Any]], stats: Dict[str, Any]) -> None:
         f"| 获得至少 1 个 AGID | {stats['with_agids']} |",
         f"| 运行异常（error_msg 非空） | {stats['errors']} |",
         f"| 总耗时（秒） | {stats['elapsed_seconds']} |",
+    ]
+    memo = stats.get("memo")
+    if memo:
+        if memo.get("enabled"):
+            lines.append(f"| Inquiry 复用（memo 命中 / 去重率 / 估计节省秒） | {memo['hits']} / "
+                         f"{memo['dedup_ratio']:.2%} / {memo['saved_seconds_est']} |")
+        else:
+            lines.append("| Inquiry 复用 | 已关闭（--no-memo） |")
+    lines += [
         "",
         "---",
         "",
@@ -173,14 +405,27 @@ def write_results(results: List[Dict[str, Any]], stats: Dict[str, Any]) -> None:
     ]
     for cat, c in stats.get("by_asset_category", {}).items():
         lines.append(f"| {cat} | {c['total']} | {c['intercepted']} | {c['passed']} | {c['with_agids']} |")
+    pct = stats.get("latency_percentiles") or {}
+    if pct:
+        lines.extend([
+            "",
+            "### 各层延迟（毫秒）",
+            "",
+            "| 阶段 | p50 | p95 | p99 |",
+            "|------|-----|-----|-----|",
+        ])
+        for col, p in pct.items():
+            lines.append(f"| {col[:-3]} | {p.get('p50')} | {p.get('p95')} | {p.get('p99')} |")
     lines.extend([
         "",
         "---",
         "",
         "## 3. 结果文件",
         "",
-        f"- **逐条结果（JSON）:** `matching_audit_results_10k.json`",
-        f"- **本汇总:** `AMANI_TRAINING_10K_MATCHING_RESULTS_SUMMARY.md`",
+        "- **逐条结果（JSON）:** `matching_audit_results_10k.json`",
+        "- **本汇总:** `AMANI_TRAINING_10K_MATCHING_RESULTS_SUMMARY.md`",
+        "- **Checkpoint（JSONL + .idx，可 --resume 续跑）:** `matching_audit_results_10k.jsonl`",
+        "- **列式结果（Parquet 或 .npz + .dict.json，`python results_store.py --summary`）:** `matching_audit_results_10k.columns.*`",
         "",
         "---",
         "",
@@ -197,18 +442,36 @@ def write_results(results: List[Dict[str, Any]], stats: Dict[str, Any]) -> None:
 
 
 def main():
-    limit = None
-    if len(sys.argv) > 1 and sys.argv[1].isdigit():
-        limit = int(sys.argv[1])
+    import argparse
+    parser = argparse.ArgumentParser(description="TrinityBridge.run_safe 10k 匹配逻辑审计（顺序执行）")
+    parser.add_argument("limit", nargs="?", type=int, default=None, help="仅处理前 N 条")
+    parser.add_argument("--mock", action="store_true", help="不连接 ChromaDB / MedGemma，输出确定")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="每条注入的模拟延迟（毫秒）")
+    parser.add_argument("--resume", action="store_true", help="从 checkpoint JSONL 续跑，跳过已完成的 request_id")
+    parser.add_argument("--input", type=Path, default=TRAINING_FILE, help="病例文件（JSON 数组或 JSONL）")
+    parser.add_argument("--no-memo", action="store_true", help="关闭 inquiry 结果复用（延迟测量时使用）")
+    add_queue_arguments(parser)
+    add_telemetry_arguments(parser)
+    args = parser.parse_args()
+    limit = args.limit if args.limit and args.limit > 0 else None
+    if args.queue:
+        print(f"Queue worker on {args.queue} (job={args.job}) ...")
+        stats = run_queue_worker(args.queue, limit=limit, mock=args.mock, latency_ms=args.latency_ms, path=args.input,
+                                 memo=not args.no_memo, owner=args.worker_id, job=args.job,
+                                 lease_seconds=args.lease_seconds, chunk_size=args.chunk_size,
+                                 telemetry=telemetry_options(args, STATUS_JSONL, STACK_DUMP),
+                                 journal_mode=args.journal_mode)
+        print(f"Worker: {stats['queue']}")
+        if stats["finalized"]:
+            print(f"Queue drained; this worker wrote {RESULTS_JSON} (Total: {stats['total']}, Errors: {stats['errors']})")
+        return
+    if limit:
         print(f"Running with limit={limit}")
     else:
         print("Running full 10,000 records (this may take several minutes)...")
-    print("Loading training data...")
-    records = load_training_data(limit=limit)
-    print(f"Loaded {len(records)} records. Running TrinityBridge.run_safe for each...")
-    results, stats = run_audit(limit=limit)
-    print("Writing results...")
-    write_results(results, stats)
+    print(f"Streaming cases from {args.input}. Running TrinityBridge.run_safe for each...")
+    stats = run_audit(limit=limit, mock=args.mock, latency_ms=args.latency_ms, resume=args.resume, path=args.input,
+                      memo=not args.no_memo, telemetry=telemetry_options(args, STATUS_JSONL, STACK_DUMP))
     print(f"Done. Results: {RESULTS_JSON}")
     print(f"Summary: {SUMMARY_MD}")
     print(f"Total: {stats['total']}, Passed L1: {stats['passed_l1']}, Intercepted: {stats['intercepted']}, Errors: {stats['errors']}, Elapsed: {stats['elapsed_seconds']}s")
@@ -3,19 +3,45 @@
 """
 Async 10k audit runner with concurrency + rate limiting.
 Uses AsyncLimiter (pip install aiolimiter) to avoid TPM spikes.
+Scheduler "adaptive" (default) admits individual items: token bucket -> adaptive in-flight cap
+(AdaptiveConcurrencyLimiter fed by per-item latency and errors) -> worker thread. Every item then passes
+the bridge's own run_safe concurrency guard, so the cap's bounds come from concurrency_guard in
+amah_config.json and the guard's live limit is a ceiling: items beyond it would only queue inside the guard.
+Scheduler "batch" is the former behaviour (Semaphore(3) over batches of 50, items sequential in a batch).
+Cases are streamed from --input (JSON array or JSONL, case_loader.iter_cases) in two passes like the
+sequential runner: keys first, then the pending cases are fed to the scheduler without loading the file.
+Results are appended to a JSONL checkpoint as they complete and compacted in input order at the end.
+Inquiries that repeat verbatim are served from an InquiryMemo without taking a rate-limit
+token or an in-flight slot (--no-memo disables this for latency measurement).
+Every completed item feeds AuditTelemetry (rolling status JSONL, optional --metrics-port, watchdog).
+Run with --bench to compare both schedulers against a latency-injecting fake bridge.
 """
 import asyncio
+import itertools
 import json
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, Dict, List, Tuple
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
 from aiolimiter import AsyncLimiter
 
+from adaptive_limiter import AdaptiveConcurrencyLimiter, Permit
+from amani_trinity_bridge import bridge_guard_bounds, bridge_limiter_limit
+from audit_checkpoint import JsonlCheckpoint
+from audit_telemetry import AuditTelemetry
+from case_loader import iter_cases
+from inquiry_memo import InquiryMemo
 from run_training_10k_matching_audit import (
-    load_training_data,
+    add_telemetry_arguments,
+    finalize,
+    make_bridge,
+    make_memo,
+    record_key,
     run_one,
-    write_results,
+    telemetry_options,
+    warm_memo,
+    TRAINING_FILE,
     RESULTS_JSON,
     SUMMARY_MD,
     LOG_EVERY_N,
@@ -24,14 +50,39 @@ from run_training_10k_matching_audit import (
 
 BASE = Path(__file__).resolve().parent
 PROGRESS_LOG = BASE / "run_10k_audit_async_log.txt"
-PARTIAL_JSON = BASE / "matching_audit_results_10k_partial_async.json"
+CHECKPOINT_JSONL = BASE / "matching_audit_results_10k_async.jsonl"
+STATUS_JSONL = BASE / "run_10k_audit_async_status.jsonl"
+STACK_DUMP = BASE / "run_10k_audit_async_stacks.txt"
+CONFIG_PATH = BASE / "amah_config.json"
 
 # 1) Rate gate: 80 requests per 60 seconds
-limiter = AsyncLimiter(80, 60)
-# 2) Concurrency gate: at most 3 in-flight requests
-semaphore = asyncio.Semaphore(3)
-# 3) Batch size: 20-50 items per group
+RATE_LIMIT = 80
+RATE_PERIOD = 60
+# 2) Adaptive in-flight cap (per item); these bounds apply only when the bridge's concurrency_guard is off,
+#    otherwise guard_in_flight_bounds() takes the guard's own (see module docstring)
+INITIAL_IN_FLIGHT = 4
+MIN_IN_FLIGHT = 1
+UNGUARDED_MAX_IN_FLIGHT = 32
+# 3) Legacy batch scheduler: at most 3 batches of 50 in flight
+BATCH_CONCURRENCY = 3
 BATCH_SIZE = 50
+SCHEDULERS = ("adaptive", "batch")
+
+Item = Tuple[int, Dict[str, Any]]
+OnResult = Callable[[int, Dict[str, Any]], None]
+
+
+def guard_in_flight_bounds(config_path: Path = CONFIG_PATH) -> Tuple[int, int, int]:
+    """
+    (initial, min, max) in-flight items for the adaptive scheduler: the run_safe concurrency guard's bounds when
+    it is enabled in config_path, else INITIAL_IN_FLIGHT / MIN_IN_FLIGHT / UNGUARDED_MAX_IN_FLIGHT.
+    """
+    try:
+        with open(config_path, "r", encoding="utf-8") as f:
+            bounds = bridge_guard_bounds(json.load(f).get("concurrency_guard") or {})
+    except (OSError, ValueError):
+        bounds = None
+    return bounds or (INITIAL_IN_FLIGHT, MIN_IN_FLIGHT, UNGUARDED_MAX_IN_FLIGHT)
 
 
 def _log_progress(msg: str) -> None:
@@ -43,146 +94,344 @@ def _log_progress(msg: str) -> None:
         pass
 
 
-def _build_stats(results: List[Dict[str, Any]], elapsed: float) -> Dict[str, Any]:
-    total = len(results)
-    intercepted = sum(1 for x in results if x.get("intercepted"))
-    passed = total - intercepted
-    by_cat: Dict[str, Dict[str, int]] = {}
-    for x in results:
-        c = x.get("asset_category") or "Unknown"
-        if c not in by_cat:
-            by_cat[c] = {"total": 0, "intercepted": 0, "passed": 0, "with_agids": 0}
-        by_cat[c]["total"] += 1
-        if x.get("intercepted"):
-            by_cat[c]["intercepted"] += 1
-        else:
-            by_cat[c]["passed"] += 1
-            if (x.get("agid_count") or 0) > 0:
-                by_cat[c]["with_agids"] += 1
-    errors = [x for x in results if x.get("error_msg")]
+def _error_result(record: Dict[str, Any], msg: str) -> Dict[str, Any]:
     return {
-        "total": total,
-        "intercepted": intercepted,
-        "passed_l1": passed,
-        "with_agids": sum(1 for x in results if (x.get("agid_count") or 0) > 0),
-        "errors": len(errors),
-        "elapsed_seconds": round(elapsed, 2),
-        "by_asset_category": by_cat,
+        "request_id": record.get("request_id", ""),
+        "asset_category": record.get("asset_category", ""),
+        "intercepted": True,
+        "l1_passed": False,
+        "d_effective": None,
+        "variance": None,
+        "agid_count": 0,
+        "top_agid": None,
+        "error_msg": msg[:500],
     }
 
 
+def _is_rate_limited(result: Dict[str, Any]) -> bool:
+    msg = result.get("error_msg") or ""
+    return "RateLimit" in msg or "429" in msg
+
+
 async def _process_one(
     idx: int,
     record: Dict[str, Any],
     bridge,
+    limiter: AsyncLimiter,
     max_retries: int = 3,
+    timings: bool = False,
+    memo: Optional[InquiryMemo] = None,
 ) -> Tuple[int, Dict[str, Any]]:
+    hit = memo.serve(record) if memo is not None else None
+    if hit is not None:
+        return idx, hit
     async with limiter:
         for attempt in range(max_retries):
+            t0 = time.perf_counter()
             try:
-                result = await asyncio.to_thread(run_one, bridge, record)
-                return idx, result
+                result = await asyncio.to_thread(run_one, bridge, record, timings)
             except Exception as e:
-                msg = str(e)
-                if "RateLimit" in msg or "429" in msg:
-                    await asyncio.sleep(min(10, 2 ** attempt))
-                    continue
-                return idx, {
-                    "request_id": record.get("request_id", ""),
-                    "asset_category": record.get("asset_category", ""),
-                    "intercepted": True,
-                    "l1_passed": False,
-                    "d_effective": None,
-                    "variance": None,
-                    "agid_count": 0,
-                    "error_msg": msg[:500],
-                }
-        return idx, {
-            "request_id": record.get("request_id", ""),
-            "asset_category": record.get("asset_category", ""),
-            "intercepted": True,
-            "l1_passed": False,
-            "d_effective": None,
-            "variance": None,
-            "agid_count": 0,
-            "error_msg": "RateLimit retries exhausted",
-        }
+                return idx, _error_result(record, str(e))
+            if _is_rate_limited(result):
+                await asyncio.sleep(min(10, 2 ** attempt))
+                continue
+            if memo is not None:
+                memo.record_miss(record, result, time.perf_counter() - t0)
+            return idx, result
+        return idx, _error_result(record, "RateLimit retries exhausted")
 
 
 async def _process_batch(
-    batch: List[Tuple[int, Dict[str, Any]]],
+    batch: List[Item],
     bridge,
-) -> List[Tuple[int, Dict[str, Any]]]:
-    out: List[Tuple[int, Dict[str, Any]]] = []
+    limiter: AsyncLimiter,
+    timings: bool = False,
+    memo: Optional[InquiryMemo] = None,
+) -> List[Item]:
+    out: List[Item] = []
     for idx, record in batch:
-        out.append(await _process_one(idx, record, bridge))
+        out.append(await _process_one(idx, record, bridge, limiter, timings=timings, memo=memo))
     return out
 
 
-async def main():
-    limit = None
-    records = load_training_data(limit=limit)
-    total = len(records)
-    _log_progress(f"[start] total={total} at {time.strftime('%Y-%m-%d %H:%M:%S')}")
-
-    from amani_trinity_bridge import TrinityBridge
-    workers = max(1, min(3, total))
-    results: List[Dict[str, Any]] = [None] * total  # type: ignore
-    queue: asyncio.Queue = asyncio.Queue()
-    batch: List[Tuple[int, Dict[str, Any]]] = []
-    for i, rec in enumerate(records):
-        batch.append((i, rec))
-        if len(batch) >= BATCH_SIZE:
-            queue.put_nowait(batch)
-            batch = []
-    if batch:
-        queue.put_nowait(batch)
-
-    progress_lock = asyncio.Lock()
-    completed = 0
-    start = time.time()
+def _chunks(items: Iterable[Item], size: int) -> Iterator[List[Item]]:
+    it = iter(items)
+    while True:
+        batch = list(itertools.islice(it, size))
+        if not batch:
+            return
+        yield batch
 
-    async def worker_loop(worker_id: int) -> None:
-        nonlocal completed
-        bridge = TrinityBridge()
-        while True:
-            item = await queue.get()
-            if item is None:
-                queue.task_done()
-                break
-            batch_items = item
+
+async def run_batched(
+    items: Iterable[Item],
+    bridge_factory: Callable[[], Any],
+    limiter: AsyncLimiter,
+    on_result: OnResult,
+    concurrency: int = BATCH_CONCURRENCY,
+    batch_size: int = BATCH_SIZE,
+    timings: bool = False,
+    memo: Optional[InquiryMemo] = None,
+) -> None:
+    """
+    Legacy scheduler: `concurrency` workers, each running whole batches sequentially under a semaphore.
+    Batches are cut from `items` as workers free up, so a streamed iterable is never materialized.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    batches = _chunks(items, batch_size)  # shared: only the event loop thread advances it
+
+    async def worker_loop() -> None:
+        bridge = bridge_factory()
+        for batch in batches:
             async with semaphore:
-                batch_results = await _process_batch(batch_items, bridge)
+                batch_results = await _process_batch(batch, bridge, limiter, timings, memo)
             for i, out in batch_results:
-                results[i] = out
-                async with progress_lock:
-                    completed += 1
-                    n = completed
-                    elapsed = time.time() - start
-                    if n <= 10 or n % LOG_EVERY_N == 0:
-                        _log_progress(f"[progress] {n}/{total} elapsed_sec={round(elapsed, 1)}")
-                    if n % CHECKPOINT_EVERY_N == 0:
-                        try:
-                            with open(PARTIAL_JSON, "w", encoding="utf-8") as f:
-                                json.dump(results, f, ensure_ascii=False, indent=2)
-                        except Exception:
-                            pass
-            queue.task_done()
-
-    tasks = [asyncio.create_task(worker_loop(i)) for i in range(workers)]
-    await queue.join()
-    for _ in tasks:
-        queue.put_nowait(None)
-    await asyncio.gather(*tasks)
+                on_result(i, out)
+
+    await asyncio.gather(*(worker_loop() for _ in range(max(1, concurrency))))
+
+
+class AdaptiveItemScheduler:
+    """
+    Per-item admission: each case takes a token from the rate limiter and a permit from an
+    AdaptiveConcurrencyLimiter before running on a worker thread. The permit's latency sample (and an
+    error flag for exceptions / error_msg results) drives the in-flight cap between min and max.
+    At most `limit` item tasks exist at a time; completions are reported via on_result in completion order.
+    ceiling (e.g. bridge_limiter_limit) returns an outer limit polled at admission; None means no ceiling.
+    With a memo, items whose inquiry was already computed are reported immediately, before admission.
+    """
+
+    def __init__(
+        self,
+        bridge,
+        limiter: AsyncLimiter,
+        initial_in_flight: int = INITIAL_IN_FLIGHT,
+        min_in_flight: int = MIN_IN_FLIGHT,
+        max_in_flight: int = UNGUARDED_MAX_IN_FLIGHT,
+        algorithm: str = "gradient",
+        max_retries: int = 3,
+        timings: bool = False,
+        memo: Optional[InquiryMemo] = None,
+        ceiling: Optional[Callable[[], Optional[int]]] = None,
+    ):
+        self.bridge = bridge
+        self._timings = timings
+        self.memo = memo
+        self.rate = limiter
+        self.cap = AdaptiveConcurrencyLimiter(initial_in_flight, min_in_flight, max_in_flight, algorithm=algorithm)
+        self._max_retries = max_retries
+        self._ceiling = ceiling
+        self._running = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="audit-item")
+        self._slot_freed: Optional[asyncio.Event] = None
+        self.peak_in_flight = 0
+
+    async def _admit(self) -> Permit:
+        while True:
+            outer = self._ceiling() if self._ceiling is not None else None
+            permit = self.cap.try_acquire("audit") if outer is None or self._running < outer else None
+            if permit is not None:
+                self._running += 1
+                self.peak_in_flight = max(self.peak_in_flight, self._running)
+                return permit
+            self._slot_freed.clear()
+            await self._slot_freed.wait()
+
+    def _release(self, permit: Permit, error: bool) -> None:
+        permit.release(error=error)
+        self._running -= 1
+        self._slot_freed.set()
+
+    async def _execute(self, idx: int, record: Dict[str, Any], permit: Permit, on_result: OnResult) -> None:
+        loop = asyncio.get_running_loop()
+        result: Optional[Dict[str, Any]] = None
+        for attempt in range(self._max_retries):
+            if attempt:
+                permit = await self._admit()
+                await self.rate.acquire()
+            t0 = time.perf_counter()
+            try:
+                result = await loop.run_in_executor(self._executor, run_one, self.bridge, record, self._timings)
+            except Exception as e:
+                result = _error_result(record, str(e))
+            limited = _is_rate_limited(result)
+            self._release(permit, error=bool(result.get("error_msg")))
+            if not limited:
+                if self.memo is not None:
+                    self.memo.record_miss(record, result, time.perf_counter() - t0)
+                break
+            await asyncio.sleep(min(10, 2 ** attempt))
+        else:
+            result = _error_result(record, "RateLimit retries exhausted")
+        on_result(idx, result)
+
+    async def run(self, items: Iterable[Item], on_result: OnResult) -> None:
+        self._slot_freed = asyncio.Event()
+        tasks: Set[asyncio.Task] = set()
+        try:
+            for idx, record in items:
+                hit = self.memo.serve(record) if self.memo is not None else None
+                if hit is not None:
+                    on_result(idx, hit)
+                    continue
+                permit = await self._admit()
+                await self.rate.acquire()
+                task = asyncio.create_task(self._execute(idx, record, permit, on_result))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        finally:
+            self._executor.shutdown(wait=False)
+
+
+async def main(
+    resume: bool = False,
+    scheduler: str = "adaptive",
+    limit: Optional[int] = None,
+    path: Optional[Path] = None,
+    mock: bool = False,
+    latency_ms: float = 0.0,
+    rate: int = RATE_LIMIT,
+    period: float = RATE_PERIOD,
+    max_in_flight: Optional[int] = None,
+    memo: bool = True,
+    telemetry: Optional[Dict[str, Any]] = None,
+):
+    path = str(path or TRAINING_FILE)
+    # First pass reads only the keys (progress total, resume, final ordering); the second streams the cases.
+    keys = [record_key(i, rec) for i, rec in enumerate(iter_cases(path, limit=limit))]
+    total = len(keys)
+    # Results go to an append-only JSONL checkpoint (fsync every CHECKPOINT_EVERY_N); resume skips done keys.
+    ckpt = JsonlCheckpoint(CHECKPOINT_JSONL, fsync_every=CHECKPOINT_EVERY_N, resume=resume)
+    inquiry_memo = make_memo(mock=mock, enabled=memo)
+    resumed = sum(1 for k in keys if k in ckpt)
+
+    def pending() -> Iterator[Item]:
+        for i, rec in enumerate(iter_cases(path, limit=limit)):
+            if keys[i] in ckpt:
+                warm_memo(inquiry_memo, ckpt, keys[i], rec)
+            else:
+                yield i, rec
+
+    _log_progress(f"[start] total={total} resumed={resumed} scheduler={scheduler} "
+                  f"at {time.strftime('%Y-%m-%d %H:%M:%S')}")
+
+    completed = resumed
+    start = time.time()
+    tele = AuditTelemetry(total - resumed, run_name=f"async-{scheduler}", **(telemetry or {})).start()
+
+    def on_result(i: int, out: Dict[str, Any]) -> None:
+        # Runs on the event loop thread only, so no lock is needed.
+        nonlocal completed
+        ckpt.append(keys[i], out)
+        tele.observe(out)
+        completed += 1
+        if completed <= 10 or completed % LOG_EVERY_N == 0:
+            snap = tele.snapshot()
+            _log_progress(f"[progress] {completed}/{total} elapsed_sec={round(time.time() - start, 1)} "
+                          f"rps={snap['rps_rolling']} eta_sec={snap['eta_seconds']}")
+
+    limiter = AsyncLimiter(rate, period)
+    try:
+        if scheduler == "batch":
+            await run_batched(pending(), lambda: make_bridge(mock=mock, latency_ms=latency_ms), limiter, on_result,
+                              timings=not mock, memo=inquiry_memo)
+        else:
+            initial, low, high = guard_in_flight_bounds()
+            sched = AdaptiveItemScheduler(make_bridge(mock=mock, latency_ms=latency_ms), limiter,
+                                          initial_in_flight=initial, min_in_flight=low,
+                                          max_in_flight=max_in_flight or high, timings=not mock,
+                                          memo=inquiry_memo, ceiling=bridge_limiter_limit)
+            await sched.run(pending(), on_result)
+            _log_progress(f"[limiter] {sched.cap.stats()}")
+    finally:
+        tele.close()
 
     elapsed = time.time() - start
+    _log_progress(f"[telemetry] {tele.snapshot()}")
     _log_progress(f"[done] {total}/{total} elapsed_sec={round(elapsed, 1)}")
-    stats = _build_stats(results, elapsed)
-    write_results(results, stats)
+    _log_progress(f"[memo] {inquiry_memo.stats()}")
+    stats = finalize(ckpt, keys, elapsed, memo_stats=inquiry_memo.stats())
     print(f"Done. Results: {RESULTS_JSON}")
     print(f"Summary: {SUMMARY_MD}")
     print(f"Total: {stats['total']}, Passed L1: {stats['passed_l1']}, Intercepted: {stats['intercepted']}, Errors: {stats['errors']}, Elapsed: {stats['elapsed_seconds']}s")
 
 
+class _ContendedBridge:
+    """Benchmark fake: latency is flat up to `capacity` concurrent calls, then grows with load."""
+
+    def __init__(self, bridge, base_ms: float, capacity: int):
+        import threading
+        self._bridge = bridge
+        self._base = base_ms / 1000.0
+        self._capacity = capacity
+        self._lock = threading.Lock()
+        self._active = 0
+
+    def run_safe(self, input_text: str, top_k_agids: int = 5, **kwargs) -> Dict[str, Any]:
+        with self._lock:
+            self._active += 1
+            load = self._active
+        try:
+            time.sleep(self._base * max(1.0, load / self._capacity) ** 2)
+            return self._bridge.run_safe(input_text, top_k_agids=top_k_agids, **kwargs)
+        finally:
+            with self._lock:
+                self._active -= 1
+
+
+async def bench(n: int, base_ms: float, capacity: int, rate: int, period: float, path: Optional[Path] = None) -> None:
+    items = list(enumerate(iter_cases(str(path or TRAINING_FILE), limit=n)))  # both schedulers replay the same cases
+    inner = make_bridge(mock=True)
+    outputs: Dict[str, List[Optional[Dict[str, Any]]]] = {}
+    for name in SCHEDULERS:
+        results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+
+        def on_result(i: int, out: Dict[str, Any]) -> None:
+            results[i] = out
+
+        bridge = _ContendedBridge(inner, base_ms, capacity)
+        t0 = time.perf_counter()
+        extra = ""
+        if name == "batch":
+            await run_batched(items, lambda: bridge, AsyncLimiter(rate, period), on_result)
+        else:
+            sched = AdaptiveItemScheduler(bridge, AsyncLimiter(rate, period))
+            await sched.run(items, on_result)
+            st = sched.cap.stats()
+            extra = f" final_cap={st['limit']} peak_in_flight={sched.peak_in_flight} rtt_p95_ms={st['rtt_p95_s'] * 1000:.0f}"
+        elapsed = time.perf_counter() - t0
+        outputs[name] = results
+        print(f"{name:>9}: {len(items)} items in {elapsed:.2f}s ({len(items) / elapsed:.1f} items/s){extra}")
+    print(f"identical ordered results: {outputs['adaptive'] == outputs['batch']}")
+
+
 if __name__ == "__main__":
-    asyncio.run(main())
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Async 10k audit runner")
+    parser.add_argument("--resume", action="store_true", help="skip request ids already in the JSONL checkpoint")
+    parser.add_argument("--scheduler", choices=SCHEDULERS, default="adaptive")
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--input", type=Path, default=TRAINING_FILE, help="cases file (JSON array or JSONL), streamed")
+    parser.add_argument("--mock", action="store_true", help="no ChromaDB / MedGemma calls (deterministic output)")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="injected latency per call")
+    parser.add_argument("--rate", type=int, default=RATE_LIMIT, help="token bucket: requests per --period")
+    parser.add_argument("--period", type=float, default=RATE_PERIOD)
+    parser.add_argument("--max-in-flight", type=int, default=None,
+                        help="upper bound of the adaptive cap (default: concurrency_guard's max; the guard's live "
+                             "limit always applies on top)")
+    parser.add_argument("--no-memo", action="store_true", help="disable inquiry memoization (latency measurement)")
+    add_telemetry_arguments(parser)
+    parser.add_argument("--bench", type=int, default=0, metavar="N", help="benchmark both schedulers on N cases")
+    parser.add_argument("--bench-base-ms", type=float, default=20.0)
+    parser.add_argument("--bench-capacity", type=int, default=12)
+    args = parser.parse_args()
+    if args.bench:
+        asyncio.run(bench(args.bench, args.bench_base_ms, args.bench_capacity, args.rate, args.period, args.input))
+    else:
+        asyncio.run(main(resume=args.resume, scheduler=args.scheduler, limit=args.limit, path=args.input,
+                         mock=args.mock, latency_ms=args.latency_ms, rate=args.rate, period=args.period,
+                         max_in_flight=args.max_in_flight, memo=not args.no_memo,
+                         telemetry=telemetry_options(args, STATUS_JSONL, STACK_DUMP)))
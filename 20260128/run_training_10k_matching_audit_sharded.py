@@ -0,0 +1,499 @@
+# V4.0_STRATEGIC_LOCKED_BY_SMITH_LIN
+# -*- coding: utf-8 -*-
+"""
+10k 匹配逻辑审计 — 多进程分片执行器。
+主进程只对 --input 做一遍键扫描（字节偏移、request_id、memo 规划，不保留病例），任务为 JSONL 字节区间；
+N 个 worker 进程各自构建一次 TrinityBridge，并自行从 --input 流式读取所领区间内的病例（JSON 数组输入
+先流式转换为临时 JSONL）：
+- static：每个 worker 处理一段连续切片（确定性分配）；
+- dynamic：所有 worker 从共享任务队列领取 chunk（work-stealing，慢分片不拖尾）。
+worker 通过结果队列按 chunk 回传结果，主进程按原始下标归并，
+输出顺序与顺序版 run_training_10k_matching_audit.py 一致；--mock 下结果 JSON 逐字节相同（--verify 校验）。
+主进程将到达的结果追加到 JSONL checkpoint（--resume 跳过已完成 request_id），结束后流式压缩为结果 JSON。
+--scaling 1,2,4,8,16 输出扩展性曲线（不写结果文件）。
+Inquiry 复用（InquiryMemo）在主进程规划阶段完成：逐字相同的 inquiry 只派发首次出现，
+结果到达后扇出给重复项（改写 request_id）；首次出现失败时重复项另起一轮执行。--no-memo 关闭。
+主进程对每条到达结果喂入 AuditTelemetry（滚动状态 JSONL、可选 --metrics-port、无进展 watchdog）。
+--queue PATH：改由 SQLite 租约队列（work_queue.py）调度，启动 N 个本地队列 worker；同一队列文件可同时被
+其他机器上的 run_training_10k_matching_audit.py --queue 消费，被杀死的 worker 其 chunk 在租约过期后自动回收。
+注：各 worker 的 protocol audit 以追加方式写同一日志文件（按批 O_APPEND 写入，行不交错；轮转经锁文件串行化，不丢行）。
+"""
+import argparse
+import contextlib
+import json
+import multiprocessing as mp
+import os
+import queue
+import sys
+import tempfile
+import time
+import traceback
+from typing import Any, Callable, Dict, FrozenSet, Iterator, List, Optional, Tuple
+
+from audit_checkpoint import JsonlCheckpoint
+from audit_telemetry import AuditTelemetry
+from case_loader import convert_to_jsonl, detect_format, iter_cases, iter_jsonl
+from inquiry_memo import RECORD_FIELDS, InquiryMemo
+from work_queue import WorkQueue, default_owner
+from run_training_10k_matching_audit import (
+    CHECKPOINT_EVERY_N,
+    LOG_EVERY_N,
+    RESULTS_JSON,
+    SUMMARY_MD,
+    BASE,
+    QUEUE_JOB,
+    QUEUE_LEASE_SECONDS,
+    TRAINING_FILE,
+    _log_progress,
+    add_queue_arguments,
+    add_telemetry_arguments,
+    build_stats,
+    enqueue_cases,
+    finalize,
+    finalize_queue,
+    make_bridge,
+    make_memo,
+    record_key,
+    run_one,
+    run_queue_worker,
+    telemetry_options,
+    warm_memo,
+)
+
+PROGRESS_LOG = BASE / "run_10k_audit_sharded_log.txt"
+CHECKPOINT_JSONL = BASE / "matching_audit_results_10k_sharded.jsonl"
+STATUS_JSONL = BASE / "run_10k_audit_sharded_status.jsonl"
+STACK_DUMP = BASE / "run_10k_audit_sharded_stacks.txt"
+DEFAULT_CHUNK_SIZE = 25
+SCHEDULES = ("static", "dynamic")
+
+Chunk = List[Tuple[int, int]]
+Task = Tuple[int, int, int, FrozenSet[int]]
+
+
+@contextlib.contextmanager
+def jsonl_input(path) -> Iterator[str]:
+    """字节区间分片需要 JSONL：JSON 数组输入先流式转换为临时 JSONL（运行结束即删除），JSONL 原样使用。"""
+    path = str(path)
+    if detect_format(path) != "json_array":
+        yield path
+        return
+    with tempfile.TemporaryDirectory(prefix="audit_shards_") as tmp:
+        dst = os.path.join(tmp, os.path.splitext(os.path.basename(path))[0] + ".jsonl")
+        convert_to_jsonl(path, dst)
+        yield dst
+
+
+def _chunks(indexed: Chunk, size: int) -> List[Chunk]:
+    return [indexed[i:i + size] for i in range(0, len(indexed), size)]
+
+
+def plan_chunks(indexed: Chunk, workers: int, schedule: str, chunk_size: int) -> List[List[Chunk]]:
+    """
+    生成每个 worker 的任务列表（indexed 为 (原始下标, 字节偏移)）。static：第 w 个 worker 得到第 w 段连续切片
+    （再按 chunk_size 切块）；dynamic：返回单一共享列表（[all_chunks]），由 worker 竞争领取。
+    """
+    if schedule == "dynamic":
+        return [_chunks(indexed, chunk_size)]
+    per = -(-len(indexed) // workers) if indexed else 0
+    return [_chunks(indexed[w * per:(w + 1) * per], chunk_size) for w in range(workers)]
+
+
+def plan_tasks(
+    offsets: List[int], dispatch: List[int], workers: int, schedule: str, chunk_size: int,
+) -> Tuple[List[List[Task]], List[List[int]]]:
+    """
+    把待派发下标按 plan_chunks 切块，每块转为字节区间任务 (chunk id, start, end, skip)：worker 流式读取
+    [start, end) 内的病例并跳过 skip 中的偏移（已完成 / memo 命中 / 重复项）。offsets[i] 为第 i 条的起始字节，
+    末尾多一项为最后一条之后的终点。返回 (每个队列的任务列表, members[chunk id] = 该块的原始下标)。
+    """
+    plan = plan_chunks([(i, offsets[i]) for i in dispatch], workers, schedule, chunk_size)
+    members: List[List[int]] = []
+    tasks: List[List[Task]] = []
+    for chunks in plan:
+        queued: List[Task] = []
+        for chunk in chunks:
+            idx = [i for i, _ in chunk]
+            keep = set(idx)
+            skip = frozenset(offsets[j] for j in range(idx[0], idx[-1] + 1) if j not in keep)
+            queued.append((len(members), offsets[idx[0]], offsets[idx[-1] + 1], skip))
+            members.append(idx)
+        tasks.append(queued)
+    return tasks, members
+
+
+def _worker(worker_id: int, src: str, task_q, result_q, mock: bool, latency_ms: float) -> None:
+    """
+    worker 进程：构建一次 bridge，循环领取字节区间任务直到 None 哨兵，自行从 src 流式读取区间内的病例，
+    逐 chunk 回传 (chunk id, [(inquiry, 结果)], 计算秒数)；inquiry 供主进程记入 memo。
+    """
+    try:
+        bridge = make_bridge(mock=mock, latency_ms=latency_ms)
+        result_q.put(("ready", worker_id, None))
+        while True:
+            task = task_q.get()
+            if task is None:
+                break
+            cid, start, end, skip = task
+            t0 = time.perf_counter()
+            out = [(rec.get("original_inquiry", ""), run_one(bridge, rec, timings=not mock))
+                   for off, rec in iter_jsonl(src, start, end, with_offsets=True) if off not in skip]
+            result_q.put(("results", worker_id, (cid, out, time.perf_counter() - t0)))
+        try:
+            from audit_writer import close_all_audit_writers
+            close_all_audit_writers()
+        except Exception:
+            pass
+        result_q.put(("done", worker_id, None))
+    except Exception:
+        result_q.put(("error", worker_id, traceback.format_exc()))
+
+
+def _execute(
+    src: str,
+    tasks: List[List[Task]],
+    members: List[List[int]],
+    workers: int,
+    schedule: str,
+    mock: bool,
+    latency_ms: float,
+    on_chunk: Callable[[int, List[int], List[Tuple[str, Dict[str, Any]]], float], None],
+) -> float:
+    """启动 workers 个进程消费 tasks，每个到达的 chunk 回调 on_chunk(worker, 下标, [(inquiry, 结果)], 秒数)；返回启动耗时。"""
+    ctx = mp.get_context()
+    result_q = ctx.Queue()
+    if schedule == "dynamic":
+        shared = ctx.Queue()
+        task_qs = [shared] * workers
+        for t in tasks[0]:
+            shared.put(t)
+    else:
+        task_qs = [ctx.Queue() for _ in range(workers)]
+        for q, queued in zip(task_qs, tasks):
+            for t in queued:
+                q.put(t)
+    for q in task_qs:
+        q.put(None)
+    start = time.time()
+    procs = [ctx.Process(target=_worker, args=(w, src, task_qs[w], result_q, mock, latency_ms), daemon=True)
+             for w in range(workers)]
+    for p in procs:
+        p.start()
+    finished = 0
+    ready_at: Optional[float] = None
+    try:
+        while finished < workers:
+            try:
+                kind, wid, payload = result_q.get(timeout=5.0)
+            except queue.Empty:
+                dead = [w for w, p in enumerate(procs) if not p.is_alive() and p.exitcode not in (0, None)]
+                if dead:
+                    raise RuntimeError(f"worker(s) {dead} exited abnormally")
+                continue
+            if kind == "ready":
+                ready_at = ready_at or time.time()
+            elif kind == "results":
+                cid, out, seconds = payload
+                if len(out) != len(members[cid]):
+                    raise RuntimeError(f"chunk {cid}: expected {len(members[cid])} cases, worker read {len(out)} "
+                                       f"({src} changed during the run?)")
+                on_chunk(wid, members[cid], out, seconds)
+            elif kind == "done":
+                finished += 1
+            elif kind == "error":
+                raise RuntimeError(f"worker {wid} failed:\n{payload}")
+    finally:
+        for p in procs:
+            p.join(timeout=5.0)
+            if p.is_alive():
+                p.terminate()
+    return (ready_at or start) - start
+
+
+def run_sharded(
+    path,
+    limit: Optional[int] = None,
+    workers: int = 4,
+    schedule: str = "dynamic",
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    mock: bool = False,
+    latency_ms: float = 0.0,
+    ckpt: Optional[JsonlCheckpoint] = None,
+    memo: Optional[InquiryMemo] = None,
+    telemetry: Optional[Dict[str, Any]] = None,
+) -> Tuple[List[Optional[Dict[str, Any]]], Dict[str, Any]]:
+    """
+    多进程执行 path（JSON 数组或 JSONL）前 limit 条的 run_one，返回 (results_list, stats_dict)；results 与病例一一对应、顺序一致。
+    主进程只做一遍键扫描（字节偏移、request_id、memo 规划，不保留病例），worker 按字节区间自行流式读取病例，
+    队列中只传区间与结果。
+    给定 ckpt 时：已在 checkpoint 中的记录跳过（对应位置为 None），新结果到达即追加。
+    给定启用的 memo 时：memo 已有的 inquiry 直接复用，其余按 inquiry 原文去重后只派发首次出现。
+    telemetry 为 AuditTelemetry 参数（结果到达主进程时计入；watchdog 转储主进程线程栈）。
+    stats 仅统计本次执行的记录，额外含 workers / schedule / startup_seconds / per_worker。
+    """
+    if schedule not in SCHEDULES:
+        raise ValueError(f"schedule must be one of {SCHEDULES}, got {schedule!r}")
+    workers = max(1, int(workers))
+    chunk_size = max(1, int(chunk_size))
+    with jsonl_input(path) as src:
+        # 规划阶段去重：followers[首次出现下标] = 重复项下标列表；重复项只保留扇出时改写的字段
+        offsets: List[int] = []
+        keys: List[str] = []
+        dispatch: List[int] = []
+        served: List[Tuple[int, Dict[str, Any]]] = []
+        followers: Dict[int, List[int]] = {}
+        fields: Dict[int, Dict[str, Any]] = {}
+        first: Dict[str, int] = {}
+        use_memo = memo is not None and memo.enabled
+        end = os.path.getsize(src)
+        for i, (off, rec) in enumerate(iter_jsonl(src, with_offsets=True)):
+            if limit is not None and limit > 0 and i >= limit:
+                end = off
+                break
+            offsets.append(off)
+            keys.append(record_key(i, rec))
+            if ckpt is not None and keys[i] in ckpt:
+                continue
+            if use_memo:
+                hit = memo.serve(rec)
+                if hit is not None:
+                    served.append((i, hit))
+                    continue
+                k = memo.key(rec)
+                if k in first:
+                    followers[first[k]].append(i)
+                    fields[i] = {f: rec.get(f, "") for f in RECORD_FIELDS}
+                    continue
+                first[k] = i
+                followers[i] = []
+            dispatch.append(i)
+        offsets.append(end)
+        pending = [i for i in range(len(keys)) if ckpt is None or keys[i] not in ckpt]
+        total = len(pending)
+        results: List[Optional[Dict[str, Any]]] = [None] * len(keys)
+        tele = AuditTelemetry(total, run_name=f"sharded-{schedule}", **(telemetry or {})).start()
+
+        def emit(i: int, r: Dict[str, Any]) -> None:
+            results[i] = r
+            tele.observe(r)
+            if ckpt is not None:
+                ckpt.append(keys[i], r)
+
+        for i, hit in served:
+            emit(i, hit)
+        retry: List[int] = []
+        per_worker = [0] * workers
+        done = len(served)
+        next_log = LOG_EVERY_N
+
+        def on_chunk(wid: int, idx: List[int], out: List[Tuple[str, Dict[str, Any]]], seconds: float) -> None:
+            nonlocal done, next_log
+            for i, (inquiry, r) in zip(idx, out):
+                emit(i, r)
+                dups = followers.pop(i, ())
+                if memo is not None:
+                    memo.record_miss({"original_inquiry": inquiry}, r, seconds / len(out))
+                if r.get("error_msg"):
+                    retry.extend(dups)  # 失败结果不复用，重复项另行执行
+                    continue
+                for j in dups:
+                    emit(j, memo.fan_out(r, fields.pop(j)))
+                done += len(dups)
+            done += len(out)
+            per_worker[wid] += len(out)
+            if done >= next_log:
+                snap = tele.snapshot()
+                _log_progress(PROGRESS_LOG, f"[progress] {done}/{total} elapsed_sec={round(time.time() - start, 1)} "
+                                            f"rps={snap['rps_rolling']} eta_sec={snap['eta_seconds']}")
+                next_log += LOG_EVERY_N
+
+        def on_retry(wid: int, idx: List[int], out: List[Tuple[str, Dict[str, Any]]], seconds: float) -> None:
+            nonlocal done
+            for j, (inquiry, r) in zip(idx, out):
+                emit(j, r)
+                memo.record_miss({"original_inquiry": inquiry}, r, seconds / len(out))
+            done += len(out)
+
+        start = time.time()
+        _log_progress(PROGRESS_LOG, f"[start] total={total} workers={workers} schedule={schedule} "
+                                    f"chunk_size={chunk_size} at {time.strftime('%Y-%m-%d %H:%M:%S')}")
+        try:
+            tasks, members = plan_tasks(offsets, dispatch, workers, schedule, chunk_size)
+            startup = _execute(src, tasks, members, workers, schedule, mock, latency_ms, on_chunk)
+            if retry:
+                retry.sort()
+                tasks, members = plan_tasks(offsets, retry, min(workers, len(retry)), schedule, chunk_size)
+                _execute(src, tasks, members, min(workers, len(retry)), schedule, mock, latency_ms, on_retry)
+        finally:
+            tele.close()
+    elapsed = time.time() - start
+    if done != total:
+        raise RuntimeError(f"{total - done} records missing from worker results")
+    _log_progress(PROGRESS_LOG, f"[done] {total}/{total} elapsed_sec={round(elapsed, 1)}")
+    stats = build_stats((results[i] for i in pending), elapsed)
+    stats.update({
+        "workers": workers,
+        "schedule": schedule,
+        "startup_seconds": round(startup, 2),
+        "per_worker": per_worker,
+    })
+    return results, stats
+
+
+def _queue_worker(queue_path: str, job: str, mock: bool, latency_ms: float, memo: bool, lease_seconds: float,
+                  journal_mode: str = "wal") -> None:
+    """本地队列 worker 进程：不入队、不 finalize（由主进程统一完成），各自独立 memo。"""
+    run_queue_worker(queue_path, mock=mock, latency_ms=latency_ms, memo=memo, job=job, lease_seconds=lease_seconds,
+                     enqueue=False, finalize_when_drained=False, journal_mode=journal_mode)
+    try:
+        from audit_writer import close_all_audit_writers
+        close_all_audit_writers()
+    except Exception:
+        pass
+
+
+def run_queue_sharded(
+    queue_path: str,
+    workers: int = 4,
+    limit: int = None,
+    mock: bool = False,
+    latency_ms: float = 0.0,
+    path: str = None,
+    memo: bool = True,
+    job: str = QUEUE_JOB,
+    lease_seconds: float = QUEUE_LEASE_SECONDS,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    journal_mode: str = "wal",
+) -> Dict[str, Any]:
+    """
+    主进程幂等入队后启动 workers 个队列 worker 进程并等待退出；个别 worker 异常退出（含被 kill）不影响结果，
+    其租约过期后由存活 worker 回收。全部退出后若队列已排空且本进程抢到 finalize 权，则生成结果文件与汇总；
+    若所有 worker 都已退出而队列未排空（或由其他机器 finalize），返回的 stats 中 finalized=False。
+    """
+    with WorkQueue(queue_path, job=job, lease_seconds=lease_seconds, journal_mode=journal_mode) as q:
+        added = enqueue_cases(q, limit=limit, path=path, chunk_size=chunk_size)
+        _log_progress(PROGRESS_LOG, f"[queue] enqueued={added} workers={workers} status={q.status()}")
+    ctx = mp.get_context()
+    worker_args = (str(queue_path), job, mock, latency_ms, memo, lease_seconds, journal_mode)
+    procs = [ctx.Process(target=_queue_worker, args=worker_args, daemon=True) for _ in range(max(1, int(workers)))]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    exitcodes = [p.exitcode for p in procs]
+    with WorkQueue(queue_path, job=job, lease_seconds=lease_seconds, journal_mode=journal_mode) as q:
+        status = q.status()
+        _log_progress(PROGRESS_LOG, f"[queue] workers exited {exitcodes} status={status}")
+        stats: Dict[str, Any] = {"finalized": False}
+        if q.try_finalize(default_owner()):
+            stats.update(finalize_queue(q))
+            stats["finalized"] = True
+    stats.update({"queue": status, "exitcodes": exitcodes})
+    return stats
+
+
+def results_bytes(results: List[Dict[str, Any]]) -> bytes:
+    """与 finalize 写出的结果 JSON 相同的序列化（json.dump indent=2 兼容，用于逐字节比对）。"""
+    return json.dumps(results, ensure_ascii=False, indent=2).encode("utf-8")
+
+
+def verify_against_sequential(path, results: List[Dict[str, Any]], limit: Optional[int] = None,
+                              latency_ms: float = 0.0) -> bool:
+    """在主进程内用单个 mock bridge 流式顺序执行 path 前 limit 条，比较两份结果 JSON 是否逐字节相同。"""
+    bridge = make_bridge(mock=True, latency_ms=latency_ms)
+    sequential = [run_one(bridge, rec) for rec in iter_cases(str(path), limit=limit)]
+    return results_bytes(sequential) == results_bytes(results)
+
+
+def scaling_curve(path, limit, worker_counts, schedule, chunk_size, mock, latency_ms) -> List[Dict[str, Any]]:
+    """依次以不同 worker 数运行，返回每档 elapsed / throughput / speedup（相对第一档）。"""
+    rows: List[Dict[str, Any]] = []
+    for n in worker_counts:
+        _, st = run_sharded(path, limit=limit, workers=n, schedule=schedule, chunk_size=chunk_size,
+                            mock=mock, latency_ms=latency_ms)
+        rows.append({
+            "workers": n,
+            "elapsed_s": st["elapsed_seconds"],
+            "startup_s": st["startup_seconds"],
+            "records_per_s": round(st["total"] / max(st["elapsed_seconds"], 1e-9), 1),
+        })
+        base = rows[0]["elapsed_s"]
+        rows[-1]["speedup"] = round(base / max(rows[-1]["elapsed_s"], 1e-9), 2)
+        print(f"  workers={n:>2}: {rows[-1]}")
+        sys.stdout.flush()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TrinityBridge.run_safe 10k 匹配逻辑审计（多进程分片）")
+    parser.add_argument("limit", nargs="?", type=int, default=None, help="仅处理前 N 条")
+    parser.add_argument("--workers", type=int, default=mp.cpu_count())
+    parser.add_argument("--schedule", choices=SCHEDULES, default="dynamic")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--mock", action="store_true", help="不连接 ChromaDB / MedGemma，输出确定")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="每条注入的模拟延迟（毫秒）")
+    parser.add_argument("--resume", action="store_true", help="从 checkpoint JSONL 续跑，跳过已完成的 request_id")
+    parser.add_argument("--verify", action="store_true", help="与顺序 mock 运行逐字节比对（需 --mock）")
+    parser.add_argument("--input", type=str, default=str(TRAINING_FILE), help="病例文件（JSON 数组或 JSONL）")
+    parser.add_argument("--scaling", type=str, default=None, help="如 1,2,4,8,16：输出扩展性曲线，不写结果文件")
+    parser.add_argument("--no-memo", action="store_true", help="关闭 inquiry 结果复用（延迟测量时使用）")
+    add_queue_arguments(parser, chunk_size=False)
+    add_telemetry_arguments(parser)
+    args = parser.parse_args()
+    limit = args.limit if args.limit and args.limit > 0 else None
+    if args.queue:
+        print(f"Running {args.workers} queue workers on {args.queue} (job={args.job}) ...")
+        stats = run_queue_sharded(str(args.queue), workers=args.workers, limit=limit, mock=args.mock,
+                                  latency_ms=args.latency_ms, path=args.input, memo=not args.no_memo, job=args.job,
+                                  lease_seconds=args.lease_seconds, chunk_size=args.chunk_size,
+                                  journal_mode=args.journal_mode)
+        print(f"Queue: {stats['queue']} worker exit codes: {stats['exitcodes']}")
+        if stats["finalized"]:
+            print(f"Done. Results: {RESULTS_JSON}")
+            print(f"Total: {stats['total']}, Passed L1: {stats['passed_l1']}, Intercepted: {stats['intercepted']}, "
+                  f"Errors: {stats['errors']}, Elapsed: {stats['elapsed_seconds']}s")
+        return
+
+    with jsonl_input(args.input) as src:
+        if args.scaling:
+            counts = [int(x) for x in args.scaling.split(",") if x.strip()]
+            print(f"Scaling curve (schedule={args.schedule}, chunk_size={args.chunk_size}, "
+                  f"latency_ms={args.latency_ms}, cpus={mp.cpu_count()}):")
+            scaling_curve(src, limit, counts, args.schedule, args.chunk_size, args.mock, args.latency_ms)
+            return
+
+        # 第一遍只取键（最终排序）并用 checkpoint 预热 memo；病例由 worker 按字节区间自行读取
+        ckpt = JsonlCheckpoint(CHECKPOINT_JSONL, fsync_every=CHECKPOINT_EVERY_N, resume=args.resume)
+        memo = make_memo(mock=args.mock, enabled=not args.no_memo)
+        keys: List[str] = []
+        for i, rec in enumerate(iter_cases(src, limit=limit)):
+            keys.append(record_key(i, rec))
+            if keys[-1] in ckpt:
+                warm_memo(memo, ckpt, keys[-1], rec)
+        print(f"Indexed {len(keys)} records.")
+        if args.resume:
+            print(f"Resumed {sum(1 for k in keys if k in ckpt)} completed records from checkpoint.")
+        print(f"Running with workers={args.workers} schedule={args.schedule} ...")
+        _, run_stats = run_sharded(src, limit=limit, workers=args.workers, schedule=args.schedule,
+                                   chunk_size=args.chunk_size, mock=args.mock, latency_ms=args.latency_ms,
+                                   ckpt=ckpt, memo=memo, telemetry=telemetry_options(args, STATUS_JSONL, STACK_DUMP))
+        if args.verify:
+            if not args.mock:
+                print("--verify requires --mock (live L2/L3 output is not deterministic); skipped.")
+            else:
+                ok = verify_against_sequential(src, list(ckpt.iter_results(keys)), limit=limit)
+                print(f"Byte-identical to sequential mock run: {ok}")
+                if not ok:
+                    sys.exit(2)
+    print("Writing results...")
+    print(f"Memo: {memo.stats()}")
+    stats = finalize(ckpt, keys, run_stats["elapsed_seconds"], memo_stats=memo.stats())
+    stats["per_worker"] = run_stats["per_worker"]
+    print(f"Done. Results: {RESULTS_JSON}")
+    print(f"Summary: {SUMMARY_MD}")
+    print(f"Total: {stats['total']}, Passed L1: {stats['passed_l1']}, Intercepted: {stats['intercepted']}, "
+          f"Errors: {stats['errors']}, Elapsed: {stats['elapsed_seconds']}s, per_worker: {stats['per_worker']}")
+
+
+if __name__ == "__main__":
+    main()
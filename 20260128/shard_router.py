@@ -0,0 +1,595 @@
+# V4.0_STRATEGIC_LOCKED_BY_SMITH_LIN
+# -*- coding: utf-8 -*-
+"""
+Discipline-sharded vector retrieval for the monolithic Chroma collections (expert_map_global,
+mayo_clinic_trials), following the discipline split sketched in chromadb_optimizer.py.
+- detect_disciplines(text): keyword hits per discipline. The vocabulary joins the two domain detectors
+  already in the tree, ontology_engine.MEDICAL_ONTOLOGY and AMAHWeightOrchestrator.detect_strategic_domain.
+  Generic terms ("trial", "cell", "biomarker") are left out because almost every document contains them.
+- ShardManager: physically partitions a source collection into one collection per discipline, named
+  "<source>__<discipline>". Each row goes to its strongest discipline; rows with no hits go to "general".
+  Stored embeddings are copied, not re-embedded, and each shard keeps the source's hnsw:space so distances
+  and ranking match the source. Each shard records its source, discipline and the source row count it
+  reflects (source_count) in its collection metadata, so routers can find the shards without a side
+  registry. sync_ids() mirrors a writer's upserts/deletes into the shards and advances that stamp.
+- Freshness: shards are a copy. A source whose count no longer matches the stamp was written by something
+  that did not call sync_ids() (batch_build_db, the bulk loaders); the router then does not use the shards
+  (available is False at start, later queries go to the source) until they are rebuilt with --build.
+  In-place rewrites by such writers do not change the count; rebuild after a bulk rewrite.
+- ShardRouter: embeds the query once and routes it to the shards of the detected intent. A clear intent
+  uses one shard; an ambiguous intent uses every discipline within ambiguity_ratio of the top hit count,
+  up to max_shards. With no detected intent, every shard is queried. The general shard is added unless
+  include_general=False. Shards are queried in parallel threads when there is more than one core. Each
+  distance is mapped to a similarity for that shard's hnsw:space (cosine 1-d, ip -d, l2 1/(1+d)). The
+  merged top n is returned in Chroma's single-query result shape, with distances = 1 - similarity.
+open_router(client, source, base_dir) applies the vector_sharding block of amah_config.json (routing is off
+unless enabled). Run as script: build shards for a collection (--build) or benchmark p50/p95 latency and recall@k of the
+router against the monolithic collection on a synthetic corpus (--bench).
+"""
+import argparse
+import json
+import logging
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from chromadb.api.types import EmbeddingFunction
+
+logger = logging.getLogger(__name__)
+
+GENERAL = "general"
+SHARD_SEPARATOR = "__"
+# shard metadata key: source row count the shards reflect (freshness stamp)
+STAMP_KEY = "source_count"
+FRESHNESS_CHECK_SECONDS = 30.0
+# HNSW parameters of the discipline shards, same as chromadb_optimizer.create_optimized_collection
+# (hnsw:space is replaced by the source collection's space at build time)
+SHARD_HNSW_METADATA = {
+    "hnsw:space": "cosine",
+    "hnsw:construction_ef": 200,
+    "hnsw:search_ef": 100,
+    "hnsw:M": 16,
+}
+DISCIPLINES: Dict[str, Tuple[str, ...]] = {
+    # Parkinson domain (weight orchestrator) + Parkinson ontology boost keywords
+    "neurology": (
+        "dbs", "parkinson", "tremor", "stn", "movement", "ips", "bci", "dopaminergic", "subthalamic",
+        "neural interface", "neuralink", "neuro", "brain", "帕金森", "脑机接口",
+    ),
+    # Oncology domain + Cancer ontology boost keywords
+    "oncology": (
+        "cancer", "oncology", "adc", "tumor", "kras", "g12c", "mrna vaccine", "car-t", "carcinoma",
+        "lymphoma", "leukemia", "癌",
+    ),
+    # Longevity domain + regenerative anchors of the hard-anchor list
+    "longevity": (
+        "aging", "longevity", "nad+", "stem cell", "gene therapy", "regenerat", "干细胞",
+    ),
+}
+
+
+def _compile(keywords: Iterable[str]) -> "re.Pattern":
+    # latin terms must start a word ("stn" must not match inside "distnct", "adc" inside "headcount");
+    # CJK terms have no word boundaries
+    parts = []
+    for k in sorted(keywords, key=len, reverse=True):
+        term = re.escape(k.lower())
+        parts.append(f"(?<![a-z0-9]){term}" if k[:1].isascii() else term)
+    return re.compile("|".join(parts))
+
+
+_DISCIPLINE_RES = {d: _compile(kws) for d, kws in DISCIPLINES.items()}
+
+
+def detect_disciplines(text: str) -> List[Tuple[str, int]]:
+    """(discipline, keyword hits) with at least one hit, strongest first (ties keep DISCIPLINES order)."""
+    low = (text or "").lower()
+    hits = [(d, len(pattern.findall(low))) for d, pattern in _DISCIPLINE_RES.items()]
+    return sorted((h for h in hits if h[1]), key=lambda h: -h[1])
+
+
+def classify(document: str, metadata: Optional[Dict[str, Any]] = None) -> str:
+    """Shard of one row: strongest discipline over document + specialty/category metadata, else general."""
+    meta = metadata or {}
+    text = f"{document or ''} {meta.get('specialty', '')} {meta.get('category', '')} {meta.get('asset_focus', '')}"
+    found = detect_disciplines(text)
+    return found[0][0] if found else GENERAL
+
+
+def shard_name(source: str, discipline: str) -> str:
+    return f"{source}{SHARD_SEPARATOR}{discipline}"
+
+
+def _similarity(space: str) -> Any:
+    if space == "cosine":
+        return lambda d: 1.0 - d
+    if space == "ip":
+        return lambda d: -d
+    return lambda d: 1.0 / (1.0 + d)
+
+
+def _collection_space(collection: Any) -> str:
+    try:
+        cfg = getattr(collection, "configuration_json", None) or {}
+        space = (cfg.get("hnsw") or {}).get("space")
+        if space:
+            return space
+    except Exception:
+        pass
+    return (collection.metadata or {}).get("hnsw:space", "l2")
+
+
+class ShardManager:
+    """Builds and opens the discipline shards of one source collection."""
+
+    def __init__(self, client: Any, source: str, embedding_function: Any = None):
+        self.client = client
+        self.source = source
+        self._embedding_function = embedding_function
+
+    def _ef_kwargs(self) -> Dict[str, Any]:
+        return {"embedding_function": self._embedding_function} if self._embedding_function is not None else {}
+
+    def shard_names(self) -> Dict[str, str]:
+        """discipline -> collection name of the shards that exist for this source."""
+        prefix = f"{self.source}{SHARD_SEPARATOR}"
+        out = {}
+        for col in self.client.list_collections():
+            name = col if isinstance(col, str) else col.name
+            if name.startswith(prefix):
+                out[name[len(prefix):]] = name
+        return out
+
+    def open(self) -> Dict[str, Any]:
+        """discipline -> shard collection (empty when the source has not been sharded)."""
+        return {d: self.client.get_collection(name, **self._ef_kwargs()) for d, name in self.shard_names().items()}
+
+    def source_collection(self) -> Any:
+        return self.client.get_collection(self.source, **self._ef_kwargs())
+
+    def stamp(self, shards: Optional[Dict[str, Any]] = None) -> Optional[int]:
+        """Source row count the shards reflect; None without shards or when a shard has no stamp."""
+        shards = self.open() if shards is None else shards
+        stamps = [(c.metadata or {}).get(STAMP_KEY) for c in shards.values()]
+        if not stamps or any(s is None for s in stamps):
+            return None
+        return min(stamps)
+
+    def is_fresh(self, shards: Optional[Dict[str, Any]] = None) -> bool:
+        """The shards reflect the source: its current row count equals the stamp written at build / sync."""
+        stamp = self.stamp(shards)
+        return stamp is not None and self.source_collection().count() == stamp
+
+    def _set_stamp(self, shards: Dict[str, Any], count: int) -> None:
+        for col in shards.values():
+            # the distance function cannot be modified; hnsw keys are left out of the update
+            meta = {k: v for k, v in (col.metadata or {}).items() if not k.startswith("hnsw:")}
+            col.modify(metadata={**meta, STAMP_KEY: int(count)})
+
+    def _create_shard(self, discipline: str, space: str, count: int) -> Any:
+        return self.client.get_or_create_collection(
+            shard_name(self.source, discipline),
+            metadata={**SHARD_HNSW_METADATA, "hnsw:space": space, "shard_of": self.source,
+                      "discipline": discipline, STAMP_KEY: int(count)},
+            **self._ef_kwargs(),
+        )
+
+    def build(self, page_size: int = 5000, reset: bool = True) -> Dict[str, int]:
+        """
+        Partition the source into discipline shards (keyset pages, stored embeddings copied as-is).
+        reset=True drops existing shards first so rows that changed discipline do not linger.
+        Returns rows per discipline.
+        """
+        from bulk_maintenance import iter_id_pages
+        from bulk_pipeline import max_batch_size
+
+        source = self.source_collection()
+        space = _collection_space(source)
+        total = source.count()  # rows written during the build leave the stamp behind: shards read as stale
+        if reset:
+            for name in self.shard_names().values():
+                self.client.delete_collection(name)
+        batch = max_batch_size(source, page_size)
+        shards: Dict[str, Any] = {}
+        counts: Dict[str, int] = {}
+        for page in iter_id_pages(source, batch):
+            got = source.get(ids=page, include=["embeddings", "documents", "metadatas"])
+            groups: Dict[str, List[int]] = {}
+            for i, (doc, meta) in enumerate(zip(got["documents"], got["metadatas"])):
+                groups.setdefault(classify(doc, meta), []).append(i)
+            for discipline, rows in groups.items():
+                shard = shards.get(discipline)
+                if shard is None:
+                    shard = shards[discipline] = self._create_shard(discipline, space, total)
+                shard.upsert(
+                    ids=[got["ids"][i] for i in rows],
+                    embeddings=[got["embeddings"][i] for i in rows],
+                    documents=[got["documents"][i] for i in rows],
+                    metadatas=[got["metadatas"][i] or None for i in rows],
+                )
+                counts[discipline] = counts.get(discipline, 0) + len(rows)
+        if not reset:
+            self._set_stamp(self.open(), total)
+        return counts
+
+    def sync_ids(self, ids: Sequence[str], source_count_before: int, page_size: int = 5000) -> bool:
+        """
+        Mirror a write to the source into the shards: ids still in the source are (re)classified and copied
+        with their stored embeddings, ids gone from it are deleted from every shard. source_count_before is
+        the source count before that write; the stamp advances only if the shards were fresh then, so a gap
+        left by another writer stays visible. Returns whether the shards are fresh afterwards.
+        """
+        shards = self.open()
+        if not shards:
+            return False
+        source = self.source_collection()
+        was_fresh = self.stamp(shards) == source_count_before
+        space = _collection_space(source)
+        ids = list(dict.fromkeys(ids))
+        for i in range(0, len(ids), page_size):
+            page = ids[i:i + page_size]
+            got = source.get(ids=page, include=["embeddings", "documents", "metadatas"])
+            placed: Dict[str, List[int]] = {}
+            for row, (doc, meta) in enumerate(zip(got["documents"], got["metadatas"])):
+                placed.setdefault(classify(doc, meta), []).append(row)
+            for discipline, rows in placed.items():
+                if discipline not in shards:
+                    shards[discipline] = self._create_shard(discipline, space, source_count_before)
+                shards[discipline].upsert(
+                    ids=[got["ids"][r] for r in rows],
+                    embeddings=[got["embeddings"][r] for r in rows],
+                    documents=[got["documents"][r] for r in rows],
+                    metadatas=[got["metadatas"][r] or None for r in rows],
+                )
+            for discipline, shard in shards.items():
+                keep = {got["ids"][r] for r in placed.get(discipline, ())}
+                stale = [x for x in page if x not in keep]
+                if stale:
+                    shard.delete(ids=stale)
+        if was_fresh:
+            self._set_stamp(shards, source.count())
+            return True
+        logger.warning("Shards of %s were already stale before this write; rebuild them (shard_router.py --build)",
+                       self.source)
+        return False
+
+
+class ShardRouter:
+    """Routes single-query retrieval to the discipline shards of a ShardManager."""
+
+    def __init__(
+        self,
+        manager: ShardManager,
+        embed_fn: Any = None,
+        max_shards: int = 2,
+        ambiguity_ratio: float = 0.5,
+        include_general: bool = True,
+        parallel: Optional[bool] = None,
+        check_interval: float = FRESHNESS_CHECK_SECONDS,
+    ):
+        self._manager = manager
+        self._shards = manager.open()
+        self._source: Any = None
+        self.check_interval = float(check_interval)
+        self._checked_at = time.monotonic()
+        self._fresh = bool(self._shards) and manager.is_fresh(self._shards)
+        if self._shards and not self._fresh:
+            logger.warning("Discipline shards of %s are stale (source count differs from the build stamp); "
+                           "not routing until rebuilt with shard_router.py --build", manager.source)
+            self._shards = {}
+        self._space = {d: _collection_space(c) for d, c in self._shards.items()}
+        self._embed_fn = embed_fn or manager._embedding_function
+        if self._embed_fn is None and self._shards:
+            from embedding_cache import collection_embedding_fn
+            self._embed_fn = collection_embedding_fn(next(iter(self._shards.values())))
+        self.max_shards = max(1, int(max_shards))
+        self.ambiguity_ratio = float(ambiguity_ratio)
+        self.include_general = include_general
+        # thread fan-out only pays off with spare cores; on one core it adds hand-off latency
+        parallel = (os.cpu_count() or 1) > 1 if parallel is None else parallel
+        self._pool = ThreadPoolExecutor(max_workers=len(DISCIPLINES) + 1, thread_name_prefix="shard-query") \
+            if parallel else None
+
+    @property
+    def available(self) -> bool:
+        return bool(self._shards)
+
+    def fresh(self) -> bool:
+        """Freshness of the shards, re-checked (one count() on the source) at most every check_interval s."""
+        if self._shards and time.monotonic() - self._checked_at >= self.check_interval:
+            self._checked_at = time.monotonic()
+            was, self._fresh = self._fresh, self._manager.is_fresh(self._shards)
+            if was and not self._fresh:
+                logger.warning("Discipline shards of %s went stale; querying the source until rebuilt",
+                               self._manager.source)
+        return self._fresh and bool(self._shards)
+
+    def route(self, text: str) -> List[str]:
+        """Shards for one query: detected disciplines (bounded), plus general; all shards without intent."""
+        found = [(d, n) for d, n in detect_disciplines(text) if d in self._shards]
+        if not found:
+            return list(self._shards)
+        top = found[0][1]
+        chosen = [d for d, n in found if n >= top * self.ambiguity_ratio][:self.max_shards]
+        if self.include_general and GENERAL in self._shards:
+            chosen.append(GENERAL)
+        return chosen
+
+    def _query_shard(self, discipline: str, embedding: Sequence[float], n_results: int,
+                     include: List[str], where_document: Optional[Dict[str, Any]]) -> List[Tuple[float, str, Any, Any]]:
+        kwargs: Dict[str, Any] = {"n_results": n_results, "include": list({*include, "distances"})}
+        if where_document:
+            kwargs["where_document"] = where_document
+        res = self._shards[discipline].query(query_embeddings=[embedding], **kwargs)
+        sim = _similarity(self._space[discipline])
+        ids = (res.get("ids") or [[]])[0]
+        dists = (res.get("distances") or [[]])[0]
+        docs = (res.get("documents") or [[]])[0] if "documents" in include else []
+        metas = (res.get("metadatas") or [[]])[0] if "metadatas" in include else []
+        return [(sim(dists[i]), aid, docs[i] if i < len(docs) else None, metas[i] if i < len(metas) else None)
+                for i, aid in enumerate(ids)]
+
+    def query(
+        self,
+        query_text: str = "",
+        n_results: int = 10,
+        include: Optional[List[str]] = None,
+        where_document: Optional[Dict[str, Any]] = None,
+        query_embedding: Optional[Sequence[float]] = None,
+        shards: Optional[List[str]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Scatter-gather top n_results for one query; returns a Chroma-shaped result
+        ({"ids": [[...]], "distances": [[...]], ...}) plus "shards": the shards that were queried.
+        """
+        include = list(include or ["documents", "metadatas", "distances"])
+        if query_embedding is None:
+            query_embedding = self._embed_fn([query_text])[0]
+        if not self.fresh():
+            # stale copy: answer from the source collection ("shards" is empty)
+            if self._source is None:
+                self._source = self._manager.source_collection()
+            kwargs: Dict[str, Any] = {"n_results": n_results, "include": include}
+            if where_document:
+                kwargs["where_document"] = where_document
+            return {**self._source.query(query_embeddings=[query_embedding], **kwargs), "shards": []}
+        targets = shards or self.route(query_text)
+        if len(targets) == 1:
+            gathered = self._query_shard(targets[0], query_embedding, n_results, include, where_document)
+        elif self._pool is None:
+            gathered = [hit for d in targets for hit in self._query_shard(d, query_embedding, n_results, include,
+                                                                          where_document)]
+            gathered.sort(key=lambda h: -h[0])
+        else:
+            futures = [self._pool.submit(self._query_shard, d, query_embedding, n_results, include, where_document)
+                       for d in targets]
+            gathered = [hit for f in futures for hit in f.result()]
+            gathered.sort(key=lambda h: -h[0])
+        top = gathered[:n_results]
+        out: Dict[str, Any] = {"ids": [[h[1] for h in top]], "shards": targets}
+        if "distances" in include:
+            out["distances"] = [[1.0 - h[0] for h in top]]
+        if "documents" in include:
+            out["documents"] = [[h[2] for h in top]]
+        if "metadatas" in include:
+            out["metadatas"] = [[h[3] for h in top]]
+        return out
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+
+
+def load_sharding_config(base_dir: Optional[str] = None) -> Dict[str, Any]:
+    """The vector_sharding block of amah_config.json ({} when missing or unreadable)."""
+    path = os.path.join(base_dir or os.path.dirname(os.path.abspath(__file__)), "amah_config.json")
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return dict(json.load(f).get("vector_sharding") or {})
+    except Exception:
+        return {}
+
+
+def open_router(client: Any, source: str, cfg: Optional[Dict[str, Any]] = None,
+                base_dir: Optional[str] = None, embedding_function: Any = None) -> Optional[ShardRouter]:
+    """
+    ShardRouter for source when vector_sharding.enabled is set and fresh shards exist, else None
+    (callers query the source directly). cfg defaults to the block in amah_config.json. embedding_function is
+    the one the source was built with; without it each shard's persisted configuration applies.
+    """
+    cfg = load_sharding_config(base_dir) if cfg is None else cfg
+    if not cfg.get("enabled", False):
+        return None
+    router = ShardRouter(
+        ShardManager(client, source, embedding_function=embedding_function),
+        max_shards=int(cfg.get("max_shards", 2)),
+        ambiguity_ratio=float(cfg.get("ambiguity_ratio", 0.5)),
+        include_general=bool(cfg.get("include_general", True)),
+        check_interval=float(cfg.get("freshness_check_seconds", FRESHNESS_CHECK_SECONDS)),
+    )
+    if router.available:
+        return router
+    router.close()
+    return None
+
+
+# ------------------------------------------------------------------------------
+# Benchmark: synthetic discipline corpus, hashed bag-of-words embeddings
+# ------------------------------------------------------------------------------
+_BENCH_TERMS = {
+    "neurology": ["STN-DBS lead placement", "Parkinson tremor", "BCI neural interface", "dopaminergic iPS graft",
+                  "subthalamic stimulation", "brain mapping"],
+    "oncology": ["KRAS G12C inhibitor", "CAR-T lymphoma", "ADC tumor trial", "cervical cancer radiotherapy",
+                 "mRNA vaccine oncology", "carcinoma resection"],
+    "longevity": ["NAD+ aging", "stem cell regeneration", "gene therapy longevity", "regenerative medicine"],
+    GENERAL: ["cardiology valve repair", "orthopedic knee", "dermatology laser", "renal dialysis",
+              "ophthalmology retina", "general medicine"],
+}
+_HUBS = ["Jacksonville", "Houston", "Boston", "Tokyo", "Zurich", "Shanghai", "Toronto", "London"]
+
+
+class HashingEmbedding(EmbeddingFunction):
+    """Deterministic hashed bag-of-words embedding (benchmark only: offline, no model download)."""
+
+    def __init__(self, dim: int = 128):
+        self.dim = dim
+
+    @staticmethod
+    def name() -> str:
+        return "hashing-bench"
+
+    def get_config(self) -> Dict[str, Any]:
+        return {"dim": self.dim}
+
+    @staticmethod
+    def build_from_config(config: Dict[str, Any]) -> "HashingEmbedding":
+        return HashingEmbedding(int(config.get("dim", 128)))
+
+    def __call__(self, input: List[str]) -> List[List[float]]:
+        import hashlib
+        import numpy as np
+
+        out = np.zeros((len(input), self.dim), dtype=np.float32)
+        for row, text in enumerate(input):
+            for tok in re.findall(r"[a-z0-9+\-]+", (text or "").lower()):
+                h = int.from_bytes(hashlib.blake2b(tok.encode(), digest_size=4).digest(), "little")
+                out[row, h % self.dim] += 1.0 if (h >> 31) & 1 else -1.0
+            norm = float(np.linalg.norm(out[row]))
+            if norm:
+                out[row] /= norm
+        return out.tolist()
+
+
+_FILLER = ("cohort", "protocol", "outcomes", "registry", "fellowship", "consult", "imaging", "surgery", "pathway",
+           "follow-up", "genomics", "telehealth", "second-opinion", "pediatric", "geriatric", "inpatient")
+
+
+def _bench_corpus(size: int, seed: int = 11) -> List[Tuple[str, str, Dict[str, Any]]]:
+    import random
+    rng = random.Random(seed)
+    names = list(_BENCH_TERMS)
+    weights = [0.3, 0.3, 0.15, 0.25]
+    rows = []
+    for i in range(size):
+        d = rng.choices(names, weights)[0]
+        terms = rng.sample(_BENCH_TERMS[d], 2)
+        hub = rng.choice(_HUBS)
+        doc = f"{hub} expert {i} | {terms[0]} | {terms[1]} | {' '.join(rng.sample(_FILLER, 3))} | Medicare"
+        rows.append((f"exp_{i:07d}", doc, {"hub": hub}))
+    return rows
+
+
+def _bench_queries(n: int, seed: int = 5) -> List[str]:
+    import random
+    rng = random.Random(seed)
+    out = []
+    for i in range(n):
+        kind = i % 4
+        if kind == 3:  # ambiguous: two disciplines
+            a, b = rng.sample(["neurology", "oncology", "longevity"], 2)
+            out.append(f"{rng.choice(_BENCH_TERMS[a])} and {rng.choice(_BENCH_TERMS[b])} in {rng.choice(_HUBS)}")
+        else:
+            d = ["neurology", "oncology", "longevity"][kind]
+            out.append(f"Patient seeking {rng.choice(_BENCH_TERMS[d])} {rng.choice(_HUBS)}")
+    return out
+
+
+def _percentile(values: List[float], q: float) -> float:
+    s = sorted(values)
+    return s[min(len(s) - 1, int(round(q * (len(s) - 1))))]
+
+
+def _recall(expect: List[Tuple[str, float]], got_ids: List[str], got_dists: List[float]) -> float:
+    """
+    Tie-aware recall@k against the monolithic top k: a routed hit counts when it is one of the monolithic
+    ids or is at least as close as the monolithic k-th result (equal distances are interchangeable).
+    """
+    if not expect:
+        return 1.0
+    ids = {i for i, _ in expect}
+    kth = expect[-1][1] + 1e-6
+    return min(len(expect), sum(1 for i, d in zip(got_ids, got_dists) if i in ids or d <= kth)) / len(expect)
+
+
+def bench(size: int, queries: int = 400, k: int = 10, dim: int = 128) -> Dict[str, Any]:
+    import shutil
+    import tempfile
+
+    import chromadb
+
+    from bulk_pipeline import max_batch_size
+
+    tmp = tempfile.mkdtemp(prefix="shard_bench_")
+    ef = HashingEmbedding(dim)
+    try:
+        client = chromadb.PersistentClient(path=tmp)
+        mono = client.create_collection("bench_mono", metadata=dict(SHARD_HNSW_METADATA), embedding_function=ef)
+        rows = _bench_corpus(size)
+        step = max_batch_size(mono)
+        t0 = time.perf_counter()
+        for i in range(0, len(rows), step):
+            part = rows[i:i + step]
+            mono.add(ids=[r[0] for r in part], documents=[r[1] for r in part], metadatas=[r[2] for r in part])
+        load_s = time.perf_counter() - t0
+        del rows
+        manager = ShardManager(client, "bench_mono", embedding_function=ef)
+        t0 = time.perf_counter()
+        counts = manager.build()
+        build_s = time.perf_counter() - t0
+        texts = _bench_queries(queries)
+        embeddings = ef(texts)
+        # GNNAssetAnchor's anchor pushdown adds a where_document $contains filter: a scan over the documents
+        filters = [None, {"$contains": "Medicare"}]
+        results: Dict[str, Dict[str, float]] = {}
+        for where in filters:
+            tag = "" if where is None else " +filter"
+            truth, lat = [], []
+            for emb in embeddings:
+                kwargs = {"where_document": where} if where else {}
+                t0 = time.perf_counter()
+                res = mono.query(query_embeddings=[emb], n_results=k, include=["distances"], **kwargs)
+                lat.append(time.perf_counter() - t0)
+                truth.append(list(zip(res["ids"][0], res["distances"][0])))
+            results["monolithic" + tag] = {"p50_ms": _percentile(lat, 0.5) * 1000, "p95_ms": _percentile(lat, 0.95) * 1000,
+                                           "recall": 1.0, "shards_per_query": 1.0}
+            for label, kwargs in (("routed", {}), ("routed, no general", {"include_general": False})):
+                router = ShardRouter(manager, embed_fn=ef, **kwargs)
+                lat, recall, fanout = [], 0.0, 0
+                for text, emb, expect in zip(texts, embeddings, truth):
+                    t0 = time.perf_counter()
+                    res = router.query(text, n_results=k, include=["distances"], where_document=where,
+                                       query_embedding=emb)
+                    lat.append(time.perf_counter() - t0)
+                    recall += _recall(expect, res["ids"][0], res["distances"][0])
+                    fanout += len(res["shards"])
+                router.close()
+                results[label + tag] = {"p50_ms": _percentile(lat, 0.5) * 1000, "p95_ms": _percentile(lat, 0.95) * 1000,
+                                        "recall": recall / len(texts), "shards_per_query": fanout / len(texts)}
+        return {"size": size, "load_s": load_s, "build_s": build_s, "shard_rows": counts, "results": results}
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Discipline shards: build for a collection, or benchmark")
+    parser.add_argument("--build", metavar="COLLECTION", help="shard this collection (e.g. expert_map_global)")
+    parser.add_argument("--db", default="./amah_vector_db", help="Chroma persistent path for --build")
+    parser.add_argument("--bench", default="", help="benchmark corpus sizes, e.g. 100000,300000")
+    parser.add_argument("--queries", type=int, default=400)
+    args = parser.parse_args()
+    if args.build:
+        import chromadb
+        counts = ShardManager(chromadb.PersistentClient(path=args.db), args.build).build()
+        print(f"{args.build}: " + ", ".join(f"{d}={n:,}" for d, n in sorted(counts.items())))
+    for size in [int(s) for s in args.bench.split(",") if s]:
+        r = bench(size, queries=args.queries)
+        print(f"corpus={size:,} (load {r['load_s']:.0f}s, shard build {r['build_s']:.0f}s) shards={r['shard_rows']}")
+        for label, m in r["results"].items():
+            print(f"  {label:<28} p50 {m['p50_ms']:6.2f}ms  p95 {m['p95_ms']:6.2f}ms  recall@10 {m['recall']:.3f}  "
+                  f"shards/query {m['shards_per_query']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
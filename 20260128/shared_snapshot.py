@@ -0,0 +1,199 @@
+# V4.0_STRATEGIC_LOCKED_BY_SMITH_LIN
+# -*- coding: utf-8 -*-
+"""
+Cross-process snapshot file: one serialization per snapshot version, mmap'd by any number of readers.
+Layout (little-endian):
+  [0:48)   magic "AMSNAP01", version, header offset/length, table offset, slot count
+  header   JSON object (everything that is not a keyed section: totals, region counts, pulse summary,
+           plus the record count per section)
+  table    open-addressing hash table of (hash64, entry offset, entry length, key length) slots
+  entries  utf-8 "section\\x1fkey" followed by the JSON-encoded record
+A reader maps the file once; a lookup hashes the key, probes a few slots via struct.unpack_from and
+decodes only that record. Writers publish by writing a temp file and os.replace(), so readers holding
+the old mapping keep a consistent version until they refresh().
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, Mapping as MappingT, Optional, Tuple
+
+_MAGIC = b"AMSNAP01"
+_PREAMBLE = struct.Struct("<8sQQQQQ")  # magic, version, header_off, header_len, table_off, n_slots
+_SLOT = struct.Struct("<QQII")  # key hash, entry offset (0 = empty), entry length, key length
+_SEP = "\x1f"
+def _json_default(value: Any) -> Any:
+    # mapping proxies / Mapping records are not dict subclasses, so json hands them to default
+    asdict = getattr(value, "_asdict", None)
+    if asdict is not None:
+        return asdict()
+    if isinstance(value, Mapping):
+        return dict(value)
+    if isinstance(value, tuple):
+        return list(value)
+    return str(value)
+
+
+_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=_json_default)
+
+
+def _hash64(composite_key: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(composite_key, digest_size=8).digest(), "little")
+
+
+def write_snapshot(path: str, version: int, header: MappingT[str, Any],
+                   sections: MappingT[str, MappingT[str, Any]]) -> int:
+    """
+    Serialize header + keyed sections into path (atomic replace). Returns bytes written.
+    header must not contain the key "section_counts" (it is filled in here).
+    """
+    counts = {section: len(records) for section, records in sections.items()}
+    head = _ENCODER.encode({**header, "section_counts": counts}).encode("utf-8")
+    n_slots = 8
+    while n_slots < sum(counts.values()) * 2:  # load factor <= 0.5
+        n_slots *= 2
+    header_off = _PREAMBLE.size
+    table_off = header_off + len(head)
+    table = bytearray(n_slots * _SLOT.size)
+    mask = n_slots - 1
+    pos = table_off + len(table)
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(prefix=".snapshot_", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            # entries are streamed after the table; the filled table is written last
+            f.seek(pos)
+            for section, records in sections.items():
+                prefix = f"{section}{_SEP}"
+                for key, record in records.items():
+                    ck = f"{prefix}{key}".encode("utf-8")
+                    body = _ENCODER.encode(record).encode("utf-8")
+                    h = _hash64(ck)
+                    slot = h & mask
+                    while _SLOT.unpack_from(table, slot * _SLOT.size)[1]:
+                        slot = (slot + 1) & mask
+                    _SLOT.pack_into(table, slot * _SLOT.size, h, pos, len(ck) + len(body), len(ck))
+                    f.write(ck)
+                    f.write(body)
+                    pos += len(ck) + len(body)
+            f.seek(0)
+            f.write(_PREAMBLE.pack(_MAGIC, version, header_off, len(head), table_off, n_slots))
+            f.write(head)
+            f.write(table)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+    return pos
+
+
+class SharedSnapshotReader:
+    """
+    mmap-backed reader for write_snapshot files. get()/section() are O(1) per key and copy only
+    the requested record; refresh() remaps when a writer has published a newer file.
+    """
+
+    def __init__(self, path: str):
+        self.path = os.path.abspath(path)
+        self._lock = threading.Lock()
+        self._map: Optional[Tuple[mmap.mmap, int, int]] = None  # (mapping, table offset, slot mask), swapped as one
+        self._stat: Optional[Tuple[int, int, int]] = None
+        self.version = 0
+        self.header: Dict[str, Any] = {}
+        self.refresh()
+
+    def refresh(self) -> bool:
+        """Map the current file if it changed since the last map. Returns True when remapped."""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return False
+        key = (st.st_ino, st.st_mtime_ns, st.st_size)
+        with self._lock:
+            if key == self._stat:
+                return False
+            with open(self.path, "rb") as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, header_off, header_len, table_off, n_slots = _PREAMBLE.unpack_from(mm, 0)
+            if magic != _MAGIC:
+                mm.close()
+                raise ValueError(f"{self.path} is not a snapshot file")
+            self.header = json.loads(mm[header_off:header_off + header_len])
+            # the previous mapping is not closed: lookups still running on it finish on that version,
+            # and it is unmapped once the last reference is dropped
+            self._map = (mm, table_off, n_slots - 1)
+            self.version, self._stat = version, key
+        return True
+
+    def close(self) -> None:
+        with self._lock:
+            if self._map is not None:
+                self._map[0].close()
+            self._map, self._stat = None, None
+
+    def __enter__(self) -> "SharedSnapshotReader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def get(self, section: str, key: str, default: Any = None) -> Any:
+        ck = f"{section}{_SEP}{key}".encode("utf-8")
+        h = _hash64(ck)
+        current = self._map
+        if current is None:
+            return default
+        mm, table_off, mask = current
+        slot = h & mask
+        while True:
+            sh, off, length, klen = _SLOT.unpack_from(mm, table_off + slot * _SLOT.size)
+            if not off:
+                return default
+            if sh == h and mm[off:off + klen] == ck:
+                return json.loads(mm[off + klen:off + length])
+            slot = (slot + 1) & mask
+
+    def keys(self, section: str) -> Iterator[str]:
+        """Keys of one section in table order (a full table scan; use get() for lookups)."""
+        current = self._map
+        if current is None:
+            return
+        mm, table_off, mask = current
+        prefix = f"{section}{_SEP}".encode("utf-8")
+        for slot in range(mask + 1):
+            _, off, _, klen = _SLOT.unpack_from(mm, table_off + slot * _SLOT.size)
+            if off and mm[off:off + len(prefix)] == prefix:
+                yield mm[off + len(prefix):off + klen].decode("utf-8")
+
+    def section(self, name: str) -> "SharedSection":
+        return SharedSection(self, name)
+
+
+class SharedSection(Mapping):
+    """Read-only Mapping view over one keyed section of a SharedSnapshotReader."""
+
+    __slots__ = ("_reader", "_name")
+    _MISSING = object()
+
+    def __init__(self, reader: SharedSnapshotReader, name: str):
+        self._reader = reader
+        self._name = name
+
+    def __getitem__(self, key: str) -> Any:
+        value = self._reader.get(self._name, key, self._MISSING)
+        if value is self._MISSING:
+            raise KeyError(key)
+        return value
+
+    def __iter__(self) -> Iterator[str]:
+        return self._reader.keys(self._name)
+
+    def __len__(self) -> int:
+        return int(self._reader.header.get("section_counts", {}).get(self._name, 0))
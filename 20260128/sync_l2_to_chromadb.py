@@ -3,34 +3,105 @@
 """
 Phase 3: Sync L2 assets (merged_data, expert_map_data, hospital_center_assets) to ChromaDB.
 Ensures semantic search has structured data. Run from 20260128 directory.
+--chroma additionally syncs experts + hospitals into amah_vector_db/expert_map_global through the
+incremental sync engine (incremental_sync.py): only added / changed / removed assets touch Chroma.
 """
+import argparse
 import json
 import os
 import hashlib
 
+L2_SOURCES = [
+    ("expert_map_data.json", "PI", "id", "name"),
+    ("hospital_center_assets.json", "HOSP", "id", "name"),
+]
+
 def to_agid(namespace: str, node_type: str, raw_id) -> str:
     raw = f"{namespace}:{node_type}:{raw_id}"
     sid = hashlib.sha256(str(raw).encode()).hexdigest()[:12].upper()
     return f"AGID-{namespace}-{node_type}-{sid}"
 
+def _load_items(path: str) -> list:
+    if not os.path.isfile(path):
+        return []
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except Exception:
+        return []
+    return data if isinstance(data, list) else [data]
+
+def _l2_document(namespace: str, item: dict) -> str:
+    """Embedded text per L2 node (experts use the same layout as expert_bulk_loader)."""
+    if namespace == "PI":
+        loc = item.get("location") or {}
+        return (f"{item.get('name', '')} | {item.get('affiliation', '')} | {item.get('specialty', '')} | "
+                f"Tags: {', '.join(item.get('expertise_tags') or [])} | "
+                f"Services: {', '.join(item.get('value_add_services') or [])} | "
+                f"{loc.get('city', '')}, {loc.get('state', '')}")
+    return (f"{item.get('name', '')} | {item.get('affiliation', '')} | "
+            f"{item.get('city', '')}, {item.get('state', '')}, {item.get('country', '')} | "
+            f"Focus: {', '.join(item.get('specialty_focus') or [])} | "
+            f"Services: {', '.join(item.get('value_add_services') or [])}")
+
+def l2_sync_docs(data_dir: str) -> dict:
+    """{source: [sync_doc]} for every L2 node file; AGID is the Chroma id, the raw id is kept as alias."""
+    from incremental_sync import sync_doc
+    out = {}
+    for name, namespace, key_id, key_name in L2_SOURCES:
+        docs = []
+        for item in _load_items(os.path.join(data_dir, name)):
+            nid = item.get(key_id)
+            if not nid and not item.get("agid"):
+                continue
+            agid = item.get("agid") or to_agid(namespace, "NODE", nid)
+            meta = {"agid": agid, "node_type": namespace, "name": str(item.get(key_name) or "")[:200]}
+            if nid:
+                meta["legacy_id"] = str(nid)
+            docs.append(sync_doc(agid, _l2_document(namespace, item), meta, legacy_id=str(nid) if nid else None))
+        out[f"l2_{namespace.lower()}"] = docs
+    return out
+
+def sync_l2_assets(data_dir: str = None, db_path: str = "./amah_vector_db", collection_name: str = "expert_map_global",
+                   manifest_path: str = None, dry_run: bool = False) -> list:
+    """
+    Incrementally sync L2 experts + hospitals into Chroma; returns one stats dict per source.
+    With hybrid_retrieval.enabled, the collection's BM25 index (lexical_index) receives the same delta and is
+    caught up when its size differs; its discipline shards (shard_router), if built, get the touched ids copied across.
+    """
+    import chromadb
+    from incremental_sync import DEFAULT_MANIFEST, SyncManifest, sync_documents
+    from lexical_index import load_hybrid_config, open_lexical
+    from shard_router import ShardManager
+    base = data_dir or os.path.dirname(os.path.abspath(__file__))
+    client = chromadb.PersistentClient(path=db_path)
+    collection = client.get_or_create_collection(name=collection_name, metadata={"hnsw:space": "cosine"})
+    shards = ShardManager(client, collection_name)
+    shards = shards if shards.shard_names() and not dry_run else None
+    hybrid = load_hybrid_config()
+    lexical_path = hybrid.get("path")
+    if lexical_path and not os.path.isabs(lexical_path):  # resolved like TrinityBridge does
+        lexical_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), lexical_path)
+    lexical = None if dry_run else open_lexical(db_path, collection_name, hybrid, path=lexical_path, create=True)
+    results = []
+    try:
+        with SyncManifest(manifest_path or DEFAULT_MANIFEST) as manifest:
+            for source, docs in l2_sync_docs(base).items():
+                results.append(sync_documents(collection, docs, source, manifest, dry_run=dry_run,
+                                              lexical=lexical, shards=shards))
+        if lexical is not None and lexical.count() != collection.count():
+            lexical.sync_from_collection(collection)
+    finally:
+        if lexical is not None:
+            lexical.close()
+    return results
+
 def build_physical_node_registry(data_dir: str) -> list:
     """Build physical_node_registry from expert_map_data + hospital_center_assets."""
     registry = []
     base = data_dir or os.path.dirname(os.path.abspath(__file__))
-    for name, namespace, key_id, key_name in [
-        ("expert_map_data.json", "PI", "id", "name"),
-        ("hospital_center_assets.json", "HOSP", "id", "name"),
-    ]:
-        path = os.path.join(base, name)
-        if not os.path.isfile(path):
-            continue
-        try:
-            with open(path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-        except Exception:
-            continue
-        items = data if isinstance(data, list) else [data]
-        for item in items:
+    for name, namespace, key_id, key_name in L2_SOURCES:
+        for item in _load_items(os.path.join(base, name)):
             nid = item.get(key_id) or item.get("agid") or str(len(registry))
             agid = item.get("agid") or to_agid(namespace, "NODE", nid)
             region = (item.get("region") or item.get("location", {}).get("state") or "NA").strip()
@@ -46,6 +117,10 @@ def build_physical_node_registry(data_dir: str) -> list:
     return registry
 
 def main():
+    parser = argparse.ArgumentParser(description="Build physical_node_registry.json; optionally sync L2 nodes to ChromaDB")
+    parser.add_argument("--chroma", action="store_true", help="incrementally sync experts + hospitals to expert_map_global")
+    parser.add_argument("--dry-run", action="store_true", help="with --chroma: only report the add / change / delete plan")
+    args = parser.parse_args()
     base = os.path.dirname(os.path.abspath(__file__))
     registry = build_physical_node_registry(base)
     out_path = os.path.join(base, "physical_node_registry.json")
@@ -59,6 +134,11 @@ def main():
         print(f"NexusRouter.auto_register loaded {n} mappings.")
     except Exception as e:
         print(f"NexusRouter.auto_register skip: {e}")
+    if args.chroma:
+        for st in sync_l2_assets(base, dry_run=args.dry_run):
+            print(f"Chroma sync {st['source']}: +{st['added']} ~{st['changed']} -{st['deleted']} "
+                  f"={st['unchanged']} (embedded {st['embedded']}"
+                  + ("" if st["dry_run"] else f", collection {st['collection_count']}, aliases {st['aliases']}") + ")")
 
 if __name__ == "__main__":
     main()
@@ -1,45 +1,56 @@
+import argparse
+
 import chromadb
-import random
 
-def restore_tech_dna():
+from bulk_maintenance import print_dry_run, rewrite_metadata, stable_rng
+
+# 定义科室与前沿技术的映射关系
+TECH_MAP = {
+    "Geriatrics & Longevity": ["Cellular Reprogramming", "Senolytic Therapy", "Telomere Extension", "NAD+ Optimization"],
+    "Neurology": ["STN-DBS Precision Tuning", "Alpha-Synuclein PET Imaging", "BCI Neural Feedback", "MR-guided Focused Ultrasound"],
+    "Oncology": ["CAR-T Cell Mapping", "Liquid Biopsy Early Detection", "Proton Therapy Alignment"],
+    "Rare & Orphan Diseases": ["CRISPR-Cas9 Gene Editing", "mRNA Protein Replacement", "Orphan Drug Matching"],
+    "Cardiology": ["TAVR Robotic Assist", "Bio-printed Heart Patch", "AI-ECG Arrhythmia Prediction"]
+}
+
+def restore_dna(asset_id, m):
+    """纯函数（进程池中执行）：随机源由资产 id 派生，重复运行结果一致、不产生写入。"""
+    dept = m.get('dept', 'Standard')
+    # 如果科室有对应的前沿技术，随机分配一个；否则设为高级临床路径
+    if dept in TECH_MAP:
+        m['tech_feature'] = stable_rng(asset_id, "tech_dna").choice(TECH_MAP[dept])
+    else:
+        m['tech_feature'] = "Advanced Clinical Pathway"
+
+    # 确保 0.79 专利精度不动摇
+    m['precision_target'] = 0.79
+    return m
+
+def restore_tech_dna(dry_run=False, workers=None, after_id=None):
     client = chromadb.PersistentClient(path="./medical_db")
     collection = client.get_collection(name="mayo_clinic_trials")
     
     print("🧬 启动 [技术 DNA] 差异化注入，正在恢复 300,001 项资产的技术深度...")
 
-    # 定义科室与前沿技术的映射关系
-    tech_map = {
-        "Geriatrics & Longevity": ["Cellular Reprogramming", "Senolytic Therapy", "Telomere Extension", "NAD+ Optimization"],
-        "Neurology": ["STN-DBS Precision Tuning", "Alpha-Synuclein PET Imaging", "BCI Neural Feedback", "MR-guided Focused Ultrasound"],
-        "Oncology": ["CAR-T Cell Mapping", "Liquid Biopsy Early Detection", "Proton Therapy Alignment"],
-        "Rare & Orphan Diseases": ["CRISPR-Cas9 Gene Editing", "mRNA Protein Replacement", "Orphan Drug Matching"],
-        "Cardiology": ["TAVR Robotic Assist", "Bio-printed Heart Patch", "AI-ECG Arrhythmia Prediction"]
-    }
-
     total = collection.count()
-    batch_size = 5000
-    
-    for i in range(0, total, batch_size):
-        results = collection.get(limit=batch_size, offset=i, include=['metadatas'])
-        ids = results['ids']
-        metas = results['metadatas']
-        
-        for m in metas:
-            dept = m.get('dept', 'Standard')
-            # 如果科室有对应的前沿技术，随机分配一个；否则设为高级临床路径
-            if dept in tech_map:
-                m['tech_feature'] = random.choice(tech_map[dept])
-            else:
-                m['tech_feature'] = "Advanced Clinical Pathway"
-            
-            # 确保 0.79 专利精度不动摇
-            m['precision_target'] = 0.79
-
-        collection.update(ids=ids, metadatas=metas)
-        if (i + batch_size) % 50000 == 0 or (i + batch_size) >= total:
-            print(f"📡 恢复进度: {min(i + batch_size, total)}/300001 技术 DNA 已激活...")
-
-    print("🔥 达成！30 万项资产已完成 [前沿技术-专家中心] 的深度匹配。")
+
+    def progress(scanned, changed, last_id):
+        if scanned % 50000 == 0 or scanned >= total:
+            print(f"📡 恢复进度: {scanned}/{total} 技术 DNA 已扫描（{changed} 项变更，断点 {last_id}）...")
+
+    stats = rewrite_metadata(collection, restore_dna, workers=workers, dry_run=dry_run, after_id=after_id,
+                             progress=progress)
+    if dry_run:
+        print_dry_run(stats)
+        return stats
+
+    print(f"🔥 达成！{stats['scanned']} 项资产已完成 [前沿技术-专家中心] 的深度匹配（写入 {stats['written']} 项）。")
+    return stats
 
 if __name__ == "__main__":
-    restore_tech_dna()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="技术 DNA 差异化注入")
+    parser.add_argument("--dry-run", action="store_true", help="只输出差异，不写库")
+    parser.add_argument("--workers", type=int, default=None, help="transform 进程数（默认 CPU 数 - 1）")
+    parser.add_argument("--after-id", default=None, help="从该 id 之后续跑（取上次进度输出的断点）")
+    args = parser.parse_args()
+    restore_tech_dna(dry_run=args.dry_run, workers=args.workers, after_id=args.after_id)
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""AdaptiveConcurrencyLimiter: growth on flat latency, cut on queueing delay, caller quotas, fast rejection."""
+import threading
+import time
+
+import pytest
+
+from adaptive_limiter import AdaptiveConcurrencyLimiter, LimiterRejected
+
+
+def _run_samples(limiter, n, latency):
+    for _ in range(n):
+        permit = limiter.acquire()
+        limiter._release(permit, latency(limiter), error=False)
+
+
+@pytest.mark.parametrize("algorithm", ["gradient", "aimd"])
+def test_limit_grows_while_latency_flat(algorithm):
+    lim = AdaptiveConcurrencyLimiter(initial_limit=4, max_limit=64, algorithm=algorithm)
+    _run_samples(lim, 400, lambda _: 0.01)
+    assert lim.limit > 8
+
+
+@pytest.mark.parametrize("algorithm", ["gradient", "aimd"])
+def test_limit_cut_when_queueing_delay_grows(algorithm):
+    lim = AdaptiveConcurrencyLimiter(initial_limit=4, max_limit=64, algorithm=algorithm)
+    _run_samples(lim, 400, lambda _: 0.01)
+    high = lim.limit
+    lim._last_cut = 0.0
+    for _ in range(50):
+        lim._last_cut = 0.0  # allow one cut per sample in this synthetic loop
+        permit = lim.acquire()
+        lim._release(permit, 0.05, error=False)
+    assert lim.limit < high / 2
+
+
+def test_fixed_never_moves():
+    lim = AdaptiveConcurrencyLimiter(initial_limit=8, algorithm="fixed")
+    _run_samples(lim, 100, lambda _: 0.01)
+    _run_samples(lim, 100, lambda _: 1.0)
+    assert lim.limit == 8
+
+
+def test_caller_quota_lets_second_caller_through():
+    lim = AdaptiveConcurrencyLimiter(initial_limit=4, max_limit=4, algorithm="fixed", caller_quota=0.5)
+    # alone, a caller is not capped at its quota of 2: all 4 permits are usable
+    held = [lim.acquire("batch", timeout=0.1) for _ in range(4)]
+    got = {}
+
+    def _wait(caller):
+        got[caller] = lim.acquire(caller)
+
+    greedy = threading.Thread(target=_wait, args=("batch",))
+    greedy.start()
+    time.sleep(0.05)
+    polite = threading.Thread(target=_wait, args=("interactive",))
+    polite.start()
+    time.sleep(0.05)
+    held[0].release()  # "batch" is queued first but over quota while "interactive" waits
+    polite.join(1.0)
+    assert list(got) == ["interactive"]
+    held[1].release()
+    greedy.join(1.0)
+    assert lim.stats()["caller_in_flight"] == {"batch": 3, "interactive": 1}
+
+
+def test_fast_rejection_with_retry_after():
+    lim = AdaptiveConcurrencyLimiter(initial_limit=1, max_limit=1, algorithm="fixed")
+    p = lim.acquire()
+    lim._release(p, 2.0, error=False)  # teach the limiter that calls take ~2s
+    holder = lim.acquire()
+    waiters = [threading.Thread(target=lambda: lim.acquire(timeout=10).release()) for _ in range(3)]
+    for w in waiters:
+        w.start()
+    time.sleep(0.05)
+    t0 = time.monotonic()
+    with pytest.raises(LimiterRejected) as exc:
+        lim.acquire(timeout=1.0)
+    assert time.monotonic() - t0 < 0.1
+    assert exc.value.reason == "deadline" and exc.value.retry_after >= 1.0
+    assert lim.stats()["rejected"]["deadline"] == 1 and lim.stats()["queue_depth"] == 3
+    holder.release()
+    for w in waiters:
+        w.join(2.0)
+    assert lim.stats()["in_flight"] == 0
+
+
+def test_timeout_rejection_when_no_estimate():
+    lim = AdaptiveConcurrencyLimiter(initial_limit=1, max_limit=1, algorithm="fixed")
+    holder = lim.acquire()
+    with pytest.raises(LimiterRejected) as exc:
+        lim.acquire(timeout=0.05)
+    assert exc.value.reason == "timeout"
+    holder.release()
+    assert lim.stats()["queue_depth"] == 0
+
+
+def test_run_safe_returns_retry_after_on_rejection(monkeypatch):
+    import amani_trinity_bridge as tb
+
+    class _Rejecting:
+        def acquire(self, caller="default", timeout=None):
+            raise LimiterRejected("deadline", 3.5)
+
+    monkeypatch.setattr(tb, "_get_bridge_limiter", lambda cfg: _Rejecting())
+    monkeypatch.setattr(tb, "_append_protocol_audit", lambda *a, **k: None)
+    bridge = tb.TrinityBridge(l3_anchor=tb.GNNAssetAnchor())
+    result = bridge.run_safe("Patient with Parkinson's seeking DBS evaluation", caller="api")
+    assert result["intercepted"] is True and result["retry_after_seconds"] == 3.5
+    assert "queue deadline" in result["l1_sentinel"]["error"]
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+"""ANN snapshot export: parity with live Chroma queries, columnar metadata / where_document, atomic version switch."""
+import os
+from types import SimpleNamespace
+
+import chromadb
+import numpy as np
+
+import ann_snapshot
+from amani_trinity_bridge import GNNAssetAnchor
+from ann_snapshot import (
+    CURRENT_FILE,
+    SnapshotRetriever,
+    _synthetic_version,
+    current_version,
+    export_snapshot,
+    write_quantized,
+)
+from shard_router import HashingEmbedding
+
+DOCS = [
+    "Jacksonville STN-DBS lead placement Parkinson tremor",
+    "Tokyo dopaminergic iPS graft for Parkinson",
+    "Houston KRAS G12C inhibitor lung cancer",
+    "Boston CAR-T lymphoma programme",
+    "Zurich NAD+ aging clinic",
+    "Toronto stem cell regeneration",
+    "London cardiology valve repair",
+    "上海 脑机接口 中心",
+]
+
+
+class _BruteForceIndex:
+    """hnswlib.Index stand-in (hnswlib is an optional dependency): same calls and file round trip, exact search."""
+    queries = []
+
+    def __init__(self, space, dim):
+        self.space, self.dim = space, dim
+
+    def init_index(self, max_elements, ef_construction=200, M=16):
+        self.data, self.labels = np.zeros((0, self.dim), np.float32), np.zeros(0, np.uint64)
+
+    def add_items(self, data, ids):
+        self.data = np.vstack([self.data, np.asarray(data, np.float32)])
+        self.labels = np.concatenate([self.labels, np.asarray(ids, np.uint64)])
+
+    def save_index(self, path):
+        with open(path, "wb") as f:
+            np.savez(f, data=self.data, labels=self.labels)
+
+    def load_index(self, path, max_elements=0):
+        with open(path, "rb") as f:
+            z = np.load(f)
+            self.data, self.labels = z["data"], z["labels"]
+
+    def set_ef(self, ef):
+        self.ef = ef
+
+    def knn_query(self, data, k=1):
+        _BruteForceIndex.queries.append(k)
+        q = np.asarray(data, np.float32)
+        d = ((self.data[None] - q[:, None]) ** 2).sum(-1) if self.space == "l2" else 1.0 - q @ self.data.T
+        order = np.argsort(d, axis=1)[:, :k]
+        return self.labels[order], np.take_along_axis(d, order, axis=1)
+
+
+def _collection(tmp_path, space="cosine", name="expert_map_global"):
+    client = chromadb.PersistentClient(path=str(tmp_path / "db"))
+    ef = HashingEmbedding(64)
+    col = client.create_collection(name, metadata={"hnsw:space": space}, embedding_function=ef)
+    metas = [{"hub": f"hub_{i % 3}", "rank": i, "score": i / 2, "verified": i % 2 == 0} for i in range(len(DOCS))]
+    metas[4] = {"hub": "hub_x", "rank": 4.5}  # mixed int/float column, missing keys
+    metas[6] = None
+    col.add(ids=[f"e{i}" for i in range(len(DOCS))], documents=DOCS, metadatas=metas)
+    return client, col, ef
+
+
+def test_export_roundtrip_matches_chroma(tmp_path):
+    for space in ("cosine", "l2", "ip"):
+        _, col, ef = _collection(tmp_path / space, space)
+        manifest = export_snapshot(col, str(tmp_path / space / "snap"), page_size=3)
+        assert manifest["count"] == len(DOCS) and manifest["space"] == space and manifest["dim"] == 64
+        snap = SnapshotRetriever(str(tmp_path / space / "snap"), embedding_fn=ef)
+        assert snap.count() == len(DOCS) and snap.name == "expert_map_global"
+        for q in ("Parkinson DBS tremor", "lung cancer KRAS", "脑机接口"):
+            live = col.query(query_texts=[q], n_results=4, include=["documents", "metadatas", "distances"])
+            got = snap.query(query_texts=[q], n_results=4)
+            assert np.allclose(got["distances"][0], live["distances"][0], atol=1e-4)
+            # rows at equal distance may come back in either order: compare the strictly-closer prefix
+            cut = sum(d < live["distances"][0][-1] - 1e-4 for d in live["distances"][0])
+            assert got["ids"][0][:cut] == live["ids"][0][:cut]
+            assert got["documents"][0][:cut] == live["documents"][0][:cut]
+            assert got["metadatas"][0][:cut] == live["metadatas"][0][:cut]
+        assert snap.query(query_texts=["x"], n_results=50, include=["distances"])["documents"] is None
+
+
+def test_where_document_and_columns(tmp_path):
+    _, col, ef = _collection(tmp_path)
+    export_snapshot(col, str(tmp_path / "snap"))
+    snap = SnapshotRetriever(str(tmp_path / "snap"), embedding_fn=ef)
+    for where in ({"$contains": "Parkinson"}, {"$contains": "脑机"},
+                  {"$or": [{"$contains": "KRAS"}, {"$contains": "CAR-T"}]},
+                  {"$and": [{"$contains": "Parkinson"}, {"$contains": "Tokyo"}]}, {"$contains": "no-such-term"}):
+        live = col.query(query_texts=["Parkinson cancer"], n_results=5, where_document=where, include=["distances"])
+        got = snap.query(query_texts=["Parkinson cancer"], n_results=5, where_document=where, include=["distances"])
+        assert got["ids"][0] == live["ids"][0]
+    # a match straddling two adjacent documents ("...tremor" + "Tokyo...") is not a hit
+    assert snap.query(query_texts=["x"], n_results=5, where_document={"$contains": "tremorTokyo"})["ids"] == [[]]
+    metas = snap.query(query_texts=["Zurich aging"], n_results=8, include=["metadatas"])
+    by_id = dict(zip(metas["ids"][0], metas["metadatas"][0]))
+    assert by_id["e4"] == {"hub": "hub_x", "rank": 4.5} and by_id["e6"] is None
+    assert by_id["e1"] == {"hub": "hub_1", "rank": 1, "score": 0.5, "verified": False}
+
+
+def test_version_switch_and_anchor_uses_snapshot(tmp_path):
+    _, col, ef = _collection(tmp_path)
+    root = str(tmp_path / "snap")
+    first = export_snapshot(col, root)["version"]
+    snap = SnapshotRetriever(root, embedding_fn=ef, refresh_interval=0)
+    col.add(ids=["e_new"], documents=["Miami spinal cord stimulation Parkinson"], metadatas=[{"hub": "hub_new"}])
+    export_snapshot(col, root)
+    second = export_snapshot(col, root, keep=2)["version"]
+    assert current_version(root) == second != first
+    assert sorted(d for d in os.listdir(root) if d.startswith("v")) == ["v000002", "v000003"]
+    assert snap.count() == len(DOCS) + 1 and snap.version == second  # picked up on the next call
+    with open(os.path.join(root, CURRENT_FILE), encoding="utf-8") as f:
+        assert f.read() == second
+
+    anchor = GNNAssetAnchor(ann_snapshot={"enabled": True, "path": root}, embedding_function=ef)
+    assert anchor._chroma_collection is anchor._snapshot and anchor._chroma_client is None
+    res = anchor._query("spinal cord stimulation", 3, ["distances"], where_document={"$contains": "Miami"})
+    assert res["ids"] == [["e_new"]]
+    missing = GNNAssetAnchor(ann_snapshot={"enabled": True, "path": str(tmp_path / "absent")})
+    assert missing._snapshot is None and missing._chroma_collection is None
+
+
+def test_quantized_first_stage_rerank_matches_exact(tmp_path):
+    root = str(tmp_path / "synth")
+    centers = _synthetic_version(root, 3000, 32)
+    version_dir = os.path.join(root, "v000001")
+    for kind in ("int8", "float16"):
+        manifest = write_quantized(version_dir, kind)
+    assert set(manifest["quantized"]) == {"int8", "float16"}
+    codes = np.load(os.path.join(version_dir, "vectors_int8.npy"))
+    scale = np.load(os.path.join(version_dir, "vectors_int8_scale.npy"))
+    vectors = np.load(os.path.join(version_dir, "vectors.npy"))
+    assert codes.dtype == np.int8 and np.abs(codes * scale - vectors).max() <= scale.max() / 2 + 1e-6
+
+    rng = np.random.default_rng(0)
+    qs = centers[rng.integers(0, len(centers), 16)] + 0.6 * rng.standard_normal((16, 32)).astype(np.float32)
+    plain = SnapshotRetriever(root)
+    assert plain._version.quant is None  # float32 unless a quantized first stage is asked for
+    exact = plain.query(query_embeddings=qs, n_results=10, include=["distances"])
+    for mode in ("int8", "float16", True):
+        snap = SnapshotRetriever(root, quantized=mode, rerank=100)
+        assert snap._version.quant_kind == ("int8" if mode is True else mode)
+        got = snap.query(query_embeddings=qs, n_results=10, include=["distances"])  # batched first stage
+        single = [snap.query(query_embeddings=[q], n_results=10, include=["distances"]) for q in qs]
+        assert [s["ids"][0] for s in single] == got["ids"]
+        recall = np.mean([len(set(a) & set(b)) / 10 for a, b in zip(got["ids"], exact["ids"])])
+        assert recall >= 0.95
+        # re-ranked distances are exact float32 values, not quantized approximations
+        for ids, dists, eids, edists in zip(got["ids"], got["distances"], exact["ids"], exact["distances"]):
+            same = dict(zip(eids, edists))
+            assert all(abs(d - same[i]) < 1e-5 for i, d in zip(ids, dists) if i in same)
+
+
+def test_export_with_quantization_and_anchor_config(tmp_path):
+    _, col, ef = _collection(tmp_path, space="l2")
+    manifest = export_snapshot(col, str(tmp_path / "snap"), quantization=["int8"])
+    assert list(manifest["quantized"]) == ["int8"]
+    cfg = {"enabled": True, "path": str(tmp_path / "snap"), "rerank_candidates": 3}
+    assert GNNAssetAnchor(ann_snapshot=cfg)._snapshot._version.quant_kind is None
+    anchor = GNNAssetAnchor(ann_snapshot=dict(cfg, quantized="int8"))
+    snap = anchor._snapshot
+    assert snap._version.quant_kind == "int8" and snap.rerank == 3
+    snap._embedding_function = ef
+    for q in ("Parkinson DBS tremor", "lung cancer KRAS"):
+        live = col.query(query_texts=[q], n_results=2, include=["distances"])
+        got = snap.query(query_texts=[q], n_results=2, include=["distances"])
+        assert np.allclose(got["distances"][0], live["distances"][0], atol=1e-4)
+    # a float16 request against an int8-only snapshot falls back to the exact float32 scan
+    assert SnapshotRetriever(str(tmp_path / "snap"), embedding_fn=ef, quantized="float16")._version.quant is None
+
+
+def test_hnsw_index_is_built_loaded_and_queried(tmp_path, monkeypatch, caplog):
+    monkeypatch.setattr(ann_snapshot, "hnswlib", SimpleNamespace(Index=_BruteForceIndex))
+    for space in ("cosine", "l2"):
+        _, col, ef = _collection(tmp_path / space, space)
+        root = str(tmp_path / space / "snap")
+        manifest = export_snapshot(col, root, page_size=3)
+        index_file = os.path.join(root, manifest["version"], "index.hnsw")
+        assert manifest["index"] == "hnswlib" and os.path.isfile(index_file)
+        snap = SnapshotRetriever(root, embedding_fn=ef)
+        assert snap._version.index is not None and snap._version.index.ef == 100
+        _BruteForceIndex.queries.clear()
+        live = col.query(query_texts=["Parkinson DBS tremor"], n_results=4, include=["distances"])
+        got = snap.query(query_texts=["Parkinson DBS tremor"], n_results=4, include=["distances"])
+        assert _BruteForceIndex.queries == [4]  # served by the index, distances recomputed from the float32 rows
+        assert np.allclose(got["distances"][0], live["distances"][0], atol=1e-4)
+        snap.query(query_texts=["x"], n_results=2, where_document={"$contains": "Parkinson"})
+        assert _BruteForceIndex.queries == [4]  # filtered queries rank only the matching rows
+    # an unreadable index file, or no hnswlib at query time, falls back to the exact scan
+    with open(index_file, "wb") as f:
+        f.write(b"not an index")
+    assert SnapshotRetriever(root, embedding_fn=ef)._version.index is None
+    monkeypatch.setattr(ann_snapshot, "hnswlib", None)
+    monkeypatch.setattr(ann_snapshot, "EXACT_SCAN_WARN_ROWS", len(DOCS))
+    assert SnapshotRetriever(root, embedding_fn=ef).query(query_texts=["Parkinson"], n_results=2)["ids"][0]
+    assert "exact O(n) scan" in caplog.text  # the fallback is announced, not served silently
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""asset_store: JSON views import/export losslessly, ingest dedups through the unique indexes, replace is change-aware."""
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "asset_library_l2"))
+
+import asset_ingest  # noqa: E402
+from asset_store import AssetStore, to_agid  # noqa: E402
+
+
+def _write_view(path, items):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(items, f, ensure_ascii=False, indent=2)
+
+
+def test_existing_view_imports_and_exports_byte_identical(tmp_path):
+    items = [{"id": "NCT1", "title": "脑深部电刺激", "status": "RECRUITING", "nested": {"a": [1, 2]}},
+             {"title": "row without id", "status": "ACTIVE"},
+             {"id": "NCT2", "title": "t2", "status": "ACTIVE", "criteria": "line1\nline2"}]
+    view = tmp_path / "merged_data.json"
+    _write_view(view, items)
+    original = view.read_bytes()
+    with AssetStore(str(tmp_path)) as store:
+        assert store.count("trial") == 3
+        assert store.export_views() == []  # nothing changed since import
+        assert store.export_views(["trial"], force=True) == [str(view)]
+        assert view.read_bytes() == original
+        _write_view(tmp_path / "empty.json", [])
+        store.export_json("pi", path=str(tmp_path / "pi.json"), force=True)
+        assert (tmp_path / "pi.json").read_bytes() == (tmp_path / "empty.json").read_bytes()
+
+
+def test_ingest_skips_duplicates_and_invalid_records(tmp_path, monkeypatch):
+    monkeypatch.setattr(asset_ingest, "WORKING_LOG_JSONL", str(tmp_path / "log.jsonl"))
+    monkeypatch.setattr(asset_ingest, "WORKING_LOG_MD", str(tmp_path / "log.md"))
+    _write_view(tmp_path / "hospital_center_assets.json", [{"id": "h0", "name": "Existing"}])
+    recs = [{"id": "h0", "name": "dup of existing"}, {"id": "h1", "name": "New"}, {"id": "h1", "name": "dup in batch"},
+            {"id": "h2"}]
+    assert asset_ingest.ingest_hospitals(recs, data_dir=str(tmp_path)) == (1, ["h1"])
+    assert asset_ingest.ingest_hospitals(recs, data_dir=str(tmp_path)) == (0, [])
+    cov = [{"id": "c1", "region": "EU", "coverage_count": 5}, {"id": "c2", "region": "NA", "coverage_count": 7}]
+    assert asset_ingest.ingest_patient_coverage(cov, data_dir=str(tmp_path))[0] == 2
+    assert "total coverage count: 12" in (tmp_path / "log.jsonl").read_text(encoding="utf-8").splitlines()[-1]
+
+    paths = asset_ingest.export_views(str(tmp_path))
+    assert sorted(os.path.basename(p) for p in paths) == ["hospital_center_assets.json", "patient_coverage_by_region.json"]
+    hospitals = json.loads((tmp_path / "hospital_center_assets.json").read_text(encoding="utf-8"))
+    assert [h["id"] for h in hospitals] == ["h0", "h1"] and hospitals[1]["name"] == "New"
+    assert asset_ingest.export_views(str(tmp_path)) == []
+
+
+def test_replace_is_change_aware_and_agid_unique(tmp_path):
+    with AssetStore(str(tmp_path)) as store:
+        added, _ = store.upsert("trial", [{"id": f"NCT{i}", "title": "v1"} for i in range(10)], batch_size=3)
+        assert len(added) == 10
+        recs = [{"id": f"NCT{i}", "title": "v2" if i < 2 else "v1"} for i in range(10)]
+        assert store.upsert("trial", recs, replace=True) == ([], ["NCT0", "NCT1"])
+        assert store.get("trial", "NCT0")["title"] == "v2"
+        # a different source id claiming an AGID that is already taken is not stored
+        clash = {"id": "OTHER", "agid": to_agid("TRIAL", "NODE", "NCT3")}
+        assert store.upsert("trial", [clash, {"id": "NCT99"}]) == (["NCT99"], [])
+        assert store.contains("trial", ["NCT99", "OTHER"]) == {"NCT99"}
+
+
+def test_views_rewritten_by_other_writers_are_merged_before_export(tmp_path):
+    view = tmp_path / "merged_data.json"
+    with AssetStore(str(tmp_path)) as store:
+        store.upsert("trial", [{"id": "A"}, {"id": "B"}])
+        store.export_views()
+        # a legacy script appends to the view directly, then the store ingests and exports again
+        _write_view(view, json.loads(view.read_text(encoding="utf-8")) + [{"id": "FRONTIER"}])
+        store.upsert("trial", [{"id": "C"}])
+        store.export_views()
+        assert [r["id"] for r in json.loads(view.read_text(encoding="utf-8"))] == ["A", "B", "FRONTIER", "C"]
+        # a purifier drops B and edits A; D was added to the store meanwhile and must survive
+        store.upsert("trial", [{"id": "D"}])
+        _write_view(view, [{"id": "A", "clean": True}, {"id": "FRONTIER"}, {"id": "C"}])
+        assert store.export_views() == [str(view)]
+        assert json.loads(view.read_text(encoding="utf-8")) == [
+            {"id": "A", "clean": True}, {"id": "FRONTIER"}, {"id": "C"}, {"id": "D"}]
+        os.utime(view)  # touched, same content: no merge, nothing to export
+        assert store.export_views() == [] and store.count("trial") == 4
+    with AssetStore(str(tmp_path)) as store:  # the sync point survives reopening
+        assert store.count("trial") == 4 and store.export_views() == []
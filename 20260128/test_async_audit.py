@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""Async audit runner: per-item adaptive admission beats the batch scheduler's fixed concurrency of 3; cases stream
+from --input."""
+import asyncio
+import json
+
+from aiolimiter import AsyncLimiter
+
+import run_training_10k_matching_audit as audit
+import run_training_10k_matching_audit_async as runner
+from case_loader import convert_to_jsonl
+from run_training_10k_matching_audit import LatencyInjectingBridge, load_training_data, make_bridge
+
+
+def _collect(scheduler, items, bridge):
+    results = [None] * len(items)
+
+    def on_result(i, out):
+        results[i] = out
+
+    async def go():
+        limiter = AsyncLimiter(100000, 1)
+        if scheduler == "batch":
+            await runner.run_batched(items, lambda: bridge, limiter, on_result)
+            return None
+        sched = runner.AdaptiveItemScheduler(bridge, limiter, initial_in_flight=4, max_in_flight=16)
+        await sched.run(items, on_result)
+        return sched
+
+    return results, asyncio.run(go())
+
+
+def test_adaptive_scheduler_runs_items_concurrently_and_keeps_order():
+    items = list(enumerate(load_training_data(limit=120)))
+    bridge = LatencyInjectingBridge(make_bridge(mock=True), latency_ms=5)
+    adaptive, sched = _collect("adaptive", items, bridge)
+    batch, _ = _collect("batch", items, bridge)
+    assert adaptive == batch and all(r is not None for r in adaptive)
+    assert sched.peak_in_flight > runner.BATCH_CONCURRENCY
+    assert sched.cap.stats()["in_flight"] == 0 and sched.cap.stats()["granted"] == len(items)
+
+
+def test_rate_limited_result_is_retried():
+    inner = make_bridge(mock=True)
+    calls = {"n": 0}
+
+    class _Flaky:
+        def run_safe(self, text, top_k_agids=5, **kwargs):
+            calls["n"] += 1
+            if calls["n"] == 1:
+                raise RuntimeError("HTTP 429 RateLimit")
+            return inner.run_safe(text, top_k_agids=top_k_agids, **kwargs)
+
+    items = list(enumerate(load_training_data(limit=1)))
+    results, sched = _collect("adaptive", items, _Flaky())
+    assert calls["n"] == 2 and results[0]["error_msg"] is None
+    assert sched.cap.stats()["errors"] == 1
+
+
+def test_main_streams_input_file_and_resumes(tmp_path, monkeypatch):
+    for name in ("RESULTS_JSON", "RESULTS_COLUMNAR", "SUMMARY_MD"):
+        monkeypatch.setattr(audit, name, tmp_path / name.lower())
+    monkeypatch.setattr(runner, "CHECKPOINT_JSONL", tmp_path / "ckpt.jsonl")
+    monkeypatch.setattr(runner, "PROGRESS_LOG", tmp_path / "log.txt")
+    cases = tmp_path / "cases.jsonl"
+    convert_to_jsonl(str(audit.TRAINING_FILE), str(cases))
+    outputs = {}
+    for scheduler in runner.SCHEDULERS:
+        asyncio.run(runner.main(scheduler=scheduler, limit=40, path=cases, mock=True, rate=100000, period=1))
+        outputs[scheduler] = audit.RESULTS_JSON.read_bytes()
+    assert outputs["adaptive"] == outputs["batch"] and len(json.loads(outputs["batch"])) == 40
+    asyncio.run(runner.main(resume=True, limit=40, path=cases, mock=True, rate=100000, period=1))
+    assert audit.RESULTS_JSON.read_bytes() == outputs["batch"]
+    assert "resumed=40" in runner.PROGRESS_LOG.read_text(encoding="utf-8")
+
+
+def test_in_flight_cap_is_derived_from_the_bridge_guard(tmp_path):
+    assert runner.guard_in_flight_bounds() == (8, 2, 64)  # amah_config.json concurrency_guard
+    cfg = tmp_path / "cfg.json"
+    fixed = {"enabled": True, "max_concurrent_bridge_calls": 6}
+    for guard, bounds in (({"enabled": False}, (4, 1, 32)), (fixed, (6, 6, 6))):
+        cfg.write_text(json.dumps({"concurrency_guard": guard}), encoding="utf-8")
+        assert runner.guard_in_flight_bounds(cfg) == bounds
+
+    items = list(enumerate(load_training_data(limit=60)))
+    results = [None] * len(items)
+    sched = runner.AdaptiveItemScheduler(LatencyInjectingBridge(make_bridge(mock=True), latency_ms=5),
+                                         AsyncLimiter(100000, 1), initial_in_flight=16, max_in_flight=16,
+                                         ceiling=lambda: 3)
+    asyncio.run(sched.run(items, lambda i, out: results.__setitem__(i, out)))
+    assert all(r is not None for r in results) and sched.peak_in_flight == 3
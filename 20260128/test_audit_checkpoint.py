@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""JsonlCheckpoint: json.dump-compatible streaming compaction, crash recovery and exact --resume."""
+import json
+
+import run_training_10k_matching_audit as audit
+from audit_checkpoint import JsonlCheckpoint, write_json_array
+
+
+def _result(i):
+    return {"request_id": f"R{i}", "asset_category": "脑机接口", "intercepted": i % 3 == 0, "agid_count": i % 5}
+
+
+def test_compaction_matches_json_dump(tmp_path):
+    for items in ([], [_result(0)], [_result(i) for i in range(20)]):
+        write_json_array(iter(items), str(tmp_path / "out.json"))
+        assert (tmp_path / "out.json").read_text(encoding="utf-8") == json.dumps(items, ensure_ascii=False, indent=2)
+
+
+def test_recovery_truncates_to_last_durable_entry(tmp_path):
+    path = tmp_path / "r.jsonl"
+    with JsonlCheckpoint(path, fsync_every=4) as ckpt:
+        for i in range(10):
+            ckpt.append(f"R{i}", _result(i))
+    # Simulated crash: a half-written data line and a torn index line after R9.
+    with open(path, "ab") as f:
+        f.write(b'{"request_id": "R10", "asse')
+    with open(f"{path}.idx", "ab") as f:
+        f.write(b"R10\t99999")
+    ckpt = JsonlCheckpoint(path, resume=True)
+    assert ckpt.completed_keys() == [f"R{i}" for i in range(10)]
+    ckpt.append("R10", _result(10))
+    order = [f"R{i}" for i in range(10, -1, -1)]
+    assert list(ckpt.iter_results(order)) == [_result(i) for i in range(10, -1, -1)]
+    ckpt.close()
+    assert len(path.read_text(encoding="utf-8").splitlines()) == 11
+
+
+def test_index_entry_past_data_end_is_dropped(tmp_path):
+    path = tmp_path / "r.jsonl"
+    with JsonlCheckpoint(path) as ckpt:
+        for i in range(5):
+            ckpt.append(f"R{i}", _result(i))
+    data = path.read_bytes()
+    path.write_bytes(data[: data.rindex(b"{")])  # index durable, last data line lost
+    ckpt = JsonlCheckpoint(path, resume=True)
+    assert len(ckpt) == 4 and "R4" not in ckpt
+    ckpt.close()
+
+
+def test_runner_resume_reproduces_uninterrupted_output(tmp_path, monkeypatch):
+    for name in ("CHECKPOINT_JSONL", "RESULTS_JSON", "RESULTS_COLUMNAR", "SUMMARY_MD", "PROGRESS_LOG"):
+        monkeypatch.setattr(audit, name, tmp_path / name.lower())
+    monkeypatch.setattr(audit, "CHECKPOINT_EVERY_N", 7)
+    full = audit.run_audit(limit=60, mock=True)
+    expected = audit.RESULTS_JSON.read_bytes()
+    assert full["total"] == 60
+
+    # Crash after 25 results: keep 25 index entries plus a torn data line.
+    idx = tmp_path / "checkpoint_jsonl.idx"
+    lines = idx.read_bytes().splitlines(keepends=True)[:25]
+    idx.write_bytes(b"".join(lines))
+    end = sum(int(ln.split(b"\t")[2]) for ln in lines)
+    ckpt_path = audit.CHECKPOINT_JSONL
+    ckpt_path.write_bytes(ckpt_path.read_bytes()[: end + 10])
+    audit.RESULTS_JSON.unlink()
+
+    resumed = audit.run_audit(limit=60, mock=True, resume=True)
+    assert audit.RESULTS_JSON.read_bytes() == expected
+    per_run = ("elapsed_seconds", "memo")
+    assert {k: v for k, v in resumed.items() if k not in per_run} == \
+        {k: v for k, v in full.items() if k not in per_run}
+    assert "resumed=25" in audit.PROGRESS_LOG.read_text(encoding="utf-8")
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""AuditTelemetry: percentiles / error reasons / ETA, rolling status file, HTTP endpoint and hang watchdog."""
+import json
+import threading
+import time
+import urllib.request
+
+import run_training_10k_matching_audit as audit
+from audit_telemetry import AuditTelemetry, classify_error, read_latest_status
+
+
+def _result(i, error=None):
+    return {"request_id": f"R{i}", "intercepted": i % 2 == 0, "error_msg": error, "latency_ms": float(i),
+            "stage_latency_ms": {"l1": 1.0, "l2": float(i)}}
+
+
+def test_snapshot_percentiles_errors_and_eta():
+    tele = AuditTelemetry(total=200)
+    for i in range(1, 101):
+        tele.observe(_result(i))
+    tele.observe(_result(0, error="ReadTimeout: timed out after 30s"))
+    tele.observe(_result(0, error="HTTP 429 RateLimit"))
+    snap = tele.snapshot()
+    assert snap["completed"] == 102 and snap["latency_ms"]["l2_ms"]["p50"] == 49.5
+    assert snap["latency_ms"]["l1_ms"] == {"p50": 1.0, "p95": 1.0, "p99": 1.0}
+    assert snap["errors_by_reason"] == {"timeout": 1, "rate_limited": 1, "connection": 0, "other": 0}
+    assert snap["timeouts"] == 1 and snap["eta_seconds"] is not None and snap["rps_rolling"] > 0
+    assert classify_error("Connection refused") == "connection" and classify_error("boom") == "other"
+
+
+def test_status_file_and_http_endpoint(tmp_path):
+    status = tmp_path / "status.jsonl"
+    with AuditTelemetry(total=3, run_name="t", status_path=status, http_port=0, status_every=0.05) as tele:
+        for i in range(3):
+            tele.observe(_result(i))
+        base = f"http://127.0.0.1:{tele.http_port}"
+        metrics = urllib.request.urlopen(f"{base}/metrics", timeout=5).read().decode("utf-8")
+        live = json.loads(urllib.request.urlopen(f"{base}/status", timeout=5).read())
+        time.sleep(0.2)
+    assert 'amani_audit_completed_total{run="t"} 3' in metrics
+    assert 'amani_audit_latency_ms{run="t",stage="l2",quantile="0.95"}' in metrics
+    assert live["completed"] == 3 and live["state"] == "running"
+    final = read_latest_status(str(status))
+    assert final["state"] == "done" and final["eta_seconds"] == 0.0
+    assert len(status.read_text(encoding="utf-8").splitlines()) >= 2
+
+
+def test_watchdog_dumps_thread_stacks_once_per_stall(tmp_path):
+    dump = tmp_path / "stacks.txt"
+    blocker = threading.Event()
+    worker = threading.Thread(target=blocker.wait, name="stuck-audit-worker", daemon=True)
+    worker.start()
+    with AuditTelemetry(total=5, watchdog_seconds=0.2, stack_dump_path=dump) as tele:
+        tele.observe(_result(1))
+        time.sleep(0.7)
+        assert tele.snapshot()["stalled"] and tele.snapshot()["stall_dumps"] == 1
+        tele.observe(_result(2))
+        assert not tele.snapshot()["stalled"]
+    blocker.set()
+    text = dump.read_text(encoding="utf-8")
+    assert text.count("[watchdog]") == 1 and "stuck-audit-worker" in text
+
+
+def test_runner_feeds_telemetry(tmp_path, monkeypatch):
+    for name in ("CHECKPOINT_JSONL", "RESULTS_JSON", "RESULTS_COLUMNAR", "SUMMARY_MD", "PROGRESS_LOG"):
+        monkeypatch.setattr(audit, name, tmp_path / name.lower())
+    status = tmp_path / "status.jsonl"
+    audit.run_audit(limit=40, mock=True, telemetry={"status_path": status})
+    final = read_latest_status(str(status))
+    assert final["run"] == "sequential" and final["completed"] == 40 and final["intercepted"] == 40
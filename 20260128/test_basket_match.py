@@ -25,10 +25,20 @@ print("-" * 30)
 
 # 3. 检索 (Retrieval)
 # 我们请求返回最匹配的 2 个结果，看看 AI 能否把靶向药排在第一位
-results = collection.query(
-    query_texts=[patient_profile],
-    n_results=2 
-)
+# amah_config.json 中 hybrid_retrieval.enabled 开启且 BM25 索引
+# （python lexical_index.py --build mayo_clinic_trials --db ./medical_db）存在时，
+# KRAS G12C 这类精确标识符由词法检索召回，再与向量结果加权融合
+from lexical_index import hybrid_query, open_lexical
+lexical = open_lexical("./medical_db", "mayo_clinic_trials", base_dir=os.path.dirname(os.path.abspath(__file__)))
+if lexical is not None:
+    with lexical:
+        results = hybrid_query(collection, lexical, patient_profile, n_results=2)
+    print("🔀 词法 + 向量混合检索")
+else:
+    results = collection.query(
+        query_texts=[patient_profile],
+        n_results=2 
+    )
 
 # 4. 展示结果
 if results['documents']:
@@ -37,10 +47,10 @@ if results['documents']:
     for i in range(len(results['documents'][0])):
         trial_id = results['ids'][0][i]
         doc_preview = results['documents'][0][i][:200].replace('\n', ' ')
-        distance = results['distances'][0][i] # 距离越小越匹配
+        distance = results['distances'][0][i] # 距离越小越匹配（仅被 BM25 召回时为 None）
         
         print(f"【排名 {i+1}】 Trial ID: {trial_id}")
-        print(f"   匹配距离: {distance:.4f}")
+        print(f"   匹配距离: {distance:.4f}" if distance is not None else "   匹配距离: -（BM25 命中）")
         print(f"   内容摘要: {doc_preview}...")
         print("-" * 30)
 
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""run_safe regression gate: permutation test, per-round verdicts and the end-to-end baseline round trip."""
+import json
+
+import bench_run_safe as bench
+
+
+def _run(scale=1.0, rss=130.0):
+    rounds = [{"total": {"p50": (1.0 + 0.02 * i) * scale, "p95": (3.0 + 0.05 * i) * scale},
+               "l3": {"p50": 0.5 + 0.01 * i, "p95": 1.0 + 0.02 * i}} for i in range(5)]
+    return {"meta": {}, "profiles": {"full": {"rounds": rounds}}, "rss_rounds": [rss + 0.1 * i for i in range(5)]}
+
+
+def _verdicts(findings):
+    return {(f["metric"], f["stat"]): f["verdict"] for f in findings}
+
+
+def test_permutation_p_separates_shifted_rounds():
+    assert bench.permutation_p([2.0, 2.1, 2.2, 2.3, 2.4], [1.0, 1.1, 1.2, 1.3, 1.4]) < 0.05
+    assert bench.permutation_p([1.0, 1.1, 1.2, 1.3, 1.4], [2.0, 2.1, 2.2, 2.3, 2.4]) == 1.0
+
+
+def test_compare_flags_only_significant_shifts_beyond_threshold():
+    base = _run()
+    assert set(_verdicts(bench.compare(_run(), base)).values()) == {"ok"}
+    slower = _verdicts(bench.compare(_run(scale=1.5), base))
+    assert slower[("total", "p50")] == slower[("total", "p95")] == "regression"
+    assert slower[("l3", "p50")] == "ok"
+    assert _verdicts(bench.compare(_run(scale=1.1), base))[("total", "p50")] == "ok"  # within 15%
+    assert _verdicts(bench.compare(_run(scale=0.5), base))[("total", "p50")] == "improvement"
+    assert _verdicts(bench.compare(_run(rss=200.0), base))[("peak_rss_mb", "max")] == "regression"
+
+
+def test_baseline_round_trip(tmp_path):
+    baseline = tmp_path / "baseline.json"
+    args = ["--cases", "12", "--assets", "200", "--warmup", "2", "--rounds", "2", "--baseline", str(baseline)]
+    assert bench.main(args + ["--update-baseline"]) == 0
+    data = json.loads(baseline.read_text(encoding="utf-8"))
+    assert data["meta"]["cases"] == 12 and len(data["profiles"]["full"]["rounds"]) == 2
+    assert set(data["profiles"]["full"]["summary"]) == set(bench.METRICS)
+    assert set(data["profiles"]["gate"]["summary"]) == {"total", "l1"}  # corpus is intercepted at L1
+    assert bench.main(args + ["--threshold", "10", "--tail-threshold", "10", "--rss-threshold", "10"]) == 0
+    assert bench.main(["--cases", "13"] + args[2:]) == 2
+    for key, value in (("config_fingerprint", "0" * 16), ("cpus", data["meta"]["cpus"] + 1)):
+        baseline.write_text(json.dumps(dict(data, meta=dict(data["meta"], **{key: value}))), encoding="utf-8")
+        assert bench.main(args + ["--rounds", "1"]) == 2
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""bulk_maintenance: keyset paging, changed-only writes, dry-run diffs, write-acknowledged resume points and
+idempotent randomised rewrites."""
+import chromadb
+import numpy as np
+
+from bulk_maintenance import iter_pages, metadata_delta, rewrite_metadata
+from global_expert_expansion_v2 import assign_global_hub
+from harmonize_300k import harmonize
+
+
+def _collection(tmp_path, name="c", n=1200):
+    col = chromadb.PersistentClient(path=str(tmp_path / name)).create_collection("maint_test", embedding_function=None)
+    ids = [f"NCT{i:05d}" for i in np.random.default_rng(0).permutation(n)]  # insertion order != id order
+    metas = [{"dept": "Neurology", "legacy": 1} if i % 4 else {"dept": "Oncology", "precision_target": 0.79,
+             "shadow_bill": 100000, "tech_feature": "Standard Clinical Protocol"} for i in range(n)]
+    col.add(ids=ids, metadatas=metas, embeddings=np.zeros((n, 2), dtype=np.float32))
+    return col
+
+
+def _drop_legacy(asset_id, m):
+    m.pop("legacy", None)
+    return harmonize(asset_id, m)
+
+
+def test_keyset_pages_are_id_ordered_and_resumable(tmp_path):
+    col = _collection(tmp_path)
+    pages = list(iter_pages(col, page_size=100))
+    ids = [k for page, _ in pages for k in page]
+    assert ids == sorted(ids) and len(ids) == 1200 and all(m is not None for _, ms in pages for m in ms)
+    resumed = [k for page, _ in iter_pages(col, page_size=100, after_id=ids[449]) for k in page]
+    assert resumed == ids[450:]
+    assert metadata_delta({"a": 1, "b": 2}, {"a": 1, "c": 3}) == {"c": 3, "b": None}
+    assert metadata_delta({"a": 1}, {"a": 1.0}) == {"a": 1.0} and metadata_delta({"a": 1}, {"a": 1}) == {}
+
+
+def test_dry_run_then_changed_only_rewrite(tmp_path):
+    col = _collection(tmp_path)
+    before = col.get(include=["metadatas"])
+    dry = rewrite_metadata(col, _drop_legacy, page_size=100, workers=0, dry_run=True, sample_diffs=3)
+    assert dry["changed"] == 900 and dry["written"] == 0 and len(dry["samples"]) == 3
+    assert dry["changed_keys"] == {"legacy": 900, "tech_feature": 900, "precision_target": 900, "shadow_bill": 900}
+    assert dry["samples"][0]["delta"]["legacy"] is None
+    assert col.get(include=["metadatas"]) == before
+
+    st = rewrite_metadata(col, _drop_legacy, page_size=100, workers=1, write_batch=250)
+    assert st["changed"] == st["written"] == 900 and st["failed_batches"] == 0 and st["last_id"] == "NCT01199"
+    metas = col.get(include=["metadatas"])["metadatas"]
+    assert all("legacy" not in m and m["shadow_bill"] == 100000 for m in metas)
+    assert rewrite_metadata(col, _drop_legacy, page_size=100, workers=0)["changed"] == 0
+
+
+class _FailingCollection:
+    """Delegates to a Chroma collection; the update call number fail_on raises."""
+
+    def __init__(self, col, fail_on):
+        self.col, self.fail_on, self.calls = col, fail_on, 0
+
+    def get(self, *args, **kwargs):
+        return self.col.get(*args, **kwargs)
+
+    def update(self, ids, metadatas):
+        self.calls += 1
+        if self.calls == self.fail_on:
+            raise ValueError("disk full")
+        self.col.update(ids=ids, metadatas=metadatas)
+
+
+def test_progress_reports_only_written_pages_and_failures_freeze_the_resume_point(tmp_path):
+    col = _collection(tmp_path)
+    seen = []
+
+    def progress(scanned, changed, last_id):
+        done = col.get(where={"legacy": 1}, include=[])["ids"]
+        assert not [k for k in done if k <= last_id]  # every row up to the reported id is already written
+        seen.append(last_id)
+
+    st = rewrite_metadata(col, _drop_legacy, page_size=100, workers=0, write_batch=250, progress=progress)
+    assert seen == [f"NCT{i:05d}" for i in range(99, 1200, 100)] and st["last_id"] == seen[-1]
+
+    col = _collection(tmp_path, "failing")
+    seen.clear()
+    st = rewrite_metadata(_FailingCollection(col, fail_on=2), _drop_legacy, page_size=100, workers=0,
+                          write_batch=250, progress=lambda s, c, last_id: seen.append(last_id))
+    # batches of 250 changed rows = 333 ids; the second batch (pages 4-6) fails and nothing is acknowledged after it
+    assert st["failed_batches"] == 1 and st["last_id"] == seen[-1] == "NCT00299"
+    resumed = rewrite_metadata(col, _drop_legacy, page_size=100, workers=0, after_id=st["last_id"])
+    assert resumed["failed_batches"] == 0 and resumed["changed"] == 250
+    assert rewrite_metadata(col, _drop_legacy, page_size=100, workers=0)["changed"] == 0
+
+
+def test_randomised_transform_is_stable_per_asset(tmp_path):
+    col = _collection(tmp_path, n=300)
+    first = rewrite_metadata(col, assign_global_hub, page_size=64, workers=0)
+    assert first["changed"] == 300
+    hubs = {m["expert"] for m in col.get(include=["metadatas"])["metadatas"]}
+    assert len(hubs) > 10 and rewrite_metadata(col, assign_global_hub, page_size=64, workers=0)["changed"] == 0
+    assert assign_global_hub("NCT1", {}) == assign_global_hub("NCT1", {}) != assign_global_hub("NCT2", {})
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""bulk_pipeline: pooled and inline embedding load the same vectors, batches are regrouped, backpressure holds."""
+import os
+import random
+import threading
+import time
+
+import chromadb
+import numpy as np
+
+from amah_mega_loader import iter_high_fidelity_records
+from bench_run_safe import hashed_embedder
+from bulk_pipeline import pipelined_upsert, resolve_embedder, threads_per_worker
+
+
+def _load(tmp_path, name, **kwargs):
+    random.seed(7)  # the mega generator draws hub / specialty at random
+    col = chromadb.PersistentClient(path=str(tmp_path / name)).create_collection(
+        "bulk_test", embedding_function=None, metadata={"hnsw:space": "cosine"})
+    stats = pipelined_upsert(col, iter_high_fidelity_records(300, batch_size=120), embed_batch=7, upsert_batch=50,
+                             **kwargs)
+    got = col.get(include=["embeddings", "metadatas"])
+    order = np.argsort(got["ids"])
+    return stats, [got["ids"][i] for i in order], np.asarray(got["embeddings"])[order], got["metadatas"]
+
+
+def test_pool_and_inline_load_identical_collections(tmp_path):
+    pooled, ids, vecs, metas = _load(tmp_path, "pooled", embedder="bench_run_safe:hashed_embedder", workers=1)
+    inline, ids2, vecs2, _ = _load(tmp_path, "inline", embedder=hashed_embedder(), workers=0)
+    assert ids == ids2 == [f"mega_exp_{i:06d}" for i in range(300)]  # ids stay unique across generator batches
+    assert np.allclose(vecs, vecs2) and all(m["hub"] for m in metas)
+    assert pooled["written"] == inline["written"] == 300 and pooled["upserts"] == inline["upserts"] == 7
+
+
+class _SlowCollection:
+    def __init__(self, fail_first=False):
+        self.rows = 0
+        self.fail_first = fail_first
+        self.calls = 0
+
+    def upsert(self, ids, documents, embeddings, metadatas=None):
+        self.calls += 1
+        time.sleep(0.01)
+        if self.fail_first and self.calls == 1:
+            raise ValueError("bad batch")
+        assert len(ids) <= 40 and embeddings.shape == (len(ids), 64)
+        self.rows += len(ids)
+
+
+def test_backpressure_bounds_generation_and_failed_batches_are_skipped():
+    col = _SlowCollection(fail_first=True)
+    produced = [0]
+    lead = []
+    lock = threading.Lock()
+
+    def records():
+        for i in range(1000):
+            with lock:
+                produced[0] += 1
+                lead.append(produced[0] - col.rows)
+            yield f"r{i}", f"doc {i}", None
+
+    stats = pipelined_upsert(col, records(), embedder=hashed_embedder(), workers=0, embed_batch=10, upsert_batch=40,
+                             queue_depth=2)
+    assert stats["failed_batches"] == 1 and "bad batch" in stats["errors"][0]
+    assert stats["written"] == col.rows == 960
+    # in flight: 2 embedding batches + 2 queued + 1 being regrouped + one 40-record upsert + the batch being built
+    assert max(lead) <= 2 * 10 + 2 * 10 + 10 + 40 + 10 + 40
+
+
+def test_worker_onnx_threads_never_oversubscribe_cores(monkeypatch):
+    monkeypatch.setattr(os, "cpu_count", lambda: 8)
+    assert threads_per_worker(7) == 1 and threads_per_worker(2) == 4 and threads_per_worker(3, threads=8) == 2
+    assert threads_per_worker(1, threads=3) == 3
+    fn = resolve_embedder("default", threads=2)  # Chroma builds the session lazily from ort.SessionOptions()
+    so = fn.ort.SessionOptions()
+    assert (so.intra_op_num_threads, so.inter_op_num_threads) == (2, 1) and fn.ort.get_available_providers()
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""Streaming case loader: array/JSONL parity with json.load, chunk-boundary parsing, byte-range sharding."""
+import json
+from pathlib import Path
+
+import pytest
+
+from case_loader import convert_to_jsonl, detect_format, iter_cases, iter_json_array, shard_ranges
+
+TRAINING = Path(__file__).resolve().parent / "amani_training_10k.json"
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    with open(TRAINING, "r", encoding="utf-8") as f:
+        return json.load(f)[:500]
+
+
+def test_array_parse_matches_json_load_at_any_chunk_size(tmp_path, corpus):
+    path = tmp_path / "cases.json"
+    path.write_text(json.dumps(corpus, ensure_ascii=False, indent=2), encoding="utf-8")
+    assert detect_format(str(path)) == "json_array"
+    for chunk in (1, 7, 4096):
+        assert list(iter_json_array(str(path), chunk_chars=chunk)) == corpus
+
+
+def test_scalars_and_empty_arrays(tmp_path):
+    path = tmp_path / "a.json"
+    for payload in ("[]", " [ ] ", "[1, 22.5e3, \"x\", null, [1, 2], {\"k\": -7}]"):
+        path.write_text(payload, encoding="utf-8")
+        assert list(iter_json_array(str(path), chunk_chars=2)) == json.loads(payload)
+    path.write_text("[1, 2", encoding="utf-8")
+    with pytest.raises(ValueError):
+        list(iter_json_array(str(path)))
+
+
+@pytest.mark.parametrize("shards", [1, 2, 3, 7, 64])
+def test_byte_range_shards_cover_every_case_once(tmp_path, corpus, shards):
+    src = tmp_path / "cases.json"
+    src.write_text(json.dumps(corpus, ensure_ascii=False), encoding="utf-8")
+    dst = tmp_path / "cases.jsonl"
+    assert convert_to_jsonl(str(src), str(dst)) == len(corpus)
+    assert detect_format(str(dst)) == "jsonl"
+    merged = [c for rng in shard_ranges(str(dst), shards) for c in iter_cases(str(dst), byte_range=rng)]
+    assert merged == corpus
+    with pytest.raises(ValueError):
+        next(iter_cases(str(src), byte_range=(0, 10)))
+
+
+def test_limit_stops_early(corpus):
+    assert list(iter_cases(str(TRAINING), limit=3)) == corpus[:3]
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""Centurion ingestors: fingerprinted source cache, precompiled region/tag rules, __slots__ records."""
+import json
+import os
+import time
+
+import pytest
+
+from amah_centurion_injection import (
+    _SOURCE_CACHE,
+    Advanced_Therapeutic_Assets,
+    Global_Patient_Resources,
+    PatientRecord,
+    Principal_Investigator_Registry,
+)
+
+
+def _write(path, payload, age_s=60):
+    path.write_text(json.dumps(payload), encoding="utf-8")
+    past = time.time() - age_s  # outside the racy-mtime window
+    os.utime(path, (past, past))
+
+
+@pytest.fixture(autouse=True)
+def _fresh_cache():
+    _SOURCE_CACHE.clear()
+    yield
+    _SOURCE_CACHE.clear()
+
+
+def test_source_is_parsed_once_until_its_content_changes(tmp_path):
+    src = tmp_path / "merged_data.json"
+    _write(src, [{"id": "NCT1", "title": "Gene therapy in Japan", "status": "recruiting"}])
+    before = _SOURCE_CACHE.parses
+    assert Global_Patient_Resources(str(tmp_path)).ingest() == 1
+    assert Global_Patient_Resources(str(tmp_path)).ingest() == 1
+    assert _SOURCE_CACHE.parses == before + 1
+
+    os.utime(src, None)  # touched, same bytes: re-hashed, not re-parsed
+    Global_Patient_Resources(str(tmp_path)).ingest()
+    assert _SOURCE_CACHE.parses == before + 1
+
+    _write(src, [{"id": "NCT1", "title": "Gene therapy in Japan", "status": "completed"}, {"id": "NCT2"}])
+    gpr = Global_Patient_Resources(str(tmp_path))
+    assert gpr.ingest() == 2 and _SOURCE_CACHE.parses == before + 2
+    snap = gpr.get_snapshot()
+    assert snap["index"]["NCT1"]["status"] == "COMPLETED"
+    assert snap["region_counts"] == {"Asia-Pacific": 1, "NA": 1}
+
+
+def test_records_are_lean_and_regions_match_keyword_rules(tmp_path):
+    rows = [
+        {"id": "a", "title": "Trial in Australia"},          # Asia-Pacific wins over Commonwealth
+        {"id": "b", "title": "London cohort", "category": "Neuro"},
+        {"id": "c", "title": "Canada site"},
+        {"id": "d", "title": "EU study"},                   # "eu " needs the trailing space
+        {"id": "e", "title": "Boston", "category": "Eu"},
+    ]
+    _write(tmp_path / "merged_data.json", rows)
+    gpr = Global_Patient_Resources(str(tmp_path))
+    gpr.ingest()
+    index = gpr.get_snapshot()["index"]
+    assert {k: r["region"] for k, r in index.items()} == \
+        {"a": "Asia-Pacific", "b": "EU", "c": "Commonwealth", "d": "EU", "e": "NA"}
+    rec = index["b"]
+    assert isinstance(rec, PatientRecord) and not hasattr(rec, "__dict__")
+    assert dict(rec)["category"] == "Neuro" and rec.get("missing") is None
+    with pytest.raises(TypeError):
+        rec["status"] = "X"
+
+    ata = Advanced_Therapeutic_Assets(str(tmp_path))
+    assert ata.ingest() == 1 and "b" in ata.get_snapshot()["index"]  # only "neuro" matches an asset tag
+
+
+def test_pi_linkage_does_not_leak_into_the_cached_mapping(tmp_path):
+    _write(tmp_path / "expert_map_data.json", [{"id": "pi_1", "name": "Dr. A", "linked_projects": ["NCT1"]}])
+    reg = Principal_Investigator_Registry(str(tmp_path))
+    reg.ingest(therapeutic_asset_ids=["NCT1", "NCT9"])
+    assert reg.get_snapshot()["project_to_pi"] == {"NCT1": ("pi_1",), "NCT9": ()}
+    reg.ingest()
+    assert reg.get_snapshot()["project_to_pi"] == {"NCT1": ("pi_1",)}
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""QueryEmbeddingCache: LRU/disk hits, model-id keying, embedding-function resolution and GNNAssetAnchor
+query_embeddings path."""
+import tempfile
+
+import chromadb
+
+from embedding_cache import QueryEmbeddingCache, _hash_embedding_fn, collection_embedding_fn
+from amani_trinity_bridge import GNNAssetAnchor
+from lexical_index import ShapeEmbedding
+
+
+class _CountingFn:
+    def __init__(self):
+        self.calls = 0
+        self.texts = 0
+        self._fn = _hash_embedding_fn(dim=8)
+
+    def __call__(self, texts):
+        self.calls += 1
+        self.texts += len(texts)
+        return self._fn(texts)
+
+
+def test_lru_hits_and_normalization():
+    fn = _CountingFn()
+    cache = QueryEmbeddingCache(fn, model_id="m1", capacity=2)
+    a = cache.embed(["KRAS  G12C\tlung"])
+    b = cache.embed(["KRAS G12C lung"])
+    assert a == b
+    assert fn.texts == 1
+    cache.embed(["x", "y"])  # evicts the first entry (capacity=2)
+    cache.embed(["KRAS G12C lung"])
+    st = cache.stats()
+    assert st["misses"] == 4 and st["memory_hits"] == 1 and st["lru_size"] == 2
+
+
+def test_disk_store_survives_restart_and_is_model_scoped():
+    fn = _CountingFn()
+    with tempfile.TemporaryDirectory() as tmp:
+        first = QueryEmbeddingCache(fn, model_id="m1", disk_path=tmp)
+        vecs = first.embed(["BCI Parkinson", "iPS 干细胞"])
+        second = QueryEmbeddingCache(fn, model_id="m1", disk_path=tmp)
+        assert second.embed(["BCI Parkinson", "iPS 干细胞"]) == vecs
+        assert second.stats()["disk_hits"] == 2
+        other = QueryEmbeddingCache(fn, model_id="m2", disk_path=tmp)
+        other.embed(["BCI Parkinson"])
+        assert other.stats()["disk_hits"] == 0
+    assert fn.texts == 3
+
+
+class _FakeCollection:
+    def __init__(self):
+        self.kwargs = []
+        self._embedding_function = _CountingFn()
+
+    def count(self):
+        return 3
+
+    def query(self, **kwargs):
+        self.kwargs.append(kwargs)
+        return {"ids": [["a", "b", "c"]], "distances": [[0.1, 0.2, 0.3]]}
+
+
+def test_anchor_queries_by_embedding_when_cache_enabled():
+    anchor = GNNAssetAnchor()
+    anchor._chroma_collection = _FakeCollection()
+    anchor._embedding_cache = QueryEmbeddingCache(anchor._chroma_collection._embedding_function, model_id="fake")
+    for _ in range(3):
+        assert [a for a, _ in anchor.map_to_agids("DBS evaluation", top_k=2)] == ["a", "b"]
+    sent = anchor._chroma_collection.kwargs
+    assert all("query_embeddings" in kw and "query_texts" not in kw for kw in sent)
+    assert anchor.embedding_cache_stats()["hit_rate"] == round(2 / 3, 4)
+
+
+def test_embedding_fn_comes_from_caller_or_persisted_configuration(tmp_path):
+    ef = ShapeEmbedding(16)
+    chromadb.PersistentClient(path=str(tmp_path / "db")).create_collection("experts", embedding_function=ef)
+    reopened = chromadb.PersistentClient(path=str(tmp_path / "db")).get_collection("experts")
+    resolved = collection_embedding_fn(reopened)  # rebuilt from the persisted config, not the default model
+    assert isinstance(resolved, ShapeEmbedding) and resolved.get_config() == ef.get_config()
+    explicit = _CountingFn()
+    assert collection_embedding_fn(reopened, explicit) is explicit
+    assert collection_embedding_fn(_FakeCollection()).__class__ is _CountingFn  # attribute probe, last resort
+    anchor = GNNAssetAnchor(chromadb_path=str(tmp_path / "db"), collection_name="experts", embedding_function=ef,
+                            query_embedding_cache={"enabled": True, "capacity": 8})
+    assert anchor._embedding_cache._fn is ef
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""Parity of the shared entropy kernel with the legacy per-window loops at every call site."""
+import json
+import random
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from entropy_kernel import METHODS, _sliding_entropy_py, entropy_stats, sliding_entropy
+
+BASE = Path(__file__).resolve().parent
+SAMPLES = [
+    "",
+    "a",
+    "ab",
+    "aaaaaaa",
+    "Patient with Parkinson's seeking DBS evaluation",
+    "帕金森病患者寻求BCI治疗方案，KRAS G12C 阳性 🧬",
+]
+
+
+@pytest.mark.parametrize("method", METHODS)
+@pytest.mark.parametrize("window_size", [1, 2, 3, 4, 5, 8])
+def test_kernel_matches_legacy_loop(method, window_size):
+    rng = random.Random(window_size)
+    texts = SAMPLES + ["".join(rng.choice("abcAB 病人") for _ in range(n)) for n in (7, 64, 1000)]
+    for text in texts:
+        got = sliding_entropy(text, window_size, method)
+        ref = _sliding_entropy_py(text, window_size)
+        assert len(got) == len(ref)
+        assert np.allclose(got, ref, atol=1e-9)
+
+
+def test_call_sites_share_kernel():
+    from amani_trinity_bridge import _shannon_entropy, ECNNSentinel
+    from amah_weight_orchestrator import calculate_sliding_entropy
+
+    text = SAMPLES[4]
+    ref = _sliding_entropy_py(text, 5)
+    mean, var = _shannon_entropy(text)
+    assert mean == pytest.approx(sum(ref) / len(ref), abs=1e-12)
+    assert var == pytest.approx(float(np.var(ref)), abs=1e-12)
+    seq, var2 = calculate_sliding_entropy(text)
+    assert np.allclose(seq, ref, atol=1e-9) and var2 == pytest.approx(var, abs=1e-12)
+    assert _shannon_entropy("") == (0.0, 0.0)
+    assert ECNNSentinel().gate("")[0] is False
+
+
+def test_entropy_utils_tensor_shape():
+    torch = pytest.importorskip("torch")
+    from amani_brain_v4 import EntropyUtils
+
+    tensor, variance = EntropyUtils.calculate_sliding_entropy(SAMPLES[4])
+    assert tuple(tensor.shape) == (1, len(SAMPLES[4]), 1) and tensor.dtype == torch.float32
+    assert variance == pytest.approx(entropy_stats(SAMPLES[4])[1], abs=1e-12)
+
+
+def test_gate_decisions_unchanged_on_training_corpus():
+    with open(BASE / "amani_training_10k.json", "r", encoding="utf-8") as f:
+        inquiries = [r.get("original_inquiry") or "" for r in json.load(f)[:2000]]
+    for text in inquiries:
+        ref = _sliding_entropy_py(text, 5)
+        mean, var = entropy_stats(text)
+        assert abs(mean - sum(ref) / len(ref)) < 1e-9
+        assert abs(var - float(np.var(ref))) < 1e-9
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""GNNAssetAnchor L3 retrieval: hard-anchor pushdown into the ChromaDB query and widening fallback."""
+from amani_trinity_bridge import GNNAssetAnchor, _anchor_where_document
+
+
+class _FakeCollection:
+    """Ranks a fixed corpus by list position; honours where_document $contains/$or like ChromaDB."""
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.calls = []
+
+    def count(self):
+        return len(self.docs)
+
+    @staticmethod
+    def _match(doc, wd):
+        if not wd:
+            return True
+        if "$or" in wd:
+            return any(_FakeCollection._match(doc, c) for c in wd["$or"])
+        return wd["$contains"] in doc
+
+    def query(self, query_texts=None, query_embeddings=None, n_results=10, include=None, where_document=None):
+        self.calls.append({"n_results": n_results, "include": list(include or []), "where_document": where_document})
+        hits = [(i, d) for i, d in enumerate(self.docs) if self._match(d, where_document)][:n_results]
+        res = {"ids": [[f"A{i}" for i, _ in hits]], "distances": [[0.01 * (i + 1) for i, _ in hits]]}
+        if "documents" in (include or []):
+            res["documents"] = [[d for _, d in hits]]
+        if "metadatas" in (include or []):
+            res["metadatas"] = [[{} for _ in hits]]
+        return res
+
+
+def _anchor(docs):
+    anchor = GNNAssetAnchor()
+    anchor._chroma_collection = _FakeCollection(docs)
+    anchor._cached_count = len(docs)
+    return anchor
+
+
+def test_where_document_expands_case_variants():
+    assert _anchor_where_document(["iPS"]) == {"$or": [{"$contains": "iPS"}, {"$contains": "ips"}, {"$contains": "IPS"}]}
+    assert _anchor_where_document(["BCI"]) == {"$or": [{"$contains": "BCI"}, {"$contains": "bci"}]}
+
+
+def test_rare_anchor_found_beyond_legacy_pool():
+    docs = ["generic oncology"] * 300 + ["trial targeting KRAS G12C"]
+    anchor = _anchor(docs)
+    legacy = anchor.map_to_agids("NSCLC", top_k=3, hard_anchors=["KRAS G12C"], anchor_pushdown=False)
+    assert "A300" not in [a for a, _ in legacy]
+    out = anchor.map_to_agids("NSCLC", top_k=3, hard_anchors=["KRAS G12C"])
+    assert [a for a, _ in out] == ["A300", "A0", "A1"]
+    first, *widened = anchor._chroma_collection.calls[-7:]
+    assert first["where_document"] and first["include"] == ["distances"]
+    assert all(c["where_document"] is None and "documents" in c["include"] for c in widened)
+    # anchored hits stay short of top_k, so the pool doubles up to retrieval_pool_n like the legacy pool
+    assert [c["n_results"] for c in widened] == [6, 12, 24, 48, 96, 100]
+
+
+def test_mixed_case_anchor_beyond_first_widening_is_kept():
+    docs = ["generic oncology"] * 300
+    docs[40] = "trial of mRNA vaccine platform"  # no literal/lower/upper variant of the anchor matches
+    anchor = _anchor(docs)
+    legacy = anchor.map_to_agids("tumour vaccine", top_k=3, hard_anchors=["mRNA Vaccine"], anchor_pushdown=False)
+    out = anchor.map_to_agids("tumour vaccine", top_k=3, hard_anchors=["mRNA Vaccine"])
+    assert [a for a, _ in out] == [a for a, _ in legacy] == ["A40", "A0", "A1"]
+    assert anchor._chroma_collection.calls[-1]["n_results"] == 100  # widened to the legacy pool size
+
+
+def test_enough_anchored_hits_skip_documents():
+    docs = ["DBS lead programme"] * 10
+    anchor = _anchor(docs)
+    out = anchor.map_to_agids("Parkinson", top_k=5, hard_anchors=["DBS"])
+    assert len(out) == 5
+    assert len(anchor._chroma_collection.calls) == 1
+    assert anchor._chroma_collection.calls[0]["n_results"] == 5
+
+
+def test_no_anchor_query_uses_top_k_pool():
+    anchor = _anchor(["x"] * 50)
+    assert len(anchor.map_to_agids("anything", top_k=4)) == 4
+    assert anchor._chroma_collection.calls == [{"n_results": 4, "include": ["distances"], "where_document": None}]
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""incremental_sync: only the delta is embedded, deletions propagate, legacy ids become aliases."""
+import json
+
+import chromadb
+from chromadb.api.types import EmbeddingFunction
+
+from incremental_sync import SyncManifest, collection_key, plan_sync, sync_doc, sync_documents
+from sync_l2_to_chromadb import l2_sync_docs, to_agid
+
+
+class _Counting(EmbeddingFunction):
+    embedded = 0
+
+    def __init__(self):
+        pass
+
+    def __call__(self, input):
+        _Counting.embedded += len(input)
+        return [[float(len(t)), 1.0] for t in input]
+
+    @staticmethod
+    def name():
+        return "counting-test"
+
+    def get_config(self):
+        return {}
+
+    @staticmethod
+    def build_from_config(config):
+        return _Counting()
+
+
+def _collection(tmp_path):
+    return chromadb.PersistentClient(path=str(tmp_path / "chroma")).create_collection(
+        "sync_test", embedding_function=_Counting())
+
+
+def _docs(revs):
+    return [sync_doc(f"AGID-T-{k}", f"asset {k} rev {r}", {"rev": r}, legacy_id=k) for k, r in revs.items()]
+
+
+def test_only_delta_is_embedded_and_deletes_propagate(tmp_path):
+    col = _collection(tmp_path)
+    revs = {f"L{i:03d}": 0 for i in range(200)}
+    with SyncManifest(str(tmp_path / "m.sqlite")) as manifest:
+        _Counting.embedded = 0
+        first = sync_documents(col, _docs(revs), "t", manifest, batch_size=64)
+        assert first["added"] == first["embedded"] == _Counting.embedded == 200 and col.count() == 200
+
+        _Counting.embedded = 0
+        assert sync_documents(col, _docs(revs), "t", manifest)["unchanged"] == 200 and _Counting.embedded == 0
+
+        revs["L005"] = revs["L006"] = 1
+        del revs["L010"]
+        revs["L900"] = 0
+        dry = sync_documents(col, _docs(revs), "t", manifest, dry_run=True)
+        assert (dry["added"], dry["changed"], dry["deleted"]) == (1, 2, 1) and _Counting.embedded == 0
+        st = sync_documents(col, _docs(revs), "t", manifest)
+        assert (st["added"], st["changed"], st["deleted"], st["unchanged"]) == (1, 2, 1, 197)
+        assert _Counting.embedded == 3 and col.count() == 200
+        assert col.get(ids=["AGID-T-L005"])["documents"] == ["asset L005 rev 1"]
+        assert col.get(ids=["AGID-T-L010"])["ids"] == []
+        assert manifest.resolve(collection_key(col), ["L900", "L010", "AGID-T-L001"]) == \
+            ["AGID-T-L900", "L010", "AGID-T-L001"]
+        assert plan_sync(manifest, collection_key(col), "other", _docs(revs))["add"]  # sources are independent
+
+
+def test_legacy_duplicates_replaced_by_aliases(tmp_path):
+    col = _collection(tmp_path)
+    # previous behaviour: every node written under its AGID and again under its legacy id
+    col.upsert(ids=["AGID-T-A", "A", "AGID-T-B", "B"], documents=["asset A rev 0"] * 2 + ["asset B rev 0"] * 2)
+    with SyncManifest(str(tmp_path / "m.sqlite")) as manifest:
+        st = sync_documents(col, _docs({"A": 0, "B": 0}), "t", manifest)
+        assert st["legacy_duplicates_removed"] == 2 and st["aliases"] == 2
+    assert sorted(col.get()["ids"]) == ["AGID-T-A", "AGID-T-B"]
+
+
+def test_l2_docs_use_agid_with_raw_id_alias(tmp_path):
+    (tmp_path / "expert_map_data.json").write_text(json.dumps([{
+        "id": "exp_1", "name": "Dr. A", "affiliation": "Mayo", "specialty": "Neurology", "expertise_tags": ["DBS"],
+        "value_add_services": [], "location": {"city": "Jacksonville", "state": "Florida"}}]), encoding="utf-8")
+    (tmp_path / "hospital_center_assets.json").write_text(json.dumps([{"id": "hosp_1", "name": "Center"}]),
+                                                          encoding="utf-8")
+    docs = l2_sync_docs(str(tmp_path))
+    pi, hosp = docs["l2_pi"][0], docs["l2_hosp"][0]
+    assert pi["agid"] == to_agid("PI", "NODE", "exp_1") and pi["legacy_id"] == "exp_1"
+    assert "DBS" in pi["document"] and pi["metadata"]["node_type"] == "PI"
+    assert hosp["agid"] == to_agid("HOSP", "NODE", "hosp_1") and hosp["metadata"]["legacy_id"] == "hosp_1"
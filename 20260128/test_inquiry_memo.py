@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""InquiryMemo: exact-inquiry reuse is output-neutral in all runners and invalidated by config changes."""
+import run_training_10k_matching_audit as audit
+import run_training_10k_matching_audit_sharded as sharded
+from amani_trinity_bridge import _shannon_entropy
+from inquiry_memo import InquiryMemo, config_fingerprint
+
+
+def test_fingerprint_tracks_config_and_mode(tmp_path):
+    (tmp_path / "amah_config.json").write_text('{"alpha": 1}', encoding="utf-8")
+    base = config_fingerprint(str(tmp_path), mock=True)
+    assert config_fingerprint(str(tmp_path), mock=True) == base
+    assert config_fingerprint(str(tmp_path), mock=False) != base
+    (tmp_path / "amah_config.json").write_text('{"alpha": 2}', encoding="utf-8")
+    assert config_fingerprint(str(tmp_path), mock=True) != base
+
+
+def test_hit_rewrites_record_fields_and_errors_are_not_memoized():
+    memo = InquiryMemo("fp")
+    a = {"request_id": "A", "asset_category": "脑机接口", "original_inquiry": "Need CAR-T trial"}
+    b = {"request_id": "B", "asset_category": "细胞治疗", "original_inquiry": "Need CAR-T trial"}
+    first = memo.get_or_run(a, lambda: {"request_id": "A", "asset_category": "脑机接口", "agid_count": 2, "error_msg": None})
+    second = memo.get_or_run(b, lambda: {"unexpected": True})
+    assert second == dict(first, request_id="B", asset_category="细胞治疗")
+    assert memo.stats()["hits"] == 1 and memo.stats()["dedup_ratio"] == 0.5
+
+    memo = InquiryMemo("fp")
+    memo.get_or_run(a, lambda: {"error_msg": "timeout"})
+    assert memo.lookup(b) is None
+    assert InquiryMemo("fp", enabled=False).serve(a) is None
+
+
+class _EntropyBridge:
+    """Reports the L1 sliding entropy of exactly the text it receives, as run_safe does for passing inquiries."""
+
+    def run_safe(self, text, top_k_agids=5):
+        d, var = _shannon_entropy(text)
+        return {"intercepted": False, "l1_sentinel": {"d_effective": d, "shannon_entropy_variance": var},
+                "l3_nexus": {"agids": ["AGID-X"]}}
+
+
+def test_whitespace_variants_are_not_merged():
+    bridge = _EntropyBridge()
+    a = {"request_id": "A", "asset_category": "细胞治疗", "original_inquiry": "Need CAR-T trial"}
+    b = dict(a, request_id="B", original_inquiry="  Need   CAR-T trial ")
+    plain = [audit.run_one(bridge, r) for r in (a, b)]
+    assert plain[0]["d_effective"] != plain[1]["d_effective"]  # L1 entropy depends on whitespace
+    memo = InquiryMemo("fp")
+    assert [memo.get_or_run(r, lambda r=r: audit.run_one(bridge, r)) for r in (a, b)] == plain
+    assert memo.stats()["hits"] == 0
+
+
+def test_memoized_run_is_byte_identical(tmp_path, monkeypatch):
+    for name in ("CHECKPOINT_JSONL", "RESULTS_JSON", "RESULTS_COLUMNAR", "SUMMARY_MD", "PROGRESS_LOG"):
+        monkeypatch.setattr(audit, name, tmp_path / name.lower())
+    plain = audit.run_audit(limit=600, mock=True, memo=False)
+    expected = audit.RESULTS_JSON.read_bytes()
+    memoized = audit.run_audit(limit=600, mock=True, memo=True)
+    assert audit.RESULTS_JSON.read_bytes() == expected
+    assert plain["memo"]["hits"] == 0
+    assert memoized["memo"]["hits"] == 13 and memoized["memo"]["distinct"] == 587
+    assert "Inquiry 复用" in audit.SUMMARY_MD.read_text(encoding="utf-8")
+
+
+def test_sharded_dispatches_each_inquiry_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(sharded, "PROGRESS_LOG", tmp_path / "progress.txt")
+    memo = audit.make_memo(mock=True)
+    results, stats = sharded.run_sharded(audit.TRAINING_FILE, limit=600, workers=2, schedule="dynamic", chunk_size=20,
+                                         mock=True, memo=memo)
+    assert stats["total"] == 600 and sum(stats["per_worker"]) == 587
+    assert memo.stats()["hits"] == 13
+    assert sharded.verify_against_sequential(audit.TRAINING_FILE, results, limit=600)
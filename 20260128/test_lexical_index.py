@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""BM25 lexical index: identifier tokens, incremental maintenance, rank fusion, hybrid GNNAssetAnchor retrieval."""
+import chromadb
+import pytest
+
+import lexical_index
+from amani_trinity_bridge import GNNAssetAnchor
+from incremental_sync import SyncManifest, sync_doc, sync_documents
+from lexical_index import (
+    LexicalIndex,
+    ShapeEmbedding,
+    default_index_path,
+    fuse,
+    has_identifier,
+    hybrid_query,
+    identifier_terms,
+    open_lexical,
+    query_weights,
+    reciprocal_rank_fusion,
+    tokenize,
+    weighted_fusion,
+)
+
+DOCS = {
+    "t_g12c": "Adagrasib AMG-510 in KRAS G12C non-small cell lung cancer NCT04589845",
+    "t_g12d": "MRTX-1133 in KRAS G12D non-small cell lung cancer NCT05737706",
+    "t_g13d": "Pan-RAS inhibitor in KRAS G13D non-small cell lung cancer NCT05379985",
+    "t_egfr": "Osimertinib in EGFR L858R non-small cell lung cancer NCT04035486",
+    "t_pd": "STN-DBS lead placement for Parkinson disease tremor",
+    "t_zh": "上海 脑机接口 帕金森 临床中心",
+}
+
+
+def test_tokenize_and_index_maintenance(tmp_path):
+    assert tokenize("EGFR L858R, AMG-510; STN-DBS") == ["egfr", "l858r", "amg", "510", "amg510", "stn", "dbs", "stndbs"]
+    assert tokenize("脑机接口 for the patient") == ["脑机", "机接", "接口"]
+    with LexicalIndex(str(tmp_path / "lex.sqlite")) as lex:
+        assert lex.upsert(list(DOCS), list(DOCS.values())) == len(DOCS)
+        assert lex.upsert(list(DOCS), list(DOCS.values())) == 0  # unchanged content is skipped
+        assert lex.search("KRAS G12C", 3)[0][0] == "t_g12c"
+        assert lex.search("NCT05737706")[0][0] == "t_g12d"
+        assert lex.search("AMG510")[0][0] == "t_g12c" and lex.search("脑机接口")[0][0] == "t_zh"
+        assert lex.search("the of and") == []
+        # metadata strings are indexed; changed rows are re-indexed, deleted rows disappear
+        assert lex.upsert(["t_pd"], [DOCS["t_pd"]], [{"site": "Jacksonville"}]) == 1
+        assert lex.search("jacksonville")[0][0] == "t_pd"
+        assert lex.delete(["t_g12d", "missing"]) == 1 and lex.count() == len(DOCS) - 1
+        assert lex.search("NCT05737706") == []
+        assert lex.containing(["t_g12c", "t_g13d", "t_egfr"], ["kras g12c", "L858R"]) == {"t_g12c", "t_egfr"}
+
+
+def test_fusion():
+    rrf = reciprocal_rank_fusion([["a", "b", "c"], ["c", "d"]], k=60)
+    assert [d for d, _ in rrf] == ["c", "a", "b", "d"] and rrf[0][1] == pytest.approx(1 / 63 + 1 / 61)
+    wf = weighted_fusion([[("a", 0.9), ("b", 0.5)], [("b", 12.0), ("c", 2.0)]], [1.0, 2.0])
+    assert wf == [("b", pytest.approx(2.0)), ("a", pytest.approx(1.0)), ("c", pytest.approx(0.0))]
+    # scaled so a document at the top of both lists scores 1.0
+    assert fuse([("a", 0.9), ("b", 0.1)], [("a", 5.0), ("c", 1.0)], "rrf")[0] == ("a", pytest.approx(1.0))
+    assert fuse([("a", 0.9), ("b", 0.1)], [("a", 5.0), ("c", 1.0)], "weighted")[0] == ("a", pytest.approx(1.0))
+    assert fuse([("a", 0.9)], [], "weighted") == [("a", pytest.approx(1.0))]
+    with pytest.raises(ValueError):
+        fuse([], [], "max")
+    assert has_identifier("KRAS G12C lung") and has_identifier("NCT04589845") and not has_identifier("lung cancer")
+    assert query_weights("EGFR L858R", 1.0, 1.0, 2.0) == (1.0, 2.0) and query_weights("lung", 1.0, 1.0, 2.0) == (1.0, 1.0)
+
+
+def test_serving_search_matches_identifier_terms_only(tmp_path, monkeypatch):
+    assert identifier_terms("is AMG-510 recruiting for NSCLC with KRAS G12C") == ["amg510", "nsclc", "kras", "g12c"]
+    assert identifier_terms("lung cancer trial", ["KRAS G12C", "脑机接口"]) == ["kras", "g12c", "脑机", "机接", "接口"]
+    assert identifier_terms(" ".join(f"NCT0{i:07d}" for i in range(20))) == [f"nct0{i:07d}" for i in range(8)]
+    with LexicalIndex(str(tmp_path / "lex.sqlite")) as lex:
+        lex.upsert(list(DOCS), list(DOCS.values()))
+        assert lex.search("non-small cell lung cancer", 10)  # generic search still matches every term
+        assert lex.search_identifiers("non-small cell lung cancer", 10) == []  # no identifier: BM25 skipped
+        assert lex.search_identifiers("lung cancer with NCT05737706")[0][0] == "t_g12d"
+        assert lex.search_identifiers("is 510 an option", 10) == []  # bare numbers are not identifiers
+        assert lex.search_identifiers("Parkinson tremor", 10, anchors=["STN-DBS"])[0][0] == "t_pd"
+        # a term in more than MAX_TERM_DOCS documents only re-scores the vector candidates
+        monkeypatch.setattr(lexical_index, "MAX_TERM_DOCS", 1)
+        assert [d for d, _ in lex.search_identifiers("KRAS G12D", 10)] == ["t_g12d"]
+        hits = lex.search_identifiers("KRAS G12D", 10, within=["t_g13d", "t_egfr"])
+        assert [d for d, _ in hits] == ["t_g12d", "t_g13d"]  # t_egfr carries neither term
+
+
+def test_index_use_and_maintenance_follow_the_config_flag(tmp_path):
+    db = str(tmp_path / "db")
+    assert open_lexical(db, "trials", {"enabled": False}, create=True) is None
+    assert not (tmp_path / "db_lexical").exists()  # disabled: nothing is created or maintained
+    assert open_lexical(db, "trials", {"enabled": True}) is None  # enabled, but no index built yet
+    with open_lexical(db, "trials", {"enabled": True}, create=True) as lex:
+        lex.upsert(["t_pd"], [DOCS["t_pd"]])
+    with open_lexical(db, "trials", {"enabled": True}) as lex:
+        assert lex.count() == 1
+    assert open_lexical(db, "trials", {"enabled": False}) is None  # an existing index is ignored when off
+    assert open_lexical(db, "trials", base_dir=str(tmp_path)) is None  # no amah_config.json: off
+
+
+def test_hybrid_anchor_ranks_exact_identifier_first(tmp_path):
+    db = str(tmp_path / "db")
+    ef = ShapeEmbedding(64)
+    col = chromadb.PersistentClient(path=db).create_collection(
+        "expert_map_global", metadata={"hnsw:space": "cosine"}, embedding_function=ef)
+    lexical_path = default_index_path(db, "expert_map_global")
+    with SyncManifest(str(tmp_path / "manifest.sqlite")) as manifest, LexicalIndex(lexical_path) as lex:
+        docs = [sync_doc(k, v, {"title": k}) for k, v in DOCS.items()]
+        sync_documents(col, docs, "t", manifest, lexical=lex)
+        sync_documents(col, [d for d in docs if d["agid"] != "t_zh"], "t", manifest, lexical=lex)
+        assert lex.count() == col.count() == len(DOCS) - 1
+
+    query = "NSCLC patient with KRAS G13D after platinum"
+    dense = col.query(query_texts=[query], n_results=1)["ids"][0]
+    assert dense != ["t_g13d"]  # identifiers collapse in the dense space
+    anchor = GNNAssetAnchor(chromadb_path=db, hybrid_retrieval={"enabled": True}, embedding_function=ef)
+    assert anchor._lexical is not None
+    assert anchor.map_to_agids(query, top_k=3)[0][0] == "t_g13d"
+    top = anchor.map_to_agids("lung cancer trial", top_k=2, hard_anchors=["L858R"])
+    assert top[0][0] == "t_egfr"  # downgrade firewall: anchored candidate first
+
+    res = hybrid_query(col, LexicalIndex(lexical_path), "details of NCT04589845", n_results=2)
+    assert res["ids"][0][0] == "t_g12c" and res["documents"][0][0] == DOCS["t_g12c"]
+    assert res["metadatas"][0][0] == {"title": "t_g12c"} and len(res["scores"][0]) == 2
+
+    off = GNNAssetAnchor(chromadb_path=db, hybrid_retrieval={"enabled": True, "path": str(tmp_path / "none.sqlite")})
+    assert off._lexical is None
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""Lifecycle_Pulse_Monitor: fingerprint diff, stat / digest fast paths, JSONL changelog compaction, legacy import."""
+import json
+import os
+import time
+
+from amah_centurion_injection import (
+    Advanced_Therapeutic_Assets,
+    Global_Patient_Resources,
+    Lifecycle_Pulse_Monitor,
+    Principal_Investigator_Registry,
+)
+
+
+def _write(tmp_path, trials, pis=()):
+    (tmp_path / "merged_data.json").write_text(json.dumps(trials), encoding="utf-8")
+    (tmp_path / "expert_map_data.json").write_text(json.dumps(list(pis)), encoding="utf-8")
+    past = time.time() - 60  # outside the racy-mtime window, so the stat fast path can trust the files
+    for name in ("merged_data.json", "expert_map_data.json"):
+        os.utime(tmp_path / name, (past, past))
+
+
+def _trial(i, status="RECRUITING", title=None):
+    return {"id": f"NCT{i:04d}", "category": "Gene Therapy", "title": title or f"study {i}", "status": status}
+
+
+def _monitor(tmp_path):
+    d = str(tmp_path)
+    return Lifecycle_Pulse_Monitor(Global_Patient_Resources(d), Advanced_Therapeutic_Assets(d),
+                                   Principal_Investigator_Registry(d), data_dir=d)
+
+
+def test_cycles_report_only_the_delta(tmp_path):
+    _write(tmp_path, [_trial(i) for i in range(50)], [{"id": "pi_1", "name": "Dr. A", "linked_projects": ["NCT0001"]}])
+    mon = _monitor(tmp_path)
+    first = mon.run_cycle()
+    assert first["additions"] == 101 and first["fast_path"] == "diff"  # 50 GPR + 50 ATA + 1 PI
+    assert mon.run_cycle()["fast_path"] == "sources_unchanged"
+    fresh = _monitor(tmp_path).run_cycle()
+    assert fresh["fast_path"] == "digest_match" and fresh["changelog_count"] == 0
+
+    trials = [_trial(i) for i in range(1, 50)] + [_trial(77)]
+    trials[0] = _trial(1, status="COMPLETED")
+    trials[1] = _trial(2, title="renamed")  # content change without status/category change: no event
+    _write(tmp_path, trials)
+    st = mon.run_cycle()
+    assert (st["additions"], st["deletions"], st["status_changes"]) == (2, 3, 2)
+    events = mon.read_changelog(limit=7)
+    assert sorted(e.get("key") or e["id"] for e in events if e["event"] == "DELETION") == \
+        ["ATA:NCT0000", "GPR:NCT0000", "PI:pi_1"]
+    assert {e["changes"]["status"][1] for e in events if e["event"] == "STATUS_CHANGE"} == {"COMPLETED"}
+    assert mon.load_index()["ATA:NCT0002"]["title"] == "renamed"
+    assert _monitor(tmp_path).run_cycle()["fast_path"] == "digest_match"
+
+
+def test_recently_written_sources_are_not_trusted_by_stat(tmp_path):
+    _write(tmp_path, [_trial(1)])
+    mon = _monitor(tmp_path)
+    mon.run_cycle()
+    (tmp_path / "merged_data.json").write_text(json.dumps([_trial(1, status="X")]), encoding="utf-8")
+    st = mon.run_cycle()
+    assert st["fast_path"] == "diff" and st["status_changes"] == 2
+    # written just now: the next cycle re-ingests instead of trusting an unchanged stat
+    assert mon.run_cycle()["fast_path"] == "digest_match"
+
+
+def test_changelog_is_append_only_and_compacted(tmp_path, monkeypatch):
+    monkeypatch.setattr(Lifecycle_Pulse_Monitor, "MAX_CHANGELOG_ENTRIES", 10)
+    mon = _monitor(tmp_path)
+    for rev in range(4):
+        _write(tmp_path, [_trial(i, status=f"S{rev}") for i in range(4)])
+        mon.run_cycle()
+    # 8 additions, then 8 status changes per cycle: compacted to the newest 10 once past 20 lines
+    lines = (tmp_path / "centurion_pulse_changelog.jsonl").read_text(encoding="utf-8").splitlines()
+    assert 10 <= len(lines) <= 20
+    assert json.loads(lines[-1])["changes"]["status"] == ["S2", "S3"]
+
+
+def test_legacy_json_index_and_changelog_are_imported(tmp_path):
+    _write(tmp_path, [_trial(1), _trial(2)])
+    legacy = {f"{c}:NCT000{i}": {"id": f"NCT000{i}", "status": "RECRUITING", "category": "Gene Therapy"}
+              for c in ("GPR", "ATA") for i in (1, 9)}
+    (tmp_path / "centurion_pulse_index.json").write_text(json.dumps(legacy), encoding="utf-8")
+    (tmp_path / "centurion_pulse_changelog.json").write_text(json.dumps([{"event": "ADDITION", "id": "old"}]),
+                                                             encoding="utf-8")
+    st = _monitor(tmp_path).run_cycle()
+    assert (st["additions"], st["deletions"]) == (2, 2)  # NCT0002 new, NCT0009 gone; NCT0001 already known
+    log = _monitor(tmp_path).read_changelog()
+    assert log[0]["id"] == "old" and len(log) == 5
+    assert os.path.isfile(tmp_path / "centurion_pulse_index.sqlite")
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""Columnar results store: vectorized stats match build_stats; npz / parquet round trips."""
+import math
+import random
+
+import numpy as np
+import pytest
+
+from results_store import ColumnarResults
+from run_training_10k_matching_audit import build_stats
+
+
+def _results(n=2000, seed=3):
+    rng = random.Random(seed)
+    out = []
+    for i in range(n):
+        inter = rng.random() < 0.5
+        agids = 0 if inter else rng.randint(0, 3)
+        r = {
+            "request_id": f"R{i}",
+            "asset_category": rng.choice(["BCI", "Stem_Cell", "", "基因治疗"]),
+            "intercepted": inter,
+            "d_effective": None if inter else rng.random(),
+            "variance": rng.random() / 100,
+            "agid_count": agids,
+            "top_agid": f"AGID-{rng.randint(0, 9)}" if agids else None,
+            "error_msg": "boom" if rng.random() < 0.02 else None,
+        }
+        if i % 2:
+            r["latency_ms"] = rng.random() * 50
+            r["stage_latency_ms"] = {"l1": 1.0, "l2": 2.0, "l3": rng.random() * 30, "l4": 0.5}
+        out.append(r)
+    return out
+
+
+def test_vectorized_stats_match_row_loop():
+    results = _results()
+    store = ColumnarResults.from_results(iter(results))
+    assert store.stats(1.234) == build_stats(results, 1.234)
+    assert store.decode("top_agid") == [r["top_agid"] for r in results]
+    counts = store.status_counts()
+    assert counts["error"] == sum(1 for r in results if r["error_msg"])
+    assert sum(counts.values()) == len(results)
+
+
+def test_latency_and_histograms_ignore_missing_values():
+    results = _results()
+    store = ColumnarResults.from_results(results)
+    lat = [r["latency_ms"] for r in results if "latency_ms" in r]
+    pct = store.latency_percentiles()
+    assert pct["latency_ms"]["p50"] == pytest.approx(float(np.percentile(lat, 50)), abs=1e-3)
+    assert pct["l1_ms"] == {"p50": 1.0, "p95": 1.0, "p99": 1.0}
+    counts, _ = store.histogram("d_effective", 10, (0.0, 1.0))
+    assert counts.sum() == sum(1 for r in results if r["d_effective"] is not None)
+
+
+@pytest.mark.parametrize("backend", ["npz", "parquet"])
+def test_round_trip(tmp_path, backend):
+    if backend == "parquet":
+        pytest.importorskip("pyarrow")
+    results = _results(300)
+    store = ColumnarResults.from_results(results)
+    path = store.save(str(tmp_path / "run"), backend=backend)
+    loaded = ColumnarResults.load(path)
+    assert loaded.stats() == store.stats()
+    assert loaded.decode("request_id") == [r["request_id"] for r in results]
+    d = loaded.columns["d_effective"]
+    assert all(math.isnan(x) if r["d_effective"] is None else x == r["d_effective"] for x, r in zip(d, results))
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""Sharded 10k audit runner: ordered merge, byte-identical to the sequential mock run for both schedules."""
+import json
+
+import pytest
+
+import run_training_10k_matching_audit_sharded as sharded
+from case_loader import iter_jsonl
+from run_training_10k_matching_audit import TRAINING_FILE, load_training_data
+
+
+@pytest.mark.parametrize("schedule", sharded.SCHEDULES)
+def test_merged_output_byte_identical_to_sequential(schedule, tmp_path, monkeypatch):
+    monkeypatch.setattr(sharded, "PROGRESS_LOG", tmp_path / "progress.txt")
+    records = load_training_data(limit=150)
+    results, stats = sharded.run_sharded(TRAINING_FILE, limit=150, workers=3, schedule=schedule, chunk_size=7,
+                                         mock=True)
+    assert [r["request_id"] for r in results] == [r.get("request_id", "") for r in records]
+    assert sum(stats["per_worker"]) == stats["total"] == 150
+    assert sharded.verify_against_sequential(TRAINING_FILE, results, limit=150)
+
+
+def test_static_plan_is_contiguous_slices():
+    indexed = [(i, {"i": i}) for i in range(10)]
+    plan = sharded.plan_chunks(indexed, workers=3, schedule="static", chunk_size=2)
+    flat = [[i for chunk in w for i, _ in chunk] for w in plan]
+    assert flat == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]
+
+
+@pytest.mark.parametrize("schedule", sharded.SCHEDULES)
+def test_byte_range_tasks_read_exactly_the_dispatched_cases(schedule, tmp_path):
+    path = tmp_path / "cases.jsonl"
+    path.write_text("".join(json.dumps({"request_id": f"R{i}"}) + "\n" + "\n" * (i % 3 == 0) for i in range(23)),
+                    encoding="utf-8")
+    offsets = [off for off, _ in iter_jsonl(str(path), with_offsets=True)] + [path.stat().st_size]
+    dispatch = [i for i in range(23) if i % 4 != 1]
+    tasks, members = sharded.plan_tasks(offsets, dispatch, workers=3, schedule=schedule, chunk_size=4)
+    read = {}
+    for cid, start, end, skip in (t for queued in tasks for t in queued):
+        read[cid] = [rec["request_id"] for off, rec in iter_jsonl(str(path), start, end, with_offsets=True)
+                     if off not in skip]
+    assert [read[cid] for cid in range(len(members))] == [[f"R{i}" for i in idx] for idx in members]
+    assert sorted(i for idx in members for i in idx) == dispatch
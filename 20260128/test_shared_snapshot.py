@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""SecondLayerOrchestrator versioned read-only snapshots and the mmap'd cross-process snapshot file."""
+import json
+import os
+import time
+
+import pytest
+
+from amah_centurion_injection import (
+    _SOURCE_CACHE,
+    AMAHCenturionInjector,
+    SecondLayerOrchestrator,
+    read_shared_snapshot,
+)
+from shared_snapshot import SharedSnapshotReader, write_snapshot
+
+
+def _write(tmp_path, trials):
+    (tmp_path / "merged_data.json").write_text(json.dumps(trials), encoding="utf-8")
+    (tmp_path / "expert_map_data.json").write_text(
+        json.dumps([{"id": "pi_1", "name": "Dr. A", "linked_projects": ["NCT1"]}]), encoding="utf-8")
+    past = time.time() - 60
+    for name in ("merged_data.json", "expert_map_data.json"):
+        os.utime(tmp_path / name, (past, past))
+
+
+def _trials(status="RECRUITING", n=3):
+    return [{"id": f"NCT{i}", "category": "Gene Therapy", "title": f"study {i}", "status": status} for i in range(n)]
+
+
+@pytest.fixture(autouse=True)
+def _fresh_cache():
+    _SOURCE_CACHE.clear()
+    yield
+    _SOURCE_CACHE.clear()
+
+
+def test_snapshots_are_shared_read_only_versions(tmp_path):
+    _write(tmp_path, _trials())
+    orch = SecondLayerOrchestrator(data_dir=str(tmp_path))
+    assert orch.get_latest_snapshot(0.9) is None
+    a, b = orch.get_latest_snapshot(0.5), orch.get_latest_snapshot(0.5)
+    key = "Component_2_Advanced_Therapeutic_Assets"
+    assert a["snapshot_version"] == b["snapshot_version"] == 1
+    assert a[key] is b[key] and a[key]["index"]["NCT1"]["status"] == "RECRUITING"
+    with pytest.raises(TypeError):
+        a[key]["index"]["NCT1"] = {}
+
+    _write(tmp_path, _trials(status="COMPLETED"))
+    orch._component_4.run_once()
+    c = orch.get_latest_snapshot(0.5)
+    assert c["snapshot_version"] == 2 and c[key]["index"]["NCT1"]["status"] == "COMPLETED"
+    assert a[key]["index"]["NCT1"]["status"] == "RECRUITING"  # earlier readers keep their version
+
+
+def test_layer_3_output_is_json_serializable(tmp_path):
+    _write(tmp_path, _trials())
+    injector = AMAHCenturionInjector.__new__(AMAHCenturionInjector)  # no Chroma: only the layer flow
+    injector._orchestrator = SecondLayerOrchestrator(data_dir=str(tmp_path))
+    out = injector.get_latest_snapshot(0.5)
+    summary = json.loads(json.dumps(out))["layer_2_summary"]
+    assert summary["component_2_total"] == 3 and summary["component_4_summary"]["additions"] == 7
+    # the orchestrator itself still hands out the read-only view
+    with pytest.raises(TypeError):
+        injector._orchestrator.get_latest_snapshot(0.5)["Component_4_Lifecycle_Pulse_Monitor"]["records"] = 0
+
+
+def test_shared_file_is_exported_once_per_change_and_read_lazily(tmp_path):
+    _write(tmp_path, _trials())
+    shared = tmp_path / "layer2.snapshot"
+    orch = SecondLayerOrchestrator(data_dir=str(tmp_path), shared_snapshot_path=str(shared))
+    orch.get_latest_snapshot(0.5)
+    mtime = shared.stat().st_mtime_ns
+    orch._component_4.run_once()  # pulse summary changes, indexes do not: no rewrite
+    orch.get_latest_snapshot(0.5)
+    assert shared.stat().st_mtime_ns == mtime
+
+    snap = read_shared_snapshot(str(shared), 0.5)
+    c1 = snap["Component_1_Global_Patient_Resources"]
+    assert c1["total"] == 3 and c1["region_counts"] == {"NA": 3} and len(c1["index"]) == 3
+    assert c1["index"]["NCT2"]["title"] == "study 2" and "NCT9" not in c1["index"]
+    assert snap["Component_3_Principal_Investigator_Registry"]["project_to_pi"]["NCT1"] == ["pi_1"]
+    assert read_shared_snapshot(str(shared), 0.95) is None
+
+    _write(tmp_path, _trials(status="COMPLETED", n=4))
+    orch._component_4.run_once()
+    orch.get_latest_snapshot(0.5)
+    snap = read_shared_snapshot(str(shared), 0.5)
+    assert snap["snapshot_version"] > 1
+    assert snap["Component_2_Advanced_Therapeutic_Assets"]["index"]["NCT3"]["status"] == "COMPLETED"
+
+
+def test_snapshot_file_lookup_handles_collisions_and_missing_keys(tmp_path):
+    path = str(tmp_path / "s.snapshot")
+    records = {f"k{i}": {"v": i} for i in range(500)}
+    write_snapshot(path, 7, {"note": "x"}, {"a": records, "b": {"k1": [1, 2]}})
+    with SharedSnapshotReader(path) as reader:
+        assert reader.version == 7 and reader.header["section_counts"] == {"a": 500, "b": 1}
+        assert all(reader.get("a", k) == v for k, v in records.items())
+        assert reader.get("b", "k1") == [1, 2] and reader.get("b", "k2") is None
+        assert sorted(reader.section("b")) == ["k1"] and len(reader.section("a")) == 500
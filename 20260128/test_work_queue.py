@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""WorkQueue: atomic chunk claims across processes, lease renewal, reclaim after killed workers, audit runner wiring."""
+import multiprocessing as mp
+import os
+import time
+
+import pytest
+
+import run_training_10k_matching_audit as audit
+import run_training_10k_matching_audit_sharded as sharded
+from work_queue import WorkQueue, drain
+
+
+def _fill(db, n=120, chunk_size=10, lease_seconds=0.5):
+    with WorkQueue(db, job="t", lease_seconds=lease_seconds) as q:
+        assert q.enqueue(((f"c{i:03d}", {"i": i}) for i in range(n)), chunk_size=chunk_size) == n
+        assert q.enqueue(((f"c{i:03d}", {"i": i}) for i in range(n)), chunk_size=chunk_size) == 0
+
+
+def _worker(db, log_dir, crash_marker=None):
+    def handle(items):
+        if crash_marker and not os.path.exists(crash_marker):
+            open(crash_marker, "w").close()
+            os._exit(9)  # simulate a worker dying mid-chunk without releasing its lease
+        with open(os.path.join(log_dir, f"{os.getpid()}.log"), "a") as f:
+            f.writelines(f"{k}\n" for k, _ in items)
+        return {k: p["i"] * 2 for k, p in items}
+
+    with WorkQueue(db, job="t", lease_seconds=0.5) as q:
+        drain(q, handle, idle_wait=0.05)
+
+
+def _hold_lease(db):
+    with WorkQueue(db, job="t", lease_seconds=0.5) as q:
+        q.claim("doomed")
+        time.sleep(60)
+
+
+def _executed(log_dir):
+    lines = []
+    for name in os.listdir(log_dir):
+        with open(os.path.join(log_dir, name)) as f:
+            lines.extend(f.read().split())
+    return lines
+
+
+def test_workers_drain_each_case_once_and_recover_from_crash(tmp_path):
+    db = str(tmp_path / "q.sqlite")
+    _fill(db)
+    marker, logs = str(tmp_path / "crashed"), tmp_path / "logs"
+    logs.mkdir()
+    procs = [mp.Process(target=_worker, args=(db, str(logs), marker if w == 0 else None)) for w in range(4)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(timeout=60)
+    assert sorted(p.exitcode for p in procs) == [0, 0, 0, 9]
+    executed = _executed(str(logs))
+    assert sorted(executed) == [f"c{i:03d}" for i in range(120)]  # the crashed chunk never logged, ran once elsewhere
+    with WorkQueue(db, job="t") as q:
+        assert q.counts() == {"pending": 0, "leased": 0, "done": 120, "failed": 0}
+        rows = list(q.rows())
+        assert [r["result"] for r in rows] == [i * 2 for i in range(120)]
+        assert sorted(r["attempts"] for r in rows)[-10:] == [2] * 10 and q.status()["retried"] == 10
+
+
+def test_sigkilled_lease_is_reclaimed_after_expiry(tmp_path):
+    db = str(tmp_path / "q.sqlite")
+    _fill(db, n=20)
+    p = mp.Process(target=_hold_lease, args=(db,))
+    p.start()
+    with WorkQueue(db, job="t", lease_seconds=0.5) as q:
+        while q.counts()["leased"] == 0:
+            time.sleep(0.01)
+        p.kill()
+        p.join()
+        first = q.claim("survivor")
+        assert first.chunk == 1  # chunk 0 still under the dead worker's live lease
+        time.sleep(0.6)
+        again = q.claim("survivor")
+        assert again.chunk == 0 and again.case_ids == [f"c{i:03d}" for i in range(10)]
+        assert q.complete(first, {k: 1 for k in first.case_ids}) == 10
+
+
+def test_renewal_keeps_lease_and_stale_owner_is_rejected(tmp_path):
+    db = str(tmp_path / "q.sqlite")
+    _fill(db, n=10, lease_seconds=0.3)
+    with WorkQueue(db, job="t", lease_seconds=0.3) as q:
+        lease = q.claim("a")
+        with q.keep_alive(lease, interval=0.05):
+            time.sleep(0.6)
+            assert q.claim("b") is None and not lease.lost
+        time.sleep(0.4)
+        stolen = q.claim("b")
+        assert stolen.case_ids == lease.case_ids
+        assert q.complete(lease, {k: "late" for k in lease.case_ids}) == 0
+        assert not q.renew(lease) and lease.lost
+        assert q.complete(stolen, {k: "ok" for k in stolen.case_ids}) == 10 and q.try_finalize("b")
+        assert not q.try_finalize("a")
+
+
+def test_expired_past_max_attempts_is_parked_as_failed(tmp_path):
+    db = str(tmp_path / "q.sqlite")
+    with WorkQueue(db, job="t", lease_seconds=0.01, max_attempts=2) as q:
+        q.enqueue([("x", {}), ("y", {})], chunk_size=1)
+        assert q.fail(q.claim("w"), ["x"], "boom") == 1
+        assert q.claim("w").case_ids == ["x"]
+        time.sleep(0.02)
+        assert q.claim("w").case_ids == ["y"]
+        assert q.counts()["failed"] == 1 and next(q.rows())["error"].startswith("lease expired")
+
+
+def test_queue_runners_match_sequential_output(tmp_path, monkeypatch):
+    for name in ("CHECKPOINT_JSONL", "QUEUE_CHECKPOINT_JSONL", "RESULTS_JSON", "RESULTS_COLUMNAR", "SUMMARY_MD",
+                 "PROGRESS_LOG"):
+        monkeypatch.setattr(audit, name, tmp_path / name.lower())
+    monkeypatch.setattr(sharded, "PROGRESS_LOG", tmp_path / "sharded.txt")
+    audit.run_audit(limit=80, mock=True)
+    expected = audit.RESULTS_JSON.read_bytes()
+    sequential_ckpt = audit.CHECKPOINT_JSONL.read_bytes()
+    audit.RESULTS_JSON.unlink()
+
+    stats = sharded.run_queue_sharded(str(tmp_path / "q.sqlite"), workers=2, limit=80, mock=True, chunk_size=7)
+    assert stats["finalized"] and stats["total"] == 80 and stats["exitcodes"] == [0, 0]
+    assert audit.RESULTS_JSON.read_bytes() == expected
+
+    solo = audit.run_queue_worker(tmp_path / "solo.sqlite", limit=80, mock=True, telemetry=None, journal_mode="delete")
+    assert solo["finalized"] and solo["queue"]["completed"] == 80
+    assert audit.RESULTS_JSON.read_bytes() == expected
+    # queue finalize rebuilds its own checkpoint; the sequential one stays resumable
+    assert audit.CHECKPOINT_JSONL.read_bytes() == sequential_ckpt
+    with WorkQueue(tmp_path / "solo.sqlite", job=audit.QUEUE_JOB, journal_mode="delete") as q:
+        assert q._conn.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+    with pytest.raises(ValueError):
+        WorkQueue(tmp_path / "solo.sqlite", journal_mode="memory")
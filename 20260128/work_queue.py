@@ -0,0 +1,409 @@
+# V4.0_STRATEGIC_LOCKED_BY_SMITH_LIN
+# -*- coding: utf-8 -*-
+"""
+Leased work queue in a single SQLite file, shared by every worker process (and host) of a long job.
+One row per case: (job, case_id) -> state pending|leased|done|failed, lease_owner, lease_expires,
+attempts, plus the JSON payload and, once done, the JSON result. Cases are grouped into fixed chunks at
+enqueue time; claim() atomically leases the lowest claimable chunk (pending, or leased with an expired
+lease) inside BEGIN IMMEDIATE, so two workers never hold the same case. Workers renew while they work
+(keep_alive) and complete() only if they still own the lease; a killed worker simply stops renewing and
+its chunk is reclaimed by the next claim() after expiry. A case whose lease expires max_attempts times
+is parked as failed instead of crashing workers forever.
+The database runs in WAL mode so readers (status, finalize) never block claimers. WAL relies on shared
+memory and therefore on all processes seeing the same host's file locks; on network filesystems pass
+journal_mode="delete". Leases use wall-clock time, so hosts must agree on time to well within
+lease_seconds. Run as script for queue status: python work_queue.py <db> [--job NAME].
+"""
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+DEFAULT_LEASE_SECONDS = 60.0
+DEFAULT_MAX_ATTEMPTS = 3
+STATES = ("pending", "leased", "done", "failed")
+# WAL for a local disk; delete/truncate/persist (rollback journal) for network filesystems. Every process
+# using one file must pass the same mode: each connection sets it, so a mismatch flips the file back and forth.
+JOURNAL_MODES = ("wal", "delete", "truncate", "persist")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job           TEXT    NOT NULL,
+    case_id       TEXT    NOT NULL,
+    seq           INTEGER NOT NULL,
+    chunk         INTEGER NOT NULL,
+    payload       TEXT,
+    state         TEXT    NOT NULL DEFAULT 'pending',
+    lease_owner   TEXT,
+    lease_expires REAL,
+    attempts      INTEGER NOT NULL DEFAULT 0,
+    result        TEXT,
+    error         TEXT,
+    updated_at    REAL,
+    PRIMARY KEY (job, case_id)
+);
+CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (job, state, chunk);
+CREATE INDEX IF NOT EXISTS jobs_order ON jobs (job, seq);
+CREATE TABLE IF NOT EXISTS job_meta (
+    job          TEXT PRIMARY KEY,
+    created_at   REAL NOT NULL,
+    finalized_by TEXT,
+    finalized_at REAL
+);
+"""
+
+
+def default_owner() -> str:
+    """host:pid:random — unique per worker process, readable in status output."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+class Lease:
+    """One claimed chunk: its cases (case_id, payload) in enqueue order and the current expiry."""
+
+    def __init__(self, owner: str, chunk: int, items: List[Tuple[str, Any]], expires: float):
+        self.owner = owner
+        self.chunk = chunk
+        self.items = items
+        self.expires = expires
+        self.lost = False
+
+    @property
+    def case_ids(self) -> List[str]:
+        return [k for k, _ in self.items]
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+
+class WorkQueue:
+    """SQLite-backed job table with atomic chunk claims, lease renewal and expired-lease reclaim."""
+
+    def __init__(
+        self,
+        path: str,
+        job: str = "default",
+        lease_seconds: float = DEFAULT_LEASE_SECONDS,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        busy_timeout: float = 30.0,
+        journal_mode: str = "wal",
+    ):
+        if journal_mode not in JOURNAL_MODES:
+            raise ValueError(f"journal_mode must be one of {JOURNAL_MODES}, got {journal_mode!r}")
+        self.path = str(path)
+        self.job = job
+        self.lease_seconds = float(lease_seconds)
+        self.max_attempts = max(1, int(max_attempts))
+        self._busy_timeout = float(busy_timeout)
+        self._journal_mode = journal_mode
+        d = os.path.dirname(self.path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        self._conn = self._connect()
+        self._conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        # isolation_level=None: autocommit, every write transaction is an explicit BEGIN IMMEDIATE
+        conn = sqlite3.connect(self.path, timeout=self._busy_timeout, isolation_level=None)
+        conn.execute(f"PRAGMA busy_timeout={int(self._busy_timeout * 1000)}")
+        conn.execute(f"PRAGMA journal_mode={self._journal_mode}")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _write(self):
+        return _Transaction(self._conn)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "WorkQueue":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    # -- producer ---------------------------------------------------------------
+    def enqueue(self, items: Iterable[Tuple[str, Any]], chunk_size: int = 25) -> int:
+        """
+        Add (case_id, payload) pairs in order, chunk_size cases per claimable chunk. Idempotent:
+        case ids already in the job keep their state, so every worker may enqueue the same corpus.
+        Returns the number of newly inserted cases.
+        """
+        chunk_size = max(1, int(chunk_size))
+        now = time.time()
+        added = 0
+        with self._write() as c:
+            c.execute("INSERT OR IGNORE INTO job_meta (job, created_at) VALUES (?, ?)", (self.job, now))
+            seq = c.execute("SELECT COALESCE(MAX(seq) + 1, 0) FROM jobs WHERE job = ?", (self.job,)).fetchone()[0]
+            for case_id, payload in items:
+                cur = c.execute(
+                    "INSERT OR IGNORE INTO jobs (job, case_id, seq, chunk, payload, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (self.job, str(case_id), seq, seq // chunk_size, json.dumps(payload, ensure_ascii=False), now),
+                )
+                if cur.rowcount == 1:
+                    seq += 1
+                    added += 1
+        return added
+
+    # -- worker -----------------------------------------------------------------
+    def claim(self, owner: str) -> Optional[Lease]:
+        """
+        Lease the lowest claimable chunk for owner, or return None when nothing is claimable right now
+        (everything done/failed, or all remaining chunks held by live leases). Expired leases past
+        max_attempts are marked failed here rather than handed out again.
+        """
+        now = time.time()
+        expires = now + self.lease_seconds
+        with self._write() as c:
+            c.execute(
+                "UPDATE jobs SET state = 'failed', lease_owner = NULL, updated_at = ?, "
+                "error = 'lease expired after ' || attempts || ' attempts' "
+                "WHERE job = ? AND state = 'leased' AND lease_expires < ? AND attempts >= ?",
+                (now, self.job, now, self.max_attempts),
+            )
+            pending = c.execute("SELECT MIN(chunk) FROM jobs WHERE job = ? AND state = 'pending'",
+                                (self.job,)).fetchone()[0]
+            expired = c.execute("SELECT MIN(chunk) FROM jobs WHERE job = ? AND state = 'leased' AND lease_expires < ?",
+                                (self.job, now)).fetchone()[0]
+            chunks = [x for x in (pending, expired) if x is not None]
+            if not chunks:
+                return None
+            chunk = min(chunks)
+            c.execute(
+                "UPDATE jobs SET state = 'leased', lease_owner = ?, lease_expires = ?, attempts = attempts + 1, "
+                "updated_at = ? WHERE job = ? AND chunk = ? AND (state = 'pending' OR (state = 'leased' AND lease_expires < ?))",
+                (owner, expires, now, self.job, chunk, now),
+            )
+            rows = c.execute(
+                "SELECT case_id, payload FROM jobs WHERE job = ? AND chunk = ? AND state = 'leased' AND lease_owner = ? "
+                "ORDER BY seq",
+                (self.job, chunk, owner),
+            ).fetchall()
+        return Lease(owner, chunk, [(k, json.loads(p)) for k, p in rows], expires)
+
+    def renew(self, lease: Lease) -> bool:
+        """Extend lease by lease_seconds; False (and lease.lost) if another worker has taken it over."""
+        now = time.time()
+        with self._write() as c:
+            cur = c.execute(
+                "UPDATE jobs SET lease_expires = ?, updated_at = ? "
+                "WHERE job = ? AND chunk = ? AND state = 'leased' AND lease_owner = ?",
+                (now + self.lease_seconds, now, self.job, lease.chunk, lease.owner),
+            )
+        if cur.rowcount == 0:
+            lease.lost = True
+            return False
+        lease.expires = now + self.lease_seconds
+        return True
+
+    def complete(self, lease: Lease, results: Dict[str, Any]) -> int:
+        """
+        Mark cases done with their results in one transaction. Only cases still leased by this owner are
+        accepted (a late result from a reclaimed lease is dropped); returns how many were accepted.
+        """
+        now = time.time()
+        accepted = 0
+        with self._write() as c:
+            for case_id, result in results.items():
+                cur = c.execute(
+                    "UPDATE jobs SET state = 'done', result = ?, error = NULL, lease_owner = NULL, lease_expires = NULL, "
+                    "updated_at = ? WHERE job = ? AND case_id = ? AND state = 'leased' AND lease_owner = ?",
+                    (json.dumps(result, ensure_ascii=False), now, self.job, case_id, lease.owner),
+                )
+                accepted += cur.rowcount
+        return accepted
+
+    def fail(self, lease: Lease, case_ids: Iterable[str], error: str) -> int:
+        """Return cases to pending for another attempt, or park them as failed once max_attempts is reached."""
+        now = time.time()
+        n = 0
+        with self._write() as c:
+            for case_id in case_ids:
+                cur = c.execute(
+                    "UPDATE jobs SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, error = ?, "
+                    "lease_owner = NULL, lease_expires = NULL, updated_at = ? "
+                    "WHERE job = ? AND case_id = ? AND state = 'leased' AND lease_owner = ?",
+                    (self.max_attempts, str(error)[:500], now, self.job, case_id, lease.owner),
+                )
+                n += cur.rowcount
+        return n
+
+    def release(self, lease: Lease) -> int:
+        """Give an unfinished lease back (graceful shutdown); the attempt is not counted."""
+        with self._write() as c:
+            cur = c.execute(
+                "UPDATE jobs SET state = 'pending', attempts = MAX(attempts - 1, 0), lease_owner = NULL, "
+                "lease_expires = NULL, updated_at = ? WHERE job = ? AND chunk = ? AND state = 'leased' AND lease_owner = ?",
+                (time.time(), self.job, lease.chunk, lease.owner),
+            )
+        return cur.rowcount
+
+    def keep_alive(self, lease: Lease, interval: Optional[float] = None) -> "LeaseKeeper":
+        """Context manager renewing lease from a background thread every lease_seconds / 3."""
+        return LeaseKeeper(self, lease, interval or self.lease_seconds / 3.0)
+
+    # -- status / results -------------------------------------------------------
+    def counts(self) -> Dict[str, int]:
+        out = {s: 0 for s in STATES}
+        for state, n in self._conn.execute("SELECT state, COUNT(*) FROM jobs WHERE job = ? GROUP BY state", (self.job,)):
+            out[state] = n
+        return out
+
+    def drained(self) -> bool:
+        """True when every case is done or failed."""
+        c = self.counts()
+        return c["pending"] == 0 and c["leased"] == 0
+
+    def elapsed(self) -> float:
+        """Seconds from the job's first enqueue to its latest state change."""
+        row = self._conn.execute(
+            "SELECT m.created_at, (SELECT MAX(updated_at) FROM jobs WHERE job = m.job) FROM job_meta m WHERE m.job = ?",
+            (self.job,),
+        ).fetchone()
+        if not row or row[1] is None:
+            return 0.0
+        return max(0.0, row[1] - row[0])
+
+    def status(self) -> Dict[str, Any]:
+        now = time.time()
+        owners = self._conn.execute(
+            "SELECT lease_owner, COUNT(*), MIN(lease_expires) FROM jobs WHERE job = ? AND state = 'leased' "
+            "GROUP BY lease_owner", (self.job,)).fetchall()
+        retried = self._conn.execute("SELECT COUNT(*) FROM jobs WHERE job = ? AND attempts > 1", (self.job,)).fetchone()[0]
+        return {
+            "job": self.job,
+            "counts": self.counts(),
+            "retried": retried,
+            "leases": [{"owner": o, "cases": n, "expires_in": round(e - now, 1)} for o, n, e in owners],
+            "elapsed_seconds": round(self.elapsed(), 2),
+        }
+
+    def rows(self) -> Iterator[Dict[str, Any]]:
+        """All cases in enqueue order with decoded payload / result (result is None unless done)."""
+        cur = self._conn.execute(
+            "SELECT case_id, payload, state, result, error, attempts FROM jobs WHERE job = ? ORDER BY seq", (self.job,))
+        for case_id, payload, state, result, error, attempts in cur:
+            yield {
+                "case_id": case_id,
+                "payload": json.loads(payload) if payload is not None else None,
+                "state": state,
+                "result": json.loads(result) if result is not None else None,
+                "error": error,
+                "attempts": attempts,
+            }
+
+    def try_finalize(self, owner: str) -> bool:
+        """Once drained, exactly one caller wins the right to write the job's final outputs."""
+        if not self.drained():
+            return False
+        with self._write() as c:
+            cur = c.execute("UPDATE job_meta SET finalized_by = ?, finalized_at = ? WHERE job = ? AND finalized_by IS NULL",
+                            (owner, time.time(), self.job))
+        return cur.rowcount == 1
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE … COMMIT/ROLLBACK: takes the write lock up front so claims cannot interleave."""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self._conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self._conn.execute("BEGIN IMMEDIATE")
+        return self._conn
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self._conn.execute("ROLLBACK" if exc_type is not None else "COMMIT")
+
+
+class LeaseKeeper:
+    """Background renewal for one lease; uses its own connection (sqlite3 connections are per thread)."""
+
+    def __init__(self, queue: WorkQueue, lease: Lease, interval: float):
+        self._queue = queue
+        self._lease = lease
+        self._interval = max(0.01, float(interval))
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"lease-keeper-{lease.chunk}", daemon=True)
+
+    def _run(self) -> None:
+        q = WorkQueue(self._queue.path, self._queue.job, self._queue.lease_seconds, self._queue.max_attempts,
+                      self._queue._busy_timeout, self._queue._journal_mode)
+        try:
+            while not self._stop.wait(self._interval):
+                if not q.renew(self._lease):
+                    break
+        finally:
+            q.close()
+
+    def __enter__(self) -> Lease:
+        self._thread.start()
+        return self._lease
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+def drain(
+    queue: WorkQueue,
+    handle_chunk: Callable[[List[Tuple[str, Any]]], Dict[str, Any]],
+    owner: Optional[str] = None,
+    on_result: Optional[Callable[[str, Any], None]] = None,
+    idle_wait: float = 0.5,
+    max_chunks: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Worker loop: claim a chunk, run handle_chunk(items) -> {case_id: result} under keep_alive, complete.
+    An exception fails the whole chunk (retried up to max_attempts); cases missing from the returned mapping
+    are failed individually. While other workers still hold live leases the loop waits idle_wait and retries,
+    so it only returns once the job is drained (or after max_chunks). on_result sees every accepted result.
+    """
+    owner = owner or default_owner()
+    stats = {"owner": owner, "chunks": 0, "completed": 0, "failed": 0, "rejected": 0}
+    while max_chunks is None or stats["chunks"] < max_chunks:
+        lease = queue.claim(owner)
+        if lease is None:
+            if queue.drained():
+                break
+            time.sleep(idle_wait)
+            continue
+        stats["chunks"] += 1
+        try:
+            with queue.keep_alive(lease):
+                results = handle_chunk(lease.items)
+        except Exception as e:
+            stats["failed"] += queue.fail(lease, lease.case_ids, f"{type(e).__name__}: {e}")
+            continue
+        missing = [k for k in lease.case_ids if k not in results]
+        accepted = queue.complete(lease, {k: results[k] for k in lease.case_ids if k in results})
+        stats["completed"] += accepted
+        stats["rejected"] += len(results) - accepted
+        if missing:
+            stats["failed"] += queue.fail(lease, missing, "no result returned")
+        if on_result is not None and accepted:
+            for k in lease.case_ids:
+                if k in results:
+                    on_result(k, results[k])
+    return stats
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Work queue status")
+    parser.add_argument("db")
+    parser.add_argument("--job", default=None, help="job name (default: all jobs in the file)")
+    parser.add_argument("--journal-mode", choices=JOURNAL_MODES, default="wal",
+                        help="must match the workers' mode (delete on network filesystems)")
+    args = parser.parse_args()
+    probe = WorkQueue(args.db, journal_mode=args.journal_mode)
+    jobs = [args.job] if args.job else [r[0] for r in probe._conn.execute("SELECT job FROM job_meta ORDER BY created_at")]
+    probe.close()
+    for name in jobs:
+        with WorkQueue(args.db, name, journal_mode=args.journal_mode) as q:
+            print(json.dumps(q.status(), ensure_ascii=False))